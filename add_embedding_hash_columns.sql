@@ -0,0 +1,10 @@
+-- Empreinte du texte source des embeddings (utilisée par embedding_pipeline.py
+-- pour ne pas ré-encoder les lignes inchangées)
+ALTER TABLE items
+ADD COLUMN IF NOT EXISTS embedding_hash VARCHAR(40);
+
+ALTER TABLE market_analyses
+ADD COLUMN IF NOT EXISTS embedding_hash VARCHAR(40);
+
+COMMENT ON COLUMN items.embedding_hash IS 'SHA-1 du modèle et du texte ayant servi à calculer embedding';
+COMMENT ON COLUMN market_analyses.embedding_hash IS 'SHA-1 du modèle et du texte ayant servi à calculer embedding';
@@ -4,29 +4,25 @@ import io
 import json
 import logging
 import re
-import hashlib
 import smtplib
 import threading
 import queue
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple
-from dataclasses import dataclass, asdict
-from enum import Enum
+from typing import Dict, List, Optional, Any
+from dataclasses import asdict
 from functools import lru_cache, wraps
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from flask import Flask, jsonify, render_template, request, Response, stream_with_context, make_response, send_file, url_for
+from flask import Flask, jsonify, render_template, request, Response, stream_with_context, make_response, send_file, url_for, redirect
 from metrics_api import metrics_bp
 from werkzeug.utils import secure_filename
 from pdf_optimizer import generate_optimized_pdf, create_summary_box, create_item_card_html, format_price_for_pdf
 from flask_cors import CORS
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import TfidfVectorizer
 from dotenv import load_dotenv
 from celery.result import AsyncResult
 from celery_app import celery
+from task_events import stream_task_events
 from tasks import chat_task, pdf_task, markets_chat_task
 from tasks import chat_v2_task, markets_chat_v2_task
 import requests
@@ -44,6 +40,9 @@ from stock_api_manager import (
     get_stock_price_stable,
     get_stock_price_manus
 )
+from stock_price_sync import bulk_upsert_stock_prices
+from report_cache import bump_inventory_version
+from embedding_pipeline import EmbeddingBackfill
 from web_search_manager import (
     OpenAIWebSearchManager,
     WebSearchType,
@@ -69,7 +68,7 @@ from unified_market_manager import (
 from google_cse_stock_data import GoogleCSEStockDataManager
 from enhanced_google_cse_ai_report import EnhancedGoogleCSEAIReport
 from intelligent_scraper import IntelligentScraper, get_scraper
-from gpt5_compat import from_chat_completions_compat, chat_tools_messages, from_responses_simple, extract_output_text
+from gpt5_compat import from_chat_completions_compat, from_responses_simple, extract_output_text
 from scrapingbee_scraper import ScrapingBeeScraper, get_scrapingbee_scraper
 from enhanced_chatbot_manager import EnhancedChatbotManager, ConversationOptimizer
 from chatbot_visualizations import ChatbotVisualizer, ReportGenerator
@@ -145,75 +144,6 @@ def get_global_scraper():
 forex_cache = {}
 FOREX_CACHE_DURATION = 3600  # 1 heure
 
-# Classes de données sophistiquées
-@dataclass
-class CollectionItem:
-    """Modèle de données enrichi pour un objet de collection"""
-    name: str
-    category: str
-    status: str
-    id: Optional[int] = None
-    construction_year: Optional[int] = None
-    condition: Optional[str] = None
-    description: Optional[str] = None
-    current_value: Optional[float] = None
-    sold_price: Optional[float] = None
-    acquisition_price: Optional[float] = None
-    for_sale: bool = False
-    sale_status: Optional[str] = None
-    sale_progress: Optional[str] = None
-    buyer_contact: Optional[str] = None
-    intermediary: Optional[str] = None
-    current_offer: Optional[float] = None
-    commission_rate: Optional[float] = None
-    last_action_date: Optional[str] = None
-    surface_m2: Optional[float] = None
-    rental_income_chf: Optional[float] = None
-    location: Optional[str] = None
-    # Champs spécifiques aux actions
-    stock_symbol: Optional[str] = None
-    stock_quantity: Optional[int] = None
-    stock_purchase_price: Optional[float] = None
-    stock_exchange: Optional[str] = None
-    stock_currency: Optional[str] = None
-    current_price: Optional[float] = None
-    last_price_update: Optional[str] = None
-    # Métriques boursières supplémentaires
-    stock_volume: Optional[int] = None
-    stock_pe_ratio: Optional[float] = None
-    stock_52_week_high: Optional[float] = None
-    stock_52_week_low: Optional[float] = None
-    stock_change: Optional[float] = None
-    stock_change_percent: Optional[float] = None
-    stock_average_volume: Optional[int] = None
-    created_at: Optional[str] = None
-    updated_at: Optional[str] = None
-    embedding: Optional[List[float]] = None
-    
-    def to_dict(self) -> Dict[str, Any]:
-        """Convertit en dictionnaire"""
-        return {k: v for k, v in asdict(self).items() if v is not None}
-    
-    @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> 'CollectionItem':
-        """Crée une instance depuis un dictionnaire"""
-        # Filtrer seulement les champs valides
-        valid_fields = {k: v for k, v in data.items() if k in cls.__annotations__}
-        return cls(**valid_fields)
-
-class QueryIntent(Enum):
-    """Types d'intentions sophistiquées"""
-    VEHICLE_ANALYSIS = "vehicle_analysis"
-    FINANCIAL_ANALYSIS = "financial_analysis"
-    SALE_PROGRESS_TRACKING = "sale_progress_tracking"
-    MARKET_INTELLIGENCE = "market_intelligence"
-    CATEGORY_ANALYTICS = "category_analytics"
-    PERFORMANCE_METRICS = "performance_metrics"
-    PORTFOLIO_OPTIMIZATION = "portfolio_optimization"
-    TECHNICAL_SPECS = "technical_specs"
-    SEMANTIC_SEARCH = "semantic_search"
-    UNKNOWN = "unknown"
-
 # Variables d'environnement avec validation (déjà définies ci-dessus)
 APP_URL = os.getenv("APP_URL", "https://inventorysbo.onrender.com")
 
@@ -258,28 +188,26 @@ if not SUPABASE_URL or not SUPABASE_KEY:
 
 logger.info("Variables d'environnement validees")
 
-# Connexions avec gestion d'erreurs
-supabase = None
-openai_client = None
+# Connexions, cache, mémoire de conversation et moteur IA (module partagé avec les workers Celery)
+from chat_engine import (
+    supabase,
+    openai_client,
+    CollectionItem,
+    smart_cache,
+    conversation_memory,
+    is_item_sold,
+    is_item_available,
+    AdvancedDataManager,
+    ai_engine,
+    DEFAULT_RAG_TOP_ITEMS,
+    DEFAULT_RAG_TOP_ANALYSES,
+    _build_retrieval_context_from_supabase,
+    build_markets_context,
+)
+if supabase is None:
+    raise EnvironmentError("Connexion Supabase impossible")
 gemini_client = None
 
-try:
-    from supabase import create_client
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-    logger.info("Supabase connecte")
-except Exception as e:
-    logger.error(f"Erreur Supabase: {e}")
-    raise
-
-try:
-    if OPENAI_API_KEY:
-        from openai import OpenAI
-        openai_client = OpenAI(api_key=OPENAI_API_KEY)
-        logger.info("OpenAI connecte")
-    else:
-        logger.warning("⚠️ OpenAI non configuré")
-except Exception as e:
-    logger.warning(f"⚠️ OpenAI non disponible: {e}")
 
 # Initialize Web Search Manager
 web_search_manager = None
@@ -626,20 +554,12 @@ def get_optimized_pdf_css():
 def generate_optimized_pdf(html_content: str, css_string: str, filename: str):
     """Génère un PDF optimisé avec gestion d'erreur mémoire"""
     try:
-        from weasyprint import HTML, CSS
-        from weasyprint.text.fonts import FontConfiguration
-        
-        # Configuration des polices
-        font_config = FontConfiguration()
+        from pdf_renderer import get_pdf_renderer
         
-        # Créer le PDF avec optimisations mémoire
-        html_doc = HTML(string=html_content)
-        css_doc = CSS(string=css_string, font_config=font_config)
-        
-        # Options pour réduire la consommation mémoire
-        pdf = html_doc.write_pdf(
-            stylesheets=[css_doc], 
-            font_config=font_config,
+        # Police et CSS compilées une fois par process; options pour réduire la consommation mémoire
+        pdf = get_pdf_renderer().render(
+            html_content,
+            css_string,
             optimize_images=True,
             jpeg_quality=85
         )
@@ -2250,129 +2170,9 @@ Ce rapport a été généré automatiquement par votre système de gestion
         }
         return f"<strong>Prochaine étape:</strong> {next_steps.get(status, 'Continuez le suivi de cette vente.')}"
 
-# Cache sophistiqué
-class SmartCache:
-    """Cache intelligent multi-niveaux"""
-    
-    def __init__(self):
-        self._caches = {
-            'items': {'data': None, 'timestamp': None, 'ttl': 60},
-            'analytics': {'data': None, 'timestamp': None, 'ttl': 300},
-            'ai_responses': {'data': {}, 'timestamp': None, 'ttl': 900},
-            'embeddings': {'data': {}, 'timestamp': None, 'ttl': 3600}
-        }
-    
-    def get(self, cache_name: str, key: str = 'default'):
-        """Récupère du cache"""
-        if cache_name not in self._caches:
-            return None
-        
-        cache_info = self._caches[cache_name]
-        now = datetime.now()
-        
-        if cache_info['timestamp'] and (now - cache_info['timestamp']).seconds < cache_info['ttl']:
-            if cache_name in ['ai_responses', 'embeddings']:
-                return cache_info['data'].get(key)
-            return cache_info['data']
-        
-        return None
-    
-    def set(self, cache_name: str, data: Any, key: str = 'default'):
-        """Stocke dans le cache"""
-        if cache_name not in self._caches:
-            return
-        
-        if cache_name in ['ai_responses', 'embeddings']:
-            if not isinstance(self._caches[cache_name]['data'], dict):
-                self._caches[cache_name]['data'] = {}
-            self._caches[cache_name]['data'][key] = data
-        else:
-            self._caches[cache_name]['data'] = data
-        
-        self._caches[cache_name]['timestamp'] = datetime.now()
-    
-    def invalidate(self, cache_name: str = None):
-        """Invalide le cache"""
-        if cache_name:
-            if cache_name in self._caches:
-                self._caches[cache_name]['data'] = None if cache_name not in ['ai_responses', 'embeddings'] else {}
-                self._caches[cache_name]['timestamp'] = None
-        else:
-            for cache_info in self._caches.values():
-                cache_info['data'] = None
-                cache_info['timestamp'] = None
-
-# Instance globale du cache
-smart_cache = SmartCache()
-
 # Instance globale du gestionnaire Gmail
 gmail_manager = GmailNotificationManager()
 
-# ──────────────────────────────────────────────────────────
-# Conversation Memory (SQLite local store)
-# ──────────────────────────────────────────────────────────
-
-class ConversationMemoryStore:
-    """SQLite-backed memory store for conversation history per session_id."""
-
-    def __init__(self, db_filename: str = "chat_memory.db"):
-        try:
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-        except Exception:
-            base_dir = os.getcwd()
-        self.db_path = os.path.join(base_dir, db_filename)
-        self._ensure_schema()
-
-    def _connect(self):
-        return sqlite3.connect(self.db_path, check_same_thread=False)
-
-    def _ensure_schema(self):
-        with self._connect() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS messages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id TEXT NOT NULL,
-                    role TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    created_at TEXT NOT NULL
-                )
-                """
-            )
-            # Index for quick retrieval
-            cur.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, id)")
-            conn.commit()
-
-    def add_message(self, session_id: str, role: str, content: str):
-        try:
-            with self._connect() as conn:
-                cur = conn.cursor()
-                cur.execute(
-                    "INSERT INTO messages(session_id, role, content, created_at) VALUES (?,?,?,?)",
-                    (session_id, role, content, datetime.utcnow().isoformat()),
-                )
-                conn.commit()
-        except Exception:
-            # Memory is best-effort; avoid breaking the request
-            pass
-
-    def get_recent_messages(self, session_id: str, limit: int = 12):
-        try:
-            with self._connect() as conn:
-                cur = conn.cursor()
-                cur.execute(
-                    "SELECT role, content FROM messages WHERE session_id=? ORDER BY id DESC LIMIT ?",
-                    (session_id, max(1, int(limit))),
-                )
-                rows = cur.fetchall()
-                # Return in chronological order
-                return [{"role": r[0], "content": r[1]} for r in reversed(rows)]
-        except Exception:
-            return []
-
-conversation_memory = ConversationMemoryStore()
-
 # Store previous Responses API IDs per session to enable stateful conversations
 responses_prev_ids: Dict[str, str] = {}
 
@@ -2400,38 +2200,6 @@ def _update_chatbot_metrics(start_time: float, error: Exception = None):
     except Exception:
         pass
 
-# ──────────────────────────────────────────────────────────
-# Status normalization helpers
-# ──────────────────────────────────────────────────────────
-
-def is_item_sold(item: Any) -> bool:
-    """Detect if an item is sold using multiple signals (status, sale_status)."""
-    try:
-        status = str(getattr(item, 'status', '') or '').strip().lower()
-        sale_status = str(getattr(item, 'sale_status', '') or '').strip().lower()
-        sale_progress = str(getattr(item, 'sale_progress', '') or '').strip().lower()
-        if status in {'sold', 'vendu', 'vendue'}:
-            return True
-        if sale_status in {'completed', 'complete', 'finalisé', 'finalisee', 'finalise', 'completed sale', 'completed_sale'}:
-            return True
-        if sale_progress in {'completed', 'complete', 'finalisé', 'finalisee', 'finalise'}:
-            return True
-        try:
-            sold_price = getattr(item, 'sold_price', None)
-            if sold_price is not None and float(sold_price) > 0:
-                return True
-        except Exception:
-            pass
-    except Exception:
-        return False
-    return False
-
-def is_item_available(item: Any) -> bool:
-    try:
-        return not is_item_sold(item)
-    except Exception:
-        return True
-
 # ──────────────────────────────────────────────────────────
 # Simple moderation/guardrails
 # ──────────────────────────────────────────────────────────
@@ -2867,1454 +2635,39 @@ app.config.setdefault('MARKET_PDF_UPLOAD_FOLDER', os.path.join(app.root_path, 's
 app.config.setdefault('MARKET_PDF_ALLOWED_EXTENSIONS', {'.pdf'})
 # Créer le dossier si nécessaire
 os.makedirs(app.config['MARKET_PDF_UPLOAD_FOLDER'], exist_ok=True)
-# Gestionnaire de données sophistiqué
-class AdvancedDataManager:
-    """Gestionnaire de données avec logique métier avancée"""
-    
-    @staticmethod
-    def fetch_all_items() -> List[CollectionItem]:
-        """Récupère tous les objets avec cache"""
-        cached_items = smart_cache.get('items')
-        if cached_items:
-            logger.info(f"📦 Cache: {len(cached_items)} objets")
-            return cached_items
-        
-        try:
-            if not supabase:
-                return []
-            
-            response = supabase.table("items").select("*").order("updated_at", desc=True).execute()
-            raw_items = response.data or []
-            
-            items = []
-            for raw_item in raw_items:
-                try:
-                    # Convertir l'embedding du format pgvector
-                    if 'embedding' in raw_item and raw_item['embedding']:
-                        embedding = raw_item['embedding']
-                        
-                        # Si c'est une string qui ressemble à un array pgvector
-                        if isinstance(embedding, str):
-                            # Format pgvector: "[0.1,0.2,0.3]" ou "(0.1,0.2,0.3)"
-                            embedding = embedding.strip()
-                            if embedding.startswith('[') and embedding.endswith(']'):
-                                # Format JSON array
-                                try:
-                                    raw_item['embedding'] = json.loads(embedding)
-                                except:
-                                    # Fallback: parser manuellement
-                                    raw_item['embedding'] = [float(x) for x in embedding[1:-1].split(',')]
-                            elif embedding.startswith('(') and embedding.endswith(')'):
-                                # Format pgvector tuple
-                                raw_item['embedding'] = [float(x) for x in embedding[1:-1].split(',')]
-                            else:
-                                logger.warning(f"Format d'embedding inconnu pour {raw_item.get('name', 'item')}: {embedding[:50]}")
-                                raw_item['embedding'] = None
-                        elif isinstance(embedding, list):
-                            # Déjà une liste, parfait
-                            pass
-                        else:
-                            logger.warning(f"Type d'embedding invalide pour {raw_item.get('name', 'item')}: {type(embedding)}")
-                            raw_item['embedding'] = None
-                    
-                    item = CollectionItem.from_dict(raw_item)
-                    items.append(item)
-                except Exception as e:
-                    logger.warning(f"Erreur item {raw_item.get('id', '?')}: {e}")
-                    continue
-            
-            smart_cache.set('items', items)
-            logger.info(f"🔄 {len(items)} objets chargés")
-            return items
-            
-        except Exception as e:
-            logger.error(f"Erreur fetch: {e}")
-            return []
-    
-    @staticmethod
-    def calculate_advanced_analytics(items: List[CollectionItem]) -> Dict[str, Any]:
-        """Calcule des analytics sophistiquées"""
-        cached_analytics = smart_cache.get('analytics')
-        if cached_analytics:
-            return cached_analytics
-        
-        analytics = {
-            'basic_metrics': AdvancedDataManager._basic_metrics(items),
-            'financial_metrics': AdvancedDataManager._financial_metrics(items),
-            'category_analytics': AdvancedDataManager._category_analytics(items),
-            'sales_pipeline': AdvancedDataManager._sales_pipeline(items),
-            'performance_kpis': AdvancedDataManager._performance_kpis(items),
-            'market_insights': AdvancedDataManager._market_insights(items),
-            'stock_analytics': AdvancedDataManager._stock_analytics(items)
-        }
-        
-        smart_cache.set('analytics', analytics)
-        return analytics
-    
-    @staticmethod
-    def _basic_metrics(items: List[CollectionItem]) -> Dict[str, Any]:
-        """Métriques de base enrichies"""
-        total = len(items)
-        # Utiliser la normalisation robuste (statuts/indices multiples)
-        available = len([i for i in items if is_item_available(i)])
-        sold = len([i for i in items if is_item_sold(i)])
-        for_sale = len([i for i in items if i.for_sale])
-        # Valeur totale par défaut = somme des valeurs disponibles (hors vendus)
-        total_value = sum((i.current_value or 0) for i in items if is_item_available(i) and (i.current_value is not None))
-        
-        return {
-            'total_items': total,
-            'available_items': available,
-            'sold_items': sold,
-            'items_for_sale': for_sale,
-            'total_value': total_value,
-            'availability_rate': (available / total * 100) if total > 0 else 0,
-            'conversion_rate': (sold / total * 100) if total > 0 else 0,
-            'active_sale_rate': (for_sale / available * 100) if available > 0 else 0
-        }
-    
-    @staticmethod
-    def _financial_metrics(items: List[CollectionItem]) -> Dict[str, Any]:
-        """Métriques financières avancées"""
-        total_current = sum(i.current_value or 0 for i in items if i.status == 'Available' and i.current_value)
-        total_sold = sum(i.sold_price or 0 for i in items if i.status == 'Sold' and i.sold_price)
-        total_acquisition = sum(i.acquisition_price or 0 for i in items if i.acquisition_price)
-        
-        # ROI calculation
-        profit_items = [
-            (i.sold_price or 0) - (i.acquisition_price or 0)
-            for i in items 
-            if i.status == 'Sold' and i.sold_price and i.acquisition_price
-        ]
-        
-        total_profit = sum(profit_items)
-        roi_percentage = (total_profit / total_acquisition * 100) if total_acquisition > 0 else 0
-        
-        return {
-            'portfolio_value': total_current,
-            'realized_sales': total_sold,
-            'total_acquisition_cost': total_acquisition,
-            'total_profit': total_profit,
-            'roi_percentage': roi_percentage,
-            'average_item_value': total_current / len([i for i in items if i.current_value]) if any(i.current_value for i in items) else 0,
-            'profit_margin': (total_profit / total_sold * 100) if total_sold > 0 else 0
-        }
-    
-    @staticmethod
-    def _category_analytics(items: List[CollectionItem]) -> Dict[str, Any]:
-        """Analytics par catégorie"""
-        categories = {}
-        
-        for item in items:
-            cat = item.category or 'Uncategorized'
-            if cat not in categories:
-                categories[cat] = {
-                    'total': 0, 'available': 0, 'sold': 0, 'for_sale': 0,
-                    'total_value': 0, 'avg_value': 0
-                }
-            
-            stats = categories[cat]
-            stats['total'] += 1
-            
-            if item.status == 'Available':
-                stats['available'] += 1
-            elif item.status == 'Sold':
-                stats['sold'] += 1
-            
-            if item.for_sale:
-                stats['for_sale'] += 1
-            
-            value = item.current_value or item.sold_price or 0
-            stats['total_value'] += value
-        
-        # Calculer les moyennes
-        for stats in categories.values():
-            if stats['total'] > 0:
-                stats['avg_value'] = stats['total_value'] / stats['total']
-        
-        return categories
-    
-    @staticmethod
-    def _sales_pipeline(items: List[CollectionItem]) -> Dict[str, Any]:
-        """Pipeline de vente sophistiqué"""
-        pipeline_stages = {
-            'initial': 'Mise en vente initiale',
-            'presentation': 'Préparation présentation',
-            'intermediary': 'Choix intermédiaires',
-            'inquiries': 'Premières demandes',
-            'viewing': 'Visites programmées',
-            'negotiation': 'En négociation',
-            'offer_received': 'Offres reçues',
-            'offer_accepted': 'Offres acceptées',
-            'paperwork': 'Formalités en cours',
-            'completed': 'Ventes finalisées'
-        }
-        
-        pipeline_data = {}
-        total_value = 0
-        
-        for stage_key, stage_name in pipeline_stages.items():
-            stage_items = [i for i in items if i.for_sale and i.sale_status == stage_key]
-            stage_value = sum(i.current_value or 0 for i in stage_items)
-            
-            pipeline_data[stage_key] = {
-                'name': stage_name,
-                'count': len(stage_items),
-                'total_value': stage_value,
-                'items': [{'name': i.name, 'value': i.current_value} for i in stage_items]
-            }
-            total_value += stage_value
-        
-        return {
-            'stages': pipeline_data,
-            'total_pipeline_value': total_value,
-            'active_negotiations': len([i for i in items if i.for_sale and i.sale_status in ['negotiation', 'offer_received']])
-        }
-    
-    @staticmethod
-    def _performance_kpis(items: List[CollectionItem]) -> Dict[str, Any]:
-        """KPIs de performance"""
-        # Top performers par valeur
-        top_sales = sorted(
-            [i for i in items if i.sold_price], 
-            key=lambda x: x.sold_price, 
-            reverse=True
-        )[:5]
-        
-                # Distribution des prix
-        prices = [i.sold_price or i.current_value for i in items if i.sold_price or i.current_value]
-        price_ranges = {
-            'under_100k': len([p for p in prices if p < 100000]),
-            '100k_500k': len([p for p in prices if 100000 <= p < 500000]),
-            '500k_1m': len([p for p in prices if 500000 <= p < 1000000]),
-            'over_1m': len([p for p in prices if p >= 1000000])
-        }
-        
-        return {
-            'top_value_sales': [{'name': i.name, 'value': i.sold_price} for i in top_sales],
-            'price_distribution': price_ranges,
-            'inventory_turnover': len([i for i in items if i.status == 'Sold']) / len(items) if items else 0
-        }
-    
-    @staticmethod
-    def _market_insights(items: List[CollectionItem]) -> Dict[str, Any]:
-        """Insights de marché"""
-        # Hotness par catégorie (basé sur l'activité)
-        category_activity = {}
-        
-        for item in items:
-            cat = item.category or 'Other'
-            if cat not in category_activity:
-                category_activity[cat] = 0
-            
-            # Score d'activité
-            if item.for_sale:
-                category_activity[cat] += 2
-            if item.sale_status in ['negotiation', 'offer_received']:
-                category_activity[cat] += 5
-            if item.status == 'Sold':
-                category_activity[cat] += 3
-        
-        return {
-            'category_activity_scores': category_activity,
-            'most_active_category': max(category_activity.items(), key=lambda x: x[1])[0] if category_activity else None,
-            'market_temperature': 'hot' if max(category_activity.values(), default=0) > 10 else 'warm' if max(category_activity.values(), default=0) > 5 else 'cool'
-        }
-    
-    @staticmethod
-    def _stock_analytics(items: List[CollectionItem]) -> Dict[str, Any]:
-        """Analytics spécifiques aux actions"""
-        stock_items = [i for i in items if i.category == 'Actions']
-        
-        if not stock_items:
-            return {
-                'total_stocks': 0,
-                'total_shares': 0,
-                'total_value': 0,
-                'by_exchange': {},
-                'top_holdings': []
-            }
-        
-        total_shares = sum(i.stock_quantity or 0 for i in stock_items)
-        total_value = sum(i.current_value or 0 for i in stock_items)
-        
-        # Grouper par bourse
-        by_exchange = {}
-        for item in stock_items:
-            exchange = item.stock_exchange or 'Unknown'
-            if exchange not in by_exchange:
-                by_exchange[exchange] = {'count': 0, 'value': 0}
-            by_exchange[exchange]['count'] += 1
-            by_exchange[exchange]['value'] += item.current_value or 0
-        
-        # Top holdings par valeur
-        top_holdings = sorted(
-            stock_items,
-            key=lambda x: x.current_value or 0,
-            reverse=True
-        )[:5]
-        
-        return {
-            'total_stocks': len(stock_items),
-            'total_shares': total_shares,
-            'total_value': total_value,
-            'average_holding_value': total_value / len(stock_items) if stock_items else 0,
-            'by_exchange': by_exchange,
-            'top_holdings': [
-                {
-                    'symbol': h.stock_symbol,
-                    'name': h.name,
-                    'quantity': h.stock_quantity,
-                    'value': h.current_value
-                }
-                for h in top_holdings
-            ]
-        }
-
-# Classe pour la recherche sémantique RAG
-class SemanticSearchRAG:
-    """Moteur de recherche sémantique avec RAG"""
-    
-    def __init__(self, openai_client):
-        self.client = openai_client
-        self.embedding_model = "text-embedding-3-small"
-    
-    def get_query_embedding(self, query: str) -> Optional[List[float]]:
-        """Génère l'embedding pour une requête"""
-        if not self.client:
-            return None
-        
-        try:
-            response = self.client.embeddings.create(
-                input=query,
-                model=self.embedding_model
-            )
-            return response.data[0].embedding
-        except Exception as e:
-            logger.error(f"Erreur génération embedding: {e}")
-            return None
-    
-    def semantic_search(self, query: str, items: List[CollectionItem], top_k: int = 10) -> List[Tuple[CollectionItem, float]]:
-        """Recherche sémantique hybride: embeddings + TF-IDF BM25-like fusion."""
-        # 1) Embedding route
-        embedding_scores: List[Tuple[CollectionItem, float]] = []
-        try:
-            query_embedding = self.get_query_embedding(query)
-            if query_embedding:
-                items_with_embeddings = [item for item in items if item.embedding]
-                for item in items_with_embeddings:
-                    try:
-                        s = self._cosine_similarity(query_embedding, item.embedding)
-                        embedding_scores.append((item, float(s)))
-                    except Exception:
-                        continue
-        except Exception:
-            pass
-
-        # 2) Sparse route (TF-IDF as a simple BM25-ish proxy)
-        sparse_scores: List[Tuple[CollectionItem, float]] = []
-        try:
-            corpus = []
-            corpus_items = []
-            for it in items:
-                parts = [it.name or "", it.category or "", it.description or ""]
-                if it.category == 'Actions':
-                    parts.extend([
-                        it.stock_symbol or "",
-                        it.stock_exchange or "",
-                    ])
-                doc = " \n".join([str(p) for p in parts if p])
-                corpus.append(doc)
-                corpus_items.append(it)
-            if corpus:
-                vectorizer = TfidfVectorizer(ngram_range=(1,2), min_df=1)
-                X = vectorizer.fit_transform(corpus)
-                qv = vectorizer.transform([query])
-                sims = (X @ qv.T).toarray().ravel()
-                for idx, score in enumerate(sims):
-                    sparse_scores.append((corpus_items[idx], float(score)))
-        except Exception:
-            pass
+# ──────────────────────────────────────────────────────────
+# RAG helpers (OpenAI embeddings + Supabase pgvector RPC)
+# ──────────────────────────────────────────────────────────
+# Routes
+@app.route("/")
+def index():
+    """Page principale de l'application"""
+    return render_template('index.html')
 
-        # 3) Fusion (Reciprocal Rank Fusion style simplified)
-        rank_map_embed = {id(item): rank for rank, (item, _) in enumerate(sorted(embedding_scores, key=lambda x: x[1], reverse=True), start=1)}
-        rank_map_sparse = {id(item): rank for rank, (item, _) in enumerate(sorted(sparse_scores, key=lambda x: x[1], reverse=True), start=1)}
-
-        all_ids = {id(item) for (item, _) in embedding_scores} | {id(item) for (item, _) in sparse_scores}
-        id_to_item = {}
-        for (it, _) in embedding_scores:
-            id_to_item[id(it)] = it
-        for (it, _) in sparse_scores:
-            id_to_item[id(it)] = it
-
-        fused: List[Tuple[CollectionItem, float]] = []
-        for iid in all_ids:
-            r1 = rank_map_embed.get(iid)
-            r2 = rank_map_sparse.get(iid)
-            score = 0.0
-            if r1:
-                score += 1.0 / (60.0 + r1)
-            if r2:
-                score += 1.0 / (60.0 + r2)
-            fused.append((id_to_item[iid], score))
-
-        fused.sort(key=lambda x: x[1], reverse=True)
-        return fused[:max(1, int(top_k))]
-    
-    def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calcule la similarité cosinus entre deux vecteurs"""
-        vec1_np = np.array(vec1).reshape(1, -1)
-        vec2_np = np.array(vec2).reshape(1, -1)
-        return cosine_similarity(vec1_np, vec2_np)[0][0]
-    
-    def generate_embedding_for_item(self, item: CollectionItem) -> Optional[List[float]]:
-        """Génère l'embedding pour un item"""
-        if not self.client:
-            return None
-        
-        # Créer le texte à encoder - INCLURE LES INFOS ACTIONS
-        text_parts = [
-            f"Nom: {item.name}",
-            f"Catégorie: {item.category}",
-            f"Statut: {item.status}",
-        ]
-        
-        # Ajouter le nom en plusieurs variations pour améliorer la recherche
-        name_variations = item.name.lower().split()
-        text_parts.extend(name_variations)
-        
-        if item.construction_year:
-            text_parts.append(f"Année: {item.construction_year}")
-        
-        if item.condition:
-            text_parts.append(f"État: {item.condition}")
-        
-        if item.description:
-            text_parts.append(f"Description: {item.description}")
-        
-        if item.for_sale:
-            text_parts.append("En vente actuellement")
-        
-        if item.sale_status:
-            text_parts.append(f"Statut de vente: {item.sale_status}")
-        
-        if item.current_value:
-            text_parts.append(f"valeur actuelle: {item.current_value} CHF")
-        
-        if item.sold_price:
-            text_parts.append(f"Prix de vente: {item.sold_price} CHF")
-        
-        # Informations spécifiques aux actions
-        if item.category == 'Actions':
-            if item.stock_symbol:
-                text_parts.append(f"Symbole boursier: {item.stock_symbol}")
-            if item.stock_quantity:
-                text_parts.append(f"Quantité: {item.stock_quantity} actions")
-            if item.stock_exchange:
-                text_parts.append(f"Bourse: {item.stock_exchange}")
-            if item.current_price:
-                text_parts.append(f"Prix actuel: {item.current_price} CHF")
-        
-        text = ". ".join(text_parts)
-        
-        try:
-            response = self.client.embeddings.create(
-                input=text,
-                model=self.embedding_model
-            )
-            return response.data[0].embedding
-        except Exception as e:
-            logger.error(f"Erreur génération embedding item: {e}")
-            return None
-# Moteur d'IA OpenAI Pure avec RAG
-class PureOpenAIEngineWithRAG:
-    """Moteur d'IA utilisant OpenAI GPT-4 avec recherche sémantique RAG"""
-    
-    def __init__(self, client):
-        self.client = client
-        self.semantic_search = SemanticSearchRAG(client) if client else None
-        self._tool_runtime_context: Dict[str, Any] = {}
-        self._last_context_snapshot: Dict[str, Any] = {}
-        self._last_intent: Optional[str] = None
-
-    def _get_tools_schema(self) -> List[Dict[str, Any]]:
-        return [
-            {
-                "type": "function",
-                "name": "get_stock_price",
-                "description": "Obtenir le prix actuel d'une action et ses métriques (devise, variation, volume).",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "symbol": {"type": "string", "description": "Symbole boursier, ex: IREN.SW, AAPL, BTC-USD"},
-                        "force_refresh": {"type": "boolean", "description": "Ignorer le cache et rafraîchir", "default": False}
-                    },
-                    "required": ["symbol"]
-                }
-            },
-            {
-                "type": "function",
-                "name": "get_market_snapshot",
-                "description": "Obtenir un aperçu du marché (indices, matières premières, crypto).",
-                "parameters": {"type": "object", "properties": {}}
-            },
-            {
-                "type": "function",
-                "name": "get_analytics_summary",
-                "description": "Résumé analytique (métriques de base, financières, pipeline).",
-                "parameters": {"type": "object", "properties": {}}
-            },
-            {
-                "type": "function",
-                "name": "list_items_by_category",
-                "description": "Lister les objets par catégorie et statut, triés par valeur décroissante.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "category": {"type": "string"},
-                        "status": {"type": "string", "enum": ["available", "sold", "all"], "default": "available"},
-                        "limit": {"type": "integer", "minimum": 1, "maximum": 100, "default": 10}
-                    },
-                    "required": ["category"]
-                }
-            }
-        ]
+@app.route("/analytics")
+def analytics():
+    """Page analytics avec diagrammes et statistiques"""
+    return render_template('analytics.html')
 
-    def _execute_tool(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
-        try:
-            if name == "get_stock_price":
-                symbol = str(arguments.get("symbol", "")).strip()
-                if not symbol or not re.match(r"^[A-Za-z0-9.+\-]{1,32}$", symbol):
-                    return {"error": "Symbole invalide"}
-                force_refresh = bool(arguments.get("force_refresh", False))
-                from stock_api_manager import stock_api_manager  # local import to avoid cycles
-                data = stock_api_manager.get_stock_price(symbol, force_refresh)
-                return data or {"error": "Prix indisponible"}
-
-            if name == "get_market_snapshot":
-                from stock_api_manager import stock_api_manager
-                return stock_api_manager.get_market_snapshot()
-
-            if name == "get_analytics_summary":
-                items: List[CollectionItem] = self._tool_runtime_context.get("items", [])
-                analytics: Dict[str, Any] = self._tool_runtime_context.get("analytics", {})
-                if not analytics:
-                    analytics = AdvancedDataManager.calculate_advanced_analytics(items)
-                basic = analytics.get('basic_metrics', {})
-                perf = analytics.get('performance_kpis', {})
-                return {"basic_metrics": basic, "performance_kpis": perf}
-
-            if name == "list_items_by_category":
-                items: List[CollectionItem] = self._tool_runtime_context.get("items", [])
-                category = str(arguments.get("category", "")).strip()
-                status = (arguments.get("status") or "available").lower()
-                limit = int(arguments.get("limit") or 10)
-                def _item_value(it: CollectionItem) -> float:
-                    try:
-                        if it.category == 'Actions' and it.current_price and it.stock_quantity:
-                            return float(it.current_price) * float(it.stock_quantity)
-                        return float(it.current_value or 0)
-                    except Exception:
-                        return 0.0
-                chosen = [i for i in items if i.category == category]
-                if status == 'sold':
-                    chosen = [i for i in chosen if is_item_sold(i)]
-                elif status == 'available':
-                    chosen = [i for i in chosen if is_item_available(i)]
-                chosen.sort(key=_item_value, reverse=True)
-                top = chosen[:max(1, min(limit, 100))]
-                return {
-                    "items": [{
-                        "id": it.id,
-                        "name": it.name,
-                        "category": it.category,
-                        "status": it.status,
-                        "value": _item_value(it)
-                    } for it in top]
-                }
-        except Exception as e:
-            return {"error": str(e)}
-        return {"error": "Outil inconnu"}
+@app.route("/reports")
+def reports():
+    """Page des rapports bancaires par classe d'actif"""
+    return render_template('reports.html')
 
-    def _run_with_tools(self, messages: List[Dict[str, Any]], items: List[CollectionItem], analytics: Dict[str, Any]) -> Optional[str]:
+@app.route("/markets")
+def markets():
+    """Page des updates de marchés financiers"""
+    return render_template('markets.html')
 
-        """Run the model with tool-calling (Responses API) and return final assistant text."""
-        try:
-            self._tool_runtime_context = {"items": items, "analytics": analytics}
-            tools = self._get_tools_schema()
-            loop_messages = list(messages)
-
-            # First turn
-            res = chat_tools_messages(
-                messages=loop_messages,
-                tools=tools,
-                model=os.getenv("AI_MODEL","gpt-5"),
-                max_output_tokens=400,
-                reasoning_effort="none",
-                client=self.client
-            )
+@app.route("/settings")
+def settings():
+    """Page des paramètres et configuration"""
+    return render_template('settings.html')
 
-            for _ in range(1):  # up to 2 turns total
-                made_call = False
-                for item in getattr(res, "output", []) or []:
-                    if getattr(item, "type", None) == "tool_call":
-                        name = getattr(item, "tool_name", None)
-                        args = getattr(item, "arguments", {})
-                        if isinstance(args, str):
-                            import json as _json
-                            try:
-                                args = _json.loads(args)
-                            except Exception:
-                                args = {"input": args}
-
-                        # Dispatch locally
-                        tool_result = self._run_tool_by_name(name, args)
-
-                        # Send tool output back using previous_response_id
-                        res = self.client.responses.create(
-                            model=os.getenv("AI_MODEL","gpt-5"),
-                            previous_response_id=res.id,
-                            input=[{
-                                "role":"tool",
-                                "name": name,
-                                "content":[{"type":"output_text","text": json.dumps(tool_result, ensure_ascii=False)}]
-                            }],
-                        )
-                        made_call = True
-                        break
-                if not made_call:
-                    break
-
-            return getattr(res, "output_text", None)
-        except Exception as e:
-            logger.error(f"_run_with_tools (Responses) error: {e}")
-            return None
-
-    def detect_query_intent(self, query: str) -> QueryIntent:
-        """Détecte l'intention de la requête"""
-        query_lower = query.lower()
-        
-        # Mots-clés pour la recherche sémantique - ÉLARGI
-        semantic_keywords = [
-            'trouve', 'cherche', 'montre', 'affiche', 'liste',
-            'combien', 'quel', 'quels', 'quelle', 'quelles',
-            'où', 'qui', 'avec', 'comme', 'similaire',
-            'ai-je', 'j\'ai', 'mes', 'ma', 'mon',
-            'allemande', 'italienne', 'française', 'japonaise',
-            'porsche', 'ferrari', 'lamborghini', 'bmw', 'mercedes',
-            'actions', 'bourse', 'portefeuille', 'symbole',
-            'total', 'valeur', 'performance', 'analyse', 'statistiques',
-            'opportunités', 'tendances', 'recommandations', 'insights'
-        ]
-        
-        # Forcer la recherche sémantique pour les questions sur les quantités et marques
-        car_brands = ['porsche', 'mercedes', 'bmw', 'ferrari', 'lamborghini', 'audi', 'volkswagen', 'allemande', 'italienne']
-        car_models = ['urus', 'cayenne', 'panamera', '911', 'aventador', 'huracan', '488', 'f8']
-        complex_questions = ['pas en vente', 'non en vente', 'pas à vendre', 'en vente', 'à vendre', 'disponible', 'vendu']
-        if 'combien' in query_lower or any(word in query_lower for word in car_brands + car_models + ['actions', 'bourse'] + complex_questions):
-            logger.info(f"Intent détecté: SEMANTIC_SEARCH pour '{query}'")
-            return QueryIntent.SEMANTIC_SEARCH
-        
-        # Vérifier si c'est une recherche sémantique
-        if any(keyword in query_lower for keyword in semantic_keywords):
-            logger.info(f"Intent détecté: SEMANTIC_SEARCH pour '{query}'")
-            return QueryIntent.SEMANTIC_SEARCH
-        
-        # Autres intentions existantes
-        if any(word in query_lower for word in ['vente', 'négociation', 'offre', 'pipeline']):
-            return QueryIntent.SALE_PROGRESS_TRACKING
-        
-        if any(word in query_lower for word in ['financ', 'roi', 'profit', 'rentab']):
-            return QueryIntent.FINANCIAL_ANALYSIS
-        
-        if any(word in query_lower for word in ['voiture', 'montre', 'bateau', 'avion']):
-            return QueryIntent.VEHICLE_ANALYSIS
-        
-        return QueryIntent.UNKNOWN
-    
-    def generate_response(self, query: str, items: List[CollectionItem], analytics: Dict[str, Any]) -> str:
-        """Génère une réponse via OpenAI GPT-4 avec approche hybride intelligente (sans historique)"""
-        return self.generate_response_with_history(query, items, analytics, [])
-    
-    def generate_response_with_history(self, query: str, items: List[CollectionItem], analytics: Dict[str, Any], conversation_history: List[Dict[str, str]]) -> str:
-        """Génère une réponse via OpenAI GPT-4 avec intelligence naturelle et mémoire conversationnelle"""
-        
-        if not self.client:
-            return "Moteur IA Indisponible"
-        
-        intent = self.detect_query_intent(query)
-        self._last_intent = intent.name
-
-        logger.info("🔍 Chatbot semantic mode (intent=%s)", intent.name)
-        return self._generate_semantic_response_with_history(query, items, analytics, conversation_history)
-    
-    def _generate_full_context_response(self, query: str, items: List[CollectionItem], analytics: Dict[str, Any], is_concept_search: bool = False) -> str:
-        """Génère une réponse en donnant TOUTES les données à GPT-4 (pour petits datasets) - sans historique"""
-        return self._generate_full_context_response_with_history(query, items, analytics, [], is_concept_search)
-    
-    def _generate_full_context_response_with_history(self, query: str, items: List[CollectionItem], analytics: Dict[str, Any], conversation_history: List[Dict[str, str]], is_concept_search: bool = False) -> str:
-        """Génère une réponse en donnant TOUTES les données à GPT-4 (pour petits datasets)"""
-        try:
-            # Cache pour éviter les appels répétés (avec historique)
-            history_hash = hashlib.md5(json.dumps(conversation_history, sort_keys=True).encode()).hexdigest()[:8]
-            cache_key = hashlib.md5(f"{query}{len(items)}{history_hash}{json.dumps(analytics.get('basic_metrics', {}), sort_keys=True)}".encode()).hexdigest()[:12]
-            cached_response = smart_cache.get('ai_responses', cache_key)
-            if cached_response:
-                return cached_response
-            
-            # Construire le contexte COMPLET avec TOUS les objets
-            complete_context = self._build_complete_dataset_context(items, analytics)
-            
-            # Prompt système amélioré pour exploiter GPT-5 avec intelligence hybride
-            system_prompt = """Tu es l'assistant IA expert de la collection BONVIN, équipé de GPT-5 pour des analyses approfondies.
-
-CAPACITÉS DISPONIBLES:
-- Analyse comparative intelligente (comparer objets, trouver le meilleur/plus rapide/plus cher)
-- Raisonnement sur les données techniques (performance, caractéristiques)
-- Synthèse financière et stratégique
-- Mémoire conversationnelle pour un dialogue naturel
-- Connaissance générale des objets de collection (voitures, montres, etc.)
-
-MODE HYBRIDE INTELLIGENT:
-1. **PRIORITÉ AUX DONNÉES DB**: Utilise d'abord les données fournies (descriptions, specs, valeurs)
-2. **COMPLÉTER AVEC CONNAISSANCES GÉNÉRALES**: Si les specs techniques manquent dans la DB, utilise ta connaissance générale
-   - Pour les voitures: Tu connais les performances (vitesse, 0-100, puissance) des modèles célèbres
-   - Pour les montres: Tu connais les complications, marques, années de production
-   - Pour les actions: Tu connais les secteurs, contexte économique
-3. **TRANSPARENCE**: Indique clairement quand tu utilises tes connaissances générales vs données DB
-   - Exemple: "Selon les données: [specs DB]" ou "Selon mes connaissances générales: [specs connues]"
-
-RÈGLES D'ANALYSE:
-- Pour questions comparatives (plus rapide, meilleur, etc.): Analyse TOUS les objets
-- Extrais d'abord les specs des descriptions fournies
-- Si specs manquantes ET tu reconnais le modèle → Utilise ta connaissance
-- Structure réponses avec clarté (titres, listes, bullets)
-- Précision maximale avec chiffres et références
-- Format: Analyse complète et structurée (pas de limite artificielle)
-
-Réponds en français, style professionnel et conversationnel."""
-
-            # Construire les messages avec historique
-            messages = [{"role": "system", "content": system_prompt}]
-            
-            # Ajouter l'historique de conversation (limité à 8 messages pour éviter les tokens excessifs)
-            for msg in conversation_history[-8:]:
-                if msg.get('role') in ['user', 'assistant'] and msg.get('content'):
-                    messages.append({
-                        "role": msg['role'],
-                        "content": msg['content']
-                    })
-            
-            # Prompt utilisateur enrichi
-            user_prompt = f"""QUESTION: {query}
-
-DONNÉES COMPLÈTES DE LA COLLECTION:
-{complete_context}
-
-INSTRUCTIONS:
-Analyse cette question en exploitant toute ton intelligence GPT-5 en MODE HYBRIDE:
-
-1. Examine TOUS les objets pertinents et leurs caractéristiques
-2. Extrais d'abord les specs techniques des descriptions fournies
-3. Si les specs manquent mais tu reconnais le modèle (ex: Ferrari F40, Porsche 911 GT3, Rolex Daytona) → Complète avec ta connaissance générale
-4. Pour les comparaisons (plus rapide, meilleur, etc.): Compare en utilisant données DB + connaissances
-5. Sois transparent: indique quelles données viennent de la DB vs tes connaissances générales
-6. Fournis une réponse complète, structurée et intelligente
-
-IMPORTANT: Utilise le mode hybride pour une analyse optimale combinant données DB + connaissances générales."""
-
-            messages.append({"role": "user", "content": user_prompt})
-
-            # Try tool-calling path first
-            ai_response = self._run_with_tools(messages, items, analytics)
-            if not ai_response:
-                # Fallback to Responses API (no Completions)
-                # Convertir messages au format Responses API
-                # ⭐ CRITIQUE: TOUS les messages d'ENTRÉE utilisent input_text
-                formatted_messages_full = []
-                for m in messages:
-                    if isinstance(m.get("content"), str):
-                        content_type = "output_text" if m.get("role") == "assistant" else "input_text"
-                        formatted_messages_full.append({
-                            "role": m["role"],
-                            "content": [{"type": content_type, "text": m["content"]}]
-                        })
-                    else:
-                        formatted_messages_full.append(m)
-                
-                resp = from_responses_simple(
-                    client=self.client,
-                    model=os.getenv("AI_MODEL", "gpt-5"),
-                    messages=formatted_messages_full,
-                    max_output_tokens=2000,
-                    reasoning_effort="none"
-                )
-                ai_response = (extract_output_text(resp) or "").strip()
-                if not ai_response:
-                    logger.warning("⚠️ Responses API returned empty output_text, falling back to Chat Completions")
-                    try:
-                        cc_resp = from_chat_completions_compat(
-                            client=self.client,
-                            model=os.getenv("AI_MODEL", "gpt-5"),
-                            messages=messages,
-                            max_completion_tokens=1200,
-                            timeout=20,
-                        )
-                        ai_response = (cc_resp.choices[0].message.get("content") or "").strip()
-                    except Exception as chat_fallback_error:
-                        logger.error("❌ Chat Completions fallback failed: %s", chat_fallback_error)
-                        ai_response = ""
-            
-            # Cache la réponse
-            smart_cache.set('ai_responses', ai_response, cache_key)
-            
-            # Pas d'indicateur de mémoire - réponses directes
-            
-            return ai_response
-            
-        except Exception as e:
-            logger.error(f"Erreur analyse complète: {e}")
-            return "❌ Erreur lors de l'analyse. Veuillez reformuler votre question."
-    
-    def _generate_semantic_response(self, query: str, items: List[CollectionItem], analytics: Dict[str, Any]) -> str:
-        """Génère une réponse via recherche sémantique (sans historique)"""
-        return self._generate_semantic_response_with_history(query, items, analytics, [])
-    
-    def _generate_semantic_response_with_history(self, query: str, items: List[CollectionItem], analytics: Dict[str, Any], conversation_history: List[Dict[str, str]]) -> str:
-        """Génère une réponse en utilisant la recherche sémantique RAG"""
-        try:
-            # Vérifier d'abord si nous avons des embeddings
-            items_with_embeddings = sum(1 for item in items if item.embedding)
-            logger.info(
-                "Recherche sémantique - Items avec embeddings: %s/%s",
-                items_with_embeddings,
-                len(items)
-            )
-            
-            if items_with_embeddings == 0:
-                logger.warning("Aucun embedding disponible, bascule vers résumé analytique")
-                return self._generate_full_context_response_with_history(query, items, analytics, conversation_history, True)
-            
-            # Recherche sémantique
-            semantic_results = self.semantic_search.semantic_search(query, items, top_k=DEFAULT_RAG_TOP_ITEMS * 2)
-            total_candidates = len(semantic_results)
-            
-            if not semantic_results:
-                logger.warning("Pas de résultats sémantiques, bascule vers résumé analytique")
-                return self._generate_full_context_response_with_history(query, items, analytics, conversation_history, True)
-            
-            # Filtrer les résultats pertinents (score > 0.3 au lieu de 0.5 pour être plus inclusif)
-            relevant_results = [(item, score) for item, score in semantic_results if score > 0.3]
-            
-            if not relevant_results:
-                relevant_results = semantic_results[:DEFAULT_RAG_TOP_ITEMS]
-            
-            selected_results = relevant_results[:DEFAULT_RAG_TOP_ITEMS]
-            logger.info(
-                "Résultats sémantiques retenus: %s/%s (limite=%s)",
-                len(selected_results),
-                total_candidates,
-                DEFAULT_RAG_TOP_ITEMS
-            )
-            
-            self._last_context_snapshot = {
-                "intent": self._last_intent,
-                "total_candidates": total_candidates,
-                "selected": len(selected_results),
-                "query": query[:120]
-            }
-            
-            # Construire le contexte RAG (limité pour éviter dépassement tokens GPT-5)
-            # Réduire à top 5 pour GPT-5 reasoning_effort="high" qui est coûteux en tokens
-            limited_results = selected_results[:5]  # Au lieu de 12
-            rag_context = self._build_rag_context(limited_results, query, total_candidates)
-            
-            # LOG: Taille du contexte
-            logger.info(f"📊 RAG Context length: {len(rag_context)} chars, {len(limited_results)} items")
-            
-            # Prompt pour GPT avec contexte RAG et mémoire conversationnelle - exploiter GPT-5 avec intelligence hybride
-            system_prompt = """Tu es l'assistant IA expert de la collection BONVIN, équipé de GPT-5 pour des analyses approfondies.
-
-CAPACITÉS DISPONIBLES:
-- Analyse comparative intelligente (comparer objets, trouver le meilleur/plus rapide/plus cher)
-- Raisonnement sur les données techniques (performance, caractéristiques)
-- Synthèse financière et stratégique
-- Recherche sémantique avancée pour trouver les objets les plus pertinents
-- Connaissance générale des objets de collection (voitures, montres, etc.)
-
-MODE HYBRIDE INTELLIGENT:
-1. **PRIORITÉ AUX RÉSULTATS**: Utilise d'abord les objets listés dans RÉSULTATS
-2. **COMPLÉTER AVEC CONNAISSANCES**: Si specs techniques manquent, utilise ta connaissance générale
-   - Pour les voitures: Tu connais les performances des modèles célèbres (Ferrari, Porsche, Lamborghini, etc.)
-   - Pour les montres: Tu connais les complications et valeurs des marques prestigieuses
-3. **TRANSPARENCE**: Indique clairement la source (données DB vs connaissances générales)
-   - Exemple: "Selon vos données: vitesse non spécifiée, mais la Ferrari F40 atteint 324 km/h (connaissance générale)"
-
-RÈGLES D'ANALYSE:
-- Pour questions comparatives: Analyse TOUS les objets retournés
-- Extrais d'abord les specs des descriptions fournies
-- Si specs manquantes ET modèle reconnu → Complète avec connaissances
-- Structure avec clarté (titres, listes si approprié)
-- Précision maximale avec chiffres et références
-- Ignore [METADATA] - elles sont pour le débogage
-
-Réponds en français, style professionnel et conversationnel."""
-
-            # Construire les messages avec historique
-            messages = [{"role": "system", "content": system_prompt}]
-            
-            # Ajouter l'historique de conversation (limité à 6 messages pour éviter les tokens excessifs)
-            for msg in conversation_history[-6:]:
-                if msg.get('role') in ['user', 'assistant'] and msg.get('content'):
-                    messages.append({
-                        "role": msg['role'],
-                        "content": msg['content']
-                    })
-
-            user_prompt = f"""QUESTION: {query}
-
-RÉSULTATS DE LA RECHERCHE SÉMANTIQUE ({len(relevant_results)} objets pertinents):
-{rag_context}
-
-INSTRUCTIONS:
-Analyse cette question en exploitant toute ton intelligence GPT-5 en MODE HYBRIDE:
-
-1. Examine TOUS les objets listés dans les résultats
-2. Extrais les specs techniques des descriptions fournies
-3. Si les specs manquent mais tu reconnais le modèle → Complète avec ta connaissance générale
-4. Pour les comparaisons (plus rapide, meilleur, etc.): Compare en utilisant données DB + connaissances
-5. Sois transparent sur tes sources d'information
-6. Fournis une réponse complète, structurée et intelligente
-
-IMPORTANT: Combine données DB et connaissances générales pour une analyse optimale."""
-
-            messages.append({"role": "user", "content": user_prompt})
-
-            # LOG: Taille totale des messages avant appel
-            total_chars = sum(len(str(m.get("content", ""))) for m in messages)
-            logger.info(f"📊 Total prompt size: {total_chars} chars (~{total_chars//4} tokens)")
-            
-            # Convertir messages au format Responses API
-            # ⭐ CRITIQUE: TOUS les messages d'ENTRÉE utilisent input_text (même assistant!)
-            # output_text est réservé à la SORTIE du modèle uniquement
-            formatted_messages = []
-            for m in messages:
-                if isinstance(m.get("content"), str):
-                    content_type = "output_text" if m.get("role") == "assistant" else "input_text"
-                    formatted_messages.append({
-                        "role": m["role"],
-                        "content": [{"type": content_type, "text": m["content"]}]
-                    })
-                else:
-                    formatted_messages.append(m)
-            
-            resp = from_responses_simple(
-                client=self.client,
-                model=os.getenv("AI_MODEL", "gpt-5"),
-                messages=formatted_messages,
-                max_output_tokens=1500,
-                reasoning_effort="none"
-            )
-            logger.info(f"✅ API call completed, extracting response...")
-            ai_response = (extract_output_text(resp) or "").strip()
-            if not ai_response:
-                logger.warning("⚠️ Responses API returned empty output_text, falling back to Chat Completions")
-                try:
-                    cc_resp = from_chat_completions_compat(
-                        client=self.client,
-                        model=os.getenv("AI_MODEL", "gpt-5"),
-                        messages=messages,
-                        max_completion_tokens=1200,
-                        timeout=20,
-                    )
-                    ai_response = (cc_resp.choices[0].message.get("content") or "").strip()
-                except Exception as chat_fallback_error:
-                    logger.error("❌ Chat Completions fallback failed: %s", chat_fallback_error)
-                    ai_response = ""
-            
-            # Pas d'indicateur de mémoire - réponses directes
-            
-            return ai_response
-            
-        except Exception as e:
-            logger.error(f"Erreur recherche sémantique: {e}")
-            return self._generate_full_context_response_with_history(query, items, analytics, conversation_history, True)
-    
-    def _build_rag_context(self, results: List[Tuple[CollectionItem, float]], query: str, total_candidates: int) -> str:
-        """Construit le contexte pour RAG"""
-        context_parts = []
-        
-        for i, (item, score) in enumerate(results, 1):
-            context_parts.append(f"\n{i}. **{item.name}** (Pertinence: {score:.2%})")
-            context_parts.append(f"   - Catégorie: {item.category}")
-            context_parts.append(f"   - Statut: {'Disponible' if item.status == 'Available' else 'Vendu'}")
-            
-            if item.for_sale:
-                context_parts.append(f"   - 🔥 EN VENTE")
-                if item.sale_status:
-                    context_parts.append(f"   - Progression vente: {item.sale_status}")
-            
-            if item.construction_year:
-                context_parts.append(f"   - Année: {item.construction_year}")
-            
-            if item.condition:
-                context_parts.append(f"   - État: {item.condition}")
-            
-            if item.current_value is not None:
-                context_parts.append(f"   - valeur actuelle: {item.current_value:,.0f} CHF")
-            
-            if item.sold_price is not None:
-                context_parts.append(f"   - Prix de vente: {item.sold_price:,.0f} CHF")
-            
-            if item.current_offer is not None:
-                context_parts.append(f"   - Offre actuelle: {item.current_offer:,.0f} CHF")
-            
-            # Informations spécifiques aux actions
-            if item.category == 'Actions':
-                if item.stock_symbol:
-                    context_parts.append(f"   - Symbole boursier: {item.stock_symbol}")
-                if item.stock_quantity:
-                    context_parts.append(f"   - Quantité: {item.stock_quantity} actions")
-                if item.stock_exchange:
-                    context_parts.append(f"   - Bourse: {item.stock_exchange}")
-                if item.stock_purchase_price is not None:
-                    context_parts.append(f"   - Prix d'achat unitaire: {item.stock_purchase_price:,.0f} CHF")
-                if item.current_price is not None:
-                    context_parts.append(f"   - Prix actuel: {item.current_price:,.0f} CHF/action")
-            
-            if item.description:
-                # Inclure description complète pour l'analyse intelligente (limite 500 chars si trop long)
-                desc_text = item.description[:500] + "..." if len(item.description) > 500 else item.description
-                context_parts.append(f"   - Description: {desc_text}")
-            
-                        # Informations spécifiques selon la catégorie
-            if item.category == "Appartements / maison" and item.surface_m2 is not None:
-                context_parts.append(f"   - Surface: {item.surface_m2} m²")
-                if item.rental_income_chf is not None:
-                    context_parts.append(f"   - Revenus locatifs: {item.rental_income_chf:,.0f} CHF/mois")
-        
-        coverage_pct = (len(results) / max(1, total_candidates)) * 100 if total_candidates else 100
-        context_parts.append("\n[METADATA]")
-        context_parts.append(f"items_retained={len(results)}")
-        context_parts.append(f"candidates_total={total_candidates}")
-        context_parts.append(f"coverage_pct={coverage_pct:.1f}")
-        
-        return "\n".join(context_parts)
-    
-
-    
-    def _build_complete_dataset_context(self, items: List[CollectionItem], analytics: Dict[str, Any]) -> str:
-        """Construit un contexte COMPLET et structuré avec TOUS les objets"""
-        context_parts = []
-        
-        # Statistiques globales
-        context_parts.append("=== STATISTIQUES GLOBALES ===")
-        context_parts.append(f"Total objets: {len(items)}")
-        total_value = analytics.get('basic_metrics', {}).get('total_value', 0)
-        if total_value is not None:
-            context_parts.append(f"Valeur totale estimée: {total_value:,.0f} CHF")
-        else:
-            context_parts.append("Valeur totale estimée: Non disponible")
-        context_parts.append(f"Objets en vente: {len([i for i in items if i.for_sale])}")
-        context_parts.append(f"Objets vendus: {len([i for i in items if i.status == 'Sold'])}")
-        
-        # Analyse par catégorie
-        context_parts.append("\n=== RÉPARTITION PAR CATÉGORIE ===")
-        category_stats = {}
-        for item in items:
-            if item.category not in category_stats:
-                category_stats[item.category] = {'count': 0, 'value': 0, 'items': []}
-            category_stats[item.category]['count'] += 1
-            category_stats[item.category]['items'].append(item)
-            if item.current_value is not None:
-                category_stats[item.category]['value'] += item.current_value
-            elif item.sold_price is not None:
-                category_stats[item.category]['value'] += item.sold_price
-        
-        for category, stats in category_stats.items():
-            category_name = category.upper() if category else "AUTRE"
-            context_parts.append(f"\n{category_name}:")
-            context_parts.append(f"  - Nombre: {stats['count']}")
-            if stats['value'] is not None:
-                context_parts.append(f"  - Valeur: {stats['value']:,.0f} CHF")
-            else:
-                context_parts.append("  - Valeur: Non disponible")
-            context_parts.append(f"  - Objets: {', '.join([item.name for item in stats['items'][:5]])}")
-            if len(stats['items']) > 5:
-                context_parts.append(f"    ... et {len(stats['items']) - 5} autres")
-        
-        # Détail complet de tous les objets
-        context_parts.append("\n=== DÉTAIL COMPLET DE TOUS LES OBJETS ===")
-        
-        for i, item in enumerate(items, 1):
-            context_parts.append(f"\n{i}. {item.name}")
-            context_parts.append(f"   Catégorie: {item.category}")
-            context_parts.append(f"   Statut: {item.status}")
-            
-            if item.for_sale:
-                context_parts.append(f"   🔥 EN VENTE")
-                if item.sale_status:
-                    context_parts.append(f"   Progression: {item.sale_status}")
-                if item.current_offer is not None:
-                    context_parts.append(f"   Offre actuelle: {item.current_offer:,.0f} CHF")
-            
-            if item.construction_year:
-                context_parts.append(f"   Année: {item.construction_year}")
-            
-            if item.condition:
-                context_parts.append(f"   État: {item.condition}")
-            
-            if item.current_value is not None:
-                context_parts.append(f"   valeur actuelle: {item.current_value:,.0f} CHF")
-            
-            if item.sold_price is not None:
-                context_parts.append(f"   Prix de vente: {item.sold_price:,.0f} CHF")
-            
-            if item.acquisition_price is not None:
-                context_parts.append(f"   Prix d'acquisition: {item.acquisition_price:,.0f} CHF")
-            
-            # Informations spécifiques aux actions
-            if item.category == 'Actions':
-                if item.stock_symbol:
-                    context_parts.append(f"   Symbole: {item.stock_symbol}")
-                if item.stock_quantity:
-                    context_parts.append(f"   Quantité: {item.stock_quantity} actions")
-                if item.stock_exchange:
-                    context_parts.append(f"   Bourse: {item.stock_exchange}")
-                if item.stock_purchase_price is not None:
-                    context_parts.append(f"   Prix d'achat unitaire: {item.stock_purchase_price:,.0f} CHF")
-                if item.current_price is not None:
-                    context_parts.append(f"   Prix actuel: {item.current_price:,.0f} CHF/action")
-                    if item.stock_quantity is not None and item.stock_purchase_price is not None:
-                        total_invested = item.stock_quantity * item.stock_purchase_price
-                        current_value = item.stock_quantity * item.current_price
-                        gain_loss = current_value - total_invested
-                        gain_loss_pct = (gain_loss / total_invested * 100) if total_invested > 0 else 0
-                        context_parts.append(f"   Performance: {gain_loss:+,.0f} CHF ({gain_loss_pct:+.1f}%)")
-            
-                        # Informations immobilières
-            if item.category == "Appartements / maison":
-                if item.surface_m2 is not None:
-                    context_parts.append(f"   Surface: {item.surface_m2} m²")
-                if item.rental_income_chf is not None:
-                    context_parts.append(f"   Revenus locatifs: {item.rental_income_chf:,.0f} CHF/mois")
-            
-            if item.description:
-                # Inclure description complète pour l'analyse intelligente (limite 500 chars si trop long)
-                desc_text = item.description[:500] + "..." if len(item.description) > 500 else item.description
-                context_parts.append(f"   Description: {desc_text}")
-        
-        # Pipeline de vente
-        items_for_sale = [item for item in items if item.for_sale]
-        if items_for_sale:
-            context_parts.append("\n=== PIPELINE DE VENTE ===")
-            for item in items_for_sale:
-                sale_status = item.sale_status or 'En vente'
-                if item.current_value is not None:
-                    context_parts.append(f"- {item.name}: {sale_status} - {item.current_value:,.0f} CHF")
-                else:
-                    context_parts.append(f"- {item.name}: {sale_status} - Prix non disponible")
-        
-        # Actions boursières
-        stocks = [item for item in items if item.category == 'Actions']
-        if stocks:
-            context_parts.append("\n=== PORTEFEUILLE ACTIONS ===")
-            total_stock_value = 0
-            for stock in stocks:
-                if stock.current_price is not None and stock.stock_quantity is not None:
-                    stock_value = stock.current_price * stock.stock_quantity
-                    total_stock_value += stock_value
-                    context_parts.append(f"- {stock.stock_symbol}: {stock.stock_quantity} actions @ {stock.current_price:,.0f} CHF = {stock_value:,.0f} CHF")
-            if total_stock_value > 0:
-                context_parts.append(f"Valeur totale actions: {total_stock_value:,.0f} CHF")
-            else:
-                context_parts.append("Valeur totale actions: Non disponible")
-        
-        return "\n".join(context_parts)
-    
-    def _build_complete_context(self, items: List[CollectionItem], analytics: Dict[str, Any]) -> str:
-        """Construit un contexte complet pour l'IA"""
-        context_parts = []
-        
-        # Vue d'ensemble
-        basic = analytics.get('basic_metrics', {})
-        context_parts.append(f"=== VUE D'ENSEMBLE ===")
-        context_parts.append(f"Total objets: {basic.get('total_items', 0)}")
-        context_parts.append(f"Disponibles: {basic.get('available_items', 0)}")
-        context_parts.append(f"Vendus: {basic.get('sold_items', 0)}")
-        context_parts.append(f"En vente: {basic.get('items_for_sale', 0)}")
-        
-        # Métriques financières
-        financial = analytics.get('financial_metrics', {})
-        context_parts.append(f"\n=== MÉTRIQUES FINANCIÈRES ===")
-        portfolio_value = financial.get('portfolio_value', 0)
-        realized_sales = financial.get('realized_sales', 0)
-        roi_percentage = financial.get('roi_percentage', 0)
-        total_profit = financial.get('total_profit', 0)
-        
-        if portfolio_value is not None:
-            context_parts.append(f"Valeur portefeuille: {portfolio_value:,.0f} CHF")
-        else:
-            context_parts.append("Valeur portefeuille: Non disponible")
-            
-        if realized_sales is not None:
-            context_parts.append(f"CA réalisé: {realized_sales:,.0f} CHF")
-        else:
-            context_parts.append("CA réalisé: Non disponible")
-            
-        if roi_percentage is not None:
-            context_parts.append(f"ROI: {roi_percentage:.1f}%")
-        else:
-            context_parts.append("ROI: Non disponible")
-            
-        if total_profit is not None:
-            context_parts.append(f"Profit total: {total_profit:,.0f} CHF")
-        else:
-            context_parts.append("Profit total: Non disponible")
-        
-        # Analytics actions si disponibles
-        stock_analytics = analytics.get('stock_analytics', {})
-        if stock_analytics.get('total_stocks', 0) > 0:
-            context_parts.append(f"\n=== PORTEFEUILLE ACTIONS ===")
-            context_parts.append(f"Nombre d'actions différentes: {stock_analytics.get('total_stocks', 0)}")
-            context_parts.append(f"Total actions détenues: {stock_analytics.get('total_shares', 0)}")
-            total_stock_value = stock_analytics.get('total_value', 0)
-            if total_stock_value is not None:
-                context_parts.append(f"Valeur totale: {total_stock_value:,.0f} CHF")
-            else:
-                context_parts.append("Valeur totale: Non disponible")
-        
-        # Liste détaillée des objets
-        context_parts.append(f"\n=== INVENTAIRE DÉTAILLÉ ===")
-        
-        # Grouper par catégorie
-        categories = {}
-        for item in items:
-            cat = item.category or 'Autre'
-            if cat not in categories:
-                categories[cat] = []
-            categories[cat].append(item)
-        
-        for category, cat_items in categories.items():
-            category_name = category.upper() if category else "AUTRE"
-            context_parts.append(f"\n{category_name} ({len(cat_items)} objets):")
-            
-            # Trier par statut
-            for_sale = [i for i in cat_items if i.for_sale]
-            available = [i for i in cat_items if i.status == 'Available' and not i.for_sale]
-            sold = [i for i in cat_items if i.status == 'Sold']
-            
-            if for_sale:
-                context_parts.append("EN VENTE:")
-                for item in for_sale:
-                    context_parts.append(f"- {item.name} ({item.construction_year or 'N/A'})")
-                    if item.current_value:
-                        context_parts.append(f"  Prix: {item.current_value:,.0f} CHF")
-                    if item.sale_status:
-                        context_parts.append(f"  Statut: {item.sale_status}")
-                    if item.current_offer:
-                        context_parts.append(f"  Offre actuelle: {item.current_offer:,.0f} CHF")
-                    # Détails spécifiques aux actions
-                    if item.category == 'Actions' and item.stock_symbol:
-                        context_parts.append(f"  Symbole: {item.stock_symbol}")
-                        context_parts.append(f"  Quantité: {item.stock_quantity} actions")
-                        if item.current_price:
-                            context_parts.append(f"  Prix actuel: {item.current_price:,.0f} CHF/action")
-            
-            if available:
-                context_parts.append("DISPONIBLES:")
-                for item in available[:5]:  # Limiter pour ne pas surcharger
-                    context_parts.append(f"- {item.name} ({item.construction_year or 'N/A'})")
-                    if item.category == 'Actions' and item.stock_symbol:
-                        context_parts.append(f"  → {item.stock_symbol}: {item.stock_quantity} actions")
-                        if item.current_price:
-                            context_parts.append(f"  → Prix actuel: {item.current_price:,.0f} CHF/action")
-                if len(available) > 5:
-                    context_parts.append(f"... et {len(available) - 5} autres")
-            
-            if sold:
-                context_parts.append("VENDUS:")
-                for item in sold[:3]:  # Limiter
-                    context_parts.append(f"- {item.name}")
-                    if item.sold_price:
-                        context_parts.append(f"  Vendu: {item.sold_price:,.0f} CHF")
-                if len(sold) > 3:
-                    context_parts.append(f"... et {len(sold) - 3} autres")
-        
-        # Pipeline de vente
-        pipeline = analytics.get('sales_pipeline', {})
-        if pipeline.get('stages'):
-            context_parts.append(f"\n=== PIPELINE DE VENTE ===")
-            for stage_data in pipeline['stages'].values():
-                if stage_data['count'] > 0:
-                    context_parts.append(f"{stage_data['name']}: {stage_data['count']} objets ({stage_data['total_value']:,.0f} CHF)")
-        
-        return "\n".join(context_parts)
-
-# Instance du moteur IA avec RAG
-ai_engine = PureOpenAIEngineWithRAG(openai_client) if openai_client else None
-if ai_engine:
-    logger.info("✅ ai_engine initialisé avec succès (GPT-5 mode hybride activé)")
-else:
-    logger.error("❌ ai_engine NON initialisé - openai_client manquant! Le chatbot ne fonctionnera pas correctement.")
-    logger.error("   Vérifier: OPENAI_API_KEY dans .env")
-
-# Limiter strictement la taille du contexte envoyé aux LLM
-# Valeurs par défaut défensives pour la taille des contextes RAG
-MIN_RAG_TOP_ITEMS = 3
-MAX_RAG_TOP_ITEMS = 15
-MIN_RAG_TOP_ANALYSES = 1
-MAX_RAG_TOP_ANALYSES = 10
-
-DEFAULT_RAG_TOP_ITEMS = max(
-    MIN_RAG_TOP_ITEMS,
-    min(MAX_RAG_TOP_ITEMS, int(os.getenv("CHATBOT_RAG_TOP_ITEMS", "12")))
-)
-DEFAULT_RAG_TOP_ANALYSES = max(
-    MIN_RAG_TOP_ANALYSES,
-    min(MAX_RAG_TOP_ANALYSES, int(os.getenv("CHATBOT_RAG_TOP_ANALYSES", "6")))
-)
-
-# ──────────────────────────────────────────────────────────
-# RAG helpers (OpenAI embeddings + Supabase pgvector RPC)
-# ──────────────────────────────────────────────────────────
-def _get_text_embedding_for_rag(text: str):
-    try:
-        if not openai_client:
-            return None
-        model = os.getenv("EMBEDDINGS_MODEL", "text-embedding-3-small")
-        res = openai_client.embeddings.create(model=model, input=(text or "")[:5000])
-        return (res.data[0].embedding if getattr(res, 'data', None) else None)
-    except Exception as e:
-        try:
-            logger.warning(f"⚠️ Embedding error: {e}")
-        except Exception:
-            pass
-        return None
-
-def _match_items_by_embedding(query_embedding, top_k: int = 15):
-    try:
-        if not supabase or query_embedding is None:
-            return []
-        payload = {"query_embedding": query_embedding, "match_count": int(max(1, min(top_k, 100)))}
-        # supabase-py returns .data on .execute()
-        result = supabase.rpc("match_items", payload).execute()
-        return getattr(result, 'data', []) or []
-    except Exception as e:
-        try:
-            logger.warning(f"⚠️ match_items RPC error: {e}")
-        except Exception:
-            pass
-        return []
-
-def _match_analyses_by_embedding(query_embedding, top_k: int = 5):
-    try:
-        if not supabase or query_embedding is None:
-            return []
-        payload = {"query_embedding": query_embedding, "match_count": int(max(1, min(top_k, 50)))}
-        result = supabase.rpc("match_analyses", payload).execute()
-        return getattr(result, 'data', []) or []
-    except Exception as e:
-        try:
-            logger.warning(f"⚠️ match_analyses RPC error: {e}")
-        except Exception:
-            pass
-        return []
-
-def _build_retrieval_context_from_supabase(query: str, top_k_items: int = 10, top_k_analyses: int = 5) -> str:
-    """Builds a compact RAG context block using pgvector RPC functions."""
-    try:
-        if not query or not isinstance(query, str):
-            return ""
-        emb = _get_text_embedding_for_rag(query)
-        if emb is None:
-            return ""
-        parts = []
-        # Items retrieval
-        try:
-            allowed_top_items = max(MIN_RAG_TOP_ITEMS, min(MAX_RAG_TOP_ITEMS, int(top_k_items)))
-            items = _match_items_by_embedding(emb, allowed_top_items)
-        except Exception:
-            items = []
-        if items:
-            lines = []
-            for r in items:
-                try:
-                    nm = str(r.get('name') or '')
-                    cat = str(r.get('category') or '')
-                    desc = str(r.get('description') or '')
-                    if len(desc) > 120:
-                        desc = desc[:120] + '…'
-                    rel = r.get('distance')
-                    try:
-                        rel = float(rel) if rel is not None else None
-                    except Exception:
-                        rel = None
-                    rel_s = f" | rel:{rel:.3f}" if isinstance(rel, float) else ""
-                    lines.append(f"- {nm} ({cat}){rel_s} :: {desc}")
-                except Exception:
-                    continue
-            if lines:
-                parts.append("[RAG_MATCH_ITEMS]\n" + "\n".join(lines))
-        # Market analyses retrieval
-        try:
-            allowed_top_analyses = max(MIN_RAG_TOP_ANALYSES, min(MAX_RAG_TOP_ANALYSES, int(top_k_analyses)))
-            analyses = _match_analyses_by_embedding(emb, allowed_top_analyses)
-        except Exception:
-            analyses = []
-        if analyses:
-            lines = []
-            for r in analyses:
-                try:
-                    at = str(r.get('analysis_type') or r.get('type') or '')
-                    summ = str(r.get('summary') or '')
-                    if len(summ) > 220:
-                        summ = summ[:220] + '…'
-                    rel = r.get('distance')
-                    try:
-                        rel = float(rel) if rel is not None else None
-                    except Exception:
-                        rel = None
-                    rel_s = f" | rel:{rel:.3f}" if isinstance(rel, float) else ""
-                    lines.append(f"- {at}{rel_s} :: {summ}")
-                except Exception:
-                    continue
-            if lines:
-                parts.append("[RAG_MATCH_ANALYSES]\n" + "\n".join(lines))
-        return ("\n\n".join(parts)).strip()
-    except Exception:
-        return ""
-
-# Routes
-@app.route("/")
-def index():
-    """Page principale de l'application"""
-    return render_template('index.html')
-
-@app.route("/analytics")
-def analytics():
-    """Page analytics avec diagrammes et statistiques"""
-    return render_template('analytics.html')
-
-@app.route("/reports")
-def reports():
-    """Page des rapports bancaires par classe d'actif"""
-    return render_template('reports.html')
-
-@app.route("/markets")
-def markets():
-    """Page des updates de marchés financiers"""
-    return render_template('markets.html')
-
-@app.route("/settings")
-def settings():
-    """Page des paramètres et configuration"""
-    return render_template('settings.html')
-
-@app.route("/sold")
-def sold():
-    """Page des objets vendus"""
-    return render_template('sold.html')
+@app.route("/sold")
+def sold():
+    """Page des objets vendus"""
+    return render_template('sold.html')
 
 @app.route("/snb-taux")
 def snb_taux():
@@ -4545,11 +2898,12 @@ def health():
             },
             "data_status": {
                 "items_count": len(items),
-                "cache_active": smart_cache._caches['items']['data'] is not None,
+                "cache_active": smart_cache.contains('items'),
                 "last_update": items[0].updated_at if items else None,
                 "embeddings_ready": sum(1 for item in items if item.embedding) if items else 0,
                 "stocks_count": len([i for i in items if i.category == "Actions"])
             },
+            "cache": smart_cache.stats(),
             "ai_mode": "openai_gpt4_with_semantic_rag",
             "stock_apis": {
                 "yahoo_finance": "available",
@@ -4579,7 +2933,7 @@ def advanced_analytics():
             "metadata": {
                 "items_analyzed": len(items),
                 "generated_at": datetime.now().isoformat(),
-                "cache_status": "hit" if smart_cache.get('analytics') else "miss"
+                "cache_status": "hit" if smart_cache.contains('analytics') else "miss"
             }
         })
         
@@ -4648,6 +3002,7 @@ def create_item():
         if response.data:
             smart_cache.invalidate('items')
             smart_cache.invalidate('analytics')
+            bump_inventory_version('create_item')
             try:
                 if ai_engine and ai_engine.semantic_search:
                     inserted = response.data[0]
@@ -4724,6 +3079,7 @@ def update_item(item_id):
         if response.data:
             smart_cache.invalidate('items')
             smart_cache.invalidate('analytics')
+            bump_inventory_version('update_item')
             
             new_data = response.data[0]
             
@@ -4763,6 +3119,7 @@ def delete_item(item_id):
         response = supabase.table("items").delete().eq("id", item_id).execute()
         smart_cache.invalidate('items')
         smart_cache.invalidate('analytics')
+        bump_inventory_version('delete_item')
         return "", 204
     except Exception as e:
         logger.error(f"Erreur delete_item: {e}")
@@ -5063,59 +3420,40 @@ def update_all_stock_prices():
             'source': 'Stock API Manager'
         }
         
-        # Traiter chaque symbole individuellement
-        for symbol in symbols:
-            try:
-                price_data = stock_api_manager.get_stock_price(symbol, force_refresh=True)
-                if price_data:
-                    results['success'].append({
-                        'symbol': symbol,
-                        'price': price_data.get('price'),
-                        'currency': price_data.get('currency'),
-                        'change': price_data.get('change'),
-                        'change_percent': price_data.get('change_percent'),
-                        'volume': price_data.get('volume'),
-                        'source': price_data.get('source', 'Stock API Manager')
-                    })
-                else:
-                    results['failed'].append(symbol)
-            except Exception as e:
-                logger.error(f"❌ Erreur pour {symbol}: {e}")
-                results['failed'].append(symbol)
+        # Récupération groupée et concurrente de tous les symboles
+        batch = stock_api_manager.get_stock_prices_batch(symbols)
+        for symbol, price_data in batch['results'].items():
+            results['success'].append({
+                'symbol': symbol,
+                'price': price_data.get('price'),
+                'currency': price_data.get('currency'),
+                'change': price_data.get('change'),
+                'change_percent': price_data.get('change_percent'),
+                'volume': price_data.get('volume'),
+                'fifty_two_week_high': price_data.get('fifty_two_week_high'),
+                'fifty_two_week_low': price_data.get('fifty_two_week_low'),
+                'pe_ratio': price_data.get('pe_ratio'),
+                'source': price_data.get('source', 'Stock API Manager')
+            })
+        for symbol, error in batch['errors'].items():
+            logger.error(f"❌ Erreur pour {symbol}: {error}")
+            results['failed'].append(symbol)
+        
+        # Mettre à jour la base de données en un seul upsert groupé
+        prices = {entry['symbol']: entry for entry in results['success']}
+        if supabase:
+            rows = [asdict(item) for item in action_items]
+            write_result = bulk_upsert_stock_prices(supabase, rows, prices)
+            if write_result['updated']:
+                smart_cache.invalidate('items')
+                smart_cache.invalidate('analytics')
+                bump_inventory_version('stock_refresh')
         
-        # Préparer les données de réponse et mettre à jour la base de données
+        # Préparer les données de réponse
         updated_data = []
-        for success_item in results['success']:
-            item = next((i for i in action_items if i.stock_symbol == success_item['symbol']), None)
-            if item:
-                # Mettre à jour la base de données
-                try:
-                    total_value = success_item['price'] * (item.stock_quantity or 1)
-                    
-                    update_data = {
-                        'current_price': to_numeric_or_none(success_item['price']),
-                        'current_value': to_numeric_or_none(total_value),
-                        'last_price_update': datetime.now().isoformat(),
-                        'stock_volume': to_numeric_or_none(success_item.get('volume')),
-                        'stock_52_week_high': to_numeric_or_none(success_item.get('fifty_two_week_high')),
-                        'stock_52_week_low': to_numeric_or_none(success_item.get('fifty_two_week_low')),
-                        'stock_change': to_numeric_or_none(success_item.get('change')),
-                        'stock_change_percent': to_numeric_or_none(success_item.get('change_percent')),
-                        'stock_average_volume': to_numeric_or_none(success_item.get('volume')),
-                        'stock_pe_ratio': to_numeric_or_none(success_item.get('pe_ratio')),
-                        'stock_currency': success_item.get('currency', 'USD')
-                    }
-                    
-                    # Mettre à jour dans Supabase
-                    if supabase:
-                        response = supabase.table('items').update(update_data).eq('id', item.id).execute()
-                        if response.data:
-                            logger.info(f"✅ Prix mis à jour dans DB pour {item.stock_symbol}: {success_item['price']} {success_item['currency']}")
-                        else:
-                            logger.warning(f"⚠️ Échec mise à jour DB pour {item.stock_symbol}")
-                except Exception as e:
-                    logger.error(f"❌ Erreur mise à jour DB pour {item.stock_symbol}: {e}")
-                
+        for item in action_items:
+            success_item = prices.get(item.stock_symbol)
+            if success_item:
                 updated_data.append({
                     'item_id': item.id,
                     'symbol': item.stock_symbol,
@@ -5189,25 +3527,21 @@ def schedule_auto_stock_updates():
                 'source': 'Stock API Manager'
             }
             
-            # Traiter chaque symbole individuellement
-            for symbol in symbols:
-                try:
-                    price_data = stock_api_manager.get_stock_price(symbol, force_refresh=True)
-                    if price_data:
-                        results['success'].append({
-                            'symbol': symbol,
-                            'price': price_data.get('price'),
-                            'currency': price_data.get('currency'),
-                            'change': price_data.get('change'),
-                            'change_percent': price_data.get('change_percent'),
-                            'volume': price_data.get('volume'),
-                            'source': price_data.get('source', 'Stock API Manager')
-                        })
-                    else:
-                        results['failed'].append(symbol)
-                except Exception as e:
-                    logger.error(f"❌ Erreur pour {symbol}: {e}")
-                    results['failed'].append(symbol)
+            # Récupération groupée et concurrente de tous les symboles
+            batch = stock_api_manager.get_stock_prices_batch(symbols)
+            for symbol, price_data in batch['results'].items():
+                results['success'].append({
+                    'symbol': symbol,
+                    'price': price_data.get('price'),
+                    'currency': price_data.get('currency'),
+                    'change': price_data.get('change'),
+                    'change_percent': price_data.get('change_percent'),
+                    'volume': price_data.get('volume'),
+                    'source': price_data.get('source', 'Stock API Manager')
+                })
+            for symbol, error in batch['errors'].items():
+                logger.error(f"❌ Erreur pour {symbol}: {error}")
+                results['failed'].append(symbol)
             
             logger.info(f"✅ Mise à jour automatique terminée:")
             logger.info(f"   - {len(results['success'])} symboles traités")
@@ -5755,6 +4089,7 @@ Réponds en JSON avec:
                 # Invalider le cache
                 smart_cache.invalidate('items')
                 smart_cache.invalidate('analytics')
+                bump_inventory_version('ai_price_update')
                 
                 logger.info(f"✅ Prix IA mis à jour pour {target_item.name}: {estimated_price:,.0f} CHF")
                 
@@ -6518,6 +4853,7 @@ def chatbot():
                             if resp.data:
                                 smart_cache.invalidate('items')
                                 smart_cache.invalidate('analytics')
+                                bump_inventory_version('chatbot_create')
                                 try:
                                     if ai_engine and ai_engine.semantic_search:
                                         inserted = resp.data[0]
@@ -6583,6 +4919,7 @@ def chatbot():
                                 if resp.data:
                                     smart_cache.invalidate('items')
                                     smart_cache.invalidate('analytics')
+                                    bump_inventory_version('chatbot_create')
                                     try:
                                         if ai_engine and ai_engine.semantic_search:
                                             inserted = resp.data[0]
@@ -7239,7 +5576,7 @@ def get_chatbot_metrics():
 
 @app.route("/api/chatbot/stream", methods=["POST"])
 def chatbot_stream():
-    """SSE streaming endpoint returning incremental chunks (server-simulated)."""
+    """SSE streaming endpoint relaying LLM text deltas as JSON frames."""
     try:
         data = request.get_json()
         if not data:
@@ -7261,27 +5598,39 @@ def chatbot_stream():
                 yield "data: {\"done\": true}\n\n"
             return Response(stream_with_context(_gen_unavailable()), mimetype='text/event-stream')
 
-        # Compute full reply once, then stream it progressively
-        full_reply = ai_engine.generate_response_with_history(query, items, analytics, conversation_history)
-
-        # Persist exchange
-        try:
-            conversation_memory.add_message(session_id, 'user', query)
-            conversation_memory.add_message(session_id, 'assistant', full_reply)
-        except Exception:
-            pass
+        def _frame(payload: Dict[str, Any]) -> str:
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
 
         def _gen():
-            chunk_size = 60
-            for i in range(0, len(full_reply), chunk_size):
-                part = full_reply[i:i+chunk_size]
-                safe = part.replace("\\", "\\\\").replace("\n", "\\n").replace("\"", "\\\"")
-                yield f"data: {{\"delta\": \"{safe}\", \"done\": false}}\n\n"
-                time.sleep(0.02)
-            yield f"data: {{\"done\": true, \"session_id\": \"{session_id}\"}}\n\n"
+            parts: List[str] = []
+            completed = False
+            try:
+                # Deltas du LLM relayés dès leur réception (pas de réponse complète en mémoire avant envoi)
+                for delta in ai_engine.stream_response_with_history(query, items, analytics, conversation_history):
+                    if delta:
+                        parts.append(delta)
+                        yield _frame({"delta": delta, "done": False})
+                completed = True
+            except GeneratorExit:
+                # Client déconnecté: ne pas persister une réponse tronquée
+                raise
+            except Exception as e:
+                logger.error(f"Erreur streaming chatbot: {e}")
+                yield _frame({"error": str(e)[:500], "done": False})
+
+            # Persister l'échange une fois le flux terminé
+            full_reply = "".join(parts)
+            if completed and full_reply:
+                try:
+                    conversation_memory.add_message(session_id, 'user', query)
+                    conversation_memory.add_message(session_id, 'assistant', full_reply)
+                except Exception:
+                    pass
+            yield _frame({"done": True, "session_id": session_id})
 
         resp = Response(stream_with_context(_gen()), mimetype='text/event-stream')
         resp.headers['Cache-Control'] = 'no-cache'
+        resp.headers['X-Accel-Buffering'] = 'no'
         return resp
     except Exception as e:
         logger.error(f"Erreur chatbot_stream: {e}")
@@ -7308,98 +5657,82 @@ def chat_task_status(job_id: str):
 @app.route("/api/chatbot/stream/<task_id>", methods=["GET"])
 def stream_chat_task(task_id):
     """
-    SSE: envoie l'avancement Celery et le résultat final.
+    SSE: envoie l'avancement Celery et le résultat final (canal push de la tâche).
     """
-    def event_stream():
-        seen_states = set()
-        hb_every = int(os.getenv("STREAM_HEARTBEAT_S", "10"))
-        last_hb = time.monotonic()
-        # Inform client the stream is open and set retry interval
-        yield "event: open\ndata: {}\n\n"
-        retry_ms = int(os.getenv("STREAM_RETRY_MS", "3000"))
-        yield f"retry: {retry_ms}\n\n"
-        while True:
-            ar = AsyncResult(task_id, app=celery)
-            state = ar.state
-            info = ar.info if isinstance(ar.info, dict) else {}
-            if state not in seen_states and state not in ("PENDING",):
-                yield f"event: state\ndata: {json.dumps({'state': state, 'info': info})}\n\n"
-                seen_states.add(state)
-            if state in ("SUCCESS", "FAILURE", "REVOKED"):
-                if state == "SUCCESS":
-                    try:
-                        result_payload = ar.result
-                        yield f"event: result\ndata: {json.dumps({'result': result_payload})}\n\n"
-                    except Exception:
-                        pass
-                elif state in ("FAILURE", "REVOKED"):
-                    try:
-                        tb = getattr(ar, 'traceback', None)
-                    except Exception:
-                        tb = None
-                    yield f"event: error\ndata: {json.dumps({'state': state, 'info': info, 'traceback': tb})}\n\n"
-                break
-            now = time.monotonic()
-            if now - last_hb >= hb_every:
-                # Heartbeat to keep intermediaries from closing idle connections
-                yield ":keepalive\n\n"
-                last_hb = now
-            time.sleep(0.4)
     headers = {"Content-Type": "text/event-stream", "Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Connection": "keep-alive"}
-    return Response(event_stream(), headers=headers)
+    return Response(stream_task_events(task_id, celery), headers=headers)
 
 @app.route("/api/v2/chatbot/stream/<task_id>", methods=["GET"])
 def stream_chat_task_v2(task_id):
     if os.getenv("CHAT_V2", "0") != "1":
         return jsonify({"error": "CHAT_V2=0"}), 400
-    def event_stream():
-        seen_states = set()
-        hb_every = int(os.getenv("STREAM_HEARTBEAT_S", "10"))
-        last_hb = time.monotonic()
-        # signaler l'ouverture + retry
-        yield "event: open\ndata: {}\n\n"
-        retry_ms = int(os.getenv("STREAM_RETRY_MS", "3000"))
-        yield f"retry: {retry_ms}\n\n"
-        while True:
-            ar = AsyncResult(task_id, app=celery)
-            state = ar.state
-            info = ar.info if isinstance(ar.info, dict) else {}
-            if state not in seen_states and state not in ("PENDING",):
-                yield f"event: state\ndata: {json.dumps({'state': state, 'info': info})}\n\n"
-                seen_states.add(state)
-            if state in ("SUCCESS", "FAILURE", "REVOKED"):
-                if state == "SUCCESS":
-                    try:
-                        result_payload = ar.result
-                        yield f"event: result\ndata: {json.dumps({'result': result_payload})}\n\n"
-                    except Exception:
-                        pass
-                else:
-                    try:
-                        tb = getattr(ar, 'traceback', None)
-                    except Exception:
-                        tb = None
-                    yield f"event: error\ndata: {json.dumps({'state': state, 'info': info, 'traceback': tb})}\n\n"
-                break
-            now = time.monotonic()
-            if now - last_hb >= hb_every:
-                yield ":keepalive\n\n"
-                last_hb = now
-            time.sleep(0.4)
     headers = {"Content-Type": "text/event-stream", "Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Connection": "keep-alive"}
-    return Response(event_stream(), headers=headers)
+    return Response(stream_task_events(task_id, celery), headers=headers)
+
+def _enqueue_report(report_type: str, params: Optional[Dict[str, Any]] = None):
+    """Renvoie le lien du PDF déjà rendu pour la version courante de l'inventaire (200), sinon enfile
+    son rendu sur la file `pdf` (202); le client suit /api/tasks/<task_id> puis télécharge `result.download_url`"""
+    from report_cache import get_report_cache
+    from report_pdf import report_params, report_filename, report_result
+    params = report_params(report_type, params)
+    cache = get_report_cache()
+    version = cache.inventory_version()
+    force = str(request.args.get("force") or "0").lower() in {"1", "true", "yes", "on"}
+    key = None if force else cache.lookup(report_type, params, version)
+    if key:
+        # Déjà rendu pour cette version: lien direct, sans passer par la file
+        result = report_result(report_type, key, report_filename(report_type, params), cache.store, cached=True)
+        return jsonify({"status": "ready", **result}), 200
+    payload = {"report": report_type, "params": params, "version": version, "force": force}
+    task = pdf_task.apply_async(args=[payload], queue="pdf")
+    return jsonify({
+        "status": "queued",
+        "task_id": task.id,
+        "report": report_type,
+        "poll_url": url_for("get_task_result", task_id=task.id),
+    }), 202
 
 @app.route("/api/reports/pdf", methods=["POST"])
 def submit_pdf_task():
     payload = request.get_json() or {}
-    task = pdf_task.apply_async(args=[payload], queue="pdf")
-    return jsonify({"task_id": task.id}), 202
+    return _enqueue_report((payload.get("report") or "portfolio").strip(), payload.get("params") or {})
+
+@app.route("/api/reports/cache/stats", methods=["GET"])
+def report_cache_stats():
+    """Statistiques du cache de rapports PDF (hits, taille, évictions, version de l'inventaire)"""
+    from report_cache import get_report_cache
+    return jsonify(get_report_cache().stats())
+
+@app.route("/api/reports/files/<key>.pdf", methods=["GET"])
+def download_report_file(key):
+    """Sert un PDF rendu par la file `pdf` (disque local) ou redirige vers l'URL pré-signée (S3)"""
+    from report_cache import get_report_cache
+    from report_store import is_valid_key, content_disposition
+    if not is_valid_key(key):
+        return jsonify({"error": "Clé de rapport invalide"}), 400
+    store = get_report_cache().store
+    filename = request.args.get("name") or f"{key[:12]}.pdf"
+    url = store.url(key, filename)
+    if url:
+        return redirect(url)
+    pdf = store.get(key)
+    if pdf is None:
+        return jsonify({"error": "Rapport introuvable (expiré ou pas encore généré)"}), 404
+    get_report_cache().touch(key)
+    response = Response(pdf, mimetype='application/pdf')
+    response.headers['Content-Disposition'] = content_disposition(filename, f"{key[:12]}.pdf")
+    return response
 
 @app.route("/api/tasks/<task_id>", methods=["GET"])
 def get_task_result(task_id):
     ar = AsyncResult(task_id, app=celery)
     if ar.successful():
-        return jsonify({"state": ar.state, "result": ar.result}), 200
+        result = ar.result
+        if isinstance(result, dict) and result.get("pdf_b64"):
+            # Worker pdf sans store partagé: le PDF est copié dans le store du web avant le lien
+            from report_pdf import ingest_pdf_payload
+            result = ingest_pdf_payload(result)
+        return jsonify({"state": ar.state, "result": result}), 200
     # Include traceback on failures to aid debugging
     tb = None
     try:
@@ -7464,60 +5797,47 @@ def celery_status():
 
 @app.route("/api/embeddings/generate", methods=["POST"])
 def generate_embeddings():
-    """Génère les embeddings pour tous les objets qui n'en ont pas"""
+    """Génère les embeddings manquants ou obsolètes (texte source modifié) via le pipeline groupé"""
     if not ai_engine or not ai_engine.semantic_search:
         return jsonify({"error": "Moteur de recherche sémantique non disponible"}), 503
     
+    if not supabase:
+        return jsonify({"error": "Base de données non disponible"}), 503
+    
     try:
         data = request.get_json() or {}
-        force_regenerate = data.get('force_regenerate', False)
-        
-        items = AdvancedDataManager.fetch_all_items()
-        
-        if force_regenerate:
-            items_to_process = items
-            logger.info("Regénération forcée de tous les embeddings")
-        else:
-            items_to_process = [item for item in items if not item.embedding]
-        
-        if not items_to_process:
-            return jsonify({
-                "message": "Tous les objets ont déjà un embedding" if not force_regenerate else "Aucun objet à traiter",
-                "total_items": len(items),
-                "items_with_embedding": len([i for i in items if i.embedding])
-            })
-        
-        success_count = 0
-        errors = []
-        
-        for item in items_to_process:
-            try:
-                # Générer l'embedding
-                embedding = ai_engine.semantic_search.generate_embedding_for_item(item)
-                
-                if embedding:
-                    # Sauvegarder dans Supabase
-                    supabase.table("items").update({"embedding": embedding}).eq("id", item.id).execute()
-                    success_count += 1
-                    logger.info(f"Embedding généré pour: {item.name}")
-                else:
-                    errors.append(f"Échec génération pour: {item.name}")
-                    
-            except Exception as e:
-                errors.append(f"Erreur pour {item.name}: {str(e)}")
-                logger.error(f"Erreur génération embedding: {e}")
+        force_regenerate = bool(data.get('force_regenerate', False))
+        tables = data.get('tables') or ['items']
+        
+        pipeline = EmbeddingBackfill(
+            supabase,
+            ai_engine.semantic_search.client,
+            model=ai_engine.semantic_search.embedding_model,
+            batch_size=data.get('batch_size'),
+            max_workers=data.get('workers')
+        )
+        results = {}
+        for table in tables:
+            results[table] = pipeline.run(table, force=force_regenerate)
+            logger.info(f"Embeddings {table}: {results[table]['embedded']} encodés, {results[table]['skipped']} inchangés")
         
         # Invalider le cache
-        smart_cache.invalidate('items')
+        if results.get('items', {}).get('embedded') or results.get('items', {}).get('reused'):
+            smart_cache.invalidate('items')
         
+        items_stats = results.get('items', {})
         return jsonify({
-            "message": f"Génération d'embeddings terminée",
-            "total_processed": len(items_to_process),
-            "success": success_count,
-            "errors": len(errors),
-            "error_details": errors[:10]  # Limiter les détails d'erreur
+            "message": "Génération d'embeddings terminée",
+            "total_processed": items_stats.get('scanned', 0),
+            "success": items_stats.get('embedded', 0),
+            "skipped": items_stats.get('skipped', 0),
+            "errors": items_stats.get('failed', 0),
+            "error_details": items_stats.get('errors', [])[:10],
+            "tables": results
         })
         
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Erreur génération embeddings: {e}")
         return jsonify({"error": str(e)}), 500
@@ -7763,880 +6083,22 @@ def list_endpoints():
     })
 @app.route("/api/portfolio/pdf", methods=["GET"])
 def generate_portfolio_pdf():
-    """Génère un PDF pixel perfect du portefeuille complet"""
-    try:
-        # Récupérer tous les items
-        items = AdvancedDataManager.fetch_all_items()
-        
-        # Calculer les statistiques
-        total_items = len(items)
-        available_items = len([item for item in items if item.status == 'Available'])
-        categories = set([item.category for item in items if item.category])
-        categories_count = len(categories)
-        
-        # Calculer la valeur totale
-        total_value = 0
-        for item in items:
-            if item.status == 'Sold':
-                continue
-            if item.category == 'Actions' and item.current_price and item.stock_quantity:
-                total_value += item.current_price * item.stock_quantity
-            elif item.status == 'Available' and item.current_value:
-                total_value += item.current_value
-        
-        # Organiser les données par catégorie
-        categories_data = {}
-        actions = []
-        
-        for item in items:
-            if item.category == 'Actions':
-                actions.append(item)
-            else:
-                if item.category not in categories_data:
-                    categories_data[item.category] = []
-                categories_data[item.category].append(item)
-        
-        # Fonction pour formater les prix
-        def format_price(price):
-            if not price or price == 0:
-                return '0 CHF'
-            try:
-                return f"{price:,.0f} CHF"
-            except:
-                return '0 CHF'
-        
-        # Préparer les données pour le template
-        template_data = {
-            'generation_date': datetime.now().strftime('%d/%m/%Y à %H:%M'),
-            'total_items': total_items,
-            'total_value': format_price(total_value),
-            'available_items': available_items,
-            'categories_count': categories_count,
-            'actions': actions,
-            'categories': categories_data
-        }
-        
-        # Rendre le template HTML
-        html_content = render_template('portfolio_pdf.html', **template_data)
-        
-        # Générer le PDF avec WeasyPrint
-        try:
-            from weasyprint import HTML, CSS
-            from weasyprint.text.fonts import FontConfiguration
-            
-            # Configuration des polices
-            font_config = FontConfiguration()
-            
-            # CSS simplifié pour réduire la consommation mémoire
-            css_string = '''
-            @page {
-                size: A4;
-                margin: 0.75in;
-            }
-            body {
-                font-family: Arial, sans-serif;
-                font-size: 11pt;
-                line-height: 1.3;
-                color: #000;
-                margin: 0;
-                padding: 0;
-            }
-            .header {
-                text-align: center;
-                margin-bottom: 1.5em;
-                border-bottom: 1px solid #000;
-                padding-bottom: 0.5em;
-            }
-            .section {
-                margin-bottom: 1.5em;
-                page-break-inside: avoid;
-            }
-            .section-title {
-                font-size: 14pt;
-                font-weight: bold;
-                margin-bottom: 0.5em;
-                color: #000;
-                border-bottom: 1px solid #ccc;
-                padding-bottom: 0.25em;
-            }
-            .item {
-                margin-bottom: 0.5em;
-                padding: 0.25em;
-                border: 1px solid #ccc;
-            }
-            .item-name {
-                font-weight: bold;
-                color: #000;
-            }
-            .item-details {
-                color: #333;
-                font-size: 9pt;
-            }
-            .price {
-                font-weight: bold;
-                color: #000;
-            }
-            .status-available { color: #000; }
-            .status-for-sale { color: #000; }
-            .status-sold { color: #000; }
-            table {
-                width: 100%;
-                border-collapse: collapse;
-                margin-bottom: 0.5em;
-                font-size: 9pt;
-            }
-            th, td {
-                border: 1px solid #ccc;
-                padding: 4px;
-                text-align: left;
-            }
-            th {
-                background-color: #f0f0f0;
-                font-weight: bold;
-            }
-            '''
-            
-            # Créer le PDF
-            html_doc = HTML(string=html_content)
-            css_doc = CSS(string=css_string, font_config=font_config)
-            pdf = html_doc.write_pdf(stylesheets=[css_doc], font_config=font_config)
-            
-            # Retourner le PDF
-            response = Response(pdf, mimetype='application/pdf')
-            response.headers['Content-Disposition'] = f'attachment; filename=bonvin_portfolio_{datetime.now().strftime("%Y%m%d_%H%M")}.pdf'
-            
-            logger.info(f"✅ PDF généré avec succès: {total_items} items, {categories_count} catégories")
-            return response
-            
-        except ImportError:
-            logger.error("❌ WeasyPrint non installé")
-            return jsonify({
-                "error": "WeasyPrint non installé. Installez avec: pip install weasyprint"
-            }), 500
-            
-    except Exception as e:
-        logger.error(f"❌ Erreur génération PDF: {e}")
-        return jsonify({
-            "error": str(e)
-        }), 500
+    """Génère un PDF pixel perfect du portefeuille complet (file Celery `pdf`, 202 + task_id)"""
+    return _enqueue_report("portfolio")
 @app.route("/api/reports/asset-class/<asset_class_name>", methods=["GET"])
 def generate_asset_class_report(asset_class_name):
-    """Génère un rapport PDF pour une classe d'actif spécifique"""
-    try:
-        # Récupérer tous les items
-        items = AdvancedDataManager.fetch_all_items()
-        
-        # Classification bancaire des actifs
-        ASSET_CLASSIFICATION = {
-            'Actions': {
-                'bankClass': 'Actions cotées',
-                'subCategory': 'Titres cotés en bourse (actions)'
-            },
-            'Voitures': {
-                'bankClass': 'Actifs réels',
-                'subCategory': 'Automobiles (véhicules de collection ou de luxe)'
-            },
-            'Appartements / maison': {
-                'bankClass': 'Immobilier direct ou indirect',
-                'subCategory': 'Immobilier résidentiel (logements)'
-            },
-            'Be Capital': {
-                'bankClass': 'Immobilier direct ou indirect',
-                'subCategory': 'Immobilier de rendement (biens générant des revenus locatifs)'
-            },
-            'Bateaux': {
-                'bankClass': 'Actifs réels',
-                'subCategory': 'Bateaux (yachts, bateaux de plaisance)'
-            },
-            'Avions': {
-                'bankClass': 'Actifs réels',
-                'subCategory': 'Avions (jets privés, aviation d\'affaires)'
-            },
-            'Start-ups': {
-                'bankClass': 'Private Equity / Venture Capital',
-                'subCategory': 'Start-ups (jeunes entreprises non cotées)'
-            },
-            'Investis services': {
-                'bankClass': 'Private Equity / Venture Capital',
-                'subCategory': 'Sociétés de rénovation (services immobiliers)'
-            },
-            'Saanen': {
-                'bankClass': 'Immobilier direct ou indirect',
-                'subCategory': 'Projet immobilier à Saanen (type d\'actif immobilier non précisé)'
-            },
-            'Dixence Resort': {
-                'bankClass': 'Immobilier direct ou indirect',
-                'subCategory': 'Immobilier hôtelier (complexe resort touristique)'
-            },
-            'Investis properties': {
-                'bankClass': 'Immobilier direct ou indirect',
-                'subCategory': 'Immobilier de rendement (portefeuille d\'immeubles locatifs)'
-            },
-            'Mibo': {
-                'bankClass': 'Immobilier direct ou indirect',
-                'subCategory': 'Actif immobilier (précision non fournie)'
-            },
-            'Portfolio Rhône Hotels': {
-                'bankClass': 'Immobilier direct ou indirect',
-                'subCategory': 'Immobilier hôtelier (portefeuille d\'hôtels, rendement locatif)'
-            },
-            'Rhône Property – Portfolio IAM': {
-                'bankClass': 'Immobilier direct ou indirect',
-                'subCategory': 'Immobilier de rendement (portefeuille immobilier)'
-            },
-            'Be Capital Activities': {
-                'bankClass': 'Private Equity / Venture Capital',
-                'subCategory': 'Sociétés de e-commerce (participations non cotées)'
-            },
-            'IB': {
-                'bankClass': 'Immobilier direct ou indirect',
-                'subCategory': 'Actif immobilier (précision non fournie)'
-            }
-        }
-        
-        # Filtrer les items pour cette classe d'actif
-        asset_class_items = []
-        for item in items:
-            if item.status == 'Sold':
-                continue
-                
-            classification = ASSET_CLASSIFICATION.get(item.category)
-            if classification and classification['bankClass'] == asset_class_name:
-                asset_class_items.append(item)
-        
-        if not asset_class_items:
-            return jsonify({
-                "error": f"Aucun actif trouvé pour la classe '{asset_class_name}'"
-            }), 404
-        
-        # Fonction pour formater les prix
-        def format_price(price):
-            if not price or price == 0:
-                return '0 CHF'
-            try:
-                return f"{price:,.0f} CHF"
-            except:
-                return '0 CHF'
-        
-        # Organiser par sous-catégorie
-        assets_by_subcategory = {}
-        subcategories_summary = {}
-        
-        for item in asset_class_items:
-            classification = ASSET_CLASSIFICATION[item.category]
-            subcategory = classification['subCategory']
-            
-            if subcategory not in assets_by_subcategory:
-                assets_by_subcategory[subcategory] = []
-                subcategories_summary[subcategory] = {'value': 0, 'count': 0}
-            
-            # Calculer la valeur
-            value = 0
-            if item.category == 'Actions' and item.current_price and item.stock_quantity:
-                value = item.current_price * item.stock_quantity
-            elif item.status == 'Available' and item.current_value:
-                value = item.current_value
-            
-            # Ajouter les données formatées
-            asset_data = {
-                'name': item.name,
-                'status': item.status,
-                'value': format_price(value),
-                'category': item.category,
-                'current_price': item.current_price,
-                'stock_purchase_price': item.stock_purchase_price,
-                'stock_quantity': item.stock_quantity,
-                'construction_year': item.construction_year,
-                'condition': item.condition
-            }
-            
-            assets_by_subcategory[subcategory].append(asset_data)
-            subcategories_summary[subcategory]['value'] += value
-            subcategories_summary[subcategory]['count'] += 1
-        
-        # Formater les valeurs dans le résumé
-        for subcategory in subcategories_summary:
-            subcategories_summary[subcategory]['value'] = format_price(subcategories_summary[subcategory]['value'])
-        
-        # Calculer les statistiques
-        total_assets = len(asset_class_items)
-        available_assets = len([item for item in asset_class_items if item.status == 'Available'])
-        subcategories_count = len(assets_by_subcategory)
-        
-        total_value = sum([
-            item.current_price * item.stock_quantity if item.category == 'Actions' and item.current_price and item.stock_quantity
-            else item.current_value if item.status == 'Available' and item.current_value
-            else 0
-            for item in asset_class_items
-        ])
-        
-        # Préparer les données pour le template
-        template_data = {
-            'asset_class_name': asset_class_name,
-            'generation_date': datetime.now().strftime('%d/%m/%Y à %H:%M'),
-            'total_assets': total_assets,
-            'total_value': format_price(total_value),
-            'available_assets': available_assets,
-            'subcategories_count': subcategories_count,
-            'assets_by_subcategory': assets_by_subcategory,
-            'subcategories_summary': subcategories_summary
-        }
-        
-        # Rendre le template HTML
-        html_content = render_template('bank_report_pdf.html', **template_data)
-        
-        # Générer le PDF avec WeasyPrint
-        try:
-            from weasyprint import HTML, CSS
-            from weasyprint.text.fonts import FontConfiguration
-            
-            # Configuration des polices
-            font_config = FontConfiguration()
-            
-            # CSS simplifié pour réduire la consommation mémoire
-            css_string = '''
-            @page {
-                size: A4;
-                margin: 0.75in;
-            }
-            body {
-                font-family: Arial, sans-serif;
-                font-size: 11pt;
-                line-height: 1.3;
-                color: #000;
-                margin: 0;
-                padding: 0;
-            }
-            .header {
-                text-align: center;
-                margin-bottom: 1.5em;
-                border-bottom: 1px solid #000;
-                padding-bottom: 0.5em;
-            }
-            .section {
-                margin-bottom: 1.5em;
-                page-break-inside: avoid;
-            }
-            .section-title {
-                font-size: 14pt;
-                font-weight: bold;
-                margin-bottom: 0.5em;
-                color: #000;
-                border-bottom: 1px solid #ccc;
-                padding-bottom: 0.25em;
-            }
-            .item {
-                margin-bottom: 0.5em;
-                padding: 0.25em;
-                border: 1px solid #ccc;
-            }
-            .item-name {
-                font-weight: bold;
-                color: #000;
-            }
-            .item-details {
-                color: #333;
-                font-size: 9pt;
-            }
-            .price {
-                font-weight: bold;
-                color: #000;
-            }
-            .status-available { color: #000; }
-            .status-for-sale { color: #000; }
-            .status-sold { color: #000; }
-            table {
-                width: 100%;
-                border-collapse: collapse;
-                margin-bottom: 0.5em;
-                font-size: 9pt;
-            }
-            th, td {
-                border: 1px solid #ccc;
-                padding: 4px;
-                text-align: left;
-            }
-            th {
-                background-color: #f0f0f0;
-                font-weight: bold;
-            }
-            '''
-            
-            # Créer le PDF
-            html_doc = HTML(string=html_content)
-            css_doc = CSS(string=css_string, font_config=font_config)
-            pdf = html_doc.write_pdf(stylesheets=[css_doc], font_config=font_config)
-            
-            response = Response(pdf, mimetype='application/pdf')
-            response.headers['Content-Disposition'] = f'attachment; filename=bonvin_{asset_class_name.replace(" ", "_").lower()}_{datetime.now().strftime("%Y%m%d_%H%M")}.pdf'
-            
-            logger.info(f"✅ Rapport bancaire généré: {asset_class_name} - {total_assets} actifs")
-            return response
-            
-        except ImportError:
-            logger.error("❌ WeasyPrint non installé")
-            return jsonify({
-                "error": "WeasyPrint non installé. Installez avec: pip install weasyprint"
-            }), 500
-            
-    except Exception as e:
-        logger.error(f"❌ Erreur génération rapport bancaire: {e}")
-        return jsonify({
-            "error": str(e)
-        }), 500
+    """Génère un rapport PDF pour une classe d'actif spécifique (file Celery `pdf`)"""
+    return _enqueue_report("asset_class", {"asset_class_name": asset_class_name})
 @app.route("/api/reports/all-asset-classes", methods=["GET"])
 def generate_all_asset_classes_report():
-    """Génère un rapport PDF pour toutes les classes d'actifs"""
-    try:
-        # Récupérer tous les items
-        items = AdvancedDataManager.fetch_all_items()
-        
-        # Classification bancaire des actifs (même que ci-dessus)
-        ASSET_CLASSIFICATION = {
-            'Actions': {'bankClass': 'Actions cotées', 'subCategory': 'Titres cotés en bourse (actions)'},
-            'Voitures': {'bankClass': 'Actifs réels', 'subCategory': 'Automobiles (véhicules de collection ou de luxe)'},
-            'Appartements / maison': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Immobilier résidentiel (logements)'},
-            'Be Capital': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Immobilier de rendement (biens générant des revenus locatifs)'},
-            'Bateaux': {'bankClass': 'Actifs réels', 'subCategory': 'Bateaux (yachts, bateaux de plaisance)'},
-            'Avions': {'bankClass': 'Actifs réels', 'subCategory': 'Avions (jets privés, aviation d\'affaires)'},
-            'Start-ups': {'bankClass': 'Private Equity / Venture Capital', 'subCategory': 'Start-ups (jeunes entreprises non cotées)'},
-            'Investis services': {'bankClass': 'Private Equity / Venture Capital', 'subCategory': 'Sociétés de rénovation (services immobiliers)'},
-            'Saanen': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Projet immobilier à Saanen (type d\'actif immobilier non précisé)'},
-            'Dixence Resort': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Immobilier hôtelier (complexe resort touristique)'},
-            'Investis properties': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Immobilier de rendement (portefeuille d\'immeubles locatifs)'},
-            'Mibo': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Actif immobilier (précision non fournie)'},
-            'Portfolio Rhône Hotels': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Immobilier hôtelier (portefeuille d\'hôtels, rendement locatif)'},
-            'Rhône Property – Portfolio IAM': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Immobilier de rendement (portefeuille immobilier)'},
-            'Be Capital Activities': {'bankClass': 'Private Equity / Venture Capital', 'subCategory': 'Sociétés de e-commerce (participations non cotées)'},
-            'IB': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Actif immobilier (précision non fournie)'}
-        }
-        
-        # Fonction pour formater les prix
-        def format_price(price):
-            if not price or price == 0:
-                return '0 CHF'
-            try:
-                return f"{price:,.0f} CHF"
-            except:
-                return '0 CHF'
-        
-        # Organiser par classe d'actif
-        asset_classes_data = {}
-        
-        for item in items:
-            if item.status == 'Sold':
-                continue
-                
-            classification = ASSET_CLASSIFICATION.get(item.category)
-            if not classification:
-                continue
-                
-            bank_class = classification['bankClass']
-            
-            if bank_class not in asset_classes_data:
-                asset_classes_data[bank_class] = {
-                    'items': [],
-                    'total_value': 0,
-                    'subcategories': {}
-                }
-            
-            # Calculer la valeur
-            value = 0
-            if item.category == 'Actions' and item.current_price and item.stock_quantity:
-                value = item.current_price * item.stock_quantity
-            elif item.status == 'Available' and item.current_value:
-                value = item.current_value
-            
-            asset_classes_data[bank_class]['items'].append(item)
-            asset_classes_data[bank_class]['total_value'] += value
-            
-            # Organiser par sous-catégorie
-            subcategory = classification['subCategory']
-            if subcategory not in asset_classes_data[bank_class]['subcategories']:
-                asset_classes_data[bank_class]['subcategories'][subcategory] = []
-            asset_classes_data[bank_class]['subcategories'][subcategory].append(item)
-        
-        # Créer le contenu HTML pour toutes les classes
-        html_parts = []
-        
-        for i, (bank_class, data) in enumerate(asset_classes_data.items()):
-            if i > 0:
-                html_parts.append('<div class="page-break"></div>')
-            
-            # Préparer les données pour cette classe
-            template_data = {
-                'asset_class_name': bank_class,
-                'generation_date': datetime.now().strftime('%d/%m/%Y à %H:%M'),
-                'total_assets': len(data['items']),
-                'total_value': format_price(data['total_value']),
-                'available_assets': len([item for item in data['items'] if item.status == 'Available']),
-                'subcategories_count': len(data['subcategories']),
-                'assets_by_subcategory': {},
-                'subcategories_summary': {}
-            }
-            
-            # Organiser les données par sous-catégorie
-            for subcategory, subcategory_items in data['subcategories'].items():
-                template_data['assets_by_subcategory'][subcategory] = []
-                subcategory_value = 0
-                
-                for item in subcategory_items:
-                    value = 0
-                    if item.category == 'Actions' and item.current_price and item.stock_quantity:
-                        value = item.current_price * item.stock_quantity
-                    elif item.status == 'Available' and item.current_value:
-                        value = item.current_value
-                    
-                    subcategory_value += value
-                    
-                    asset_data = {
-                        'name': item.name,
-                        'status': item.status,
-                        'value': format_price(value),
-                        'category': item.category,
-                        'current_price': item.current_price,
-                        'stock_purchase_price': item.stock_purchase_price,
-                        'stock_quantity': item.stock_quantity,
-                        'construction_year': item.construction_year,
-                        'condition': item.condition
-                    }
-                    
-                    template_data['assets_by_subcategory'][subcategory].append(asset_data)
-                
-                template_data['subcategories_summary'][subcategory] = {
-                    'value': format_price(subcategory_value),
-                    'count': len(subcategory_items)
-                }
-            
-            # Rendre le template pour cette classe
-            html_content = render_template('bank_report_pdf.html', **template_data)
-            html_parts.append(html_content)
-        
-        # Combiner tous les HTML
-        full_html = '\n'.join(html_parts)
-        
-        # Générer le PDF avec WeasyPrint
-        try:
-            from weasyprint import HTML, CSS
-            from weasyprint.text.fonts import FontConfiguration
-            
-            # Configuration des polices
-            font_config = FontConfiguration()
-            
-            # CSS simplifié pour réduire la consommation mémoire
-            css_string = '''
-            @page {
-                size: A4;
-                margin: 0.75in;
-            }
-            body {
-                font-family: Arial, sans-serif;
-                font-size: 11pt;
-                line-height: 1.3;
-                color: #000;
-                margin: 0;
-                padding: 0;
-            }
-            .header {
-                text-align: center;
-                margin-bottom: 1.5em;
-                border-bottom: 1px solid #000;
-                padding-bottom: 0.5em;
-            }
-            .section {
-                margin-bottom: 1.5em;
-                page-break-inside: avoid;
-            }
-            .section-title {
-                font-size: 14pt;
-                font-weight: bold;
-                margin-bottom: 0.5em;
-                color: #000;
-                border-bottom: 1px solid #ccc;
-                padding-bottom: 0.25em;
-            }
-            .item {
-                margin-bottom: 0.5em;
-                padding: 0.25em;
-                border: 1px solid #ccc;
-            }
-            .item-name {
-                font-weight: bold;
-                color: #000;
-            }
-            .item-details {
-                color: #333;
-                font-size: 9pt;
-            }
-            .price {
-                font-weight: bold;
-                color: #000;
-            }
-            .status-available { color: #000; }
-            .status-for-sale { color: #000; }
-            .status-sold { color: #000; }
-            table {
-                width: 100%;
-                border-collapse: collapse;
-                margin-bottom: 0.5em;
-                font-size: 9pt;
-            }
-            th, td {
-                border: 1px solid #ccc;
-                padding: 4px;
-                text-align: left;
-            }
-            th {
-                background-color: #f0f0f0;
-                font-weight: bold;
-            }
-            '''
-            
-            # Créer le PDF
-            html_doc = HTML(string=full_html)
-            css_doc = CSS(string=css_string, font_config=font_config)
-            pdf = html_doc.write_pdf(stylesheets=[css_doc], font_config=font_config)
-            
-            response = Response(pdf, mimetype='application/pdf')
-            response.headers['Content-Disposition'] = f'attachment; filename=bonvin_all_asset_classes_{datetime.now().strftime("%Y%m%d_%H%M")}.pdf'
-            
-            logger.info(f"✅ Rapport complet généré: {len(asset_classes_data)} classes d'actifs")
-            return response
-            
-        except ImportError:
-            logger.error("❌ WeasyPrint non installé")
-            return jsonify({
-                "error": "WeasyPrint non installé. Installez avec: pip install weasyprint"
-            }), 500
-            
-    except Exception as e:
-        logger.error(f"❌ Erreur génération rapport complet: {e}")
-        return jsonify({
-            "error": str(e)
-        }), 500
+    """Génère un rapport PDF pour toutes les classes d'actifs (file Celery `pdf`)"""
+    return _enqueue_report("all_asset_classes")
 @app.route("/api/reports/bank/full", methods=["GET"])
 def generate_full_bank_report():
-    """Génère un rapport PDF exhaustif (mode bancaire, A4, toutes classes et objets)."""
-    try:
-        items = AdvancedDataManager.fetch_all_items()
-
-        # Classification bancaire (mêmes catégories que précédemment)
-        ASSET_CLASSIFICATION = {
-            'Actions': {'bankClass': 'Actions cotées', 'subCategory': 'Titres cotés en bourse (actions)'},
-            'Voitures': {'bankClass': 'Actifs réels', 'subCategory': 'Automobiles (véhicules de collection ou de luxe)'},
-            'Appartements / maison': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Immobilier résidentiel (logements)'},
-            'Be Capital': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Immobilier de rendement (biens générant des revenus locatifs)'},
-            'Bateaux': {'bankClass': 'Actifs réels', 'subCategory': 'Bateaux (yachts, bateaux de plaisance)'},
-            'Avions': {'bankClass': 'Actifs réels', 'subCategory': 'Avions (jets privés, aviation d\'affaires)'},
-            'Start-ups': {'bankClass': 'Private Equity / Venture Capital', 'subCategory': 'Start-ups (jeunes entreprises non cotées)'},
-            'Investis services': {'bankClass': 'Private Equity / Venture Capital', 'subCategory': 'Sociétés de rénovation (services immobiliers)'},
-            'Saanen': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Projet immobilier à Saanen (type d\'actif immobilier non précisé)'},
-            'Dixence Resort': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Immobilier hôtelier (complexe resort touristique)'},
-            'Investis properties': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Immobilier de rendement (portefeuille d\'immeubles locatifs)'},
-            'Mibo': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Actif immobilier (précision non fournie)'},
-            'Portfolio Rhône Hotels': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Immobilier hôtelier (portefeuille d\'hôtels, rendement locatif)'},
-            'Rhône Property – Portfolio IAM': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Immobilier de rendement (portefeuille immobilier)'},
-            'Be Capital Activities': {'bankClass': 'Private Equity / Venture Capital', 'subCategory': 'Sociétés de e-commerce (participations non cotées)'},
-            'IB': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Actif immobilier (précision non fournie)'}
-        }
-
-        def fmt_money(val, currency='CHF'):
-            try:
-                if not val:
-                    return f"0 {currency}"
-                return f"{float(val):,.0f} {currency}"
-            except Exception:
-                return f"0 {currency}"
-
-        # Résumés
-        classes_summary = {}
-        assets_by_class = {}
-        total_items = len(items)
-        available_count = 0
-        sold_count = 0
-        total_value_available = 0.0
-        total_value_all = 0.0
-
-        for item in items:
-            classification = ASSET_CLASSIFICATION.get(item.category)
-            if not classification:
-                continue
-            bank_class = classification['bankClass']
-            subcategory = classification['subCategory']
-
-            if bank_class not in assets_by_class:
-                assets_by_class[bank_class] = {}
-            if subcategory not in assets_by_class[bank_class]:
-                assets_by_class[bank_class][subcategory] = []
-
-            # Valeur (sans conversion FX; devise native pour actions)
-            value = 0.0
-            currency = 'CHF'
-            unit_price = None
-            qty = None
-            if item.category == 'Actions' and item.stock_quantity:
-                qty = item.stock_quantity
-                unit_price = item.current_price or item.stock_purchase_price
-                if unit_price:
-                    value = float(unit_price) * float(qty)
-                currency = (item.stock_currency or 'USD') if getattr(item, 'stock_currency', None) else (item.currency if hasattr(item, 'currency') else 'USD')
-            else:
-                value = float(item.current_value or item.sold_price or 0)
-
-            total_value_all += value
-            if item.status == 'Available':
-                available_count += 1
-                total_value_available += value
-            else:
-                sold_count += 1
-
-            asset_row = {
-                'name': item.name,
-                'status': item.status,
-                'category': item.category,
-                'subcategory': subcategory,
-                'symbol': getattr(item, 'stock_symbol', None),
-                'quantity': qty,
-                'unit_price': unit_price,
-                'currency': currency,
-                'value': value,
-                'acquisition_price': getattr(item, 'acquisition_price', None),
-                'construction_year': getattr(item, 'construction_year', None),
-                'condition': getattr(item, 'condition', None),
-                'last_update': getattr(item, 'last_price_update', None),
-                'pe_ratio': getattr(item, 'stock_pe_ratio', None),
-                'wk52_high': getattr(item, 'stock_52_week_high', None),
-                'wk52_low': getattr(item, 'stock_52_week_low', None),
-                'for_sale': getattr(item, 'for_sale', False),
-                'sale_status': getattr(item, 'sale_status', None),
-                'current_offer': getattr(item, 'current_offer', None)
-            }
-
-            assets_by_class[bank_class][subcategory].append(asset_row)
-
-            # summary per class
-            if bank_class not in classes_summary:
-                classes_summary[bank_class] = {
-                    'count_all': 0,
-                    'count_available': 0,
-                    'value_all': 0.0,
-                    'value_available': 0.0
-                }
-            classes_summary[bank_class]['count_all'] += 1
-            classes_summary[bank_class]['value_all'] += value
-            if item.status == 'Available':
-                classes_summary[bank_class]['count_available'] += 1
-                classes_summary[bank_class]['value_available'] += value
-
-        # Préparer données template
-        template_data = {
-            'generation_date': datetime.now().strftime('%d/%m/%Y à %H:%M'),
-            'total_items': total_items,
-            'available_count': available_count,
-            'sold_count': sold_count,
-            'total_value_available': fmt_money(total_value_available),
-            'total_value_all': fmt_money(total_value_all),
-            'classes_summary': {k: {
-                'count_all': v['count_all'],
-                'count_available': v['count_available'],
-                'value_all': fmt_money(v['value_all']),
-                'value_available': fmt_money(v['value_available'])
-            } for k, v in classes_summary.items()},
-            'assets_by_class': assets_by_class
-        }
-
-        html_content = render_template('bank_report_full.html', **template_data)
-
-        # Choix du moteur: Puppeteer (Node) si demandé, sinon WeasyPrint
-        engine = request.args.get('engine', 'weasyprint').lower()
-
-        if engine == 'puppeteer':
-            try:
-                # Ecrire l'HTML dans un fichier temporaire
-                import tempfile
-                html_fd, html_path = tempfile.mkstemp(suffix='.html')
-                with os.fdopen(html_fd, 'w', encoding='utf-8') as f:
-                    f.write(html_content)
-
-                # Ecrire le PDF dans un fichier temporaire
-                pdf_fd, pdf_path = tempfile.mkstemp(suffix='.pdf')
-                os.close(pdf_fd)
-
-                # Construire la commande Node
-                # Sur Windows/Render, "node" doit être dans le PATH si npm install a été exécuté
-                node_cmd = os.getenv('NODE_BIN', 'node')
-                script_path = os.path.join(os.getcwd(), 'tools', 'puppeteer_print.js')
-                # Paramètres réglables via query string
-                landscape = request.args.get('landscape', 'true').lower() in ['true', '1', 'yes']
-                fmt = request.args.get('format', 'A4')
-                margin = request.args.get('margin', '14mm')
-                scale = request.args.get('scale')  # optionnel
-                wait_until = request.args.get('wait_until', 'networkidle0')
-                timeout_ms = request.args.get('timeout_ms')
-
-                cmd = [node_cmd, script_path, '--file', html_path, '--out', pdf_path, '--landscape', 'true' if landscape else 'false', '--format', fmt, '--margin', margin, '--wait-until', wait_until]
-                if scale:
-                    cmd.extend(['--scale', str(scale)])
-                if timeout_ms:
-                    cmd.extend(['--timeout', str(timeout_ms)])
-
-                import subprocess
-                completed = subprocess.run(cmd, capture_output=True)
-                if completed.returncode != 0:
-                    logger.error(f"Puppeteer error: {completed.stderr.decode('utf-8', errors='ignore')}")
-                    raise RuntimeError('Puppeteer PDF generation failed')
-
-                with open(pdf_path, 'rb') as fpdf:
-                    pdf_bytes = fpdf.read()
-                os.remove(html_path)
-                os.remove(pdf_path)
-
-                resp = Response(pdf_bytes, mimetype='application/pdf')
-                resp.headers['Content-Disposition'] = f'attachment; filename=bonvin_bank_full_{datetime.now().strftime("%Y%m%d_%H%M")}.pdf'
-                return resp
-            except Exception as e:
-                logger.error(f"Puppeteer failed, falling back to WeasyPrint: {e}")
-                # Fallback automatique vers WeasyPrint
-
-        # WeasyPrint par défaut
-        try:
-            from weasyprint import HTML, CSS
-            from weasyprint.text.fonts import FontConfiguration
-            font_config = FontConfiguration()
-            css_string = '''
-            @page {
-                size: A4 landscape;
-                margin: 14mm;
-                @bottom-center {
-                    content: "BONVIN – Rapport Bancaire | " counter(page) " / " counter(pages);
-                    font-size: 10px; color: #6b7280;
-                }
-            }
-            body { font-family: Arial, sans-serif; font-size: 11pt; color: #111827; }
-            h1,h2,h3 { color: #111827; }
-            .cover { text-align:center; padding: 60px 0; border-bottom:1px solid #e5e7eb; margin-bottom:24px; }
-            .kpi-grid { display:grid; grid-template-columns: repeat(auto-fit, minmax(220px,1fr)); gap:12px; margin:16px 0 24px; }
-            .kpi { border:1px solid #e5e7eb; border-radius:6px; padding:12px; background:#f9fafb; }
-            .kpi .v { font-weight:700; font-size:14pt; }
-            table { width:100%; border-collapse:collapse; font-size:10pt; margin:10px 0; }
-            th, td { border:1px solid #e5e7eb; padding:6px 8px; }
-            th { background:#f3f4f6; font-weight:700; text-transform:uppercase; font-size:9pt; }
-            .section { page-break-inside: avoid; margin: 18px 0; }
-            .section-title { font-weight:700; font-size:13pt; margin:8px 0; border-bottom:1px solid #e5e7eb; padding-bottom:4px; }
-            .sub-title { font-weight:600; font-size:11pt; margin:8px 0; color:#374151; }
-            .muted { color:#6b7280; font-size:9pt; }
-            '''
-            html_doc = HTML(string=html_content)
-            css_doc = CSS(string=css_string, font_config=font_config)
-            pdf = html_doc.write_pdf(stylesheets=[css_doc], font_config=font_config)
-            resp = Response(pdf, mimetype='application/pdf')
-            resp.headers['Content-Disposition'] = f'attachment; filename=bonvin_bank_full_{datetime.now().strftime("%Y%m%d_%H%M")}.pdf'
-            return resp
-        except ImportError:
-            return jsonify({"error": "WeasyPrint non installé"}), 500
-    except Exception as e:
-        logger.error(f"❌ Erreur full bank report: {e}")
-        return jsonify({"error": str(e)}), 500
+    """Génère un rapport PDF exhaustif (mode bancaire, A4, toutes classes et objets).
+    Paramètres: engine=weasyprint|puppeteer, landscape, format, margin, scale, wait_until, timeout_ms
+    """
+    return _enqueue_report("bank_full", request.args.to_dict())
 
 # Fonctions utilitaires
 def clean_date_format(date_str: str) -> Optional[str]:
@@ -10542,41 +8004,7 @@ def markets_chat():
         USE_ASYNC = False  # DÉSACTIVÉ pour éviter timeouts
         
         # Ajouter le dernier rapport + RAG analyses/items comme contexte (si disponible)
-        try:
-            from market_analysis_db import get_market_analysis_db
-            db = get_market_analysis_db()
-            latest = db.get_recent_analyses(limit=1)
-            latest_txt = ""
-            if latest:
-                a = latest[0]
-                exec_summary = "\n".join([f"- {p}" for p in (a.executive_summary or [])]) if getattr(a, 'executive_summary', None) else ""
-                summary_compact = (a.summary or "")[:800]
-                ts = a.timestamp or a.created_at or ""
-                latest_txt = (
-                    f"[Dernier rapport | {a.analysis_type or 'auto'} | {ts}]\n"
-                    f"Executive Summary:\n{exec_summary}\n"
-                    f"Résumé:\n{summary_compact}"
-                )
-            ctx_parts = []
-            if extra_context:
-                ctx_parts.append(extra_context)
-            if latest_txt:
-                ctx_parts.append(latest_txt)
-            # Récupération sémantique via Supabase (focus marchés)
-            try:
-                supa_ctx = _build_retrieval_context_from_supabase(
-                    user_message,
-                    top_k_items=min(DEFAULT_RAG_TOP_ITEMS, 5),
-                    top_k_analyses=min(DEFAULT_RAG_TOP_ANALYSES, 8)
-                )
-                if supa_ctx:
-                    ctx_parts.append(supa_ctx)
-            except Exception:
-                pass
-            if ctx_parts:
-                extra_context = "\n---\n".join([p for p in ctx_parts if p])
-        except Exception:
-            pass
+        extra_context = build_markets_context(user_message, extra_context)
 
         # Récupérer un court historique pour continuité
         history = []
@@ -10737,87 +8165,15 @@ def markets_chat_stream_task(task_id: str):
     if os.getenv("ASYNC_MARKETS_CHAT", "0") != "1":
         return jsonify({"error": "ASYNC_MARKETS_CHAT=0"}), 400
 
-    from celery.result import AsyncResult
-    from celery_app import celery
-    import json as _json
-
-    def event_stream():
-        seen = set()
-        hb_every = int(os.getenv("STREAM_HEARTBEAT_S", "10"))
-        last_hb = time.monotonic()
-        while True:
-            ar = AsyncResult(task_id, app=celery)
-            state = ar.state
-            info = ar.info if isinstance(ar.info, dict) else {}
-            if state not in seen and state not in ("PENDING",):
-                yield f"event: state\ndata: {_json.dumps({'state': state, 'info': info})}\n\n"
-                seen.add(state)
-            if state in ("SUCCESS", "FAILURE", "REVOKED"):
-                if state == "SUCCESS":
-                    try:
-                        res = ar.result
-                        yield f"event: result\ndata: {_json.dumps({'result': res})}\n\n"
-                    except Exception:
-                        pass
-                else:
-                    try:
-                        tb = getattr(ar, 'traceback', None)
-                    except Exception:
-                        tb = None
-                    yield f"event: error\ndata: {_json.dumps({'state': state, 'info': info, 'traceback': tb})}\n\n"
-                break
-            now = time.monotonic()
-            if now - last_hb >= hb_every:
-                yield ":keepalive\n\n"
-                last_hb = now
-            time.sleep(0.4)
-
     headers = {"Content-Type": "text/event-stream", "Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Connection": "keep-alive"}
-    return Response(event_stream(), headers=headers)
+    return Response(stream_task_events(task_id, celery, announce=False), headers=headers)
 
 @app.route("/api/v2/markets/chat/stream/task/<task_id>", methods=["GET"])
 def markets_chat_stream_task_v2(task_id: str):
     if os.getenv("MARKETS_CHAT_V2", "0") != "1":
         return jsonify({"error": "MARKETS_CHAT_V2=0"}), 400
-    from celery.result import AsyncResult
-    from celery_app import celery
-    import json as _json
-    def event_stream():
-        seen = set()
-        hb_every = int(os.getenv("STREAM_HEARTBEAT_S", "10"))
-        last_hb = time.monotonic()
-        # open + retry
-        yield "event: open\ndata: {}\n\n"
-        retry_ms = int(os.getenv("STREAM_RETRY_MS", "3000"))
-        yield f"retry: {retry_ms}\n\n"
-        while True:
-            ar = AsyncResult(task_id, app=celery)
-            state = ar.state
-            info = ar.info if isinstance(ar.info, dict) else {}
-            if state not in seen and state not in ("PENDING",):
-                yield f"event: state\ndata: {_json.dumps({'state': state, 'info': info})}\n\n"
-                seen.add(state)
-            if state in ("SUCCESS", "FAILURE", "REVOKED"):
-                if state == "SUCCESS":
-                    try:
-                        res = ar.result
-                        yield f"event: result\ndata: {_json.dumps({'result': res})}\n\n"
-                    except Exception:
-                        pass
-                else:
-                    try:
-                        tb = getattr(ar, 'traceback', None)
-                    except Exception:
-                        tb = None
-                    yield f"event: error\ndata: {_json.dumps({'state': state, 'info': info, 'traceback': tb})}\n\n"
-                break
-            now = time.monotonic()
-            if now - last_hb >= hb_every:
-                yield ":keepalive\n\n"
-                last_hb = now
-            time.sleep(0.4)
     headers = {"Content-Type": "text/event-stream", "Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Connection": "keep-alive"}
-    return Response(event_stream(), headers=headers)
+    return Response(stream_task_events(task_id, celery), headers=headers)
 @app.route("/api/markets/chat/export-pdf", methods=["POST"])
 def markets_chat_export_pdf():
     """Export serveur de la discussion chat au format PDF (Puppeteer, fallback WeasyPrint)."""
@@ -63,6 +63,9 @@ logger.info("--- DÉMARRAGE DU SCRIPT DU BACKGROUND WORKER ---")
 from scrapingbee_scraper import get_scrapingbee_scraper
 from market_analysis_db import get_market_analysis_db, MarketAnalysis
 from stock_api_manager import stock_api_manager
+from stock_price_sync import bulk_upsert_stock_prices
+from shared_cache import invalidate_shared
+from report_cache import bump_inventory_version
  
 
 class MarketAnalysisWorker:
@@ -721,9 +724,10 @@ class MarketAnalysisWorker:
         """Génère le contenu HTML pour l'email."""
         # Récupérer les données du snapshot de marché (chiffres en quasi temps réel via yfinance)
         from stock_api_manager import stock_api_manager
+        from market_board import report_max_age
         analysis_type = (getattr(analysis, 'analysis_type', '') or '').strip().lower()
         is_swiss = analysis_type in { 'swiss', 'suisse', 'ch', 'swiss_market' }
-        market_snapshot = {} if is_swiss else stock_api_manager.get_market_snapshot()
+        market_snapshot = {} if is_swiss else stock_api_manager.get_market_snapshot(max_age=report_max_age())
         atype = analysis_type
         is_global = atype in { 'global_market_update', 'global', 'gmu' }
         is_collection_news = atype in { 'bonvin_collection_news', 'collection_news', 'bonvin_news' }
@@ -2283,43 +2287,29 @@ class MarketAnalysisWorker:
                 return
             sb = create_client(supabase_url, supabase_key)
 
-            resp = sb.table('items').select('*').eq('category', 'Actions').execute()
+            resp = sb.table('items').select(
+                'id,name,category,stock_symbol,stock_quantity,stock_currency,current_price,stock_change,stock_volume'
+            ).eq('category', 'Actions').execute()
             rows = resp.data or []
             if not rows:
                 logger.info("ℹ️ Aucune action à mettre à jour")
                 return
-            updated = 0
-            failed = 0
-            for row in rows:
-                symbol = row.get('stock_symbol')
-                if not symbol:
-                    continue
-                try:
-                    data = stock_api_manager.get_stock_price(symbol, force_refresh=True)
-                    if not data or not data.get('price'):
-                        failed += 1
-                        continue
-                    price = data.get('price')
-                    qty = row.get('stock_quantity') or 1
-                    update_data = {
-                        'current_price': price,
-                        'current_value': price * qty,
-                        'last_price_update': datetime.utcnow().isoformat(),
-                        'stock_volume': data.get('volume'),
-                        'stock_pe_ratio': data.get('pe_ratio'),
-                        'stock_52_week_high': data.get('fifty_two_week_high'),
-                        'stock_52_week_low': data.get('fifty_two_week_low'),
-                        'stock_change': data.get('change'),
-                        'stock_change_percent': data.get('change_percent'),
-                        'stock_average_volume': data.get('volume'),
-                        'stock_currency': data.get('currency')
-                    }
-                    sb.table('items').update(update_data).eq('id', row['id']).execute()
-                    updated += 1
-                except Exception as e:
-                    logger.warning(f"⚠️ Echec MAJ {symbol}: {e}")
-                    failed += 1
-            logger.info(f"✅ MAJ prix actions terminée: {updated} ok, {failed} échecs")
+            symbols = [row.get('stock_symbol') for row in rows if row.get('stock_symbol')]
+            # Récupération groupée hors de la boucle asyncio (appels yfinance bloquants)
+            batch = await asyncio.to_thread(stock_api_manager.get_stock_prices_batch, symbols)
+            for symbol, error in batch['errors'].items():
+                logger.warning(f"⚠️ Echec MAJ {symbol}: {error}")
+            # Écriture groupée (lignes inchangées ignorées)
+            write_result = await asyncio.to_thread(bulk_upsert_stock_prices, sb, rows, batch['results'])
+            if write_result['updated']:
+                # Faire abandonner aux process web leur copie items/analytics
+                await asyncio.to_thread(invalidate_shared, 'items', 'analytics')
+                await asyncio.to_thread(bump_inventory_version, 'stock_refresh')
+            logger.info(
+                f"✅ MAJ prix actions terminée: {len(write_result['updated'])} ok, "
+                f"{len(write_result['unchanged'])} inchangées, "
+                f"{len(batch['errors']) + len(write_result['failed'])} échecs"
+            )
         except Exception as e:
             logger.error(f"❌ Erreur _refresh_all_stocks: {e}")
 
@@ -19,7 +19,14 @@ def make_celery() -> Celery:
     broker = _coerce_rediss(broker)
     backend = _coerce_rediss(backend)
 
-    app = Celery("inventorysbo", broker=broker, backend=backend, include=["tasks", "snb_tasks"])
+    # ProgressTask: chaque update_state et le résultat final sont publiés sur le canal de la tâche
+    app = Celery(
+        "inventorysbo",
+        broker=broker,
+        backend=backend,
+        include=["tasks", "snb_tasks"],
+        task_cls="task_events:ProgressTask",
+    )
     app.conf.update(
         task_serializer="json",
         result_serializer="json",
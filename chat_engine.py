@@ -0,0 +1,1752 @@
+#!/usr/bin/env python3
+"""
+Accès aux données et moteur IA du chatbot, partagés entre l'app web et les workers Celery.
+
+Contient le modèle `CollectionItem`, les clients Supabase/OpenAI, le cache `smart_cache`
+(items/analytics partagés via Redis si configuré), la mémoire de conversation,
+`AdvancedDataManager`, la recherche sémantique et `PureOpenAIEngineWithRAG`.
+Ce module n'importe ni Flask ni gevent: les tâches Celery l'importent directement
+au lieu de rappeler l'app web en HTTP.
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+import sqlite3
+from datetime import datetime
+from dataclasses import dataclass, asdict
+from enum import Enum
+from typing import Dict, Iterator, List, Optional, Any, Tuple
+
+from dotenv import load_dotenv
+
+from ttl_cache import SmartCache
+from vector_index import EmbeddingIndex
+from sparse_index import BM25Index
+from embedding_cache import QueryEmbeddingCache
+from embedding_pipeline import item_embedding_text
+from shared_cache import get_redis_cache_tier, pack_items, unpack_items, JSON_CODEC
+from gpt5_compat import from_chat_completions_compat, chat_tools_messages, from_responses_simple, extract_output_text, stream_responses_text
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Classes de données sophistiquées
+@dataclass
+class CollectionItem:
+    """Modèle de données enrichi pour un objet de collection"""
+    name: str
+    category: str
+    status: str
+    id: Optional[int] = None
+    construction_year: Optional[int] = None
+    condition: Optional[str] = None
+    description: Optional[str] = None
+    current_value: Optional[float] = None
+    sold_price: Optional[float] = None
+    acquisition_price: Optional[float] = None
+    for_sale: bool = False
+    sale_status: Optional[str] = None
+    sale_progress: Optional[str] = None
+    buyer_contact: Optional[str] = None
+    intermediary: Optional[str] = None
+    current_offer: Optional[float] = None
+    commission_rate: Optional[float] = None
+    last_action_date: Optional[str] = None
+    surface_m2: Optional[float] = None
+    rental_income_chf: Optional[float] = None
+    location: Optional[str] = None
+    # Champs spécifiques aux actions
+    stock_symbol: Optional[str] = None
+    stock_quantity: Optional[int] = None
+    stock_purchase_price: Optional[float] = None
+    stock_exchange: Optional[str] = None
+    stock_currency: Optional[str] = None
+    current_price: Optional[float] = None
+    last_price_update: Optional[str] = None
+    # Métriques boursières supplémentaires
+    stock_volume: Optional[int] = None
+    stock_pe_ratio: Optional[float] = None
+    stock_52_week_high: Optional[float] = None
+    stock_52_week_low: Optional[float] = None
+    stock_change: Optional[float] = None
+    stock_change_percent: Optional[float] = None
+    stock_average_volume: Optional[int] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    embedding: Optional[List[float]] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convertit en dictionnaire"""
+        return {k: v for k, v in asdict(self).items() if v is not None}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CollectionItem':
+        """Crée une instance depuis un dictionnaire"""
+        # Filtrer seulement les champs valides
+        valid_fields = {k: v for k, v in data.items() if k in cls.__annotations__}
+        return cls(**valid_fields)
+
+class QueryIntent(Enum):
+    """Types d'intentions sophistiquées"""
+    VEHICLE_ANALYSIS = "vehicle_analysis"
+    FINANCIAL_ANALYSIS = "financial_analysis"
+    SALE_PROGRESS_TRACKING = "sale_progress_tracking"
+    MARKET_INTELLIGENCE = "market_intelligence"
+    CATEGORY_ANALYTICS = "category_analytics"
+    PERFORMANCE_METRICS = "performance_metrics"
+    PORTFOLIO_OPTIMIZATION = "portfolio_optimization"
+    TECHNICAL_SPECS = "technical_specs"
+    SEMANTIC_SEARCH = "semantic_search"
+    UNKNOWN = "unknown"
+
+# Connexions avec gestion d'erreurs (variables déjà propagées dans l'environnement par app.py / config.py)
+SUPABASE_URL = os.getenv("SUPABASE_POOLED_URL") or os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+supabase = None
+openai_client = None
+
+try:
+    if SUPABASE_URL and SUPABASE_KEY:
+        from supabase import create_client
+        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+        logger.info("Supabase connecte")
+    else:
+        logger.error("SUPABASE_URL / SUPABASE_KEY manquants")
+except Exception as e:
+    logger.error(f"Erreur Supabase: {e}")
+
+try:
+    if OPENAI_API_KEY:
+        from openai import OpenAI
+        openai_client = OpenAI(api_key=OPENAI_API_KEY)
+        logger.info("OpenAI connecte")
+    else:
+        logger.warning("⚠️ OpenAI non configuré")
+except Exception as e:
+    logger.warning(f"⚠️ OpenAI non disponible: {e}")
+
+# Cache sophistiqué
+# Instance globale du cache (items/analytics partagés entre process via Redis si configuré)
+smart_cache = SmartCache(
+    l2=get_redis_cache_tier(),
+    codecs={
+        'items': (
+            lambda items: pack_items([asdict(item) for item in items]),
+            lambda payload: [CollectionItem.from_dict(row) for row in unpack_items(payload)]
+        ),
+        'analytics': JSON_CODEC
+    }
+)
+
+# ──────────────────────────────────────────────────────────
+# Conversation Memory (SQLite local store)
+# ──────────────────────────────────────────────────────────
+
+class ConversationMemoryStore:
+    """SQLite-backed memory store for conversation history per session_id."""
+
+    def __init__(self, db_filename: str = "chat_memory.db"):
+        try:
+            base_dir = os.path.dirname(os.path.abspath(__file__))
+        except Exception:
+            base_dir = os.getcwd()
+        self.db_path = os.path.join(base_dir, db_filename)
+        self._ensure_schema()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, check_same_thread=False)
+
+    def _ensure_schema(self):
+        with self._connect() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    created_at TEXT NOT NULL
+                )
+                """
+            )
+            # Index for quick retrieval
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, id)")
+            conn.commit()
+
+    def add_message(self, session_id: str, role: str, content: str):
+        try:
+            with self._connect() as conn:
+                cur = conn.cursor()
+                cur.execute(
+                    "INSERT INTO messages(session_id, role, content, created_at) VALUES (?,?,?,?)",
+                    (session_id, role, content, datetime.utcnow().isoformat()),
+                )
+                conn.commit()
+        except Exception:
+            # Memory is best-effort; avoid breaking the request
+            pass
+
+    def get_recent_messages(self, session_id: str, limit: int = 12):
+        try:
+            with self._connect() as conn:
+                cur = conn.cursor()
+                cur.execute(
+                    "SELECT role, content FROM messages WHERE session_id=? ORDER BY id DESC LIMIT ?",
+                    (session_id, max(1, int(limit))),
+                )
+                rows = cur.fetchall()
+                # Return in chronological order
+                return [{"role": r[0], "content": r[1]} for r in reversed(rows)]
+        except Exception:
+            return []
+
+conversation_memory = ConversationMemoryStore()
+
+# Cache des embeddings de requêtes (L1 = famille 'embeddings', L2 = SQLite de la mémoire de conversation)
+query_embedding_cache = QueryEmbeddingCache(
+    openai_client,
+    db_path=conversation_memory.db_path,
+    l1=smart_cache.family('embeddings')
+)
+
+# ──────────────────────────────────────────────────────────
+# Status normalization helpers
+# ──────────────────────────────────────────────────────────
+
+def is_item_sold(item: Any) -> bool:
+    """Detect if an item is sold using multiple signals (status, sale_status)."""
+    try:
+        status = str(getattr(item, 'status', '') or '').strip().lower()
+        sale_status = str(getattr(item, 'sale_status', '') or '').strip().lower()
+        sale_progress = str(getattr(item, 'sale_progress', '') or '').strip().lower()
+        if status in {'sold', 'vendu', 'vendue'}:
+            return True
+        if sale_status in {'completed', 'complete', 'finalisé', 'finalisee', 'finalise', 'completed sale', 'completed_sale'}:
+            return True
+        if sale_progress in {'completed', 'complete', 'finalisé', 'finalisee', 'finalise'}:
+            return True
+        try:
+            sold_price = getattr(item, 'sold_price', None)
+            if sold_price is not None and float(sold_price) > 0:
+                return True
+        except Exception:
+            pass
+    except Exception:
+        return False
+    return False
+
+def is_item_available(item: Any) -> bool:
+    try:
+        return not is_item_sold(item)
+    except Exception:
+        return True
+
+# Gestionnaire de données sophistiqué
+class AdvancedDataManager:
+    """Gestionnaire de données avec logique métier avancée"""
+    
+    @staticmethod
+    def fetch_all_items() -> List[CollectionItem]:
+        """Récupère tous les objets avec cache (un seul chargement pour les requêtes concurrentes)"""
+        try:
+            return smart_cache.get_or_load('items', AdvancedDataManager._load_items) or []
+        except Exception as e:
+            logger.error(f"Erreur fetch: {e}")
+            return []
+    
+    @staticmethod
+    def _load_items() -> Optional[List[CollectionItem]]:
+        """Charge et parse tous les objets depuis Supabase"""
+        if not supabase:
+            return None
+        
+        response = supabase.table("items").select("*").order("updated_at", desc=True).execute()
+        raw_items = response.data or []
+        
+        items = []
+        for raw_item in raw_items:
+            try:
+                # Convertir l'embedding du format pgvector
+                if 'embedding' in raw_item and raw_item['embedding']:
+                    embedding = raw_item['embedding']
+                    
+                    # Si c'est une string qui ressemble à un array pgvector
+                    if isinstance(embedding, str):
+                        # Format pgvector: "[0.1,0.2,0.3]" ou "(0.1,0.2,0.3)"
+                        embedding = embedding.strip()
+                        if embedding.startswith('[') and embedding.endswith(']'):
+                            # Format JSON array
+                            try:
+                                raw_item['embedding'] = json.loads(embedding)
+                            except:
+                                # Fallback: parser manuellement
+                                raw_item['embedding'] = [float(x) for x in embedding[1:-1].split(',')]
+                        elif embedding.startswith('(') and embedding.endswith(')'):
+                            # Format pgvector tuple
+                            raw_item['embedding'] = [float(x) for x in embedding[1:-1].split(',')]
+                        else:
+                            logger.warning(f"Format d'embedding inconnu pour {raw_item.get('name', 'item')}: {embedding[:50]}")
+                            raw_item['embedding'] = None
+                    elif isinstance(embedding, list):
+                        # Déjà une liste, parfait
+                        pass
+                    else:
+                        logger.warning(f"Type d'embedding invalide pour {raw_item.get('name', 'item')}: {type(embedding)}")
+                        raw_item['embedding'] = None
+                
+                item = CollectionItem.from_dict(raw_item)
+                items.append(item)
+            except Exception as e:
+                logger.warning(f"Erreur item {raw_item.get('id', '?')}: {e}")
+                continue
+        
+        logger.info(f"🔄 {len(items)} objets chargés")
+        return items
+    
+    @staticmethod
+    def calculate_advanced_analytics(items: List[CollectionItem]) -> Dict[str, Any]:
+        """Calcule des analytics sophistiquées"""
+        return smart_cache.get_or_load('analytics', lambda: {
+            'basic_metrics': AdvancedDataManager._basic_metrics(items),
+            'financial_metrics': AdvancedDataManager._financial_metrics(items),
+            'category_analytics': AdvancedDataManager._category_analytics(items),
+            'sales_pipeline': AdvancedDataManager._sales_pipeline(items),
+            'performance_kpis': AdvancedDataManager._performance_kpis(items),
+            'market_insights': AdvancedDataManager._market_insights(items),
+            'stock_analytics': AdvancedDataManager._stock_analytics(items)
+        })
+    
+    @staticmethod
+    def _basic_metrics(items: List[CollectionItem]) -> Dict[str, Any]:
+        """Métriques de base enrichies"""
+        total = len(items)
+        # Utiliser la normalisation robuste (statuts/indices multiples)
+        available = len([i for i in items if is_item_available(i)])
+        sold = len([i for i in items if is_item_sold(i)])
+        for_sale = len([i for i in items if i.for_sale])
+        # Valeur totale par défaut = somme des valeurs disponibles (hors vendus)
+        total_value = sum((i.current_value or 0) for i in items if is_item_available(i) and (i.current_value is not None))
+        
+        return {
+            'total_items': total,
+            'available_items': available,
+            'sold_items': sold,
+            'items_for_sale': for_sale,
+            'total_value': total_value,
+            'availability_rate': (available / total * 100) if total > 0 else 0,
+            'conversion_rate': (sold / total * 100) if total > 0 else 0,
+            'active_sale_rate': (for_sale / available * 100) if available > 0 else 0
+        }
+    
+    @staticmethod
+    def _financial_metrics(items: List[CollectionItem]) -> Dict[str, Any]:
+        """Métriques financières avancées"""
+        total_current = sum(i.current_value or 0 for i in items if i.status == 'Available' and i.current_value)
+        total_sold = sum(i.sold_price or 0 for i in items if i.status == 'Sold' and i.sold_price)
+        total_acquisition = sum(i.acquisition_price or 0 for i in items if i.acquisition_price)
+        
+        # ROI calculation
+        profit_items = [
+            (i.sold_price or 0) - (i.acquisition_price or 0)
+            for i in items 
+            if i.status == 'Sold' and i.sold_price and i.acquisition_price
+        ]
+        
+        total_profit = sum(profit_items)
+        roi_percentage = (total_profit / total_acquisition * 100) if total_acquisition > 0 else 0
+        
+        return {
+            'portfolio_value': total_current,
+            'realized_sales': total_sold,
+            'total_acquisition_cost': total_acquisition,
+            'total_profit': total_profit,
+            'roi_percentage': roi_percentage,
+            'average_item_value': total_current / len([i for i in items if i.current_value]) if any(i.current_value for i in items) else 0,
+            'profit_margin': (total_profit / total_sold * 100) if total_sold > 0 else 0
+        }
+    
+    @staticmethod
+    def _category_analytics(items: List[CollectionItem]) -> Dict[str, Any]:
+        """Analytics par catégorie"""
+        categories = {}
+        
+        for item in items:
+            cat = item.category or 'Uncategorized'
+            if cat not in categories:
+                categories[cat] = {
+                    'total': 0, 'available': 0, 'sold': 0, 'for_sale': 0,
+                    'total_value': 0, 'avg_value': 0
+                }
+            
+            stats = categories[cat]
+            stats['total'] += 1
+            
+            if item.status == 'Available':
+                stats['available'] += 1
+            elif item.status == 'Sold':
+                stats['sold'] += 1
+            
+            if item.for_sale:
+                stats['for_sale'] += 1
+            
+            value = item.current_value or item.sold_price or 0
+            stats['total_value'] += value
+        
+        # Calculer les moyennes
+        for stats in categories.values():
+            if stats['total'] > 0:
+                stats['avg_value'] = stats['total_value'] / stats['total']
+        
+        return categories
+    
+    @staticmethod
+    def _sales_pipeline(items: List[CollectionItem]) -> Dict[str, Any]:
+        """Pipeline de vente sophistiqué"""
+        pipeline_stages = {
+            'initial': 'Mise en vente initiale',
+            'presentation': 'Préparation présentation',
+            'intermediary': 'Choix intermédiaires',
+            'inquiries': 'Premières demandes',
+            'viewing': 'Visites programmées',
+            'negotiation': 'En négociation',
+            'offer_received': 'Offres reçues',
+            'offer_accepted': 'Offres acceptées',
+            'paperwork': 'Formalités en cours',
+            'completed': 'Ventes finalisées'
+        }
+        
+        pipeline_data = {}
+        total_value = 0
+        
+        for stage_key, stage_name in pipeline_stages.items():
+            stage_items = [i for i in items if i.for_sale and i.sale_status == stage_key]
+            stage_value = sum(i.current_value or 0 for i in stage_items)
+            
+            pipeline_data[stage_key] = {
+                'name': stage_name,
+                'count': len(stage_items),
+                'total_value': stage_value,
+                'items': [{'name': i.name, 'value': i.current_value} for i in stage_items]
+            }
+            total_value += stage_value
+        
+        return {
+            'stages': pipeline_data,
+            'total_pipeline_value': total_value,
+            'active_negotiations': len([i for i in items if i.for_sale and i.sale_status in ['negotiation', 'offer_received']])
+        }
+    
+    @staticmethod
+    def _performance_kpis(items: List[CollectionItem]) -> Dict[str, Any]:
+        """KPIs de performance"""
+        # Top performers par valeur
+        top_sales = sorted(
+            [i for i in items if i.sold_price], 
+            key=lambda x: x.sold_price, 
+            reverse=True
+        )[:5]
+        
+                # Distribution des prix
+        prices = [i.sold_price or i.current_value for i in items if i.sold_price or i.current_value]
+        price_ranges = {
+            'under_100k': len([p for p in prices if p < 100000]),
+            '100k_500k': len([p for p in prices if 100000 <= p < 500000]),
+            '500k_1m': len([p for p in prices if 500000 <= p < 1000000]),
+            'over_1m': len([p for p in prices if p >= 1000000])
+        }
+        
+        return {
+            'top_value_sales': [{'name': i.name, 'value': i.sold_price} for i in top_sales],
+            'price_distribution': price_ranges,
+            'inventory_turnover': len([i for i in items if i.status == 'Sold']) / len(items) if items else 0
+        }
+    
+    @staticmethod
+    def _market_insights(items: List[CollectionItem]) -> Dict[str, Any]:
+        """Insights de marché"""
+        # Hotness par catégorie (basé sur l'activité)
+        category_activity = {}
+        
+        for item in items:
+            cat = item.category or 'Other'
+            if cat not in category_activity:
+                category_activity[cat] = 0
+            
+            # Score d'activité
+            if item.for_sale:
+                category_activity[cat] += 2
+            if item.sale_status in ['negotiation', 'offer_received']:
+                category_activity[cat] += 5
+            if item.status == 'Sold':
+                category_activity[cat] += 3
+        
+        return {
+            'category_activity_scores': category_activity,
+            'most_active_category': max(category_activity.items(), key=lambda x: x[1])[0] if category_activity else None,
+            'market_temperature': 'hot' if max(category_activity.values(), default=0) > 10 else 'warm' if max(category_activity.values(), default=0) > 5 else 'cool'
+        }
+    
+    @staticmethod
+    def _stock_analytics(items: List[CollectionItem]) -> Dict[str, Any]:
+        """Analytics spécifiques aux actions"""
+        stock_items = [i for i in items if i.category == 'Actions']
+        
+        if not stock_items:
+            return {
+                'total_stocks': 0,
+                'total_shares': 0,
+                'total_value': 0,
+                'by_exchange': {},
+                'top_holdings': []
+            }
+        
+        total_shares = sum(i.stock_quantity or 0 for i in stock_items)
+        total_value = sum(i.current_value or 0 for i in stock_items)
+        
+        # Grouper par bourse
+        by_exchange = {}
+        for item in stock_items:
+            exchange = item.stock_exchange or 'Unknown'
+            if exchange not in by_exchange:
+                by_exchange[exchange] = {'count': 0, 'value': 0}
+            by_exchange[exchange]['count'] += 1
+            by_exchange[exchange]['value'] += item.current_value or 0
+        
+        # Top holdings par valeur
+        top_holdings = sorted(
+            stock_items,
+            key=lambda x: x.current_value or 0,
+            reverse=True
+        )[:5]
+        
+        return {
+            'total_stocks': len(stock_items),
+            'total_shares': total_shares,
+            'total_value': total_value,
+            'average_holding_value': total_value / len(stock_items) if stock_items else 0,
+            'by_exchange': by_exchange,
+            'top_holdings': [
+                {
+                    'symbol': h.stock_symbol,
+                    'name': h.name,
+                    'quantity': h.stock_quantity,
+                    'value': h.current_value
+                }
+                for h in top_holdings
+            ]
+        }
+
+# Durée de vie du snapshot BM25 partagé (secondes)
+BM25_SNAPSHOT_TTL = int(os.getenv("BM25_SNAPSHOT_TTL", "86400"))
+
+# Classe pour la recherche sémantique RAG
+class SemanticSearchRAG:
+    """Moteur de recherche sémantique avec RAG"""
+    
+    def __init__(self, openai_client):
+        self.client = openai_client
+        self.embedding_model = "text-embedding-3-small"
+        # Matrice d'embeddings normalisés, resynchronisée à chaque rechargement du cache items
+        self.embedding_index = EmbeddingIndex()
+        # Index BM25 persistant (snapshot partagé entre workers via Redis si disponible)
+        self.sparse_index = BM25Index()
+    
+    def _sync_sparse_index(self, items: List[CollectionItem]) -> None:
+        """Synchronise l'index BM25, en partant du snapshot partagé au premier appel du process"""
+        tier = get_redis_cache_tier()
+        if tier and not len(self.sparse_index):
+            payload = tier.get('bm25', 'snapshot')
+            if payload:
+                try:
+                    self.sparse_index = BM25Index.from_bytes(payload)
+                except Exception as e:
+                    logger.warning(f"Snapshot BM25 illisible: {e}")
+        tokenized_before = self.sparse_index.stats['docs_tokenized']
+        self.sparse_index.sync(items)
+        if tier and self.sparse_index.stats['docs_tokenized'] > tokenized_before:
+            tier.set('bm25', 'snapshot', self.sparse_index.to_bytes(), BM25_SNAPSHOT_TTL)
+    
+    def get_query_embedding(self, query: str) -> Optional[List[float]]:
+        """Génère l'embedding pour une requête"""
+        if not self.client:
+            return None
+        
+        return query_embedding_cache.get(query, self.embedding_model)
+    
+    def semantic_search(self, query: str, items: List[CollectionItem], top_k: int = 10) -> List[Tuple[CollectionItem, float]]:
+        """Recherche sémantique hybride: embeddings + TF-IDF BM25-like fusion."""
+        # Profondeur de candidats par route avant fusion
+        candidate_k = max(int(top_k) * 5, 50)
+
+        # 1) Embedding route (produit matrice-vecteur sur l'index normalisé)
+        embedding_scores: List[Tuple[CollectionItem, float]] = []
+        try:
+            query_embedding = self.get_query_embedding(query)
+            if query_embedding:
+                self.embedding_index.sync(items)
+                items_by_key = {(item.id if item.id is not None else id(item)): item for item in items}
+                for key, score in self.embedding_index.search(query_embedding, candidate_k):
+                    item = items_by_key.get(key)
+                    if item is not None:
+                        embedding_scores.append((item, score))
+        except Exception as e:
+            logger.warning(f"Recherche vectorielle indisponible: {e}")
+
+        # 2) Sparse route (index BM25 persistant, aucun ajustement de vectoriseur par requête)
+        sparse_scores: List[Tuple[CollectionItem, float]] = []
+        try:
+            self._sync_sparse_index(items)
+            items_by_key = {(item.id if item.id is not None else id(item)): item for item in items}
+            for key, score in self.sparse_index.search(query, candidate_k):
+                item = items_by_key.get(key)
+                if item is not None:
+                    sparse_scores.append((item, score))
+        except Exception as e:
+            logger.warning(f"Recherche BM25 indisponible: {e}")
+
+        # 3) Fusion (Reciprocal Rank Fusion style simplified)
+        rank_map_embed = {id(item): rank for rank, (item, _) in enumerate(sorted(embedding_scores, key=lambda x: x[1], reverse=True), start=1)}
+        rank_map_sparse = {id(item): rank for rank, (item, _) in enumerate(sorted(sparse_scores, key=lambda x: x[1], reverse=True), start=1)}
+
+        all_ids = {id(item) for (item, _) in embedding_scores} | {id(item) for (item, _) in sparse_scores}
+        id_to_item = {}
+        for (it, _) in embedding_scores:
+            id_to_item[id(it)] = it
+        for (it, _) in sparse_scores:
+            id_to_item[id(it)] = it
+
+        fused: List[Tuple[CollectionItem, float]] = []
+        for iid in all_ids:
+            r1 = rank_map_embed.get(iid)
+            r2 = rank_map_sparse.get(iid)
+            score = 0.0
+            if r1:
+                score += 1.0 / (60.0 + r1)
+            if r2:
+                score += 1.0 / (60.0 + r2)
+            fused.append((id_to_item[iid], score))
+
+        fused.sort(key=lambda x: x[1], reverse=True)
+        return fused[:max(1, int(top_k))]
+    
+    def generate_embedding_for_item(self, item: CollectionItem) -> Optional[List[float]]:
+        """Génère l'embedding pour un item"""
+        if not self.client:
+            return None
+        
+        # Même texte que le pipeline de backfill (hash comparable)
+        text = item_embedding_text(asdict(item))
+        
+        try:
+            response = self.client.embeddings.create(
+                input=text,
+                model=self.embedding_model
+            )
+            return response.data[0].embedding
+        except Exception as e:
+            logger.error(f"Erreur génération embedding item: {e}")
+            return None
+# Moteur d'IA OpenAI Pure avec RAG
+class PureOpenAIEngineWithRAG:
+    """Moteur d'IA utilisant OpenAI GPT-4 avec recherche sémantique RAG"""
+    
+    def __init__(self, client):
+        self.client = client
+        self.semantic_search = SemanticSearchRAG(client) if client else None
+        self._tool_runtime_context: Dict[str, Any] = {}
+        self._last_context_snapshot: Dict[str, Any] = {}
+        self._last_intent: Optional[str] = None
+
+    def _get_tools_schema(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "type": "function",
+                "name": "get_stock_price",
+                "description": "Obtenir le prix actuel d'une action et ses métriques (devise, variation, volume).",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "symbol": {"type": "string", "description": "Symbole boursier, ex: IREN.SW, AAPL, BTC-USD"},
+                        "force_refresh": {"type": "boolean", "description": "Ignorer le cache et rafraîchir", "default": False}
+                    },
+                    "required": ["symbol"]
+                }
+            },
+            {
+                "type": "function",
+                "name": "get_market_snapshot",
+                "description": "Obtenir un aperçu du marché (indices, matières premières, crypto).",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "max_age_s": {"type": "integer", "minimum": 0, "description": "Âge maximal accepté de l'aperçu en secondes (rafraîchit si plus ancien)"}
+                    }
+                }
+            },
+            {
+                "type": "function",
+                "name": "get_analytics_summary",
+                "description": "Résumé analytique (métriques de base, financières, pipeline).",
+                "parameters": {"type": "object", "properties": {}}
+            },
+            {
+                "type": "function",
+                "name": "list_items_by_category",
+                "description": "Lister les objets par catégorie et statut, triés par valeur décroissante.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "category": {"type": "string"},
+                        "status": {"type": "string", "enum": ["available", "sold", "all"], "default": "available"},
+                        "limit": {"type": "integer", "minimum": 1, "maximum": 100, "default": 10}
+                    },
+                    "required": ["category"]
+                }
+            }
+        ]
+
+    def _execute_tool(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            if name == "get_stock_price":
+                symbol = str(arguments.get("symbol", "")).strip()
+                if not symbol or not re.match(r"^[A-Za-z0-9.+\-]{1,32}$", symbol):
+                    return {"error": "Symbole invalide"}
+                force_refresh = bool(arguments.get("force_refresh", False))
+                from stock_api_manager import stock_api_manager  # local import to avoid cycles
+                data = stock_api_manager.get_stock_price(symbol, force_refresh)
+                return data or {"error": "Prix indisponible"}
+
+            if name == "get_market_snapshot":
+                from stock_api_manager import stock_api_manager
+                max_age = arguments.get("max_age_s")
+                return stock_api_manager.get_market_snapshot(max_age=float(max_age) if max_age is not None else None)
+
+            if name == "get_analytics_summary":
+                items: List[CollectionItem] = self._tool_runtime_context.get("items", [])
+                analytics: Dict[str, Any] = self._tool_runtime_context.get("analytics", {})
+                if not analytics:
+                    analytics = AdvancedDataManager.calculate_advanced_analytics(items)
+                basic = analytics.get('basic_metrics', {})
+                perf = analytics.get('performance_kpis', {})
+                return {"basic_metrics": basic, "performance_kpis": perf}
+
+            if name == "list_items_by_category":
+                items: List[CollectionItem] = self._tool_runtime_context.get("items", [])
+                category = str(arguments.get("category", "")).strip()
+                status = (arguments.get("status") or "available").lower()
+                limit = int(arguments.get("limit") or 10)
+                def _item_value(it: CollectionItem) -> float:
+                    try:
+                        if it.category == 'Actions' and it.current_price and it.stock_quantity:
+                            return float(it.current_price) * float(it.stock_quantity)
+                        return float(it.current_value or 0)
+                    except Exception:
+                        return 0.0
+                chosen = [i for i in items if i.category == category]
+                if status == 'sold':
+                    chosen = [i for i in chosen if is_item_sold(i)]
+                elif status == 'available':
+                    chosen = [i for i in chosen if is_item_available(i)]
+                chosen.sort(key=_item_value, reverse=True)
+                top = chosen[:max(1, min(limit, 100))]
+                return {
+                    "items": [{
+                        "id": it.id,
+                        "name": it.name,
+                        "category": it.category,
+                        "status": it.status,
+                        "value": _item_value(it)
+                    } for it in top]
+                }
+        except Exception as e:
+            return {"error": str(e)}
+        return {"error": "Outil inconnu"}
+
+    def _run_with_tools(self, messages: List[Dict[str, Any]], items: List[CollectionItem], analytics: Dict[str, Any]) -> Optional[str]:
+
+        """Run the model with tool-calling (Responses API) and return final assistant text."""
+        try:
+            self._tool_runtime_context = {"items": items, "analytics": analytics}
+            tools = self._get_tools_schema()
+            loop_messages = list(messages)
+
+            # First turn
+            res = chat_tools_messages(
+                messages=loop_messages,
+                tools=tools,
+                model=os.getenv("AI_MODEL","gpt-5"),
+                max_output_tokens=400,
+                reasoning_effort="none",
+                client=self.client
+            )
+
+            for _ in range(1):  # up to 2 turns total
+                made_call = False
+                for item in getattr(res, "output", []) or []:
+                    if getattr(item, "type", None) == "tool_call":
+                        name = getattr(item, "tool_name", None)
+                        args = getattr(item, "arguments", {})
+                        if isinstance(args, str):
+                            import json as _json
+                            try:
+                                args = _json.loads(args)
+                            except Exception:
+                                args = {"input": args}
+
+                        # Dispatch locally
+                        tool_result = self._run_tool_by_name(name, args)
+
+                        # Send tool output back using previous_response_id
+                        res = self.client.responses.create(
+                            model=os.getenv("AI_MODEL","gpt-5"),
+                            previous_response_id=res.id,
+                            input=[{
+                                "role":"tool",
+                                "name": name,
+                                "content":[{"type":"output_text","text": json.dumps(tool_result, ensure_ascii=False)}]
+                            }],
+                        )
+                        made_call = True
+                        break
+                if not made_call:
+                    break
+
+            return getattr(res, "output_text", None)
+        except Exception as e:
+            logger.error(f"_run_with_tools (Responses) error: {e}")
+            return None
+
+    def detect_query_intent(self, query: str) -> QueryIntent:
+        """Détecte l'intention de la requête"""
+        query_lower = query.lower()
+        
+        # Mots-clés pour la recherche sémantique - ÉLARGI
+        semantic_keywords = [
+            'trouve', 'cherche', 'montre', 'affiche', 'liste',
+            'combien', 'quel', 'quels', 'quelle', 'quelles',
+            'où', 'qui', 'avec', 'comme', 'similaire',
+            'ai-je', 'j\'ai', 'mes', 'ma', 'mon',
+            'allemande', 'italienne', 'française', 'japonaise',
+            'porsche', 'ferrari', 'lamborghini', 'bmw', 'mercedes',
+            'actions', 'bourse', 'portefeuille', 'symbole',
+            'total', 'valeur', 'performance', 'analyse', 'statistiques',
+            'opportunités', 'tendances', 'recommandations', 'insights'
+        ]
+        
+        # Forcer la recherche sémantique pour les questions sur les quantités et marques
+        car_brands = ['porsche', 'mercedes', 'bmw', 'ferrari', 'lamborghini', 'audi', 'volkswagen', 'allemande', 'italienne']
+        car_models = ['urus', 'cayenne', 'panamera', '911', 'aventador', 'huracan', '488', 'f8']
+        complex_questions = ['pas en vente', 'non en vente', 'pas à vendre', 'en vente', 'à vendre', 'disponible', 'vendu']
+        if 'combien' in query_lower or any(word in query_lower for word in car_brands + car_models + ['actions', 'bourse'] + complex_questions):
+            logger.info(f"Intent détecté: SEMANTIC_SEARCH pour '{query}'")
+            return QueryIntent.SEMANTIC_SEARCH
+        
+        # Vérifier si c'est une recherche sémantique
+        if any(keyword in query_lower for keyword in semantic_keywords):
+            logger.info(f"Intent détecté: SEMANTIC_SEARCH pour '{query}'")
+            return QueryIntent.SEMANTIC_SEARCH
+        
+        # Autres intentions existantes
+        if any(word in query_lower for word in ['vente', 'négociation', 'offre', 'pipeline']):
+            return QueryIntent.SALE_PROGRESS_TRACKING
+        
+        if any(word in query_lower for word in ['financ', 'roi', 'profit', 'rentab']):
+            return QueryIntent.FINANCIAL_ANALYSIS
+        
+        if any(word in query_lower for word in ['voiture', 'montre', 'bateau', 'avion']):
+            return QueryIntent.VEHICLE_ANALYSIS
+        
+        return QueryIntent.UNKNOWN
+    
+    def generate_response(self, query: str, items: List[CollectionItem], analytics: Dict[str, Any]) -> str:
+        """Génère une réponse via OpenAI GPT-4 avec approche hybride intelligente (sans historique)"""
+        return self.generate_response_with_history(query, items, analytics, [])
+    
+    def generate_response_with_history(self, query: str, items: List[CollectionItem], analytics: Dict[str, Any], conversation_history: List[Dict[str, str]]) -> str:
+        """Génère une réponse via OpenAI GPT-4 avec intelligence naturelle et mémoire conversationnelle"""
+        
+        if not self.client:
+            return "Moteur IA Indisponible"
+        
+        intent = self.detect_query_intent(query)
+        self._last_intent = intent.name
+
+        logger.info("🔍 Chatbot semantic mode (intent=%s)", intent.name)
+        return self._generate_semantic_response_with_history(query, items, analytics, conversation_history)
+    
+    def _generate_full_context_response(self, query: str, items: List[CollectionItem], analytics: Dict[str, Any], is_concept_search: bool = False) -> str:
+        """Génère une réponse en donnant TOUTES les données à GPT-4 (pour petits datasets) - sans historique"""
+        return self._generate_full_context_response_with_history(query, items, analytics, [], is_concept_search)
+    
+    def _generate_full_context_response_with_history(self, query: str, items: List[CollectionItem], analytics: Dict[str, Any], conversation_history: List[Dict[str, str]], is_concept_search: bool = False) -> str:
+        """Génère une réponse en donnant TOUTES les données à GPT-4 (pour petits datasets)"""
+        try:
+            # Cache pour éviter les appels répétés (avec historique)
+            history_hash = hashlib.md5(json.dumps(conversation_history, sort_keys=True).encode()).hexdigest()[:8]
+            cache_key = hashlib.md5(f"{query}{len(items)}{history_hash}{json.dumps(analytics.get('basic_metrics', {}), sort_keys=True)}".encode()).hexdigest()[:12]
+            cached_response = smart_cache.get('ai_responses', cache_key)
+            if cached_response:
+                return cached_response
+            
+            # Construire le contexte COMPLET avec TOUS les objets
+            complete_context = self._build_complete_dataset_context(items, analytics)
+            
+            # Prompt système amélioré pour exploiter GPT-5 avec intelligence hybride
+            system_prompt = """Tu es l'assistant IA expert de la collection BONVIN, équipé de GPT-5 pour des analyses approfondies.
+
+CAPACITÉS DISPONIBLES:
+- Analyse comparative intelligente (comparer objets, trouver le meilleur/plus rapide/plus cher)
+- Raisonnement sur les données techniques (performance, caractéristiques)
+- Synthèse financière et stratégique
+- Mémoire conversationnelle pour un dialogue naturel
+- Connaissance générale des objets de collection (voitures, montres, etc.)
+
+MODE HYBRIDE INTELLIGENT:
+1. **PRIORITÉ AUX DONNÉES DB**: Utilise d'abord les données fournies (descriptions, specs, valeurs)
+2. **COMPLÉTER AVEC CONNAISSANCES GÉNÉRALES**: Si les specs techniques manquent dans la DB, utilise ta connaissance générale
+   - Pour les voitures: Tu connais les performances (vitesse, 0-100, puissance) des modèles célèbres
+   - Pour les montres: Tu connais les complications, marques, années de production
+   - Pour les actions: Tu connais les secteurs, contexte économique
+3. **TRANSPARENCE**: Indique clairement quand tu utilises tes connaissances générales vs données DB
+   - Exemple: "Selon les données: [specs DB]" ou "Selon mes connaissances générales: [specs connues]"
+
+RÈGLES D'ANALYSE:
+- Pour questions comparatives (plus rapide, meilleur, etc.): Analyse TOUS les objets
+- Extrais d'abord les specs des descriptions fournies
+- Si specs manquantes ET tu reconnais le modèle → Utilise ta connaissance
+- Structure réponses avec clarté (titres, listes, bullets)
+- Précision maximale avec chiffres et références
+- Format: Analyse complète et structurée (pas de limite artificielle)
+
+Réponds en français, style professionnel et conversationnel."""
+
+            # Construire les messages avec historique
+            messages = [{"role": "system", "content": system_prompt}]
+            
+            # Ajouter l'historique de conversation (limité à 8 messages pour éviter les tokens excessifs)
+            for msg in conversation_history[-8:]:
+                if msg.get('role') in ['user', 'assistant'] and msg.get('content'):
+                    messages.append({
+                        "role": msg['role'],
+                        "content": msg['content']
+                    })
+            
+            # Prompt utilisateur enrichi
+            user_prompt = f"""QUESTION: {query}
+
+DONNÉES COMPLÈTES DE LA COLLECTION:
+{complete_context}
+
+INSTRUCTIONS:
+Analyse cette question en exploitant toute ton intelligence GPT-5 en MODE HYBRIDE:
+
+1. Examine TOUS les objets pertinents et leurs caractéristiques
+2. Extrais d'abord les specs techniques des descriptions fournies
+3. Si les specs manquent mais tu reconnais le modèle (ex: Ferrari F40, Porsche 911 GT3, Rolex Daytona) → Complète avec ta connaissance générale
+4. Pour les comparaisons (plus rapide, meilleur, etc.): Compare en utilisant données DB + connaissances
+5. Sois transparent: indique quelles données viennent de la DB vs tes connaissances générales
+6. Fournis une réponse complète, structurée et intelligente
+
+IMPORTANT: Utilise le mode hybride pour une analyse optimale combinant données DB + connaissances générales."""
+
+            messages.append({"role": "user", "content": user_prompt})
+
+            # Try tool-calling path first
+            ai_response = self._run_with_tools(messages, items, analytics)
+            if not ai_response:
+                # Fallback to Responses API (no Completions)
+                # Convertir messages au format Responses API
+                # ⭐ CRITIQUE: TOUS les messages d'ENTRÉE utilisent input_text
+                formatted_messages_full = []
+                for m in messages:
+                    if isinstance(m.get("content"), str):
+                        content_type = "output_text" if m.get("role") == "assistant" else "input_text"
+                        formatted_messages_full.append({
+                            "role": m["role"],
+                            "content": [{"type": content_type, "text": m["content"]}]
+                        })
+                    else:
+                        formatted_messages_full.append(m)
+                
+                resp = from_responses_simple(
+                    client=self.client,
+                    model=os.getenv("AI_MODEL", "gpt-5"),
+                    messages=formatted_messages_full,
+                    max_output_tokens=2000,
+                    reasoning_effort="none"
+                )
+                ai_response = (extract_output_text(resp) or "").strip()
+                if not ai_response:
+                    logger.warning("⚠️ Responses API returned empty output_text, falling back to Chat Completions")
+                    try:
+                        cc_resp = from_chat_completions_compat(
+                            client=self.client,
+                            model=os.getenv("AI_MODEL", "gpt-5"),
+                            messages=messages,
+                            max_completion_tokens=1200,
+                            timeout=20,
+                        )
+                        ai_response = (cc_resp.choices[0].message.get("content") or "").strip()
+                    except Exception as chat_fallback_error:
+                        logger.error("❌ Chat Completions fallback failed: %s", chat_fallback_error)
+                        ai_response = ""
+            
+            # Cache la réponse
+            smart_cache.set('ai_responses', ai_response, cache_key)
+            
+            # Pas d'indicateur de mémoire - réponses directes
+            
+            return ai_response
+            
+        except Exception as e:
+            logger.error(f"Erreur analyse complète: {e}")
+            return "❌ Erreur lors de l'analyse. Veuillez reformuler votre question."
+    
+    def _generate_semantic_response(self, query: str, items: List[CollectionItem], analytics: Dict[str, Any]) -> str:
+        """Génère une réponse via recherche sémantique (sans historique)"""
+        return self._generate_semantic_response_with_history(query, items, analytics, [])
+    
+    def _build_semantic_messages(self, query: str, items: List[CollectionItem], analytics: Dict[str, Any], conversation_history: List[Dict[str, str]]) -> Optional[List[Dict[str, Any]]]:
+        """Construit les messages RAG (recherche sémantique + historique); None si aucun résultat exploitable"""
+        # Vérifier d'abord si nous avons des embeddings
+        items_with_embeddings = sum(1 for item in items if item.embedding)
+        logger.info(
+            "Recherche sémantique - Items avec embeddings: %s/%s",
+            items_with_embeddings,
+            len(items)
+        )
+        
+        if items_with_embeddings == 0:
+            logger.warning("Aucun embedding disponible, bascule vers résumé analytique")
+            return None
+        
+        # Recherche sémantique
+        semantic_results = self.semantic_search.semantic_search(query, items, top_k=DEFAULT_RAG_TOP_ITEMS * 2)
+        total_candidates = len(semantic_results)
+        
+        if not semantic_results:
+            logger.warning("Pas de résultats sémantiques, bascule vers résumé analytique")
+            return None
+        
+        # Filtrer les résultats pertinents (score > 0.3 au lieu de 0.5 pour être plus inclusif)
+        relevant_results = [(item, score) for item, score in semantic_results if score > 0.3]
+        
+        if not relevant_results:
+            relevant_results = semantic_results[:DEFAULT_RAG_TOP_ITEMS]
+        
+        selected_results = relevant_results[:DEFAULT_RAG_TOP_ITEMS]
+        logger.info(
+            "Résultats sémantiques retenus: %s/%s (limite=%s)",
+            len(selected_results),
+            total_candidates,
+            DEFAULT_RAG_TOP_ITEMS
+        )
+        
+        self._last_context_snapshot = {
+            "intent": self._last_intent,
+            "total_candidates": total_candidates,
+            "selected": len(selected_results),
+            "query": query[:120]
+        }
+        
+        # Construire le contexte RAG (limité pour éviter dépassement tokens GPT-5)
+        # Réduire à top 5 pour GPT-5 reasoning_effort="high" qui est coûteux en tokens
+        limited_results = selected_results[:5]  # Au lieu de 12
+        rag_context = self._build_rag_context(limited_results, query, total_candidates)
+        
+        # LOG: Taille du contexte
+        logger.info(f"📊 RAG Context length: {len(rag_context)} chars, {len(limited_results)} items")
+        
+        # Prompt pour GPT avec contexte RAG et mémoire conversationnelle - exploiter GPT-5 avec intelligence hybride
+        system_prompt = """Tu es l'assistant IA expert de la collection BONVIN, équipé de GPT-5 pour des analyses approfondies.
+
+CAPACITÉS DISPONIBLES:
+- Analyse comparative intelligente (comparer objets, trouver le meilleur/plus rapide/plus cher)
+- Raisonnement sur les données techniques (performance, caractéristiques)
+- Synthèse financière et stratégique
+- Recherche sémantique avancée pour trouver les objets les plus pertinents
+- Connaissance générale des objets de collection (voitures, montres, etc.)
+
+MODE HYBRIDE INTELLIGENT:
+1. **PRIORITÉ AUX RÉSULTATS**: Utilise d'abord les objets listés dans RÉSULTATS
+2. **COMPLÉTER AVEC CONNAISSANCES**: Si specs techniques manquent, utilise ta connaissance générale
+   - Pour les voitures: Tu connais les performances des modèles célèbres (Ferrari, Porsche, Lamborghini, etc.)
+   - Pour les montres: Tu connais les complications et valeurs des marques prestigieuses
+3. **TRANSPARENCE**: Indique clairement la source (données DB vs connaissances générales)
+   - Exemple: "Selon vos données: vitesse non spécifiée, mais la Ferrari F40 atteint 324 km/h (connaissance générale)"
+
+RÈGLES D'ANALYSE:
+- Pour questions comparatives: Analyse TOUS les objets retournés
+- Extrais d'abord les specs des descriptions fournies
+- Si specs manquantes ET modèle reconnu → Complète avec connaissances
+- Structure avec clarté (titres, listes si approprié)
+- Précision maximale avec chiffres et références
+- Ignore [METADATA] - elles sont pour le débogage
+
+Réponds en français, style professionnel et conversationnel."""
+
+        # Construire les messages avec historique
+        messages = [{"role": "system", "content": system_prompt}]
+        
+        # Ajouter l'historique de conversation (limité à 6 messages pour éviter les tokens excessifs)
+        for msg in conversation_history[-6:]:
+            if msg.get('role') in ['user', 'assistant'] and msg.get('content'):
+                messages.append({
+                    "role": msg['role'],
+                    "content": msg['content']
+                })
+
+        user_prompt = f"""QUESTION: {query}
+
+RÉSULTATS DE LA RECHERCHE SÉMANTIQUE ({len(relevant_results)} objets pertinents):
+{rag_context}
+
+INSTRUCTIONS:
+Analyse cette question en exploitant toute ton intelligence GPT-5 en MODE HYBRIDE:
+
+1. Examine TOUS les objets listés dans les résultats
+2. Extrais les specs techniques des descriptions fournies
+3. Si les specs manquent mais tu reconnais le modèle → Complète avec ta connaissance générale
+4. Pour les comparaisons (plus rapide, meilleur, etc.): Compare en utilisant données DB + connaissances
+5. Sois transparent sur tes sources d'information
+6. Fournis une réponse complète, structurée et intelligente
+
+IMPORTANT: Combine données DB et connaissances générales pour une analyse optimale."""
+
+        messages.append({"role": "user", "content": user_prompt})
+
+        # LOG: Taille totale des messages avant appel
+        total_chars = sum(len(str(m.get("content", ""))) for m in messages)
+        logger.info(f"📊 Total prompt size: {total_chars} chars (~{total_chars//4} tokens)")
+        return messages
+
+    def _complete_messages(self, messages: List[Dict[str, Any]]) -> str:
+        """Appel Responses API non streamé, avec repli Chat Completions si la sortie est vide"""
+        # Convertir messages au format Responses API
+        # ⭐ CRITIQUE: TOUS les messages d'ENTRÉE utilisent input_text (même assistant!)
+        # output_text est réservé à la SORTIE du modèle uniquement
+        formatted_messages = []
+        for m in messages:
+            if isinstance(m.get("content"), str):
+                content_type = "output_text" if m.get("role") == "assistant" else "input_text"
+                formatted_messages.append({
+                    "role": m["role"],
+                    "content": [{"type": content_type, "text": m["content"]}]
+                })
+            else:
+                formatted_messages.append(m)
+        
+        resp = from_responses_simple(
+            client=self.client,
+            model=os.getenv("AI_MODEL", "gpt-5"),
+            messages=formatted_messages,
+            max_output_tokens=1500,
+            reasoning_effort="none"
+        )
+        logger.info(f"✅ API call completed, extracting response...")
+        ai_response = (extract_output_text(resp) or "").strip()
+        if not ai_response:
+            logger.warning("⚠️ Responses API returned empty output_text, falling back to Chat Completions")
+            try:
+                cc_resp = from_chat_completions_compat(
+                    client=self.client,
+                    model=os.getenv("AI_MODEL", "gpt-5"),
+                    messages=messages,
+                    max_completion_tokens=1200,
+                    timeout=20,
+                )
+                ai_response = (cc_resp.choices[0].message.get("content") or "").strip()
+            except Exception as chat_fallback_error:
+                logger.error("❌ Chat Completions fallback failed: %s", chat_fallback_error)
+                ai_response = ""
+        return ai_response
+
+    def _generate_semantic_response_with_history(self, query: str, items: List[CollectionItem], analytics: Dict[str, Any], conversation_history: List[Dict[str, str]]) -> str:
+        """Génère une réponse en utilisant la recherche sémantique RAG"""
+        try:
+            messages = self._build_semantic_messages(query, items, analytics, conversation_history)
+            if messages is None:
+                return self._generate_full_context_response_with_history(query, items, analytics, conversation_history, True)
+            return self._complete_messages(messages)
+            
+        except Exception as e:
+            logger.error(f"Erreur recherche sémantique: {e}")
+            return self._generate_full_context_response_with_history(query, items, analytics, conversation_history, True)
+    
+    def stream_response_with_history(self, query: str, items: List[CollectionItem], analytics: Dict[str, Any], conversation_history: List[Dict[str, str]]) -> Iterator[str]:
+        """Version streamée de `generate_response_with_history`: produit les deltas de texte du LLM au fil de l'eau"""
+        if not self.client:
+            yield "Moteur IA Indisponible"
+            return
+        
+        intent = self.detect_query_intent(query)
+        self._last_intent = intent.name
+        
+        try:
+            messages = self._build_semantic_messages(query, items, analytics, conversation_history)
+        except Exception as e:
+            logger.error(f"Erreur recherche sémantique: {e}")
+            messages = None
+        if messages is None:
+            # Contexte complet (avec outils): réponse non streamable, envoyée d'un bloc
+            yield self._generate_full_context_response_with_history(query, items, analytics, conversation_history, True)
+            return
+        
+        emitted = False
+        try:
+            for delta in stream_responses_text(
+                client=self.client,
+                model=os.getenv("AI_MODEL", "gpt-5"),
+                messages=messages,
+                max_output_tokens=1500
+            ):
+                emitted = True
+                yield delta
+        except Exception as e:
+            if emitted:
+                raise
+            logger.warning(f"⚠️ Streaming Responses API indisponible ({e}), réponse non streamée")
+        if not emitted:
+            yield self._complete_messages(messages)
+    
+    def _build_rag_context(self, results: List[Tuple[CollectionItem, float]], query: str, total_candidates: int) -> str:
+        """Construit le contexte pour RAG"""
+        context_parts = []
+        
+        for i, (item, score) in enumerate(results, 1):
+            context_parts.append(f"\n{i}. **{item.name}** (Pertinence: {score:.2%})")
+            context_parts.append(f"   - Catégorie: {item.category}")
+            context_parts.append(f"   - Statut: {'Disponible' if item.status == 'Available' else 'Vendu'}")
+            
+            if item.for_sale:
+                context_parts.append(f"   - 🔥 EN VENTE")
+                if item.sale_status:
+                    context_parts.append(f"   - Progression vente: {item.sale_status}")
+            
+            if item.construction_year:
+                context_parts.append(f"   - Année: {item.construction_year}")
+            
+            if item.condition:
+                context_parts.append(f"   - État: {item.condition}")
+            
+            if item.current_value is not None:
+                context_parts.append(f"   - valeur actuelle: {item.current_value:,.0f} CHF")
+            
+            if item.sold_price is not None:
+                context_parts.append(f"   - Prix de vente: {item.sold_price:,.0f} CHF")
+            
+            if item.current_offer is not None:
+                context_parts.append(f"   - Offre actuelle: {item.current_offer:,.0f} CHF")
+            
+            # Informations spécifiques aux actions
+            if item.category == 'Actions':
+                if item.stock_symbol:
+                    context_parts.append(f"   - Symbole boursier: {item.stock_symbol}")
+                if item.stock_quantity:
+                    context_parts.append(f"   - Quantité: {item.stock_quantity} actions")
+                if item.stock_exchange:
+                    context_parts.append(f"   - Bourse: {item.stock_exchange}")
+                if item.stock_purchase_price is not None:
+                    context_parts.append(f"   - Prix d'achat unitaire: {item.stock_purchase_price:,.0f} CHF")
+                if item.current_price is not None:
+                    context_parts.append(f"   - Prix actuel: {item.current_price:,.0f} CHF/action")
+            
+            if item.description:
+                # Inclure description complète pour l'analyse intelligente (limite 500 chars si trop long)
+                desc_text = item.description[:500] + "..." if len(item.description) > 500 else item.description
+                context_parts.append(f"   - Description: {desc_text}")
+            
+                        # Informations spécifiques selon la catégorie
+            if item.category == "Appartements / maison" and item.surface_m2 is not None:
+                context_parts.append(f"   - Surface: {item.surface_m2} m²")
+                if item.rental_income_chf is not None:
+                    context_parts.append(f"   - Revenus locatifs: {item.rental_income_chf:,.0f} CHF/mois")
+        
+        coverage_pct = (len(results) / max(1, total_candidates)) * 100 if total_candidates else 100
+        context_parts.append("\n[METADATA]")
+        context_parts.append(f"items_retained={len(results)}")
+        context_parts.append(f"candidates_total={total_candidates}")
+        context_parts.append(f"coverage_pct={coverage_pct:.1f}")
+        
+        return "\n".join(context_parts)
+    
+
+    
+    def _build_complete_dataset_context(self, items: List[CollectionItem], analytics: Dict[str, Any]) -> str:
+        """Construit un contexte COMPLET et structuré avec TOUS les objets"""
+        context_parts = []
+        
+        # Statistiques globales
+        context_parts.append("=== STATISTIQUES GLOBALES ===")
+        context_parts.append(f"Total objets: {len(items)}")
+        total_value = analytics.get('basic_metrics', {}).get('total_value', 0)
+        if total_value is not None:
+            context_parts.append(f"Valeur totale estimée: {total_value:,.0f} CHF")
+        else:
+            context_parts.append("Valeur totale estimée: Non disponible")
+        context_parts.append(f"Objets en vente: {len([i for i in items if i.for_sale])}")
+        context_parts.append(f"Objets vendus: {len([i for i in items if i.status == 'Sold'])}")
+        
+        # Analyse par catégorie
+        context_parts.append("\n=== RÉPARTITION PAR CATÉGORIE ===")
+        category_stats = {}
+        for item in items:
+            if item.category not in category_stats:
+                category_stats[item.category] = {'count': 0, 'value': 0, 'items': []}
+            category_stats[item.category]['count'] += 1
+            category_stats[item.category]['items'].append(item)
+            if item.current_value is not None:
+                category_stats[item.category]['value'] += item.current_value
+            elif item.sold_price is not None:
+                category_stats[item.category]['value'] += item.sold_price
+        
+        for category, stats in category_stats.items():
+            category_name = category.upper() if category else "AUTRE"
+            context_parts.append(f"\n{category_name}:")
+            context_parts.append(f"  - Nombre: {stats['count']}")
+            if stats['value'] is not None:
+                context_parts.append(f"  - Valeur: {stats['value']:,.0f} CHF")
+            else:
+                context_parts.append("  - Valeur: Non disponible")
+            context_parts.append(f"  - Objets: {', '.join([item.name for item in stats['items'][:5]])}")
+            if len(stats['items']) > 5:
+                context_parts.append(f"    ... et {len(stats['items']) - 5} autres")
+        
+        # Détail complet de tous les objets
+        context_parts.append("\n=== DÉTAIL COMPLET DE TOUS LES OBJETS ===")
+        
+        for i, item in enumerate(items, 1):
+            context_parts.append(f"\n{i}. {item.name}")
+            context_parts.append(f"   Catégorie: {item.category}")
+            context_parts.append(f"   Statut: {item.status}")
+            
+            if item.for_sale:
+                context_parts.append(f"   🔥 EN VENTE")
+                if item.sale_status:
+                    context_parts.append(f"   Progression: {item.sale_status}")
+                if item.current_offer is not None:
+                    context_parts.append(f"   Offre actuelle: {item.current_offer:,.0f} CHF")
+            
+            if item.construction_year:
+                context_parts.append(f"   Année: {item.construction_year}")
+            
+            if item.condition:
+                context_parts.append(f"   État: {item.condition}")
+            
+            if item.current_value is not None:
+                context_parts.append(f"   valeur actuelle: {item.current_value:,.0f} CHF")
+            
+            if item.sold_price is not None:
+                context_parts.append(f"   Prix de vente: {item.sold_price:,.0f} CHF")
+            
+            if item.acquisition_price is not None:
+                context_parts.append(f"   Prix d'acquisition: {item.acquisition_price:,.0f} CHF")
+            
+            # Informations spécifiques aux actions
+            if item.category == 'Actions':
+                if item.stock_symbol:
+                    context_parts.append(f"   Symbole: {item.stock_symbol}")
+                if item.stock_quantity:
+                    context_parts.append(f"   Quantité: {item.stock_quantity} actions")
+                if item.stock_exchange:
+                    context_parts.append(f"   Bourse: {item.stock_exchange}")
+                if item.stock_purchase_price is not None:
+                    context_parts.append(f"   Prix d'achat unitaire: {item.stock_purchase_price:,.0f} CHF")
+                if item.current_price is not None:
+                    context_parts.append(f"   Prix actuel: {item.current_price:,.0f} CHF/action")
+                    if item.stock_quantity is not None and item.stock_purchase_price is not None:
+                        total_invested = item.stock_quantity * item.stock_purchase_price
+                        current_value = item.stock_quantity * item.current_price
+                        gain_loss = current_value - total_invested
+                        gain_loss_pct = (gain_loss / total_invested * 100) if total_invested > 0 else 0
+                        context_parts.append(f"   Performance: {gain_loss:+,.0f} CHF ({gain_loss_pct:+.1f}%)")
+            
+                        # Informations immobilières
+            if item.category == "Appartements / maison":
+                if item.surface_m2 is not None:
+                    context_parts.append(f"   Surface: {item.surface_m2} m²")
+                if item.rental_income_chf is not None:
+                    context_parts.append(f"   Revenus locatifs: {item.rental_income_chf:,.0f} CHF/mois")
+            
+            if item.description:
+                # Inclure description complète pour l'analyse intelligente (limite 500 chars si trop long)
+                desc_text = item.description[:500] + "..." if len(item.description) > 500 else item.description
+                context_parts.append(f"   Description: {desc_text}")
+        
+        # Pipeline de vente
+        items_for_sale = [item for item in items if item.for_sale]
+        if items_for_sale:
+            context_parts.append("\n=== PIPELINE DE VENTE ===")
+            for item in items_for_sale:
+                sale_status = item.sale_status or 'En vente'
+                if item.current_value is not None:
+                    context_parts.append(f"- {item.name}: {sale_status} - {item.current_value:,.0f} CHF")
+                else:
+                    context_parts.append(f"- {item.name}: {sale_status} - Prix non disponible")
+        
+        # Actions boursières
+        stocks = [item for item in items if item.category == 'Actions']
+        if stocks:
+            context_parts.append("\n=== PORTEFEUILLE ACTIONS ===")
+            total_stock_value = 0
+            for stock in stocks:
+                if stock.current_price is not None and stock.stock_quantity is not None:
+                    stock_value = stock.current_price * stock.stock_quantity
+                    total_stock_value += stock_value
+                    context_parts.append(f"- {stock.stock_symbol}: {stock.stock_quantity} actions @ {stock.current_price:,.0f} CHF = {stock_value:,.0f} CHF")
+            if total_stock_value > 0:
+                context_parts.append(f"Valeur totale actions: {total_stock_value:,.0f} CHF")
+            else:
+                context_parts.append("Valeur totale actions: Non disponible")
+        
+        return "\n".join(context_parts)
+    
+    def _build_complete_context(self, items: List[CollectionItem], analytics: Dict[str, Any]) -> str:
+        """Construit un contexte complet pour l'IA"""
+        context_parts = []
+        
+        # Vue d'ensemble
+        basic = analytics.get('basic_metrics', {})
+        context_parts.append(f"=== VUE D'ENSEMBLE ===")
+        context_parts.append(f"Total objets: {basic.get('total_items', 0)}")
+        context_parts.append(f"Disponibles: {basic.get('available_items', 0)}")
+        context_parts.append(f"Vendus: {basic.get('sold_items', 0)}")
+        context_parts.append(f"En vente: {basic.get('items_for_sale', 0)}")
+        
+        # Métriques financières
+        financial = analytics.get('financial_metrics', {})
+        context_parts.append(f"\n=== MÉTRIQUES FINANCIÈRES ===")
+        portfolio_value = financial.get('portfolio_value', 0)
+        realized_sales = financial.get('realized_sales', 0)
+        roi_percentage = financial.get('roi_percentage', 0)
+        total_profit = financial.get('total_profit', 0)
+        
+        if portfolio_value is not None:
+            context_parts.append(f"Valeur portefeuille: {portfolio_value:,.0f} CHF")
+        else:
+            context_parts.append("Valeur portefeuille: Non disponible")
+            
+        if realized_sales is not None:
+            context_parts.append(f"CA réalisé: {realized_sales:,.0f} CHF")
+        else:
+            context_parts.append("CA réalisé: Non disponible")
+            
+        if roi_percentage is not None:
+            context_parts.append(f"ROI: {roi_percentage:.1f}%")
+        else:
+            context_parts.append("ROI: Non disponible")
+            
+        if total_profit is not None:
+            context_parts.append(f"Profit total: {total_profit:,.0f} CHF")
+        else:
+            context_parts.append("Profit total: Non disponible")
+        
+        # Analytics actions si disponibles
+        stock_analytics = analytics.get('stock_analytics', {})
+        if stock_analytics.get('total_stocks', 0) > 0:
+            context_parts.append(f"\n=== PORTEFEUILLE ACTIONS ===")
+            context_parts.append(f"Nombre d'actions différentes: {stock_analytics.get('total_stocks', 0)}")
+            context_parts.append(f"Total actions détenues: {stock_analytics.get('total_shares', 0)}")
+            total_stock_value = stock_analytics.get('total_value', 0)
+            if total_stock_value is not None:
+                context_parts.append(f"Valeur totale: {total_stock_value:,.0f} CHF")
+            else:
+                context_parts.append("Valeur totale: Non disponible")
+        
+        # Liste détaillée des objets
+        context_parts.append(f"\n=== INVENTAIRE DÉTAILLÉ ===")
+        
+        # Grouper par catégorie
+        categories = {}
+        for item in items:
+            cat = item.category or 'Autre'
+            if cat not in categories:
+                categories[cat] = []
+            categories[cat].append(item)
+        
+        for category, cat_items in categories.items():
+            category_name = category.upper() if category else "AUTRE"
+            context_parts.append(f"\n{category_name} ({len(cat_items)} objets):")
+            
+            # Trier par statut
+            for_sale = [i for i in cat_items if i.for_sale]
+            available = [i for i in cat_items if i.status == 'Available' and not i.for_sale]
+            sold = [i for i in cat_items if i.status == 'Sold']
+            
+            if for_sale:
+                context_parts.append("EN VENTE:")
+                for item in for_sale:
+                    context_parts.append(f"- {item.name} ({item.construction_year or 'N/A'})")
+                    if item.current_value:
+                        context_parts.append(f"  Prix: {item.current_value:,.0f} CHF")
+                    if item.sale_status:
+                        context_parts.append(f"  Statut: {item.sale_status}")
+                    if item.current_offer:
+                        context_parts.append(f"  Offre actuelle: {item.current_offer:,.0f} CHF")
+                    # Détails spécifiques aux actions
+                    if item.category == 'Actions' and item.stock_symbol:
+                        context_parts.append(f"  Symbole: {item.stock_symbol}")
+                        context_parts.append(f"  Quantité: {item.stock_quantity} actions")
+                        if item.current_price:
+                            context_parts.append(f"  Prix actuel: {item.current_price:,.0f} CHF/action")
+            
+            if available:
+                context_parts.append("DISPONIBLES:")
+                for item in available[:5]:  # Limiter pour ne pas surcharger
+                    context_parts.append(f"- {item.name} ({item.construction_year or 'N/A'})")
+                    if item.category == 'Actions' and item.stock_symbol:
+                        context_parts.append(f"  → {item.stock_symbol}: {item.stock_quantity} actions")
+                        if item.current_price:
+                            context_parts.append(f"  → Prix actuel: {item.current_price:,.0f} CHF/action")
+                if len(available) > 5:
+                    context_parts.append(f"... et {len(available) - 5} autres")
+            
+            if sold:
+                context_parts.append("VENDUS:")
+                for item in sold[:3]:  # Limiter
+                    context_parts.append(f"- {item.name}")
+                    if item.sold_price:
+                        context_parts.append(f"  Vendu: {item.sold_price:,.0f} CHF")
+                if len(sold) > 3:
+                    context_parts.append(f"... et {len(sold) - 3} autres")
+        
+        # Pipeline de vente
+        pipeline = analytics.get('sales_pipeline', {})
+        if pipeline.get('stages'):
+            context_parts.append(f"\n=== PIPELINE DE VENTE ===")
+            for stage_data in pipeline['stages'].values():
+                if stage_data['count'] > 0:
+                    context_parts.append(f"{stage_data['name']}: {stage_data['count']} objets ({stage_data['total_value']:,.0f} CHF)")
+        
+        return "\n".join(context_parts)
+
+# Instance du moteur IA avec RAG
+ai_engine = PureOpenAIEngineWithRAG(openai_client) if openai_client else None
+if ai_engine:
+    logger.info("✅ ai_engine initialisé avec succès (GPT-5 mode hybride activé)")
+else:
+    logger.error("❌ ai_engine NON initialisé - openai_client manquant! Le chatbot ne fonctionnera pas correctement.")
+    logger.error("   Vérifier: OPENAI_API_KEY dans .env")
+
+# Limiter strictement la taille du contexte envoyé aux LLM
+# Valeurs par défaut défensives pour la taille des contextes RAG
+MIN_RAG_TOP_ITEMS = 3
+MAX_RAG_TOP_ITEMS = 15
+MIN_RAG_TOP_ANALYSES = 1
+MAX_RAG_TOP_ANALYSES = 10
+
+DEFAULT_RAG_TOP_ITEMS = max(
+    MIN_RAG_TOP_ITEMS,
+    min(MAX_RAG_TOP_ITEMS, int(os.getenv("CHATBOT_RAG_TOP_ITEMS", "12")))
+)
+DEFAULT_RAG_TOP_ANALYSES = max(
+    MIN_RAG_TOP_ANALYSES,
+    min(MAX_RAG_TOP_ANALYSES, int(os.getenv("CHATBOT_RAG_TOP_ANALYSES", "6")))
+)
+
+
+def _get_text_embedding_for_rag(text: str):
+    try:
+        if not openai_client:
+            return None
+        model = os.getenv("EMBEDDINGS_MODEL", "text-embedding-3-small")
+        return query_embedding_cache.get(text or "", model)
+    except Exception as e:
+        try:
+            logger.warning(f"⚠️ Embedding error: {e}")
+        except Exception:
+            pass
+        return None
+
+def _match_items_by_embedding(query_embedding, top_k: int = 15):
+    try:
+        if not supabase or query_embedding is None:
+            return []
+        payload = {"query_embedding": query_embedding, "match_count": int(max(1, min(top_k, 100)))}
+        # supabase-py returns .data on .execute()
+        result = supabase.rpc("match_items", payload).execute()
+        return getattr(result, 'data', []) or []
+    except Exception as e:
+        try:
+            logger.warning(f"⚠️ match_items RPC error: {e}")
+        except Exception:
+            pass
+        return []
+
+def _match_analyses_by_embedding(query_embedding, top_k: int = 5):
+    try:
+        if not supabase or query_embedding is None:
+            return []
+        payload = {"query_embedding": query_embedding, "match_count": int(max(1, min(top_k, 50)))}
+        result = supabase.rpc("match_analyses", payload).execute()
+        return getattr(result, 'data', []) or []
+    except Exception as e:
+        try:
+            logger.warning(f"⚠️ match_analyses RPC error: {e}")
+        except Exception:
+            pass
+        return []
+
+def _build_retrieval_context_from_supabase(query: str, top_k_items: int = 10, top_k_analyses: int = 5) -> str:
+    """Builds a compact RAG context block using pgvector RPC functions."""
+    try:
+        if not query or not isinstance(query, str):
+            return ""
+        emb = _get_text_embedding_for_rag(query)
+        if emb is None:
+            return ""
+        parts = []
+        # Items retrieval
+        try:
+            allowed_top_items = max(MIN_RAG_TOP_ITEMS, min(MAX_RAG_TOP_ITEMS, int(top_k_items)))
+            items = _match_items_by_embedding(emb, allowed_top_items)
+        except Exception:
+            items = []
+        if items:
+            lines = []
+            for r in items:
+                try:
+                    nm = str(r.get('name') or '')
+                    cat = str(r.get('category') or '')
+                    desc = str(r.get('description') or '')
+                    if len(desc) > 120:
+                        desc = desc[:120] + '…'
+                    rel = r.get('distance')
+                    try:
+                        rel = float(rel) if rel is not None else None
+                    except Exception:
+                        rel = None
+                    rel_s = f" | rel:{rel:.3f}" if isinstance(rel, float) else ""
+                    lines.append(f"- {nm} ({cat}){rel_s} :: {desc}")
+                except Exception:
+                    continue
+            if lines:
+                parts.append("[RAG_MATCH_ITEMS]\n" + "\n".join(lines))
+        # Market analyses retrieval
+        try:
+            allowed_top_analyses = max(MIN_RAG_TOP_ANALYSES, min(MAX_RAG_TOP_ANALYSES, int(top_k_analyses)))
+            analyses = _match_analyses_by_embedding(emb, allowed_top_analyses)
+        except Exception:
+            analyses = []
+        if analyses:
+            lines = []
+            for r in analyses:
+                try:
+                    at = str(r.get('analysis_type') or r.get('type') or '')
+                    summ = str(r.get('summary') or '')
+                    if len(summ) > 220:
+                        summ = summ[:220] + '…'
+                    rel = r.get('distance')
+                    try:
+                        rel = float(rel) if rel is not None else None
+                    except Exception:
+                        rel = None
+                    rel_s = f" | rel:{rel:.3f}" if isinstance(rel, float) else ""
+                    lines.append(f"- {at}{rel_s} :: {summ}")
+                except Exception:
+                    continue
+            if lines:
+                parts.append("[RAG_MATCH_ANALYSES]\n" + "\n".join(lines))
+        return ("\n\n".join(parts)).strip()
+    except Exception:
+        return ""
+
+
+def build_markets_context(message: str, extra_context: str = "") -> str:
+    """Contexte marchés: contexte client + dernier rapport + RAG Supabase (items/analyses)"""
+    ctx_parts = []
+    if extra_context:
+        ctx_parts.append(extra_context)
+    try:
+        from market_analysis_db import get_market_analysis_db
+        latest = get_market_analysis_db().get_recent_analyses(limit=1)
+        if latest:
+            a = latest[0]
+            exec_summary = "\n".join([f"- {p}" for p in (a.executive_summary or [])]) if getattr(a, 'executive_summary', None) else ""
+            summary_compact = (a.summary or "")[:800]
+            ts = a.timestamp or a.created_at or ""
+            ctx_parts.append(
+                f"[Dernier rapport | {a.analysis_type or 'auto'} | {ts}]\n"
+                f"Executive Summary:\n{exec_summary}\n"
+                f"Résumé:\n{summary_compact}"
+            )
+    except Exception:
+        pass
+    # Récupération sémantique via Supabase (focus marchés)
+    try:
+        supa_ctx = _build_retrieval_context_from_supabase(
+            message,
+            top_k_items=min(DEFAULT_RAG_TOP_ITEMS, 5),
+            top_k_analyses=min(DEFAULT_RAG_TOP_ANALYSES, 8)
+        )
+        if supa_ctx:
+            ctx_parts.append(supa_ctx)
+    except Exception:
+        pass
+    return "\n---\n".join([p for p in ctx_parts if p])
+
+
+def generate_chat_reply(message: str, session_id: Optional[str] = None, history: Optional[List[Dict[str, str]]] = None) -> str:
+    """Réponse du chatbot collection en process (items/analytics en cache + RAG + historique).
+
+    Utilisé par les tâches Celery à la place d'un POST sur /api/chatbot?force_sync=1.
+    """
+    if not ai_engine:
+        raise RuntimeError("ai_engine indisponible (OPENAI_API_KEY manquant)")
+    conversation_history: List[Dict[str, str]] = []
+    if session_id:
+        try:
+            conversation_history = conversation_memory.get_recent_messages(session_id, limit=10) or []
+        except Exception:
+            conversation_history = []
+    if isinstance(history, list):
+        conversation_history = (conversation_history + list(history[-6:]))[-10:]
+
+    items = AdvancedDataManager.fetch_all_items()
+    analytics = AdvancedDataManager.calculate_advanced_analytics(items)
+    rag_context = _build_retrieval_context_from_supabase(
+        message,
+        top_k_items=min(DEFAULT_RAG_TOP_ITEMS, 10),
+        top_k_analyses=min(DEFAULT_RAG_TOP_ANALYSES, 5)
+    )
+    query = (message if len(message) <= 400 else (message[:400] + '...'))
+    if rag_context:
+        query = f"{query}\n\n{rag_context}"
+    reply = ai_engine.generate_response_with_history(query, items, analytics, conversation_history) or ""
+
+    if session_id and reply:
+        try:
+            conversation_memory.add_message(session_id, 'user', message)
+            conversation_memory.add_message(session_id, 'assistant', reply)
+        except Exception:
+            pass
+    return reply
+
+
+def generate_markets_reply(message: str, session_id: Optional[str] = None, extra_context: str = "") -> str:
+    """Réponse du chatbot marchés en process (même contexte que /api/markets/chat)"""
+    from markets_chat_worker import get_markets_chat_worker
+    history: List[Dict[str, str]] = []
+    if session_id:
+        try:
+            # limiter à 6 derniers messages pour ne pas dépasser les tokens
+            history = conversation_memory.get_recent_messages(session_id, limit=6) or []
+        except Exception:
+            history = []
+    context = build_markets_context(message, extra_context)
+    reply = get_markets_chat_worker().generate_reply(message, context, history=history) or ""
+
+    if session_id and reply:
+        try:
+            conversation_memory.add_message(session_id, 'user', message)
+            conversation_memory.add_message(session_id, 'assistant', reply)
+        except Exception:
+            pass
+    return reply
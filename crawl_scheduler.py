@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Ordonnanceur de crawl asynchrone pour les scrapers (récupération concurrente et bornée des liens).
+
+Les liens de plusieurs sources sont récupérés en parallèle sous deux sémaphores:
+- global (`SCRAPER_CRAWL_CONCURRENCY`, défaut 8): requêtes ScrapingBee simultanées
+- par domaine cible (`SCRAPER_CRAWL_PER_DOMAIN`, défaut 3): politesse envers chaque site
+Les URLs sont dédupliquées (forme normalisée) avant toute requête, et plus aucune page n'est
+lancée dès que `stop_when()` est vrai (ex: `min_chars` atteint). Latence et crédits consommés
+sont comptés par source.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from itertools import zip_longest
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid', 'mc_cid', 'mc_eid')
+
+
+def normalize_url(url: str) -> str:
+    """Forme canonique pour la déduplication (hôte en minuscules, sans fragment ni paramètres de suivi)"""
+    try:
+        parts = urlsplit((url or '').strip())
+    except ValueError:
+        return (url or '').strip()
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                       if not k.lower().startswith(_TRACKING_PARAMS)])
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ''))
+
+
+def _domain(url: str) -> str:
+    netloc = urlsplit(url).netloc.lower()
+    return netloc[4:] if netloc.startswith('www.') else netloc
+
+
+class CrawlScheduler:
+    """Récupère des lots de liens (source, urls) en parallèle; une instance par collecte (dédup commune)"""
+
+    def __init__(self, fetch: Callable[[str], Awaitable[Optional[Dict[str, Any]]]],
+                 max_concurrency: Optional[int] = None, per_domain: Optional[int] = None):
+        self.fetch = fetch
+        self.max_concurrency = int(max_concurrency if max_concurrency is not None else os.getenv('SCRAPER_CRAWL_CONCURRENCY', '8'))
+        self.per_domain = int(per_domain if per_domain is not None else os.getenv('SCRAPER_CRAWL_PER_DOMAIN', '3'))
+        self._global = asyncio.Semaphore(self.max_concurrency)
+        self._domains: Dict[str, asyncio.Semaphore] = {}
+        self._seen: set = set()
+        self._sources: Dict[str, Dict[str, Any]] = {}
+
+    def _source(self, name: str) -> Dict[str, Any]:
+        if name not in self._sources:
+            self._sources[name] = {'fetched': 0, 'accepted': 0, 'failed': 0, 'duplicates': 0, 'skipped': 0,
+                                   'cached': 0, 'latency_s': 0.0, 'max_latency_s': 0.0, 'credits': 0}
+        return self._sources[name]
+
+    def _claim(self, url: str, source: str) -> bool:
+        key = normalize_url(url)
+        if not key or key in self._seen:
+            self._source(source)['duplicates'] += 1
+            return False
+        self._seen.add(key)
+        return True
+
+    def mark_seen(self, url: str) -> None:
+        """Déclare une URL déjà collectée (ex: article RSS) pour qu'elle ne soit pas récupérée"""
+        self._seen.add(normalize_url(url))
+
+    async def _run_one(self, url: str, source: str,
+                       handle: Callable[[str, str, Dict[str, Any]], bool],
+                       stop_when: Optional[Callable[[], bool]]) -> None:
+        stats = self._source(source)
+        semaphore = self._domains.setdefault(_domain(url), asyncio.Semaphore(self.per_domain))
+        # Domaine d'abord: une tâche en attente de son domaine ne bloque pas un créneau global
+        async with semaphore, self._global:
+            if stop_when is not None and stop_when():
+                stats['skipped'] += 1
+                return
+            start = time.perf_counter()
+            try:
+                details = await self.fetch(url)
+            except Exception as e:
+                logger.debug(f"⚠️ Crawl {source} {url[:80]}: {e}")
+                details = None
+            elapsed = time.perf_counter() - start
+        stats['fetched'] += 1
+        stats['latency_s'] += elapsed
+        stats['max_latency_s'] = max(stats['max_latency_s'], elapsed)
+        if not details:
+            stats['failed'] += 1
+            return
+        if details.get('cached'):
+            stats['cached'] += 1
+        try:
+            stats['credits'] += int(details.get('credits') or 0)
+        except (TypeError, ValueError):
+            pass
+        try:
+            if handle(url, source, details):
+                stats['accepted'] += 1
+        except Exception as e:
+            logger.debug(f"⚠️ Crawl {source} {url[:80]}: traitement impossible ({e})")
+
+    async def crawl(self, batches: Sequence[Tuple[str, Sequence[str]]],
+                    handle: Callable[[str, str, Dict[str, Any]], bool],
+                    stop_when: Optional[Callable[[], bool]] = None) -> Dict[str, int]:
+        """Récupère tous les liens des lots et appelle `handle(url, source, details)` à chaque page.
+
+        `handle` retourne True si la page est retenue. Les lots sont entrelacés (une URL de chaque
+        source à tour de rôle) pour que toutes les sources avancent même si la collecte s'arrête
+        tôt. Retourne le nombre de pages retenues par source pour cet appel.
+        """
+        before = {name: s['accepted'] for name, s in self._sources.items()}
+        jobs: List[Tuple[str, str]] = []
+        for round_ in zip_longest(*[[(url, source) for url in urls] for source, urls in batches]):
+            for job in round_:
+                if job is not None and job[0] and self._claim(*job):
+                    jobs.append(job)
+        if jobs:
+            await asyncio.gather(*(self._run_one(url, source, handle, stop_when) for url, source in jobs))
+        return {source: self._source(source)['accepted'] - before.get(source, 0) for source, _ in batches}
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Par source: pages récupérées/retenues/en échec, doublons évités, arrêts anticipés, cache, latence, crédits"""
+        result = {}
+        for name, s in self._sources.items():
+            result[name] = {
+                **s,
+                'latency_s': round(s['latency_s'], 3),
+                'max_latency_s': round(s['max_latency_s'], 3),
+                'avg_latency_s': round(s['latency_s'] / s['fetched'], 3) if s['fetched'] else None,
+            }
+        return result
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Cache des embeddings de requêtes OpenAI.
+
+- Clé: modèle + texte normalisé (casse, espaces, ponctuation finale)
+- L1: LRU/TTL en mémoire (`ttl_cache.TTLCache`)
+- L2: SQLite local (même base que la mémoire de conversation), vecteurs en float32
+- Les requêtes manquantes arrivant en même temps sont regroupées en un seul appel
+  `embeddings.create` multi-input
+"""
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_MAX_INPUT_CHARS = 5000
+
+
+def normalize_text(text: str) -> str:
+    """Normalise une requête pour que des formulations triviales partagent le même embedding"""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = _WHITESPACE_RE.sub(" ", text).strip()
+    return text.rstrip(" ?!.;:")[:_MAX_INPUT_CHARS]
+
+
+class SQLiteEmbeddingStore:
+    """Stockage persistant des embeddings (BLOB float32) avec expiration"""
+
+    def __init__(self, db_path: str, ttl: float):
+        self.db_path = db_path
+        self.ttl = ttl
+        self._writes = 0
+        self._ensure_schema()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, check_same_thread=False, timeout=5)
+
+    def _ensure_schema(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.commit()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        if not keys:
+            return {}
+        try:
+            with self._connect() as conn:
+                placeholders = ",".join("?" * len(keys))
+                rows = conn.execute(
+                    f"SELECT cache_key, embedding FROM embedding_cache WHERE cache_key IN ({placeholders}) AND created_at > ?",
+                    (*keys, time.time() - self.ttl),
+                ).fetchall()
+            return {key: np.frombuffer(blob, dtype='<f4').tolist() for key, blob in rows}
+        except Exception as e:
+            logger.debug(f"Lecture cache embeddings impossible: {e}")
+            return {}
+
+    def set_many(self, model: str, entries: Dict[str, List[float]]) -> None:
+        if not entries:
+            return
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embedding_cache(cache_key, model, embedding, created_at) VALUES (?,?,?,?)",
+                    [(key, model, np.asarray(vec, dtype='<f4').tobytes(), now) for key, vec in entries.items()],
+                )
+                self._writes += len(entries)
+                if self._writes >= 500:
+                    conn.execute("DELETE FROM embedding_cache WHERE created_at <= ?", (now - self.ttl,))
+                    self._writes = 0
+                conn.commit()
+        except Exception as e:
+            logger.debug(f"Écriture cache embeddings impossible: {e}")
+
+
+class QueryEmbeddingCache:
+    """Embeddings de requêtes avec cache L1/L2 et regroupement des appels concurrents"""
+
+    def __init__(self, client, db_path: Optional[str] = None, l1: Optional[TTLCache] = None,
+                 ttl: Optional[float] = None, batch_window: Optional[float] = None, max_batch: int = 64):
+        self.client = client
+        self.l1 = l1 or TTLCache(ttl=3600, max_entries=2048, name='embeddings')
+        ttl = ttl if ttl is not None else float(os.getenv("EMBEDDING_CACHE_TTL", str(7 * 24 * 3600)))
+        self.store = SQLiteEmbeddingStore(db_path, ttl) if db_path else None
+        self.batch_window = batch_window if batch_window is not None else float(os.getenv("EMBEDDING_BATCH_WINDOW_S", "0.02"))
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._pending: Dict[str, List[Tuple[str, str, Future]]] = {}  # modèle -> [(clé, texte, future)]
+        self._inflight: Dict[str, Future] = {}
+        self.stats = {'api_calls': 0, 'api_inputs': 0, 'l2_hits': 0}
+
+    @staticmethod
+    def cache_key(model: str, normalized: str) -> str:
+        return hashlib.sha1(f"{model}\x00{normalized}".encode('utf-8')).hexdigest()
+
+    def get(self, text: str, model: str) -> Optional[List[float]]:
+        """Embedding d'un texte (None si indisponible)"""
+        return self.get_many([text], model)[0]
+
+    def get_many(self, texts: Sequence[str], model: str) -> List[Optional[List[float]]]:
+        """Embeddings de plusieurs textes; les absents sont calculés en un seul appel API"""
+        normalized = [normalize_text(t) for t in texts]
+        keys = [self.cache_key(model, n) for n in normalized]
+        results: Dict[str, Optional[List[float]]] = {}
+
+        missing = []
+        for key in dict.fromkeys(keys):
+            value = self.l1.get(key)
+            if value is not None:
+                results[key] = value
+            else:
+                missing.append(key)
+
+        if missing and self.store:
+            stored = self.store.get_many(missing)
+            self.stats['l2_hits'] += len(stored)
+            for key, value in stored.items():
+                self.l1.set(key, value)
+                results[key] = value
+            missing = [k for k in missing if k not in stored]
+
+        if missing:
+            texts_by_key = dict(zip(keys, normalized))
+            futures = {}
+            leader = False
+            for key in missing:
+                futures[key], is_leader = self._enqueue(model, key, texts_by_key[key])
+                leader = leader or is_leader
+            if leader:
+                # Laisser les autres threads rejoindre le lot avant l'appel API
+                if self.batch_window > 0:
+                    time.sleep(self.batch_window)
+                self._flush(model)
+            for key, future in futures.items():
+                try:
+                    results[key] = future.result()
+                except Exception as e:
+                    logger.warning(f"⚠️ Embedding error: {e}")
+                    results[key] = None
+
+        return [results.get(key) for key in keys]
+
+    def _enqueue(self, model: str, key: str, text: str) -> Tuple[Future, bool]:
+        """Ajoute un texte au lot en cours; retourne (future, True si l'appelant ouvre le lot)"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            batch = self._pending.setdefault(model, [])
+            batch.append((key, text, future))
+            return future, len(batch) == 1
+
+    def _flush(self, model: str) -> None:
+        with self._lock:
+            batch = self._pending.pop(model, [])
+        for start in range(0, len(batch), self.max_batch):
+            self._embed_batch(model, batch[start:start + self.max_batch])
+
+    def _embed_batch(self, model: str, batch: List[Tuple[str, str, Future]]) -> None:
+        try:
+            if not self.client:
+                raise RuntimeError("Client OpenAI non configuré")
+            response = self.client.embeddings.create(model=model, input=[text or " " for _, text, _ in batch])
+            self.stats['api_calls'] += 1
+            self.stats['api_inputs'] += len(batch)
+            vectors = [d.embedding for d in sorted(response.data, key=lambda d: getattr(d, 'index', 0))]
+            entries = {}
+            for (key, _, future), vector in zip(batch, vectors):
+                self.l1.set(key, vector)
+                entries[key] = vector
+                future.set_result(vector)
+            if self.store:
+                self.store.set_many(model, entries)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            with self._lock:
+                for key, _, future in batch:
+                    self._inflight.pop(key, None)
+                    if not future.done():
+                        future.set_exception(RuntimeError("Embedding absent de la réponse"))
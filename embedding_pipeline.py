@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Pipeline de (re)génération des embeddings pour `items` et `market_analyses`.
+
+- Pagination par clé (id croissant), colonnes utiles uniquement
+- Texte source haché (modèle + texte): les lignes dont `embedding_hash` n'a pas changé sont ignorées
+- Appels `embeddings.create` multi-input par lots, plusieurs lots en parallèle
+  sous un budget de tokens par minute
+- Écriture groupée (un upsert par lot) de l'embedding et de son hash
+- Point de reprise (dernier id traité par table) sauvegardé après chaque page
+
+Usage:
+    python embedding_pipeline.py --table all [--force] [--batch-size 100] [--workers 4] [--tpm 1000000]
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = os.getenv("EMBEDDINGS_MODEL", "text-embedding-3-small")
+# État local à côté des autres caches (hors de la racine du dépôt, ignoré par git)
+DEFAULT_CHECKPOINT_PATH = os.getenv("EMBEDDING_CHECKPOINT_PATH",
+                                    os.path.join("embedding_cache", "embedding_backfill_checkpoint.json"))
+HASH_COLUMN = 'embedding_hash'
+# ~8k tokens max par entrée pour text-embedding-3-*
+_MAX_TEXT_CHARS = 24000
+
+
+def _as_dict(value: Any) -> Dict[str, Any]:
+    if isinstance(value, dict):
+        return value
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+            if isinstance(parsed, dict):
+                return parsed
+        except Exception:
+            pass
+    return {}
+
+
+def _as_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(x) for x in value if str(x).strip()]
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+            if isinstance(parsed, list):
+                return [str(x) for x in parsed if str(x).strip()]
+        except Exception:
+            pass
+        return [value]
+    return [str(value)]
+
+
+def item_embedding_text(item: Mapping[str, Any]) -> str:
+    """Texte encodé pour un objet de la collection (infos actions incluses)"""
+    name = item.get('name') or ''
+    text_parts = [
+        f"Nom: {name}",
+        f"Catégorie: {item.get('category')}",
+        f"Statut: {item.get('status')}",
+    ]
+
+    # Ajouter le nom en plusieurs variations pour améliorer la recherche
+    text_parts.extend(name.lower().split())
+
+    if item.get('construction_year'):
+        text_parts.append(f"Année: {item['construction_year']}")
+    if item.get('condition'):
+        text_parts.append(f"État: {item['condition']}")
+    if item.get('description'):
+        text_parts.append(f"Description: {item['description']}")
+    if item.get('for_sale'):
+        text_parts.append("En vente actuellement")
+    if item.get('sale_status'):
+        text_parts.append(f"Statut de vente: {item['sale_status']}")
+    if item.get('current_value'):
+        text_parts.append(f"valeur actuelle: {item['current_value']} CHF")
+    if item.get('sold_price'):
+        text_parts.append(f"Prix de vente: {item['sold_price']} CHF")
+
+    if item.get('category') == 'Actions':
+        if item.get('stock_symbol'):
+            text_parts.append(f"Symbole boursier: {item['stock_symbol']}")
+        if item.get('stock_quantity'):
+            text_parts.append(f"Quantité: {item['stock_quantity']} actions")
+        if item.get('stock_exchange'):
+            text_parts.append(f"Bourse: {item['stock_exchange']}")
+        if item.get('current_price'):
+            text_parts.append(f"Prix actuel: {item['current_price']} CHF")
+
+    return ". ".join(text_parts)
+
+
+def analysis_embedding_text(row: Mapping[str, Any]) -> str:
+    """Texte encodé pour une analyse de marché"""
+    parts: List[str] = [str(row.get('analysis_type') or ''), str(row.get('summary') or '')]
+    structured = _as_dict(row.get('structured_data'))
+    for key in ('executive_summary', 'key_points', 'insights', 'risks', 'opportunities'):
+        parts.extend(_as_list(row.get(key) or structured.get(key)))
+    for key in ('deep_analysis', 'market_pulse', 'actionable_summary'):
+        if structured.get(key):
+            parts.append(str(structured[key]))
+    text = " \n".join(p for p in parts if str(p).strip())
+    return text or (row.get('summary') or 'market analysis')
+
+
+def _structured_embedding(row: Mapping[str, Any]) -> Optional[List[float]]:
+    """Embedding déjà calculé par le worker et stocké dans structured_data.embedding_1536"""
+    candidate = _as_dict(row.get('structured_data')).get('embedding_1536')
+    if isinstance(candidate, list) and len(candidate) >= 512:
+        try:
+            return [float(x) for x in candidate]
+        except Exception:
+            return None
+    return None
+
+
+# Configuration par table: colonnes lues, colonnes NOT NULL à renvoyer dans l'upsert, texte, embedding réutilisable
+TABLES: Dict[str, Dict[str, Any]] = {
+    'items': {
+        'columns': ('id', 'name', 'category', 'status', 'construction_year', 'condition', 'description',
+                    'for_sale', 'sale_status', 'current_value', 'sold_price', 'stock_symbol',
+                    'stock_quantity', 'stock_exchange', 'current_price'),
+        'required': ('id', 'name', 'category'),
+        'text': item_embedding_text,
+        'precomputed': None,
+    },
+    'market_analyses': {
+        'columns': ('id', 'analysis_type', 'summary', 'executive_summary', 'key_points', 'insights',
+                    'risks', 'opportunities', 'structured_data'),
+        'required': ('id', 'analysis_type'),
+        'text': analysis_embedding_text,
+        'precomputed': _structured_embedding,
+    },
+}
+
+
+def source_hash(model: str, text: str) -> str:
+    """Empreinte du texte source (et du modèle) d'un embedding"""
+    return hashlib.sha1(f"{model}\x00{text}".encode('utf-8')).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation grossière (~4 caractères par token) suffisante pour le budget"""
+    return len(text) // 4 + 1
+
+
+class TokenBudget:
+    """Budget de tokens par minute partagé entre threads (réservation de créneaux)"""
+
+    def __init__(self, tokens_per_minute: float):
+        self.rate = max(1.0, float(tokens_per_minute)) / 60.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self.waited_s = 0.0
+
+    def acquire(self, tokens: int) -> float:
+        """Bloque jusqu'à ce que `tokens` puissent être consommés; retourne l'attente"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot)
+            self._next_slot = start + tokens / self.rate
+            wait = start - now
+            self.waited_s += wait
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class EmbeddingBackfill:
+    """Génère les embeddings manquants ou obsolètes d'une table Supabase"""
+
+    def __init__(self, supabase_client, openai_client, model: str = DEFAULT_MODEL,
+                 batch_size: Optional[int] = None, max_workers: Optional[int] = None,
+                 tokens_per_minute: Optional[float] = None, page_size: Optional[int] = None,
+                 checkpoint_path: Optional[str] = DEFAULT_CHECKPOINT_PATH, max_retries: int = 3,
+                 progress: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        self.supabase = supabase_client
+        self.client = openai_client
+        self.model = model
+        self.batch_size = max(1, batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", "100")))
+        self.max_workers = max(1, max_workers or int(os.getenv("EMBEDDING_WORKERS", "4")))
+        self.budget = TokenBudget(tokens_per_minute or float(os.getenv("EMBEDDING_TPM", "1000000")))
+        self.page_size = max(self.batch_size, page_size or self.batch_size * self.max_workers * 2)
+        self.checkpoint_path = checkpoint_path
+        self.max_retries = max_retries
+        self.progress = progress
+        self._stats_lock = threading.Lock()
+
+    # --- Point de reprise ---
+
+    def _read_checkpoints(self) -> Dict[str, Any]:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return {}
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Point de reprise illisible ({self.checkpoint_path}): {e}")
+            return {}
+
+    def _write_checkpoint(self, table: str, state: Optional[Dict[str, Any]]) -> None:
+        if not self.checkpoint_path:
+            return
+        checkpoints = self._read_checkpoints()
+        if state is None:
+            checkpoints.pop(table, None)
+        else:
+            checkpoints[table] = state
+        if not checkpoints:
+            if os.path.exists(self.checkpoint_path):
+                os.remove(self.checkpoint_path)
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.checkpoint_path)), exist_ok=True)
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoints, f, indent=2)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    # --- Étapes ---
+
+    def _fetch_page(self, table: str, after_id: int) -> List[Dict[str, Any]]:
+        columns = ",".join(TABLES[table]['columns'] + (HASH_COLUMN,))
+        response = (self.supabase.table(table).select(columns)
+                    .gt('id', after_id).order('id', desc=False).limit(self.page_size).execute())
+        return response.data or []
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        tokens = sum(estimate_tokens(t) for t in texts)
+        for attempt in range(self.max_retries):
+            self.budget.acquire(tokens)
+            try:
+                response = self.client.embeddings.create(model=self.model, input=texts)
+                return [d.embedding for d in sorted(response.data, key=lambda d: getattr(d, 'index', 0))]
+            except Exception as e:
+                if attempt == self.max_retries - 1:
+                    raise
+                delay = 2 ** attempt
+                logger.warning(f"⚠️ Lot d'embeddings en échec ({e}), nouvelle tentative dans {delay}s")
+                time.sleep(delay)
+        return []
+
+    def _process_batch(self, table: str, batch: List[Tuple[Dict[str, Any], str, str, Optional[List[float]]]],
+                       stats: Dict[str, Any]) -> None:
+        required = TABLES[table]['required']
+        to_embed = [(row, text) for row, text, _, vector in batch if vector is None]
+        try:
+            vectors = iter(self._embed([text for _, text in to_embed]) if to_embed else [])
+            payload = []
+            for row, _, digest, vector in batch:
+                record = {col: row.get(col) for col in required}
+                record['embedding'] = vector if vector is not None else next(vectors)
+                record[HASH_COLUMN] = digest
+                payload.append(record)
+            self.supabase.table(table).upsert(payload, on_conflict='id').execute()
+            with self._stats_lock:
+                stats['embedded'] += len(to_embed)
+                stats['reused'] += len(batch) - len(to_embed)
+                stats['api_calls'] += 1 if to_embed else 0
+                stats['write_requests'] += 1
+        except Exception as e:
+            logger.error(f"❌ Lot {table} [{batch[0][0].get('id')}..{batch[-1][0].get('id')}] en échec: {e}")
+            with self._stats_lock:
+                stats['failed'] += len(batch)
+                if len(stats['errors']) < 20:
+                    stats['errors'].append({'ids': [row.get('id') for row, *_ in batch], 'error': str(e)})
+
+    def run(self, table: str, force: bool = False, resume: bool = True) -> Dict[str, Any]:
+        """
+        Traite toute la table. `force` ignore les hash (régénère tout);
+        `resume` repart du dernier id enregistré dans le point de reprise.
+        """
+        if table not in TABLES:
+            raise ValueError(f"Table non supportée: {table}")
+        config = TABLES[table]
+        started = time.time()
+        checkpoint = self._read_checkpoints().get(table) if resume else None
+        if checkpoint and (checkpoint.get('model') != self.model or bool(checkpoint.get('force')) != force):
+            checkpoint = None
+        last_id = int(checkpoint['last_id']) if checkpoint else 0
+        stats: Dict[str, Any] = {
+            'table': table, 'resumed_from': last_id, 'scanned': 0, 'skipped': 0, 'embedded': 0,
+            'reused': 0, 'failed': 0, 'api_calls': 0, 'write_requests': 0, 'errors': []
+        }
+        if last_id:
+            logger.info(f"↩️ Reprise {table} après id={last_id}")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='embed') as pool:
+            while True:
+                rows = self._fetch_page(table, last_id)
+                if not rows:
+                    break
+                pending = []
+                for row in rows:
+                    text = config['text'](row)[:_MAX_TEXT_CHARS]
+                    digest = source_hash(self.model, text)
+                    if not force and row.get(HASH_COLUMN) == digest:
+                        stats['skipped'] += 1
+                        continue
+                    precomputed = config['precomputed'](row) if config['precomputed'] else None
+                    pending.append((row, text, digest, precomputed))
+                stats['scanned'] += len(rows)
+
+                futures = [
+                    pool.submit(self._process_batch, table, pending[i:i + self.batch_size], stats)
+                    for i in range(0, len(pending), self.batch_size)
+                ]
+                for future in as_completed(futures):
+                    future.result()
+
+                last_id = rows[-1]['id']
+                self._write_checkpoint(table, {
+                    'last_id': last_id, 'model': self.model, 'force': force,
+                    'updated_at': datetime.now().isoformat()
+                })
+                if self.progress:
+                    self.progress(table, stats)
+                if len(rows) < self.page_size:
+                    break
+
+        # Table terminée: le prochain passage repart du début; les lignes inchangées seront ignorées
+        # et celles en échec (hash non mis à jour) retraitées
+        self._write_checkpoint(table, None)
+        stats['duration_s'] = round(time.time() - started, 2)
+        stats['budget_wait_s'] = round(self.budget.waited_s, 2)
+        return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Génération groupée des embeddings (items, market_analyses)")
+    parser.add_argument('--table', choices=sorted(TABLES) + ['all'], default='all')
+    parser.add_argument('--force', action='store_true', help="Régénérer même si le texte source est inchangé")
+    parser.add_argument('--no-resume', action='store_true', help="Ignorer le point de reprise")
+    parser.add_argument('--batch-size', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--tpm', type=float, default=None, help="Budget de tokens par minute")
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT_PATH)
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from supabase import create_client
+    from openai import OpenAI
+
+    load_dotenv()
+    missing = [v for v in ("SUPABASE_URL", "SUPABASE_KEY", "OPENAI_API_KEY") if not os.getenv(v)]
+    if missing:
+        print(f"❌ Variables manquantes: {', '.join(missing)}")
+        sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    pipeline = EmbeddingBackfill(
+        create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY")),
+        OpenAI(api_key=os.getenv("OPENAI_API_KEY")),
+        model=args.model,
+        batch_size=args.batch_size,
+        max_workers=args.workers,
+        tokens_per_minute=args.tpm,
+        checkpoint_path=args.checkpoint,
+        progress=lambda table, s: print(
+            f"\r{table}: {s['scanned']} lus | {s['embedded']} encodés | {s['skipped']} inchangés | {s['failed']} erreurs",
+            end='', flush=True
+        ),
+    )
+
+    tables = sorted(TABLES) if args.table == 'all' else [args.table]
+    for table in tables:
+        stats = pipeline.run(table, force=args.force, resume=not args.no_resume)
+        print(f"\n✅ {table}: {json.dumps(stats, ensure_ascii=False)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Cache persistant des pages récupérées par les scrapers (SQLite WAL).
+
+- Clé: URL normalisée (`crawl_scheduler.normalize_url`: hôte en minuscules, sans fragment
+  ni paramètres de suivi)
+- Valeur: texte extrait (ou HTML brut), `published_at`, en-têtes utiles, date de récupération
+- Durée de validité par source (`article` 72 h, `rss` 10 min, ...), surchargeable via
+  FETCH_CACHE_TTL_<SOURCE> (secondes)
+- Flux RSS: au-delà du TTL, l'entrée sert à une revalidation conditionnelle
+  (If-None-Match / If-Modified-Since); un 304 prolonge l'entrée sans retélécharger
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from crawl_scheduler import normalize_url
+
+logger = logging.getLogger(__name__)
+
+HOUR_S = 3600
+
+DEFAULT_TTLS: Dict[str, float] = {
+    'article': 72 * HOUR_S,           # corps d'article ScrapingBee (ne change pas en 72 h)
+    'rss': 10 * 60,                   # flux RSS / Google News, revalidés ensuite par ETag
+    'page': 30 * 60,                  # pages d'accueil / rubriques servant à découvrir des liens
+    'intelligent': 24 * HOUR_S,       # pages lues par IntelligentScraper (Playwright)
+    'immoscout24_results': HOUR_S,    # pages de résultats ImmoScout24
+    'immoscout24_detail': 24 * HOUR_S,
+}
+
+# En-têtes conservés avec l'entrée (revalidation + date de publication)
+_KEPT_HEADERS = ('etag', 'last-modified', 'date', 'content-type', 'spb-cost',
+                 'spb-initial-status-code', 'spb-resolved-url')
+
+
+class FetchCache:
+    """Pages récupérées par URL normalisée, avec TTL par source et validateurs HTTP"""
+
+    def __init__(self, db_path: str, ttls: Optional[Dict[str, float]] = None, enabled: bool = True):
+        self.db_path = db_path
+        self.enabled = enabled
+        self.ttls = dict(DEFAULT_TTLS)
+        self.ttls.update(ttls or {})
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._stats = {'hits': 0, 'misses': 0, 'stale': 0, 'writes': 0, 'revalidated': 0}
+        if enabled:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._ensure_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, check_same_thread=False, timeout=5)
+
+    def _ensure_schema(self) -> None:
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS fetch_cache (
+                    url_key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    published_at TEXT,
+                    published_at_raw TEXT,
+                    headers TEXT,
+                    fetched_at REAL NOT NULL
+                )
+                """
+            )
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def ttl_for(self, source: str) -> float:
+        env = os.getenv(f"FETCH_CACHE_TTL_{source.upper()}")
+        if env:
+            return float(env)
+        return self.ttls.get(source, self.ttls['article'])
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """Entrée brute quel que soit son âge (`age_s` fourni), ou None"""
+        if not self.enabled:
+            return None
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT url, source, text, published_at, published_at_raw, headers, fetched_at "
+                    "FROM fetch_cache WHERE url_key = ?", (normalize_url(url),)
+                ).fetchone()
+        except Exception as e:
+            logger.debug(f"Lecture cache pages impossible ({url}): {e}")
+            return None
+        if row is None:
+            return None
+        cached_url, source, text, published_at, published_at_raw, headers, fetched_at = row
+        try:
+            published = datetime.fromisoformat(published_at) if published_at else None
+        except ValueError:
+            published = None
+        return {
+            'url': cached_url,
+            'source': source,
+            'text': text,
+            'published_at': published,
+            'published_at_raw': published_at_raw,
+            'headers': json.loads(headers) if headers else {},
+            'fetched_at': fetched_at,
+            'age_s': time.time() - fetched_at,
+        }
+
+    def get(self, url: str, source: str = 'article', max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Entrée encore valide pour `source` (ou plus récente que `max_age`), sinon None"""
+        entry = self.lookup(url)
+        if entry is None:
+            self._count('misses')
+            return None
+        limit = self.ttl_for(source) if max_age is None else max_age
+        if entry['age_s'] > limit:
+            self._count('stale')
+            return None
+        self._count('hits')
+        return entry
+
+    def put(self, url: str, text: str, source: str = 'article', published_at: Optional[datetime] = None,
+            published_at_raw: Optional[str] = None, headers: Optional[Dict[str, str]] = None) -> None:
+        """Enregistre une page récupérée (texte non vide uniquement)"""
+        if not self.enabled or not text:
+            return
+        kept = {k.lower(): v for k, v in (headers or {}).items() if k.lower() in _KEPT_HEADERS}
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO fetch_cache(url_key, url, source, text, published_at, published_at_raw, headers, fetched_at) "
+                    "VALUES (?,?,?,?,?,?,?,?)",
+                    (normalize_url(url), url, source, text,
+                     published_at.isoformat() if published_at else None, published_at_raw,
+                     json.dumps(kept) if kept else None, now),
+                )
+                with self._lock:
+                    self._stats['writes'] += 1
+                    self._writes += 1
+                    prune = self._writes >= 500
+                    if prune:
+                        self._writes = 0
+                if prune:
+                    # Entrées plus vieilles que le plus long TTL (surcharges FETCH_CACHE_TTL_* comprises)
+                    longest = max(self.ttl_for(source) for source in self.ttls)
+                    conn.execute("DELETE FROM fetch_cache WHERE fetched_at <= ?", (now - longest,))
+        except Exception as e:
+            logger.debug(f"Écriture cache pages impossible ({url}): {e}")
+
+    def touch(self, url: str) -> None:
+        """Revalidation réussie (304): l'entrée repart pour un TTL complet"""
+        if not self.enabled:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute("UPDATE fetch_cache SET fetched_at = ? WHERE url_key = ?", (time.time(), normalize_url(url)))
+            self._count('revalidated')
+        except Exception as e:
+            logger.debug(f"Revalidation cache pages impossible ({url}): {e}")
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """En-têtes If-None-Match / If-Modified-Since à partir d'une entrée en cache"""
+        headers: Dict[str, str] = {}
+        saved = (entry or {}).get('headers') or {}
+        if saved.get('etag'):
+            headers['If-None-Match'] = saved['etag']
+        if saved.get('last-modified'):
+            headers['If-Modified-Since'] = saved['last-modified']
+        return headers
+
+    def stats(self) -> Dict[str, Any]:
+        """Succès / absences / entrées expirées, écritures et revalidations (304)"""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses'] + stats['stale']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else None
+        if self.enabled:
+            try:
+                with self._connect() as conn:
+                    stats['entries'] = conn.execute("SELECT COUNT(*) FROM fetch_cache").fetchone()[0]
+            except Exception:
+                stats['entries'] = None
+        return stats
+
+
+_cache: Optional[FetchCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_fetch_cache() -> FetchCache:
+    """Cache du process (FETCH_CACHE_DB, désactivable avec FETCH_CACHE_ENABLED=0)"""
+    global _cache
+    if _cache is not None:
+        return _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = FetchCache(
+                os.getenv('FETCH_CACHE_DB', os.path.join('scraper_cache', 'fetch_cache.db')),
+                enabled=os.getenv('FETCH_CACHE_ENABLED', '1') == '1',
+            )
+    return _cache
@@ -3,7 +3,7 @@ from __future__ import annotations
 import os
 import json
 from types import SimpleNamespace
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
 try:
     from openai import OpenAI
@@ -188,6 +188,44 @@ def chat_tools_messages(
     return client.responses.create(**req)
 
 
+def _responses_request(
+    *,
+    model: str,
+    typed_input: List[Dict[str, Any]],
+    max_output_tokens: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Construit la requête Responses API (system -> instructions)."""
+    # Extraire system pour le mettre en instructions (recommandation OpenAI)
+    instructions_text = None
+    input_messages = []
+    for msg in typed_input:
+        if msg.get("role") == "system":
+            # Extraire le texte du system message
+            content = msg.get("content", [])
+            if isinstance(content, list) and content:
+                instructions_text = content[0].get("text", "")
+        else:
+            input_messages.append(msg)
+    
+    req: Dict[str, Any] = {
+        "model": model,
+        "input": input_messages if instructions_text else typed_input
+    }
+    
+    # DÉSACTIVER reasoning temporairement (génère seulement reasoning sans texte)
+    # if reasoning_effort and reasoning_effort != "none":
+    #     req["reasoning"] = {"effort": reasoning_effort}
+    
+    # CRITIQUE: instructions au lieu de system dans input
+    if instructions_text:
+        req["instructions"] = instructions_text
+    
+    # max_output_tokens EN RACINE (version SDK actuelle)
+    if max_output_tokens is not None:
+        req["max_output_tokens"] = max_output_tokens
+    return req
+
+
 # --- New: Responses-only helpers ---
 def from_responses_simple(
     *,
@@ -225,34 +263,7 @@ def from_responses_simple(
         if isinstance(first_msg.get('content'), list) and first_msg['content']:
             logger.info(f"  - First content item: {first_msg['content'][0]}")
     
-    # Extraire system pour le mettre en instructions (recommandation OpenAI)
-    instructions_text = None
-    input_messages = []
-    for msg in typed_input:
-        if msg.get("role") == "system":
-            # Extraire le texte du system message
-            content = msg.get("content", [])
-            if isinstance(content, list) and content:
-                instructions_text = content[0].get("text", "")
-        else:
-            input_messages.append(msg)
-    
-    req: Dict[str, Any] = {
-        "model": model,
-        "input": input_messages if instructions_text else typed_input
-    }
-    
-    # DÉSACTIVER reasoning temporairement (génère seulement reasoning sans texte)
-    # if reasoning_effort and reasoning_effort != "none":
-    #     req["reasoning"] = {"effort": reasoning_effort}
-    
-    # CRITIQUE: instructions au lieu de system dans input
-    if instructions_text:
-        req["instructions"] = instructions_text
-    
-    # max_output_tokens EN RACINE (version SDK actuelle)
-    if max_output_tokens is not None:
-        req["max_output_tokens"] = max_output_tokens
+    req = _responses_request(model=model, typed_input=typed_input, max_output_tokens=max_output_tokens)
     
     # LOG: Requête finale avec valeurs
     logger.info(f"📤 Sending request:")
@@ -286,3 +297,30 @@ def extract_output_text(res: Any) -> str:
     return _extract_output_text_from_response(res)
 
 
+def stream_responses_text(
+    *,
+    client: OpenAI,
+    model: str,
+    messages: List[Dict[str, Any]],
+    max_output_tokens: Optional[int] = None,
+    timeout: Optional[int] = None,
+) -> Iterator[str]:
+    """Stream the Responses API output as text deltas (same request as `from_responses_simple`).
+
+    Yields each `response.output_text.delta` as soon as it arrives; raises on an
+    `error` event so the caller can fall back to a non-streaming call.
+    """
+    req = _responses_request(model=model, typed_input=_to_responses_input(messages), max_output_tokens=max_output_tokens)
+    try:
+        _client = client.with_options(timeout=timeout) if timeout else client
+    except Exception:
+        _client = client
+    with _client.responses.stream(**req) as stream:
+        for event in stream:
+            etype = getattr(event, "type", None)
+            if etype == "response.output_text.delta":
+                delta = getattr(event, "delta", None)
+                if delta:
+                    yield str(delta)
+            elif etype in ("error", "response.failed"):
+                raise RuntimeError(str(getattr(event, "error", None) or getattr(event, "response", "stream error")))
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Extraction HTML en une passe (lxml) pour les scrapers.
+
+Le document est parsé une seule fois; un unique parcours de l'arbre relève le titre, les
+candidats de date de publication (meta, JSON-LD, <time>) et les liens sortants, et marque
+le « boilerplate » (script/style, navigation, bandeaux cookies, partage, pubs...). Après
+suppression de ces éléments, le contenu principal est choisi (<article>, <main>,
+itemprop=articleBody, sinon le bloc le plus dense en paragraphes) puis converti en texte.
+
+Remplace les chaînes de `re.sub` sur le document entier (`_extract_text_from_html`), la
+seconde analyse BeautifulSoup de `_extract_published_time` et l'arbre BeautifulSoup de
+`IntelligentScraper._extract_main_content`.
+"""
+
+import re
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+from lxml import etree, html as lxml_html
+
+logger = logging.getLogger(__name__)
+
+MAX_TEXT_CHARS = 15000
+MIN_MAIN_CHARS = 200
+
+_WS_RE = re.compile(r'\s+')
+_DROP_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'iframe', 'object', 'embed', 'canvas',
+              'nav', 'footer', 'header', 'aside', 'button', 'select', 'dialog'}
+_BOILERPLATE_RE = re.compile(
+    r'(^|[\s_-])(cookie|consent|gdpr|newsletter|subscribe|paywall|share|sharing|social|related|recommend'
+    r'|promo|advert|ads?|sponsor|banner|breadcrumbs?|comments?|sidebar|menu|navbar|footer|masthead|popup|modal)([\s_-]|$)',
+    re.IGNORECASE,
+)
+_JSONLD_DATE_RE = re.compile(r'"datePublished"\s*:\s*"([^"]+)"')
+_MONTHS = {'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+           'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12}
+
+# Ordre de priorité des dates de publication (même ordre que l'ancienne recherche BeautifulSoup)
+_META_DATE_KEYS = ('article:published_time', 'og:published_time', 'og:updated_time', 'datepublished', 'date')
+
+
+@dataclass
+class ExtractedPage:
+    """Résultat d'une passe d'extraction"""
+    text: str = ''
+    title: str = ''
+    published_at: Optional[datetime] = None
+    published_at_raw: Optional[str] = None
+    links: List[str] = field(default_factory=list)
+    method: str = 'empty'  # article | main | density | body | empty
+
+
+def parse_datetime_str(s: str) -> Optional[datetime]:
+    """Date RSS (RFC 2822), ISO 8601 ou motifs courants ('28 Aug 2025', '2025-08-28', '08/28/2025')"""
+    if not s or not isinstance(s, str):
+        return None
+    st = s.strip()
+    if not st:
+        return None
+    # RSS format: "Thu, 28 Aug 2025 15:52:00 GMT"
+    if ',' in st and len(st.split()) >= 6:
+        try:
+            return parsedate_to_datetime(st)
+        except Exception:
+            pass
+    try:
+        return datetime.fromisoformat(st.replace('Z', '+00:00'))
+    except Exception:
+        pass
+    try:
+        return parsedate_to_datetime(st)
+    except Exception:
+        pass
+    try:
+        match = re.search(r'(\d{1,2})\s+(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+(\d{4})', st, re.IGNORECASE)
+        if match:
+            day, month, year = match.groups()
+            return datetime(int(year), _MONTHS[month.lower()], int(day))
+        match = re.search(r'(\d{4})-(\d{1,2})-(\d{1,2})', st)
+        if match:
+            year, month, day = match.groups()
+            return datetime(int(year), int(month), int(day))
+        match = re.search(r'(\d{1,2})/(\d{1,2})/(\d{4})', st)
+        if match:
+            month, day, year = match.groups()
+            return datetime(int(year), int(month), int(day))
+    except Exception:
+        pass
+    return None
+
+
+def _parse(html_content) -> Optional[etree._Element]:
+    if isinstance(html_content, str):
+        # lxml refuse les chaînes unicode portant une déclaration d'encodage XML
+        html_content = html_content.encode('utf-8', errors='replace')
+    try:
+        return lxml_html.fromstring(html_content, parser=lxml_html.HTMLParser(encoding='utf-8', remove_comments=True))
+    except (etree.ParserError, ValueError) as e:
+        logger.debug(f"HTML non analysable: {e}")
+        return None
+
+
+def _text_of(el) -> str:
+    return _WS_RE.sub(' ', ' '.join(el.itertext())).strip()
+
+
+def _is_boilerplate(el) -> bool:
+    marker = f"{el.get('class') or ''} {el.get('id') or ''} {el.get('role') or ''}"
+    if marker.strip() and _BOILERPLATE_RE.search(marker):
+        return True
+    return el.get('aria-hidden') == 'true' or el.get('hidden') is not None
+
+
+def _densest_block(root) -> Tuple[Optional[etree._Element], int]:
+    """Bloc dont les paragraphes portent le plus de texte (parent + grand-parent, à la Readability)"""
+    scores: Dict[etree._Element, float] = {}
+    for p in root.iter('p', 'pre', 'blockquote', 'li'):
+        length = len(_text_of(p))
+        if length < 25:
+            continue
+        parent = p.getparent()
+        if parent is None:
+            continue
+        scores[parent] = scores.get(parent, 0) + length
+        grand = parent.getparent()
+        if grand is not None:
+            scores[grand] = scores.get(grand, 0) + length / 2
+    if not scores:
+        return None, 0
+    best = max(scores, key=scores.get)
+    return best, int(scores[best])
+
+
+def extract_page(html_content, base_url: Optional[str] = None, headers: Optional[Dict[str, str]] = None,
+                 max_chars: int = MAX_TEXT_CHARS) -> ExtractedPage:
+    """Texte principal, titre, date de publication et liens sortants d'une page, en une seule analyse"""
+    page = ExtractedPage()
+    root = _parse(html_content) if html_content else None
+    if root is not None:
+        dates: Dict[str, str] = {}
+        time_values: List[str] = []
+        og_title = ''
+        seen_links = set()
+        to_drop = []
+
+        for el in root.iter():
+            tag = el.tag if isinstance(el.tag, str) else ''
+            if tag == 'meta':
+                key = (el.get('property') or el.get('name') or el.get('itemprop') or '').lower()
+                content = el.get('content')
+                if content:
+                    if key in _META_DATE_KEYS:
+                        dates.setdefault(key, content)
+                    elif key == 'og:title':
+                        og_title = content
+            elif tag == 'title' and not page.title:
+                page.title = _text_of(el)
+            elif tag == 'time' and el.get('datetime'):
+                time_values.append(el.get('datetime'))
+            elif tag == 'a':
+                href = (el.get('href') or '').strip()
+                if href and not href.startswith(('#', 'javascript:', 'mailto:', 'tel:')):
+                    href = urljoin(base_url, href) if base_url else href
+                    if href not in seen_links:
+                        seen_links.add(href)
+                        page.links.append(href)
+            if tag == 'script' and (el.get('type') or '').lower() == 'application/ld+json':
+                match = _JSONLD_DATE_RE.search(el.text or '')
+                if match:
+                    dates.setdefault('jsonld', match.group(1))
+            if tag in _DROP_TAGS:
+                # L'en-tête d'un article (titre, chapeau) fait partie du contenu
+                if tag != 'header' or not any(a.tag == 'article' for a in el.iterancestors()):
+                    to_drop.append(el)
+            elif tag not in ('html', 'body', 'article', 'main') and _is_boilerplate(el):
+                # Classe ambiguë sur un conteneur riche (ex: "sidebar-layout" autour de l'article): conservé
+                if len(el.findall('.//p')) < 5:
+                    to_drop.append(el)
+
+        page.title = page.title or og_title
+        for key in (*_META_DATE_KEYS[:4], 'jsonld', 'date'):
+            candidates = [dates[key]] if key in dates else []
+            if key == 'date':
+                candidates += time_values
+            for raw in candidates:
+                parsed = parse_datetime_str(raw)
+                if parsed:
+                    page.published_at, page.published_at_raw = parsed, raw
+                    break
+            if page.published_at:
+                break
+
+        for el in to_drop:
+            # drop_tree conserve le texte qui suit l'élément (tail)
+            if el.getparent() is not None:
+                el.drop_tree()
+
+        body = root.find('body')
+        body = body if body is not None else root
+        candidates = [('article', max(root.iter('article'), key=lambda e: len(_text_of(e)), default=None)),
+                      ('main', next(root.iter('main'), None)),
+                      ('article', next(iter(root.xpath('//*[@itemprop="articleBody"]')), None))]
+        densest, _ = _densest_block(body)
+        candidates.append(('density', densest))
+        for method, el in candidates:
+            if el is None:
+                continue
+            text = _text_of(el)
+            if len(text) >= MIN_MAIN_CHARS:
+                page.text, page.method = text, method
+                break
+        if not page.text:
+            page.text = _text_of(body)
+            page.method = 'body' if page.text else 'empty'
+        page.text = page.text[:max_chars]
+
+    if page.published_at is None and headers:
+        # En-têtes HTTP en dernier recours
+        for key in ('last-modified', 'date'):
+            value = headers.get(key) or headers.get(key.title())
+            parsed = parse_datetime_str(value) if value else None
+            if parsed:
+                page.published_at, page.published_at_raw = parsed, value
+                break
+    return page
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Session aiohttp partagée pour les scrapers (keep-alive, cache DNS, limites de connexions).
+
+Une `aiohttp.ClientSession` par boucle asyncio (une session ne peut pas changer de boucle):
+les requêtes successives vers app.scrapingbee.com réutilisent les connexions TCP/TLS ouvertes
+au lieu d'un nouveau handshake par page. `session()` s'utilise comme `aiohttp.ClientSession`
+(`async with pool.session(headers=...) as session: session.get(...)`) mais ne ferme rien en
+sortie; la fermeture se fait dans `close()` / `close_nowait()` (cleanup du scraper).
+"""
+
+import os
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class _SessionView:
+    """Vue sur la session partagée avec en-têtes et timeout par défaut (comme ClientSession(headers=, timeout=))"""
+
+    def __init__(self, session: aiohttp.ClientSession, headers: Optional[Dict[str, str]] = None,
+                 timeout: Optional[aiohttp.ClientTimeout] = None):
+        self._session = session
+        self._headers = headers or {}
+        self._timeout = timeout
+
+    def request(self, method: str, url: str, **kwargs):
+        if self._headers:
+            kwargs['headers'] = {**self._headers, **(kwargs.get('headers') or {})}
+        if self._timeout is not None and kwargs.get('timeout') is None:
+            kwargs['timeout'] = self._timeout
+        return self._session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def head(self, url: str, **kwargs):
+        return self.request('HEAD', url, **kwargs)
+
+
+class HttpSessionPool:
+    """Sessions aiohttp mutualisées (une par boucle) + statistiques de réutilisation des connexions"""
+
+    def __init__(self, name: str = 'http', limit: Optional[int] = None, limit_per_host: Optional[int] = None,
+                 keepalive_timeout: Optional[float] = None, dns_ttl: Optional[int] = None):
+        self.name = name
+        self.limit = int(limit if limit is not None else os.getenv('SCRAPER_HTTP_MAX_CONNECTIONS', '64'))
+        self.limit_per_host = int(limit_per_host if limit_per_host is not None else os.getenv('SCRAPER_HTTP_MAX_PER_HOST', '16'))
+        self.keepalive_timeout = float(keepalive_timeout if keepalive_timeout is not None else os.getenv('SCRAPER_HTTP_KEEPALIVE_S', '30'))
+        self.dns_ttl = int(dns_ttl if dns_ttl is not None else os.getenv('SCRAPER_HTTP_DNS_TTL_S', '300'))
+        self._sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+        self._lock = threading.Lock()
+        self._stats = {'sessions_created': 0, 'requests': 0, 'connections_created': 0,
+                       'connections_reused': 0, 'dns_cache_hits': 0, 'dns_cache_misses': 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        def counter(key):
+            async def _on_event(session, ctx, params):
+                self._count(key)
+            return _on_event
+
+        trace.on_request_start.append(counter('requests'))
+        trace.on_connection_create_end.append(counter('connections_created'))
+        trace.on_connection_reuseconn.append(counter('connections_reused'))
+        trace.on_dns_cache_hit.append(counter('dns_cache_hits'))
+        trace.on_dns_cache_miss.append(counter('dns_cache_misses'))
+        return trace
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Session de la boucle courante (créée au premier appel)"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            # Boucles terminées (asyncio.run successifs): leurs sessions ne sont plus utilisables
+            for old_loop in [l for l in self._sessions if l.is_closed()]:
+                self._sessions.pop(old_loop).detach()
+            session = self._sessions.get(loop)
+            if session is not None and not session.closed:
+                return session
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_ttl,
+                use_dns_cache=True,
+            )
+            session = aiohttp.ClientSession(connector=connector, trace_configs=[self._trace_config()])
+            self._sessions[loop] = session
+            self._stats['sessions_created'] += 1
+        logger.debug(f"🔌 Session HTTP partagée '{self.name}' créée (max {self.limit}, {self.limit_per_host}/hôte)")
+        return session
+
+    @asynccontextmanager
+    async def session(self, headers: Optional[Dict[str, str]] = None, timeout: Optional[aiohttp.ClientTimeout] = None):
+        """Remplace `async with aiohttp.ClientSession(headers=..., timeout=...)` sans fermer la connexion en sortie"""
+        yield _SessionView(await self.get_session(), headers=headers, timeout=timeout)
+
+    async def close(self) -> None:
+        """Ferme la session de la boucle courante (et oublie celles des boucles terminées)"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            session = self._sessions.pop(loop, None)
+        if session is not None and not session.closed:
+            await session.close()
+        self.close_nowait()
+
+    def close_nowait(self) -> None:
+        """Fermeture depuis du code synchrone (cleanup): planifiée sur la boucle propriétaire de chaque session"""
+        with self._lock:
+            sessions = list(self._sessions.items())
+            self._sessions.clear()
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        for loop, session in sessions:
+            if session.closed:
+                continue
+            try:
+                if loop.is_closed():
+                    session.detach()
+                elif loop is current:
+                    loop.create_task(session.close())
+                elif loop.is_running():
+                    asyncio.run_coroutine_threadsafe(session.close(), loop)
+                else:
+                    loop.run_until_complete(session.close())
+            except Exception as e:
+                logger.debug(f"Fermeture session HTTP '{self.name}' impossible: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Requêtes, connexions ouvertes vs réutilisées, cache DNS"""
+        with self._lock:
+            opened = self._stats['connections_created']
+            reused = self._stats['connections_reused']
+            return {
+                **self._stats,
+                'reuse_rate': round(reused / (opened + reused), 3) if opened + reused else None,
+                'open_sessions': sum(1 for s in self._sessions.values() if not s.closed),
+                'limit': self.limit,
+                'limit_per_host': self.limit_per_host,
+            }
@@ -15,6 +15,9 @@ from bs4 import BeautifulSoup
 from openai import OpenAI
 import logging
 
+from fetch_cache import get_fetch_cache
+from html_extract import extract_page
+
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -49,6 +52,7 @@ class IntelligentScraper:
         self.openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
         self.tasks = {}  # Stockage temporaire des tâches
         self._initialized = False
+        self._fetch_cache = get_fetch_cache()
         
     def initialize_sync(self):
         """Initialise le navigateur Playwright de manière synchrone"""
@@ -233,13 +237,18 @@ class IntelligentScraper:
             # Scraping de chaque page
             for i, link in enumerate(links[:num_results]):
                 try:
-                    logger.info(f"📖 Scraping {i+1}/{len(links)}: {link['title']}")
-                    await page.goto(link['url'], timeout=15000, wait_until='domcontentloaded')
-                    content = await page.content()
-                    soup = BeautifulSoup(content, 'html.parser')
-                    
-                    # Extraction intelligente du contenu
-                    text_content = self._extract_main_content(soup)
+                    cached = self._fetch_cache.get(link['url'], 'intelligent')
+                    if cached is not None:
+                        logger.info(f"📖 Cache {i+1}/{len(links)}: {link['title']}")
+                        text_content = cached['text']
+                    else:
+                        logger.info(f"📖 Scraping {i+1}/{len(links)}: {link['title']}")
+                        await page.goto(link['url'], timeout=15000, wait_until='domcontentloaded')
+                        content = await page.content()
+                        
+                        # Extraction intelligente du contenu (une seule analyse lxml)
+                        text_content = extract_page(content, base_url=link['url']).text
+                        self._fetch_cache.put(link['url'], text_content, 'intelligent')
                     
                     scraped_data = ScrapedData(
                         url=link['url'],
@@ -277,33 +286,7 @@ class IntelligentScraper:
     
     def _extract_main_content(self, soup: BeautifulSoup) -> str:
         """Extraction intelligente du contenu principal"""
-        # Suppression des éléments non pertinents
-        for element in soup(['script', 'style', 'nav', 'footer', 'header', 'aside']):
-            element.decompose()
-            
-        # Recherche du contenu principal
-        main_content = (
-            soup.find('main') or 
-            soup.find('article') or 
-            soup.find('div', class_='content') or
-            soup.find('div', class_='main') or
-            soup.find('div', id='content')
-        )
-        
-        if main_content:
-            text = main_content.get_text(separator=' ', strip=True)
-        else:
-            text = soup.get_text(separator=' ', strip=True)
-            
-        # Nettoyage du texte
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
-        cleaned_text = ' '.join(lines)
-        
-        # Suppression des espaces multiples
-        import re
-        cleaned_text = re.sub(r'\s+', ' ', cleaned_text)
-        
-        return cleaned_text
+        return extract_page(str(soup)).text
     
     async def process_with_llm(self, prompt: str, scraped_data: List[ScrapedData]) -> Dict:
         """Traite les données scrapées avec OpenAI"""
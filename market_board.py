@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Tableau de marché (aperçu indices, actions, matières premières, crypto, taux, macro FRED).
+
+- rafraîchissement groupé: un seul `yf.download` multi-tickers pour tout l'univers,
+  séries FRED et indicateurs annexes (RSI, Fear & Greed, dominance BTC) en parallèle
+- dernier aperçu valide conservé dans Redis (partagé web / workers) ou en mémoire, avec la
+  date d'obtention de chaque champ: un champ en échec garde sa dernière valeur connue
+- `snapshot()` répond en millisecondes depuis ce stock; au-delà de `refresh_interval` un
+  rafraîchissement part en arrière-plan, et `max_age` force un rafraîchissement synchrone
+  si l'aperçu est plus ancien (données "live" à la demande)
+- rapports et analyses: `snapshot(max_age=report_max_age())` (MARKET_BOARD_REPORT_MAX_AGE_S,
+  900 s par défaut) pour ne jamais bâtir un rapport sur des cours périmés
+"""
+
+import os
+import copy
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from request_coalescer import RequestCoalescer
+
+logger = logging.getLogger(__name__)
+
+BOARD_KEY = 'inventorysbo:market_board'
+BOARD_LOCK_KEY = 'inventorysbo:market_board:lock'
+
+# (catégorie, libellé affiché, symbole yfinance)
+BOARD_SYMBOLS: List[Tuple[str, str, str]] = [
+    # Actions USA (repères tech)
+    ("stocks", "NVDA", "NVDA"),
+    ("stocks", "MSFT", "MSFT"),
+    ("stocks", "AMD", "AMD"),
+    ("stocks", "AAPL", "AAPL"),
+    # Actions Europe/Suisse (sociétés phares)
+    ("stocks", "Nestlé (CH)", "NESN.SW"),
+    ("stocks", "Novartis (CH)", "NOVN.SW"),
+    ("stocks", "Roche (CH)", "ROG.SW"),
+    ("stocks", "IREN (CH)", "IREN.SW"),
+    ("stocks", "LVMH (FR)", "MC.PA"),
+    ("stocks", "ASML (NL)", "ASML.AS"),
+    # Indices USA
+    ("indices", "S&P 500", "^GSPC"),
+    ("indices", "NASDAQ", "^IXIC"),
+    ("indices", "Dow Jones", "^DJI"),
+    ("indices", "Russell 2000", "^RUT"),
+    # Indices Europe
+    ("indices", "Euro Stoxx 50", "^STOXX50E"),
+    ("indices", "DAX", "^GDAXI"),
+    ("indices", "CAC 40", "^FCHI"),
+    ("indices", "FTSE 100", "^FTSE"),
+    ("indices", "SMI", "^SSMI"),
+    # Indices Asie
+    ("indices", "Nikkei 225", "^N225"),
+    ("indices", "Hang Seng", "^HSI"),
+    ("indices", "Shanghai Composite", "^SSEC"),
+    # Volatilité
+    ("volatility", "VIX", "^VIX"),
+    # Matières premières
+    ("commodities", "WTI", "CL=F"),
+    ("commodities", "Brent", "BZ=F"),
+    ("commodities", "Natural Gas", "NG=F"),
+    ("commodities", "Or (Gold)", "GC=F"),
+    ("commodities", "Silver", "SI=F"),
+    # Crypto
+    ("crypto", "Bitcoin", "BTC-USD"),
+    ("crypto", "Ethereum", "ETH-USD"),
+    # Devises / Indice dollar
+    ("forex", "DXY", "DX=F"),
+]
+
+# Obligations US: rendements FRED (pas de repli yfinance)
+BOND_SERIES = {'US2Y': 'DGS2', 'US5Y': 'DGS5', 'US10Y': 'DGS10'}
+YIELD_SERIES = {'DGS2', 'DGS5', 'DGS10', 'DGS30'}
+
+FRED_BLOCKS: Dict[str, Dict[str, str]] = {
+    'rates_yields': {
+        # US
+        'DFF': "Fed Funds Rate",
+        'DGS2': "2Y Treasury",
+        'DGS10': "10Y Treasury",
+        'DGS30': "30Y Treasury",
+        'T10Y2Y': "Yield Curve 10Y-2Y",
+        'BAMLH0A0HYM2': "High Yield Spread",
+        # Europe
+        'IRLTLT01EZM156N': "ECB 10Y",
+        'IR3TIB01DEM156N': "3M Euribor",
+        # Suisse
+        'IRLTLT01CHM156N': "Swiss 10Y",
+        'IRSTCI01CHM156N': "SARON",
+    },
+    'inflation': {
+        'CPIAUCSL': "US CPI",
+        'CPILFESL': "US Core CPI",
+        'PCEPI': "US PCE",
+        'DPCCRV1Q225SBEA': "US Core PCE",
+        'CP0000EZ19M086NEST': "Eurozone HICP",
+        'CPALTT01CHM659N': "Swiss CPI",
+    },
+    'employment': {
+        'UNRATE': "US Unemployment",
+        'PAYEMS': "US NFP",
+        'CIVPART': "US Participation Rate",
+        'EMVOVERALLEMV': "US Job Openings",
+        'LRHUTTTTEZM156S': "Eurozone Unemployment",
+    },
+    'activity': {
+        'GDP': "US GDP",
+        'GDPC1': "US Real GDP",
+        'MANEMP': "ISM Manufacturing",
+        'NMFBAI': "ISM Services",
+        'RSAFS': "US Retail Sales",
+        'INDPRO': "US Industrial Production",
+        'NAPM': "US PMI Composite",
+    },
+    'liquidity_stress': {
+        'WALCL': "Fed Balance Sheet",
+        'RRPONTSYD': "Reverse Repo",
+        'SOFR': "SOFR Rate",
+        'TEDRATE': "TED Spread",
+        'DCOILWTICO': "WTI Oil",
+        'DEXUSEU': "EUR/USD",
+    }
+}
+
+_SEP = '|'  # séparateur des chemins stockés (les libellés contiennent '/', ex. EUR/USD)
+
+
+def fred_series_format(series_id: str) -> Dict[str, Any]:
+    """Retourne unit, change_unit, scale d'affichage (pour value), et decimals.
+    - unit: suffixe d'unité pour la valeur (ex: '%', 'index', 'bln USD', 'USD/bbl', 'ratio', 'K jobs')
+    - change_unit: unité de variation (ex: 'bp', 'pp', 'pts', 'USD')
+    - scale: facteur à appliquer à la valeur brute pour l'affichage
+    - decimals: nombre de décimales recommandé
+    """
+    percent_series = {
+        'DFF', 'DGS2', 'DGS10', 'DGS30', 'T10Y2Y', 'BAMLH0A0HYM2',
+        'IRLTLT01EZM156N', 'IR3TIB01DEM156N', 'IRLTLT01CHM156N', 'IRSTCI01CHM156N',
+        'UNRATE', 'CIVPART', 'SOFR', 'TEDRATE'
+    }
+    index_series = {
+        'CPIAUCSL', 'CPILFESL', 'PCEPI', 'DPCCRV1Q225SBEA', 'CP0000EZ19M086NEST', 'CPALTT01CHM659N',
+        'INDPRO', 'NAPM', 'NMFBAI'
+    }
+    usd_per_barrel = {'DCOILWTICO'}
+    ratio_series = {'DEXUSEU'}
+    bln_usd_series = {'GDP', 'GDPC1'}  # déjà en milliards
+    mln_to_bln_series = {'WALCL', 'RRPONTSYD', 'RSAFS'}  # millions -> milliards
+    k_jobs_series = {'PAYEMS'}  # milliers de personnes
+
+    if series_id in percent_series:
+        # Valeur en %, variation en points de pourcentage (pp); pour DGS*, change est en bp
+        if series_id in {'DGS2', 'DGS10', 'DGS30'}:
+            return {'unit': '%', 'change_unit': 'bp', 'scale': 1.0, 'decimals': 2}
+        return {'unit': '%', 'change_unit': 'pp', 'scale': 1.0, 'decimals': 2}
+    if series_id in index_series:
+        return {'unit': 'index', 'change_unit': 'pts', 'scale': 1.0, 'decimals': 1}
+    if series_id in usd_per_barrel:
+        return {'unit': 'USD/bbl', 'change_unit': 'USD', 'scale': 1.0, 'decimals': 2}
+    if series_id in ratio_series:
+        return {'unit': 'ratio', 'change_unit': None, 'scale': 1.0, 'decimals': 4}
+    if series_id in bln_usd_series:
+        return {'unit': 'bln USD', 'change_unit': 'bln USD', 'scale': 1.0, 'decimals': 1}
+    if series_id in mln_to_bln_series:
+        return {'unit': 'bln USD', 'change_unit': 'bln USD', 'scale': 1e-3, 'decimals': 1}
+    if series_id in k_jobs_series:
+        return {'unit': 'K jobs', 'change_unit': 'K', 'scale': 1.0, 'decimals': 0}
+    # Défaut
+    return {'unit': None, 'change_unit': None, 'scale': 1.0, 'decimals': 2}
+
+
+def _is_good(value: Any) -> bool:
+    """Valeur exploitable (pas d'erreur, cours/valeur/rendement renseigné)"""
+    if value is None:
+        return False
+    if isinstance(value, dict):
+        if 'error' in value:
+            return False
+        for key in ('price', 'value', 'yield'):
+            if key in value:
+                return value[key] not in (None, 'N/A')
+    return True
+
+
+def _unflatten(flat: Dict[Tuple[str, ...], Any]) -> Dict[str, Any]:
+    data: Dict[str, Any] = {}
+    for path, value in flat.items():
+        node = data
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = value
+    return data
+
+
+def _market_phase(now_utc: datetime) -> str:
+    # Approximation: Marchés US ouverts ~ 13:30-20:00 UTC (selon DST)
+    hour, minute = now_utc.hour, now_utc.minute
+    trading = (hour > 13 or (hour == 13 and minute >= 30)) and (hour < 20)
+    if now_utc.weekday() >= 5:
+        return 'Weekend'
+    return 'Trading' if trading else ('Pre-market' if hour < 13 else 'After-hours')
+
+
+class MarketBoard:
+    """Dernier aperçu de marché valide, rafraîchi en un passage groupé"""
+
+    def __init__(self, manager, redis_client=None, refresh_interval: float = 300.0, workers: int = 8):
+        self.manager = manager
+        self.redis = redis_client
+        self.refresh_interval = float(refresh_interval)
+        self.workers = max(1, int(workers))
+        self._local: Optional[Dict[str, Any]] = None
+        self._flight = RequestCoalescer(name='market_board', max_inflight=1)
+        self._background = threading.Lock()
+        self._stats = {'served': 0, 'refreshes': 0, 'background_refreshes': 0, 'forced_refreshes': 0,
+                       'refresh_errors': 0, 'last_refresh_s': None}
+
+    # --- Stockage du dernier aperçu ---------------------------------------------
+
+    def _load(self) -> Optional[Dict[str, Any]]:
+        if self.redis is not None:
+            try:
+                raw = self.redis.get(BOARD_KEY)
+                if raw:
+                    return json.loads(raw)
+            except Exception as e:
+                logger.debug(f"Tableau de marché Redis illisible: {e}")
+        return self._local
+
+    def _save(self, board: Dict[str, Any]) -> None:
+        self._local = board
+        if self.redis is not None:
+            try:
+                self.redis.set(BOARD_KEY, json.dumps(board, default=str), ex=7 * 24 * 3600)
+            except Exception as e:
+                logger.debug(f"Tableau de marché non écrit dans Redis: {e}")
+
+    # --- Rafraîchissement --------------------------------------------------------
+
+    def _fetch_fred(self, series_id: str) -> Optional[Dict[str, Any]]:
+        if series_id in YIELD_SERIES:
+            return self.manager.fred.get_latest_yield(series_id)
+        return self.manager.fred.get_latest_value(series_id)
+
+    def _collect(self) -> Dict[Tuple[str, ...], Any]:
+        """Un passage: download multi-tickers + FRED + indicateurs annexes, en parallèle"""
+        symbols = [symbol for _, _, symbol in BOARD_SYMBOLS]
+        series = sorted(set(BOND_SERIES.values()) | {sid for block in FRED_BLOCKS.values() for sid in block})
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='market-board') as pool:
+            quotes_future = pool.submit(self.manager.yfinance.get_bulk_quotes, symbols)
+            fred_futures = {sid: pool.submit(self._fetch_fred, sid) for sid in series}
+            extra_futures = {
+                'rsi_spx_14': pool.submit(self.manager._get_yfinance_rsi, '^GSPC', 14),
+                'btc_fear_greed': pool.submit(self.manager._get_crypto_fng),
+                'btc_dominance_pct': pool.submit(self.manager._get_btc_dominance_pct),
+            }
+
+            def result(future, label):
+                try:
+                    return future.result()
+                except Exception as e:
+                    logger.warning(f"⚠️ Tableau de marché: {label} indisponible: {e}")
+                    return None
+
+            quotes = result(quotes_future, 'yfinance download') or {}
+            fred = {sid: result(f, f"FRED {sid}") for sid, f in fred_futures.items()}
+            extras = {name: result(f, name) for name, f in extra_futures.items()}
+
+        fresh: Dict[Tuple[str, ...], Any] = {}
+        for category, name, symbol in BOARD_SYMBOLS:
+            q = quotes.get(symbol)
+            if q and q.get('price') is not None:
+                key = 'value' if category == 'forex' else 'price'
+                fresh[(category, name)] = {key: q.get('price'), "change": q.get('change'),
+                                           "change_percent": q.get('change_percent'), "source": q.get('source')}
+            else:
+                fresh[(category, name)] = {"error": "Data not available"}
+
+        for name, sid in BOND_SERIES.items():
+            fresh[('bonds', name)] = fred.get(sid) or {'yield': 'N/A', 'change_bps': 'N/A', 'source': 'FRED (indisponible)'}
+
+        for block, block_series in FRED_BLOCKS.items():
+            for sid, label in block_series.items():
+                val = fred.get(sid)
+                if not val:
+                    continue
+                fmt = fred_series_format(sid)
+                yield_like = sid in YIELD_SERIES and 'yield' in val
+                fresh[('macros', block, label)] = {
+                    "value": val['yield'] if yield_like else val.get('value'),
+                    "change": val.get('change_bps') if yield_like else val.get('change'),
+                    "unit": fmt.get('unit'),
+                    "change_unit": fmt.get('change_unit'),
+                    "scale": fmt.get('scale'),
+                    "decimals": fmt.get('decimals'),
+                    "source": val.get('source')
+                }
+
+        if extras['rsi_spx_14'] is not None:
+            fresh[('analytics', 'rsi_spx_14')] = round(extras['rsi_spx_14'], 1)
+        fresh[('analytics', 'btc_fear_greed')] = extras['btc_fear_greed']
+        fresh[('analytics', 'btc_dominance_pct')] = extras['btc_dominance_pct']
+        return fresh
+
+    @staticmethod
+    def _derive(flat: Dict[Tuple[str, ...], Any]) -> Dict[Tuple[str, ...], Any]:
+        """Indicateurs calculés sur l'aperçu fusionné (ratio or/argent, pente 2-10 ans, régime VIX)"""
+        derived: Dict[Tuple[str, ...], Any] = {}
+        gold = (flat.get(('commodities', 'Or (Gold)')) or {}).get('price')
+        silver = (flat.get(('commodities', 'Silver')) or {}).get('price')
+        if gold and silver:
+            derived[('analytics', 'gold_silver_ratio')] = round(float(gold) / float(silver), 2)
+        ten_y = (flat.get(('bonds', 'US10Y')) or {}).get('yield')
+        two_y = (flat.get(('bonds', 'US2Y')) or {}).get('yield')
+        if isinstance(ten_y, (int, float)) and isinstance(two_y, (int, float)):
+            derived[('analytics', 'spread_2_10_bps')] = round((float(ten_y) - float(two_y)) * 100.0, 1)
+        vix = (flat.get(('volatility', 'VIX')) or {}).get('price')
+        if isinstance(vix, (int, float)):
+            regime = 'Crisis (>30)'
+            if vix < 15:
+                regime = 'Low (<15)'
+            elif vix < 20:
+                regime = 'Normal (15-20)'
+            elif vix < 30:
+                regime = 'Elevated (20-30)'
+            derived[('analytics', 'vix_regime')] = regime
+        return derived
+
+    def _refresh(self) -> Dict[str, Any]:
+        start = time.time()
+        try:
+            fresh = self._collect()
+        except Exception:
+            self._stats['refresh_errors'] += 1
+            raise
+        previous = self._load() or {}
+        prev_flat = {tuple(k.split(_SEP)): v for k, v in (previous.get('fields') or {}).items()}
+        prev_fresh = previous.get('freshness') or {}
+
+        # Champ en échec: on garde la dernière valeur connue et sa date d'obtention
+        merged: Dict[Tuple[str, ...], Any] = {}
+        freshness: Dict[str, float] = {}
+        for path in set(prev_flat) | set(fresh):
+            key = _SEP.join(path)
+            if _is_good(fresh.get(path)):
+                merged[path], freshness[key] = fresh[path], start
+            elif _is_good(prev_flat.get(path)):
+                merged[path], freshness[key] = prev_flat[path], prev_fresh.get(key, previous.get('refreshed_at'))
+            elif path in fresh:
+                merged[path] = fresh[path]
+        for path, value in self._derive(merged).items():
+            merged[path], freshness[_SEP.join(path)] = value, start
+
+        duration = time.time() - start
+        board = {
+            'fields': {_SEP.join(path): value for path, value in merged.items()},
+            'freshness': freshness,
+            'refreshed_at': start,
+            'duration_s': round(duration, 2),
+        }
+        self._save(board)
+        self._stats['refreshes'] += 1
+        self._stats['last_refresh_s'] = board['duration_s']
+        stale = sum(1 for t in freshness.values() if t is not None and t < start)
+        logger.info(f"✅ Tableau de marché rafraîchi en {duration:.1f}s ({len(merged)} champs, {stale} repris du précédent)")
+        return board
+
+    def refresh(self) -> Dict[str, Any]:
+        """Rafraîchissement synchrone (un seul à la fois dans le process)"""
+        return self._flight.run('refresh', self._refresh)
+
+    def _refresh_in_background(self) -> None:
+        if not self._background.acquire(blocking=False):
+            return
+        if self.redis is not None:
+            try:
+                # Un seul process rafraîchit à la fois (les autres liront le résultat dans Redis)
+                if not self.redis.set(BOARD_LOCK_KEY, '1', nx=True, ex=300):
+                    self._background.release()
+                    return
+            except Exception:
+                pass
+
+        def run():
+            try:
+                self._stats['background_refreshes'] += 1
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"⚠️ Rafraîchissement du tableau de marché échoué: {e}")
+            finally:
+                if self.redis is not None:
+                    try:
+                        self.redis.delete(BOARD_LOCK_KEY)
+                    except Exception:
+                        pass
+                self._background.release()
+
+        threading.Thread(target=run, name='market-board-refresh', daemon=True).start()
+
+    # --- Lecture -----------------------------------------------------------------
+
+    def snapshot(self, max_age: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Aperçu au format historique (stocks, indices, ..., macros, analytics) + as_of, age_s, freshness.
+
+        `max_age` (secondes): si l'aperçu stocké est plus ancien, il est rafraîchi avant de répondre.
+        Sinon réponse immédiate; un aperçu de plus de `refresh_interval` est rafraîchi en arrière-plan.
+        """
+        board = self._load()
+        now = time.time()
+        if board is None or (max_age is not None and now - board['refreshed_at'] > max_age):
+            if board is not None:
+                self._stats['forced_refreshes'] += 1
+            board = self.refresh()
+            now = time.time()
+        elif now - board['refreshed_at'] > self.refresh_interval:
+            self._refresh_in_background()
+        self._stats['served'] += 1
+        return self._render(board, now)
+
+    @staticmethod
+    def _render(board: Dict[str, Any], now: float) -> Dict[str, Any]:
+        flat = {tuple(k.split(_SEP)): v for k, v in board['fields'].items()}
+        snapshot: Dict[str, Any] = {c: {} for c in ("stocks", "indices", "volatility", "commodities",
+                                                    "crypto", "forex", "bonds", "macros", "analytics")}
+        snapshot.update(copy.deepcopy(_unflatten(flat)))
+        snapshot['analytics']['market_phase'] = _market_phase(datetime.now(timezone.utc))
+
+        def iso(ts):
+            return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts else None
+
+        snapshot['as_of'] = iso(board['refreshed_at'])
+        snapshot['age_s'] = round(now - board['refreshed_at'], 1)
+        # Même arborescence que les données: freshness['macros']['inflation']['US CPI'] = date d'obtention
+        snapshot['freshness'] = _unflatten({tuple(key.split(_SEP)): iso(ts) for key, ts in board['freshness'].items()})
+        return snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        board = self._load()
+        return {
+            **self._stats,
+            'age_s': round(time.time() - board['refreshed_at'], 1) if board else None,
+            'fields': len(board['fields']) if board else 0,
+            'refresh_interval_s': self.refresh_interval,
+            'shared': self.redis is not None,
+        }
+
+
+_board: Optional[MarketBoard] = None
+_board_lock = threading.Lock()
+
+
+def report_max_age() -> float:
+    """Âge maximal (s) de l'aperçu utilisé pour un rapport (MARKET_BOARD_REPORT_MAX_AGE_S)"""
+    return float(os.getenv('MARKET_BOARD_REPORT_MAX_AGE_S', '900'))
+
+
+def get_market_board(manager) -> MarketBoard:
+    """Tableau du process (aperçu partagé via Redis si configuré)"""
+    global _board
+    if _board is not None:
+        return _board
+    with _board_lock:
+        if _board is None:
+            redis_client = None
+            try:
+                from shared_cache import get_redis_cache_tier
+                tier = get_redis_cache_tier()
+                redis_client = tier.client if tier is not None else None
+            except Exception:
+                redis_client = None
+            _board = MarketBoard(
+                manager,
+                redis_client=redis_client,
+                refresh_interval=float(os.getenv('MARKET_BOARD_REFRESH_S', '300')),
+                workers=int(os.getenv('MARKET_BOARD_WORKERS', '8')),
+            )
+    return _board
@@ -292,23 +292,15 @@ def generate_optimized_pdf(html_content: str, filename: str, custom_css: Optiona
         Response Flask avec le PDF ou une erreur
     """
     try:
-        from weasyprint import HTML, CSS
-        from weasyprint.text.fonts import FontConfiguration
-        
-        # Configuration des polices
-        font_config = FontConfiguration()
+        from pdf_renderer import get_pdf_renderer
         
         # Utiliser le CSS optimisé par défaut ou le CSS personnalisé
         css_string = custom_css if custom_css else get_optimized_pdf_css()
         
-        # Créer le PDF avec optimisations mémoire
-        html_doc = HTML(string=html_content)
-        css_doc = CSS(string=css_string, font_config=font_config)
-        
-        # Options pour réduire la consommation mémoire
-        pdf = html_doc.write_pdf(
-            stylesheets=[css_doc], 
-            font_config=font_config,
+        # Police et CSS compilées une fois par process; options pour réduire la consommation mémoire
+        pdf = get_pdf_renderer().render(
+            html_content,
+            css_string,
             optimize_images=True,
             jpeg_quality=85
         )
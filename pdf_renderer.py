@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Service de rendu PDF WeasyPrint partagé par le process.
+
+- `FontConfiguration` créée une seule fois et réutilisée par tous les rendus
+- feuilles de style compilées (`CSS(string=...)`) une fois par contenu, gardées en LRU borné
+- pré-chauffage au démarrage du worker Celery (`prewarm_pdf_renderer`): CSS des rapports
+  compilées et un document minimal rendu pour charger polices et Pango
+- temps par phase (analyse HTML, mise en page, écriture) journalisés et agrégés dans `stats()`
+"""
+
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+PHASES = ('parse', 'layout', 'write')
+WARMUP_HTML = '<html><body><h1>BONVIN</h1><p>Pré-chauffage 0123456789 CHF</p><table><tr><td>x</td></tr></table></body></html>'
+
+
+class PdfRenderer:
+    """Rendu HTML → PDF avec police et CSS compilées une fois par process"""
+
+    def __init__(self, html_cls=None, css_cls=None, font_config_factory: Optional[Callable[[], Any]] = None,
+                 max_stylesheets: int = 32):
+        self._html_cls = html_cls
+        self._css_cls = css_cls
+        self._font_config_factory = font_config_factory
+        self._font_config = None
+        self._stylesheets: 'OrderedDict[str, Any]' = OrderedDict()
+        self.max_stylesheets = int(max_stylesheets)
+        # Une FontConfiguration partagée n'est pas prévue pour des rendus concurrents
+        self._lock = threading.RLock()
+        self._stats: Dict[str, Any] = {
+            'renders': 0, 'errors': 0, 'css_compiled': 0, 'css_reused': 0,
+            'font_configs': 0, 'warmed': False, 'warmup_s': None,
+        }
+        self._phase_total = {phase: 0.0 for phase in PHASES}
+        self._last: Dict[str, float] = {}
+
+    def _ensure_engine(self) -> None:
+        if self._html_cls is None or self._css_cls is None:
+            from weasyprint import HTML, CSS
+            self._html_cls = self._html_cls or HTML
+            self._css_cls = self._css_cls or CSS
+        if self._font_config is None:
+            if self._font_config_factory is None:
+                from weasyprint.text.fonts import FontConfiguration
+                self._font_config_factory = FontConfiguration
+            self._font_config = self._font_config_factory()
+            self._stats['font_configs'] += 1
+
+    def stylesheet(self, css_string: str):
+        """Feuille de style compilée pour ce contenu CSS (compilée au premier usage)"""
+        digest = hashlib.sha1(css_string.encode('utf-8')).hexdigest()
+        with self._lock:
+            self._ensure_engine()
+            sheet = self._stylesheets.get(digest)
+            if sheet is not None:
+                self._stylesheets.move_to_end(digest)
+                self._stats['css_reused'] += 1
+                return sheet
+            sheet = self._css_cls(string=css_string, font_config=self._font_config)
+            self._stylesheets[digest] = sheet
+            self._stats['css_compiled'] += 1
+            while len(self._stylesheets) > self.max_stylesheets:
+                self._stylesheets.popitem(last=False)
+            return sheet
+
+    def render(self, html_content: str, css_string: Optional[str] = None,
+               timings: Optional[Dict[str, float]] = None, **options) -> bytes:
+        """HTML → PDF. `options` est transmis à WeasyPrint (optimize_images, jpeg_quality...);
+        `timings`, si fourni, reçoit la durée de chaque phase en secondes"""
+        with self._lock:
+            stylesheets = [self.stylesheet(css_string)] if css_string else []
+            phases: Dict[str, float] = {}
+            try:
+                start = time.perf_counter()
+                html_doc = self._html_cls(string=html_content)
+                phases['parse'] = time.perf_counter() - start
+
+                start = time.perf_counter()
+                document = html_doc.render(stylesheets=stylesheets, font_config=self._font_config, **options)
+                phases['layout'] = time.perf_counter() - start
+
+                start = time.perf_counter()
+                pdf = document.write_pdf(**options)
+                phases['write'] = time.perf_counter() - start
+            except Exception:
+                self._stats['errors'] += 1
+                raise
+            self._stats['renders'] += 1
+            for phase, seconds in phases.items():
+                self._phase_total[phase] += seconds
+            self._last = phases
+        if timings is not None:
+            timings.update(phases)
+        logger.info(
+            f"🖨️ PDF rendu ({len(pdf)} octets): analyse {phases['parse']:.2f}s, "
+            f"mise en page {phases['layout']:.2f}s, écriture {phases['write']:.2f}s"
+        )
+        return pdf
+
+    def warm(self, css_strings: Iterable[str] = ()) -> float:
+        """Compile les CSS données et rend un document minimal (polices chargées avant la 1re requête)"""
+        start = time.perf_counter()
+        css_list = [css for css in dict.fromkeys(css_strings) if css]
+        for css in css_list:
+            self.stylesheet(css)
+        with self._lock:
+            self._ensure_engine()
+            html_doc = self._html_cls(string=WARMUP_HTML)
+            stylesheets = [self.stylesheet(css_list[0])] if css_list else []
+            html_doc.render(stylesheets=stylesheets, font_config=self._font_config).write_pdf()
+            elapsed = time.perf_counter() - start
+            self._stats['warmed'] = True
+            self._stats['warmup_s'] = round(elapsed, 3)
+        logger.info(f"🔥 Rendu PDF pré-chauffé: {len(css_list)} feuilles de style en {elapsed:.2f}s")
+        return elapsed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            renders = self._stats['renders']
+            return {
+                **self._stats,
+                'stylesheets': len(self._stylesheets),
+                'phase_avg_s': {p: round(t / renders, 4) if renders else None for p, t in self._phase_total.items()},
+                'phase_last_s': {p: round(t, 4) for p, t in self._last.items()},
+            }
+
+
+_renderer: Optional[PdfRenderer] = None
+_renderer_lock = threading.Lock()
+
+
+def get_pdf_renderer() -> PdfRenderer:
+    """Service de rendu du process"""
+    global _renderer
+    if _renderer is not None:
+        return _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = PdfRenderer()
+    return _renderer
+
+
+def prewarm_pdf_renderer() -> Optional[float]:
+    """Pré-chauffe le service avec les CSS des rapports (best-effort, ne lève jamais)"""
+    try:
+        from report_pdf import REPORT_CSS
+        from pdf_optimizer import get_optimized_pdf_css
+        css = list(REPORT_CSS.values()) + [get_optimized_pdf_css()]
+        return get_pdf_renderer().warm(css)
+    except Exception as e:
+        logger.warning(f"⚠️ Pré-chauffage du rendu PDF impossible: {e}")
+        return None
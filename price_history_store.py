@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Historique des cours en ajout seul (SQLite WAL) pour StockPriceManager.
+
+- une ligne par (symbole, minute): un même cours relu dans la minute remplace le point
+  au lieu de le dupliquer
+- lecture par plage (`history(symbol, days)` lit uniquement la fenêtre demandée, via la clé
+  primaire (symbol, ts)), avec sous-échantillonnage optionnel (dernier point par intervalle)
+- `downsample()` compacte les points anciens (ex. un par jour au-delà de 7 jours)
+- dernier cours connu par symbole (`quotes`): une ligne mise à jour par rafraîchissement,
+  au lieu de réécrire tout `price_cache.json`
+- import unique des anciens `price_cache.json` / `price_history.json`
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TICK_RESOLUTION_S = 60
+DAY_S = 86400
+
+
+class PriceHistoryStore:
+    """Séries de cours par symbole + dernier cours connu, dans une base SQLite"""
+
+    def __init__(self, db_path: str, resolution: int = TICK_RESOLUTION_S):
+        self.db_path = db_path
+        self.resolution = max(1, int(resolution))
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._ensure_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+
+    def _ensure_schema(self) -> None:
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ticks (
+                    symbol TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    price REAL NOT NULL,
+                    change REAL,
+                    change_percent REAL,
+                    volume INTEGER,
+                    PRIMARY KEY (symbol, ts)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS quotes (
+                    symbol TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+
+    # --- Points de cours ---------------------------------------------------------
+
+    def _bucket(self, ts: float) -> int:
+        return int(ts) // self.resolution * self.resolution
+
+    def append(self, symbol: str, price: float, change: float = 0.0, change_percent: float = 0.0,
+               volume: int = 0, ts: Optional[float] = None) -> None:
+        """Ajoute un point; un point de la même minute est remplacé (pas de doublon)"""
+        self.append_many(symbol, [{'ts': time.time() if ts is None else ts, 'price': price, 'change': change,
+                                   'change_percent': change_percent, 'volume': volume}])
+
+    def append_many(self, symbol: str, points: Iterable[Dict[str, Any]]) -> int:
+        rows = [
+            (symbol, self._bucket(p['ts']), float(p['price']), float(p.get('change') or 0),
+             float(p.get('change_percent') or 0), int(p.get('volume') or 0))
+            for p in points if p.get('price') is not None
+        ]
+        if not rows:
+            return 0
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO ticks(symbol, ts, price, change, change_percent, volume) VALUES(?,?,?,?,?,?)"
+                " ON CONFLICT(symbol, ts) DO UPDATE SET price=excluded.price, change=excluded.change,"
+                " change_percent=excluded.change_percent, volume=excluded.volume",
+                rows,
+            )
+        return len(rows)
+
+    def history(self, symbol: str, days: int = 30, interval: Optional[int] = None,
+                now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Points de la fenêtre [now - days, now] (tout l'historique si days <= 0), du plus ancien
+        au plus récent; `interval` (secondes) ne garde que le dernier point de chaque intervalle"""
+        start = 0 if days <= 0 else int((time.time() if now is None else now) - days * DAY_S)
+        with self._connect() as conn:
+            if interval:
+                # SQLite: avec MAX(), les colonnes nues sont celles de la ligne retenue
+                rows = conn.execute(
+                    "SELECT MAX(ts), price, change, change_percent, volume FROM ticks"
+                    " WHERE symbol=? AND ts>=? GROUP BY ts / ? ORDER BY 1",
+                    (symbol, start, int(interval)),
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT ts, price, change, change_percent, volume FROM ticks"
+                    " WHERE symbol=? AND ts>=? ORDER BY ts",
+                    (symbol, start),
+                ).fetchall()
+        return [self._point(*row) for row in rows]
+
+    @staticmethod
+    def _point(ts: int, price: float, change: float, change_percent: float, volume: int) -> Dict[str, Any]:
+        moment = datetime.fromtimestamp(ts)
+        return {
+            'date': moment.strftime('%Y-%m-%d'),
+            'time': moment.strftime('%H:%M'),
+            'price': price,
+            'change': change,
+            'change_percent': change_percent,
+            'volume': volume,
+        }
+
+    def downsample(self, older_than_days: int = 7, interval: int = DAY_S, now: Optional[float] = None) -> int:
+        """Ne garde que le dernier point par intervalle pour les points plus vieux que le seuil"""
+        cutoff = int((time.time() if now is None else now) - older_than_days * DAY_S)
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM ticks WHERE ts < ? AND (symbol, ts) NOT IN ("
+                " SELECT symbol, MAX(ts) FROM ticks WHERE ts < ? GROUP BY symbol, ts / ?)",
+                (cutoff, cutoff, int(interval)),
+            )
+            removed = cursor.rowcount
+        if removed:
+            logger.info(f"🗜️ Historique des cours compacté: {removed} points supprimés")
+        return removed
+
+    def symbol_count(self) -> int:
+        with self._connect() as conn:
+            return int(conn.execute("SELECT COUNT(DISTINCT symbol) FROM ticks").fetchone()[0])
+
+    # --- Dernier cours connu -----------------------------------------------------
+
+    def put_quote(self, symbol: str, data: Dict[str, Any], fetched_at: Optional[float] = None) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO quotes(symbol, data, fetched_at) VALUES(?,?,?)",
+                (symbol, json.dumps(data, ensure_ascii=False, default=str), time.time() if fetched_at is None else fetched_at),
+            )
+
+    def load_quotes(self) -> Dict[str, Dict[str, Any]]:
+        """{symbole: {'data': ..., 'timestamp': ...}} (format de l'ancien price_cache.json)"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT symbol, data, fetched_at FROM quotes").fetchall()
+        return {symbol: {'data': json.loads(data), 'timestamp': fetched_at} for symbol, data, fetched_at in rows}
+
+    def clear_quotes(self) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM quotes")
+
+    # --- Reprise des anciens fichiers JSON ---------------------------------------
+
+    def import_json(self, cache_file: Optional[str] = None, history_file: Optional[str] = None) -> Dict[str, int]:
+        """Importe une seule fois price_cache.json / price_history.json (fichiers laissés en place)"""
+        with self._connect() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE name='json_imported'").fetchone():
+                return {'quotes': 0, 'points': 0}
+        imported = {'quotes': 0, 'points': 0}
+        try:
+            if cache_file and os.path.exists(cache_file):
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    for symbol, entry in (json.load(f) or {}).items():
+                        self.put_quote(symbol, entry.get('data') or {}, entry.get('timestamp') or 0)
+                        imported['quotes'] += 1
+            if history_file and os.path.exists(history_file):
+                with open(history_file, 'r', encoding='utf-8') as f:
+                    for symbol, points in (json.load(f) or {}).items():
+                        imported['points'] += self.append_many(symbol, (
+                            {**p, 'ts': datetime.strptime(f"{p['date']} {p.get('time') or '00:00'}", '%Y-%m-%d %H:%M').timestamp()}
+                            for p in points if p.get('date')
+                        ))
+        except Exception as e:
+            logger.error(f"Erreur import de l'historique JSON: {e}")
+            return imported
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta(name, value) VALUES('json_imported', ?)", (datetime.now().isoformat(),))
+        if imported['quotes'] or imported['points']:
+            logger.info(f"Historique JSON importé: {imported['quotes']} cours, {imported['points']} points")
+        return imported
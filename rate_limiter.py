@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Limiteur de débit à jetons (token bucket) par fournisseur de données, partagé entre process via Redis.
+
+Algorithme GCRA (équivalent d'un seau de `burst` jetons rechargé à `calls_per_minute`):
+chaque appel réserve atomiquement le prochain créneau (script Lua + horloge Redis `TIME`)
+puis attend hors verrou. Les créneaux étant attribués dans l'ordre d'arrivée, les threads
+et workers en attente sont servis équitablement (FIFO), sans réveil groupé.
+
+Sans Redis (ou en cas d'erreur Redis), le même calcul est fait localement sous verrou:
+le budget reste correct au sein du process.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'inventorysbo:ratelimit:'
+
+# Débit (appels/minute) et rafale autorisée par fournisseur; surchargeables par
+# RATE_LIMIT_<FOURNISSEUR>_PER_MIN et RATE_LIMIT_<FOURNISSEUR>_BURST
+PROVIDER_LIMITS: Dict[str, Dict[str, float]] = {
+    'alpha_vantage': {'calls_per_minute': 5, 'burst': 1},
+    'eodhd': {'calls_per_minute': 10, 'burst': 2},
+    'finnhub': {'calls_per_minute': 60, 'burst': 5},
+    'yahoo': {'calls_per_minute': 90, 'burst': 5},
+    'fred': {'calls_per_minute': 120, 'burst': 10},
+}
+
+# KEYS[1] = TAT (theoretical arrival time); ARGV = intervalle, tolérance, attente max (-1 = illimitée)
+_GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local max_wait = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tat < now then tat = now end
+local wait = tat - tolerance - now
+if wait < 0 then wait = 0 end
+if max_wait >= 0 and wait > max_wait then
+  return {0, tostring(wait)}
+end
+local new_tat = tat + interval
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000) + 1000)
+return {1, tostring(wait)}
+"""
+
+
+class TokenBucket:
+    """Budget d'appels d'un fournisseur: `acquire()` bloque jusqu'au créneau réservé"""
+
+    def __init__(self, provider: str, calls_per_minute: float, burst: int = 1, redis_client=None):
+        if calls_per_minute <= 0:
+            raise ValueError(f"calls_per_minute doit être > 0 ({provider})")
+        self.provider = provider
+        self.calls_per_minute = float(calls_per_minute)
+        self.burst = max(1, int(burst))
+        self.interval = 60.0 / self.calls_per_minute
+        self.tolerance = self.interval * (self.burst - 1)
+        self.redis = redis_client
+        self._script = None
+        self._tat = 0.0
+        self._lock = threading.Lock()
+        self._stats = {'acquired': 0, 'waited': 0, 'rejected': 0, 'total_wait_s': 0.0,
+                       'max_wait_s': 0.0, 'redis_errors': 0}
+
+    def _reserve_local(self, max_wait: Optional[float]) -> Optional[float]:
+        with self._lock:
+            now = time.time()
+            tat = max(self._tat, now)
+            wait = max(0.0, tat - self.tolerance - now)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tat = tat + self.interval
+            return wait
+
+    def _reserve_redis(self, max_wait: Optional[float]) -> Optional[float]:
+        if self._script is None:
+            self._script = self.redis.register_script(_GCRA_SCRIPT)
+        allowed, wait = self._script(
+            keys=[KEY_PREFIX + self.provider],
+            args=[self.interval, self.tolerance, -1 if max_wait is None else max_wait],
+        )
+        return float(wait) if int(allowed) else None
+
+    def _reserve(self, max_wait: Optional[float]) -> Optional[float]:
+        if self.redis is not None:
+            try:
+                return self._reserve_redis(max_wait)
+            except Exception as e:
+                with self._lock:
+                    self._stats['redis_errors'] += 1
+                logger.warning(f"⚠️ Rate limiter '{self.provider}': Redis indisponible, budget local ({e})")
+        return self._reserve_local(max_wait)
+
+    def acquire(self, max_wait: Optional[float] = None) -> Optional[float]:
+        """Réserve un créneau et attend son heure; retourne l'attente (s).
+
+        Si l'attente dépasserait `max_wait`, rien n'est réservé et None est retourné
+        (l'appelant peut servir un cache plutôt que patienter).
+        """
+        wait = self._reserve(max_wait)
+        with self._lock:
+            if wait is None:
+                self._stats['rejected'] += 1
+                return None
+            self._stats['acquired'] += 1
+            if wait > 0:
+                self._stats['waited'] += 1
+                self._stats['total_wait_s'] += wait
+                self._stats['max_wait_s'] = max(self._stats['max_wait_s'], wait)
+        if wait > 0:
+            logger.info(f"⏳ Rate limiting {self.provider}: attente {wait:.2f}s "
+                        f"(max {self.calls_per_minute:g} req/min, rafale {self.burst})")
+            time.sleep(wait)
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        """Appels servis, attentes (nombre, cumul, max), refus et backend utilisé"""
+        with self._lock:
+            acquired = self._stats['acquired']
+            return {
+                **self._stats,
+                'total_wait_s': round(self._stats['total_wait_s'], 3),
+                'max_wait_s': round(self._stats['max_wait_s'], 3),
+                'avg_wait_s': round(self._stats['total_wait_s'] / acquired, 3) if acquired else 0.0,
+                'calls_per_minute': self.calls_per_minute,
+                'burst': self.burst,
+                'backend': 'redis' if self.redis is not None else 'local',
+            }
+
+
+_limiters: Dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def _shared_redis_client():
+    try:
+        from shared_cache import get_redis_cache_tier
+        tier = get_redis_cache_tier()
+        return tier.client if tier is not None else None
+    except Exception:
+        return None
+
+
+def get_rate_limiter(provider: str, calls_per_minute: Optional[float] = None,
+                     burst: Optional[int] = None) -> TokenBucket:
+    """Limiteur du fournisseur (un par process, budget commun via Redis si configuré).
+
+    Priorité: variables d'environnement > arguments > PROVIDER_LIMITS. Le premier appel fixe
+    les paramètres; les appels suivants pour le même fournisseur partagent ce limiteur.
+    """
+    limiter = _limiters.get(provider)
+    if limiter is not None:
+        return limiter
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            defaults = PROVIDER_LIMITS.get(provider, {})
+            env = provider.upper()
+            rate = os.getenv(f'RATE_LIMIT_{env}_PER_MIN') or calls_per_minute or defaults.get('calls_per_minute', 60)
+            size = os.getenv(f'RATE_LIMIT_{env}_BURST') or burst or defaults.get('burst', 1)
+            limiter = TokenBucket(provider, float(rate), int(size), redis_client=_shared_redis_client())
+            _limiters[provider] = limiter
+    return limiter
+
+
+def limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """Statistiques de tous les limiteurs créés dans ce process"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.provider: limiter.stats() for limiter in limiters}
@@ -10,9 +10,11 @@ import logging
 import json
 from typing import List, Dict, Optional
 from scrapingbee import ScrapingBeeClient # Synchrone par défaut, nous allons l'adapter.
-import aiohttp # Pour des appels asynchrones
 from bs4 import BeautifulSoup
 
+from http_session_pool import HttpSessionPool
+from fetch_cache import get_fetch_cache
+
 from real_estate_db import RealEstateListing, get_real_estate_db
 
 logging.basicConfig(level=logging.INFO)
@@ -25,20 +27,36 @@ class ImmoScout24Scraper:
             raise ValueError("La clé API ScrapingBee est requise.")
         self.api_key = api_key
         self.base_url = "https://www.immoscout24.ch/fr/immeuble-habitation/acheter/pays-suisse" # Recherche sur toute la suisse
+        self._http = HttpSessionPool('immoscout24')
+        self._fetch_cache = get_fetch_cache()
+
+    async def cleanup(self):
+        """Ferme la session HTTP partagée"""
+        stats = self._http.stats()
+        await self._http.close()
+        logger.info(f"🧹 ImmoScout24: {stats['requests']} requêtes, {stats['connections_reused']} connexions réutilisées")
 
-    async def _send_scrapingbee_request(self, url: str, params: Dict) -> Optional[str]:
-        """Envoie une requête asynchrone à ScrapingBee."""
+    async def _send_scrapingbee_request(self, url: str, params: Dict, cache_source: Optional[str] = None) -> Optional[str]:
+        """Envoie une requête asynchrone à ScrapingBee (HTML servi depuis le cache si `cache_source` est fourni)."""
         scraping_bee_url = "https://app.scrapingbee.com/api/v1/"
+        if cache_source:
+            cached = self._fetch_cache.get(url, cache_source)
+            if cached is not None:
+                logger.info(f"HTML en cache ({cache_source}): {url}")
+                return cached['text']
         
         # Les paramètres de base sont fusionnés avec les paramètres spécifiques
         base_params = {'api_key': self.api_key, 'url': url}
         final_params = {**base_params, **params}
 
         try:
-            async with aiohttp.ClientSession() as session:
+            async with self._http.session() as session:
                 async with session.get(scraping_bee_url, params=final_params, timeout=180) as response:
                     if response.status == 200:
-                        return await response.text()
+                        html = await response.text()
+                        if cache_source:
+                            self._fetch_cache.put(url, html, cache_source, headers=dict(response.headers))
+                        return html
                     else:
                         response_text = await response.text()
                         logger.error(f"❌ Erreur ScrapingBee: {response.status}")
@@ -62,7 +80,7 @@ class ImmoScout24Scraper:
             'block_resources': 'true',   # On garde le blocage pour la vitesse.
             'wait': '10000',             # On attend 10 secondes, simplement.
         }
-        return await self._send_scrapingbee_request(url, params)
+        return await self._send_scrapingbee_request(url, params, cache_source='immoscout24_results')
 
     def _parse_listing_summary(self, article_soup: BeautifulSoup) -> Optional[Dict]:
         """Extrait les données sommaires d'une annonce depuis la page de résultats."""
@@ -148,7 +166,7 @@ class ImmoScout24Scraper:
         logger.info(f"Extraction par IA pour {url}")
         
         params = {'render_js': 'true', 'wait': '3000'}
-        html_content = await self._send_scrapingbee_request(url, params)
+        html_content = await self._send_scrapingbee_request(url, params, cache_source='immoscout24_detail')
         if not html_content:
             return None
             
@@ -193,7 +211,10 @@ async def run_real_estate_scraper():
         return
     
     scraper = ImmoScout24Scraper(api_key=api_key)
-    await scraper.scrape_and_save_all(max_pages=5)
+    try:
+        await scraper.scrape_and_save_all(max_pages=5)
+    finally:
+        await scraper.cleanup()
     logger.info("Scraping immobilier terminé.")
 
 if __name__ == "__main__":
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Cache des rapports PDF indexé sur la version de l'inventaire.
+
+- `inventory_version`: compteur monotone incrémenté à chaque écriture sur les items
+  (create/update/delete_item, rafraîchissement des cours). Redis (INCR) si configuré, partagé
+  entre web, workers Celery et background worker; sinon compteur SQLite local.
+- alias (type, paramètres, version) → clé de contenu du PDF (`report_store.report_key`):
+  tant que la version ne bouge pas, un téléchargement répété est servi sans relire les items
+  ni rendre le PDF.
+- index des fichiers (taille, dernier accès, hits) pour borner la taille du store
+  (éviction LRU, `REPORT_CACHE_MAX_MB`) et exposer des statistiques. Store partagé entre
+  services (S3) + Redis: index dans Redis (ZSET des derniers accès + HASH des tailles), vu par le
+  web (téléchargements) comme par les workers (rendus) et soumis à une seule limite. Sinon index
+  SQLite à côté des PDF locaux; avec S3 sans Redis, chaque service n'en verrait qu'une partie:
+  l'éviction est alors désactivée.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from report_store import get_report_store, store_is_shared
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'inventorysbo:inventory_version'
+ALIAS_PREFIX = 'inventorysbo:report_alias:'
+INDEX_ACCESS_KEY = 'inventorysbo:report_index:access'  # ZSET clé → dernier accès
+INDEX_SIZE_KEY = 'inventorysbo:report_index:size'      # HASH clé → taille (octets)
+INDEX_HITS_KEY = 'inventorysbo:report_index:hits'      # HASH clé → téléchargements
+
+
+def report_alias(report_type: str, params: Dict[str, Any], version: int) -> str:
+    payload = json.dumps({'type': report_type, 'params': params or {}, 'version': int(version)},
+                         sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ReportCache:
+    """Index LRU borné des PDF stockés + alias par version d'inventaire"""
+
+    def __init__(self, store, index_path: str, max_bytes: int = 512 * 1024 * 1024,
+                 redis_client=None, alias_ttl: int = 7 * 24 * 3600, shared_index: bool = False,
+                 evict: bool = True):
+        """
+        Args:
+            shared_index: index LRU dans Redis (store partagé entre services); ignoré sans `redis_client`
+            evict: False quand aucun index ne voit tout le store (S3 sans Redis)
+        """
+        self.store = store
+        self.index_path = index_path
+        self.max_bytes = int(max_bytes)
+        self.redis = redis_client
+        self.shared_index = bool(shared_index and redis_client is not None)
+        self.evict = evict
+        self.alias_ttl = int(alias_ttl)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stored': 0, 'evictions': 0, 'version_bumps': 0}
+        os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, size INTEGER NOT NULL,"
+                         " created_at REAL NOT NULL, last_access REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_access ON entries(last_access)")
+            conn.execute("CREATE TABLE IF NOT EXISTS aliases (alias TEXT PRIMARY KEY, key TEXT NOT NULL, created_at REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.index_path, check_same_thread=False, timeout=10)
+
+    # --- Version de l'inventaire -------------------------------------------------
+
+    def inventory_version(self) -> int:
+        if self.redis is not None:
+            try:
+                return int(self.redis.get(VERSION_KEY) or 0)
+            except Exception as e:
+                logger.debug(f"Version inventaire Redis illisible: {e}")
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE name='inventory_version'").fetchone()
+        return int(row[0]) if row else 0
+
+    def bump_inventory_version(self, reason: str = '') -> int:
+        self._stats['version_bumps'] += 1
+        if self.redis is not None:
+            try:
+                version = int(self.redis.incr(VERSION_KEY))
+                logger.debug(f"Version inventaire → {version} ({reason})")
+                return version
+            except Exception as e:
+                logger.debug(f"Incrément Redis impossible, repli SQLite: {e}")
+        with self._lock, self._connect() as conn:
+            conn.execute("INSERT INTO meta(name, value) VALUES('inventory_version', 1)"
+                         " ON CONFLICT(name) DO UPDATE SET value = value + 1")
+            version = int(conn.execute("SELECT value FROM meta WHERE name='inventory_version'").fetchone()[0])
+        logger.debug(f"Version inventaire → {version} ({reason})")
+        return version
+
+    # --- Alias (type, paramètres, version) → clé de contenu ----------------------
+
+    def lookup(self, report_type: str, params: Dict[str, Any], version: int) -> Optional[str]:
+        """Clé du PDF déjà rendu pour cette version de l'inventaire, sinon None"""
+        alias = report_alias(report_type, params, version)
+        key = None
+        if self.redis is not None:
+            try:
+                raw = self.redis.get(ALIAS_PREFIX + alias)
+                key = raw.decode() if isinstance(raw, bytes) else raw
+            except Exception:
+                key = None
+        if key is None:
+            with self._connect() as conn:
+                row = conn.execute("SELECT key FROM aliases WHERE alias=?", (alias,)).fetchone()
+            key = row[0] if row else None
+        if key and self.store.exists(key):
+            self._stats['hits'] += 1
+            self.touch(key)
+            return key
+        self._stats['misses'] += 1
+        return None
+
+    def remember(self, report_type: str, params: Dict[str, Any], version: int, key: str) -> None:
+        alias = report_alias(report_type, params, version)
+        if self.redis is not None:
+            try:
+                self.redis.set(ALIAS_PREFIX + alias, key, ex=self.alias_ttl)
+            except Exception:
+                pass
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO aliases(alias, key, created_at) VALUES(?,?,?)", (alias, key, time.time()))
+
+    # --- Index LRU ---------------------------------------------------------------
+
+    def record(self, key: str, size: int) -> None:
+        """Enregistre un PDF ajouté au store puis évince les moins récemment utilisés"""
+        now = time.time()
+        self._stats['stored'] += 1
+        if self.shared_index:
+            try:
+                pipe = self.redis.pipeline()
+                pipe.zadd(INDEX_ACCESS_KEY, {key: now})
+                pipe.hset(INDEX_SIZE_KEY, key, int(size))
+                pipe.execute()
+                if self.evict:
+                    self._evict_shared(keep=key)
+                return
+            except Exception as e:
+                logger.debug(f"Index Redis des rapports indisponible, repli SQLite: {e}")
+        with self._lock, self._connect() as conn:
+            conn.execute("INSERT INTO entries(key, size, created_at, last_access) VALUES(?,?,?,?)"
+                         " ON CONFLICT(key) DO UPDATE SET size=excluded.size, last_access=excluded.last_access",
+                         (key, int(size), now, now))
+            if self.evict:
+                self._evict(conn, keep=key)
+
+    def touch(self, key: str) -> None:
+        now = time.time()
+        if self.shared_index:
+            try:
+                # xx: seulement les PDF déjà indexés (enregistrés par le worker qui les a rendus)
+                if self.redis.zadd(INDEX_ACCESS_KEY, {key: now}, xx=True, ch=True):
+                    self.redis.hincrby(INDEX_HITS_KEY, key, 1)
+                return
+            except Exception as e:
+                logger.debug(f"Index Redis des rapports indisponible, repli SQLite: {e}")
+        with self._connect() as conn:
+            conn.execute("UPDATE entries SET last_access=?, hits=hits+1 WHERE key=?", (now, key))
+
+    def _evict(self, conn: sqlite3.Connection, keep: Optional[str] = None) -> None:
+        total = int(conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0])
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_access ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                self.store.delete(key)
+            except Exception as e:
+                logger.warning(f"Éviction du rapport {key[:12]} impossible: {e}")
+                continue
+            conn.execute("DELETE FROM entries WHERE key=?", (key,))
+            conn.execute("DELETE FROM aliases WHERE key=?", (key,))
+            total -= int(size)
+            self._stats['evictions'] += 1
+
+    def _evict_shared(self, keep: Optional[str] = None) -> None:
+        sizes = {_text(k): int(v) for k, v in (self.redis.hgetall(INDEX_SIZE_KEY) or {}).items()}
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+        for raw in self.redis.zrange(INDEX_ACCESS_KEY, 0, -1):
+            key = _text(raw)
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                self.store.delete(key)
+            except Exception as e:
+                logger.warning(f"Éviction du rapport {key[:12]} impossible: {e}")
+                continue
+            pipe = self.redis.pipeline()
+            pipe.zrem(INDEX_ACCESS_KEY, key)
+            pipe.hdel(INDEX_SIZE_KEY, key)
+            pipe.hdel(INDEX_HITS_KEY, key)
+            pipe.execute()
+            total -= sizes.get(key, 0)
+            self._stats['evictions'] += 1
+
+    def _index_totals(self) -> Tuple[int, int]:
+        if self.shared_index:
+            try:
+                sizes = self.redis.hvals(INDEX_SIZE_KEY) or []
+                return len(sizes), sum(int(v) for v in sizes)
+            except Exception as e:
+                logger.debug(f"Index Redis des rapports illisible: {e}")
+        with self._connect() as conn:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return int(count), int(total)
+
+    def stats(self) -> Dict[str, Any]:
+        count, total = self._index_totals()
+        with self._connect() as conn:
+            aliases = conn.execute("SELECT COUNT(*) FROM aliases").fetchone()[0]
+        lookups = self._stats['hits'] + self._stats['misses']
+        return {
+            **self._stats,
+            'hit_rate': round(self._stats['hits'] / lookups, 3) if lookups else None,
+            'entries': count,
+            'aliases': int(aliases),
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'eviction': self.evict,
+            'inventory_version': self.inventory_version(),
+            'backend': getattr(self.store, 'backend', 'local'),
+            'shared_version': self.redis is not None,
+            'shared_index': self.shared_index,
+        }
+
+
+def _text(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+_cache: Optional[ReportCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_report_cache() -> ReportCache:
+    """Cache du process (index à côté des PDF locaux, version partagée via Redis si configuré)"""
+    global _cache
+    if _cache is not None:
+        return _cache
+    with _cache_lock:
+        if _cache is None:
+            store = get_report_store()
+            index_dir = getattr(store, 'root', None) or os.getenv('REPORT_STORE_DIR', os.path.join(os.getcwd(), 'generated_reports'))
+            redis_client = None
+            try:
+                from shared_cache import get_redis_cache_tier
+                tier = get_redis_cache_tier()
+                redis_client = tier.client if tier is not None else None
+            except Exception:
+                redis_client = None
+            # Store commun à plusieurs services: un seul index LRU (Redis) pour tous
+            shared_index = store_is_shared() and getattr(store, 'backend', 'local') == 's3'
+            evict = not (shared_index and redis_client is None)
+            if not evict:
+                logger.warning("⚠️ Rapports sur S3 sans Redis: éviction LRU désactivée (index non partagé)")
+            _cache = ReportCache(
+                store,
+                index_path=os.path.join(index_dir, 'index.db'),
+                max_bytes=int(float(os.getenv('REPORT_CACHE_MAX_MB', '512')) * 1024 * 1024),
+                redis_client=redis_client,
+                shared_index=shared_index,
+                evict=evict,
+            )
+    return _cache
+
+
+def bump_inventory_version(reason: str = '') -> Optional[int]:
+    """À appeler après toute écriture sur les items (best-effort, ne lève jamais)"""
+    try:
+        return get_report_cache().bump_inventory_version(reason)
+    except Exception as e:
+        logger.warning(f"⚠️ Version inventaire non incrémentée ({reason}): {e}")
+        return None
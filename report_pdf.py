@@ -0,0 +1,602 @@
+#!/usr/bin/env python3
+"""
+Rapports PDF de la collection (portefeuille, classe d'actif, toutes classes, bancaire complet).
+
+Exécuté dans la file Celery `pdf` (`tasks.pdf_task`) plutôt que dans une requête web:
+- données lues en process via `chat_engine.AdvancedDataManager` (cache items partagé)
+- HTML rendu par Jinja2 depuis `templates/` (sans contexte Flask)
+- PDF rendu par WeasyPrint (ou Puppeteer pour le rapport bancaire si demandé)
+- résultat stocké par `report_store` sous le hash des données d'entrée: un rapport
+  identique est resservi sans nouveau rendu
+"""
+
+import os
+import base64
+import logging
+import subprocess
+import tempfile
+import time
+from dataclasses import asdict, is_dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from pdf_renderer import get_pdf_renderer
+from report_cache import get_report_cache
+from report_store import report_key, store_is_shared
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+REPORT_TYPES = ('portfolio', 'asset_class', 'all_asset_classes', 'bank_full')
+
+# Classification bancaire des actifs
+ASSET_CLASSIFICATION = {
+    'Actions': {'bankClass': 'Actions cotées', 'subCategory': 'Titres cotés en bourse (actions)'},
+    'Voitures': {'bankClass': 'Actifs réels', 'subCategory': 'Automobiles (véhicules de collection ou de luxe)'},
+    'Appartements / maison': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Immobilier résidentiel (logements)'},
+    'Be Capital': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Immobilier de rendement (biens générant des revenus locatifs)'},
+    'Bateaux': {'bankClass': 'Actifs réels', 'subCategory': 'Bateaux (yachts, bateaux de plaisance)'},
+    'Avions': {'bankClass': 'Actifs réels', 'subCategory': 'Avions (jets privés, aviation d\'affaires)'},
+    'Start-ups': {'bankClass': 'Private Equity / Venture Capital', 'subCategory': 'Start-ups (jeunes entreprises non cotées)'},
+    'Investis services': {'bankClass': 'Private Equity / Venture Capital', 'subCategory': 'Sociétés de rénovation (services immobiliers)'},
+    'Saanen': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Projet immobilier à Saanen (type d\'actif immobilier non précisé)'},
+    'Dixence Resort': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Immobilier hôtelier (complexe resort touristique)'},
+    'Investis properties': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Immobilier de rendement (portefeuille d\'immeubles locatifs)'},
+    'Mibo': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Actif immobilier (précision non fournie)'},
+    'Portfolio Rhône Hotels': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Immobilier hôtelier (portefeuille d\'hôtels, rendement locatif)'},
+    'Rhône Property – Portfolio IAM': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Immobilier de rendement (portefeuille immobilier)'},
+    'Be Capital Activities': {'bankClass': 'Private Equity / Venture Capital', 'subCategory': 'Sociétés de e-commerce (participations non cotées)'},
+    'IB': {'bankClass': 'Immobilier direct ou indirect', 'subCategory': 'Actif immobilier (précision non fournie)'}
+}
+
+# CSS simplifié pour réduire la consommation mémoire
+SIMPLE_REPORT_CSS = '''
+@page {
+    size: A4;
+    margin: 0.75in;
+}
+body {
+    font-family: Arial, sans-serif;
+    font-size: 11pt;
+    line-height: 1.3;
+    color: #000;
+    margin: 0;
+    padding: 0;
+}
+.header {
+    text-align: center;
+    margin-bottom: 1.5em;
+    border-bottom: 1px solid #000;
+    padding-bottom: 0.5em;
+}
+.section {
+    margin-bottom: 1.5em;
+    page-break-inside: avoid;
+}
+.section-title {
+    font-size: 14pt;
+    font-weight: bold;
+    margin-bottom: 0.5em;
+    color: #000;
+    border-bottom: 1px solid #ccc;
+    padding-bottom: 0.25em;
+}
+.item {
+    margin-bottom: 0.5em;
+    padding: 0.25em;
+    border: 1px solid #ccc;
+}
+.item-name {
+    font-weight: bold;
+    color: #000;
+}
+.item-details {
+    color: #333;
+    font-size: 9pt;
+}
+.price {
+    font-weight: bold;
+    color: #000;
+}
+.status-available { color: #000; }
+.status-for-sale { color: #000; }
+.status-sold { color: #000; }
+table {
+    width: 100%;
+    border-collapse: collapse;
+    margin-bottom: 0.5em;
+    font-size: 9pt;
+}
+th, td {
+    border: 1px solid #ccc;
+    padding: 4px;
+    text-align: left;
+}
+th {
+    background-color: #f0f0f0;
+    font-weight: bold;
+}
+'''
+
+BANK_FULL_CSS = '''
+@page {
+    size: A4 landscape;
+    margin: 14mm;
+    @bottom-center {
+        content: "BONVIN – Rapport Bancaire | " counter(page) " / " counter(pages);
+        font-size: 10px; color: #6b7280;
+    }
+}
+body { font-family: Arial, sans-serif; font-size: 11pt; color: #111827; }
+h1,h2,h3 { color: #111827; }
+.cover { text-align:center; padding: 60px 0; border-bottom:1px solid #e5e7eb; margin-bottom:24px; }
+.kpi-grid { display:grid; grid-template-columns: repeat(auto-fit, minmax(220px,1fr)); gap:12px; margin:16px 0 24px; }
+.kpi { border:1px solid #e5e7eb; border-radius:6px; padding:12px; background:#f9fafb; }
+.kpi .v { font-weight:700; font-size:14pt; }
+table { width:100%; border-collapse:collapse; font-size:10pt; margin:10px 0; }
+th, td { border:1px solid #e5e7eb; padding:6px 8px; }
+th { background:#f3f4f6; font-weight:700; text-transform:uppercase; font-size:9pt; }
+.section { page-break-inside: avoid; margin: 18px 0; }
+.section-title { font-weight:700; font-size:13pt; margin:8px 0; border-bottom:1px solid #e5e7eb; padding-bottom:4px; }
+.sub-title { font-weight:600; font-size:11pt; margin:8px 0; color:#374151; }
+.muted { color:#6b7280; font-size:9pt; }
+'''
+
+
+class ReportError(Exception):
+    """Rapport impossible à produire (status HTTP équivalent pour l'appelant)"""
+
+    def __init__(self, message: str, status: int = 500):
+        super().__init__(message)
+        self.status = status
+
+
+_jinja_env: Optional[Environment] = None
+
+
+def _env() -> Environment:
+    global _jinja_env
+    if _jinja_env is None:
+        _jinja_env = Environment(loader=FileSystemLoader(TEMPLATES_DIR), autoescape=select_autoescape(['html']))
+    return _jinja_env
+
+
+def render_html(template_name: str, **context) -> str:
+    return _env().get_template(template_name).render(**context)
+
+
+def format_price(price) -> str:
+    if not price or price == 0:
+        return '0 CHF'
+    try:
+        return f"{price:,.0f} CHF"
+    except Exception:
+        return '0 CHF'
+
+
+def fmt_money(val, currency: str = 'CHF') -> str:
+    try:
+        if not val:
+            return f"0 {currency}"
+        return f"{float(val):,.0f} {currency}"
+    except Exception:
+        return f"0 {currency}"
+
+
+def _item_value(item) -> float:
+    if item.category == 'Actions' and item.current_price and item.stock_quantity:
+        return item.current_price * item.stock_quantity
+    if item.status == 'Available' and item.current_value:
+        return item.current_value
+    return 0
+
+
+def _asset_data(item, value) -> Dict[str, Any]:
+    return {
+        'name': item.name,
+        'status': item.status,
+        'value': format_price(value),
+        'category': item.category,
+        'current_price': item.current_price,
+        'stock_purchase_price': item.stock_purchase_price,
+        'stock_quantity': item.stock_quantity,
+        'construction_year': item.construction_year,
+        'condition': item.condition
+    }
+
+
+def _fingerprint(value: Any) -> Any:
+    """Données du template réduites à du JSON stable (sans embeddings) pour la clé de contenu"""
+    if is_dataclass(value) and not isinstance(value, type):
+        data = asdict(value)
+        data.pop('embedding', None)
+        return data
+    if isinstance(value, dict):
+        return {str(k): _fingerprint(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_fingerprint(v) for v in value]
+    return value
+
+
+def build_portfolio(items: List[Any], params: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """(template, données) du PDF du portefeuille complet"""
+    total_items = len(items)
+    available_items = len([item for item in items if item.status == 'Available'])
+    categories_count = len(set([item.category for item in items if item.category]))
+
+    total_value = 0
+    for item in items:
+        if item.status == 'Sold':
+            continue
+        total_value += _item_value(item)
+
+    # Organiser les données par catégorie
+    categories_data: Dict[str, List[Any]] = {}
+    actions = []
+    for item in items:
+        if item.category == 'Actions':
+            actions.append(item)
+        else:
+            categories_data.setdefault(item.category, []).append(item)
+
+    template_data = {
+        'total_items': total_items,
+        'total_value': format_price(total_value),
+        'available_items': available_items,
+        'categories_count': categories_count,
+        'actions': actions,
+        'categories': categories_data
+    }
+    return 'portfolio_pdf.html', template_data
+
+
+def _asset_class_data(asset_class_name: str, class_items: List[Any]) -> Dict[str, Any]:
+    assets_by_subcategory: Dict[str, List[Dict[str, Any]]] = {}
+    subcategories_summary: Dict[str, Dict[str, Any]] = {}
+    for item in class_items:
+        subcategory = ASSET_CLASSIFICATION[item.category]['subCategory']
+        if subcategory not in assets_by_subcategory:
+            assets_by_subcategory[subcategory] = []
+            subcategories_summary[subcategory] = {'value': 0, 'count': 0}
+        value = _item_value(item)
+        assets_by_subcategory[subcategory].append(_asset_data(item, value))
+        subcategories_summary[subcategory]['value'] += value
+        subcategories_summary[subcategory]['count'] += 1
+
+    # Formater les valeurs dans le résumé
+    for subcategory in subcategories_summary:
+        subcategories_summary[subcategory]['value'] = format_price(subcategories_summary[subcategory]['value'])
+
+    return {
+        'asset_class_name': asset_class_name,
+        'total_assets': len(class_items),
+        'total_value': format_price(sum(_item_value(item) for item in class_items)),
+        'available_assets': len([item for item in class_items if item.status == 'Available']),
+        'subcategories_count': len(assets_by_subcategory),
+        'assets_by_subcategory': assets_by_subcategory,
+        'subcategories_summary': subcategories_summary
+    }
+
+
+def _items_by_bank_class(items: List[Any]) -> Dict[str, List[Any]]:
+    by_class: Dict[str, List[Any]] = {}
+    for item in items:
+        if item.status == 'Sold':
+            continue
+        classification = ASSET_CLASSIFICATION.get(item.category)
+        if classification:
+            by_class.setdefault(classification['bankClass'], []).append(item)
+    return by_class
+
+
+def build_asset_class(items: List[Any], params: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """Rapport bancaire d'une classe d'actif (params: asset_class_name)"""
+    asset_class_name = str(params.get('asset_class_name') or '')
+    class_items = _items_by_bank_class(items).get(asset_class_name) or []
+    if not class_items:
+        raise ReportError(f"Aucun actif trouvé pour la classe '{asset_class_name}'", status=404)
+    return 'bank_report_pdf.html', _asset_class_data(asset_class_name, class_items)
+
+
+def build_all_asset_classes(items: List[Any], params: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """Une section `bank_report_pdf.html` par classe d'actif, séparées par un saut de page"""
+    sections = [_asset_class_data(name, class_items) for name, class_items in _items_by_bank_class(items).items()]
+    return 'bank_report_pdf.html', {'sections': sections}
+
+
+def build_bank_full(items: List[Any], params: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """Rapport exhaustif (mode bancaire, A4 paysage, toutes classes et objets)"""
+    classes_summary: Dict[str, Dict[str, Any]] = {}
+    assets_by_class: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+    available_count = 0
+    sold_count = 0
+    total_value_available = 0.0
+    total_value_all = 0.0
+
+    for item in items:
+        classification = ASSET_CLASSIFICATION.get(item.category)
+        if not classification:
+            continue
+        bank_class = classification['bankClass']
+        subcategory = classification['subCategory']
+
+        # Valeur (sans conversion FX; devise native pour actions)
+        value = 0.0
+        currency = 'CHF'
+        unit_price = None
+        qty = None
+        if item.category == 'Actions' and item.stock_quantity:
+            qty = item.stock_quantity
+            unit_price = item.current_price or item.stock_purchase_price
+            if unit_price:
+                value = float(unit_price) * float(qty)
+            currency = (item.stock_currency or 'USD') if getattr(item, 'stock_currency', None) else (item.currency if hasattr(item, 'currency') else 'USD')
+        else:
+            value = float(item.current_value or item.sold_price or 0)
+
+        total_value_all += value
+        if item.status == 'Available':
+            available_count += 1
+            total_value_available += value
+        else:
+            sold_count += 1
+
+        assets_by_class.setdefault(bank_class, {}).setdefault(subcategory, []).append({
+            'name': item.name,
+            'status': item.status,
+            'category': item.category,
+            'subcategory': subcategory,
+            'symbol': getattr(item, 'stock_symbol', None),
+            'quantity': qty,
+            'unit_price': unit_price,
+            'currency': currency,
+            'value': value,
+            'acquisition_price': getattr(item, 'acquisition_price', None),
+            'construction_year': getattr(item, 'construction_year', None),
+            'condition': getattr(item, 'condition', None),
+            'last_update': getattr(item, 'last_price_update', None),
+            'pe_ratio': getattr(item, 'stock_pe_ratio', None),
+            'wk52_high': getattr(item, 'stock_52_week_high', None),
+            'wk52_low': getattr(item, 'stock_52_week_low', None),
+            'for_sale': getattr(item, 'for_sale', False),
+            'sale_status': getattr(item, 'sale_status', None),
+            'current_offer': getattr(item, 'current_offer', None)
+        })
+
+        summary = classes_summary.setdefault(bank_class, {
+            'count_all': 0, 'count_available': 0, 'value_all': 0.0, 'value_available': 0.0
+        })
+        summary['count_all'] += 1
+        summary['value_all'] += value
+        if item.status == 'Available':
+            summary['count_available'] += 1
+            summary['value_available'] += value
+
+    template_data = {
+        'total_items': len(items),
+        'available_count': available_count,
+        'sold_count': sold_count,
+        'total_value_available': fmt_money(total_value_available),
+        'total_value_all': fmt_money(total_value_all),
+        'classes_summary': {k: {
+            'count_all': v['count_all'],
+            'count_available': v['count_available'],
+            'value_all': fmt_money(v['value_all']),
+            'value_available': fmt_money(v['value_available'])
+        } for k, v in classes_summary.items()},
+        'assets_by_class': assets_by_class
+    }
+    return 'bank_report_full.html', template_data
+
+
+BUILDERS: Dict[str, Callable[[List[Any], Dict[str, Any]], Tuple[str, Dict[str, Any]]]] = {
+    'portfolio': build_portfolio,
+    'asset_class': build_asset_class,
+    'all_asset_classes': build_all_asset_classes,
+    'bank_full': build_bank_full,
+}
+
+REPORT_CSS = {
+    'portfolio': SIMPLE_REPORT_CSS,
+    'asset_class': SIMPLE_REPORT_CSS,
+    'all_asset_classes': SIMPLE_REPORT_CSS,
+    'bank_full': BANK_FULL_CSS,
+}
+
+# Paramètres qui influencent le rendu (le reste de la requête est ignoré pour la clé)
+RENDER_PARAMS = {
+    'asset_class': ('asset_class_name',),
+    'bank_full': ('engine', 'landscape', 'format', 'margin', 'scale', 'wait_until', 'timeout_ms'),
+}
+
+
+def report_params(report_type: str, params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    params = params or {}
+    return {k: params[k] for k in RENDER_PARAMS.get(report_type, ()) if params.get(k) not in (None, '')}
+
+
+def report_filename(report_type: str, params: Dict[str, Any]) -> str:
+    if report_type == 'asset_class':
+        prefix = f'bonvin_{str(params.get("asset_class_name") or "").replace(" ", "_").lower()}'
+    else:
+        prefix = f'bonvin_{report_type}'
+    return f'{prefix}_{datetime.now().strftime("%Y%m%d_%H%M")}.pdf'
+
+
+def build_report_html(report_type: str, items: List[Any], params: Dict[str, Any],
+                      generation_date: Optional[str] = None) -> Tuple[str, str]:
+    """(HTML, clé de contenu) d'un rapport"""
+    if report_type not in BUILDERS:
+        raise ReportError(f"Type de rapport inconnu: {report_type}", status=400)
+    template, template_data = BUILDERS[report_type](items, params)
+    key = report_key(report_type, params, _fingerprint(template_data))
+    generation_date = generation_date or datetime.now().strftime('%d/%m/%Y à %H:%M')
+
+    if report_type == 'all_asset_classes':
+        html_parts = []
+        for i, section in enumerate(template_data['sections']):
+            if i > 0:
+                html_parts.append('<div class="page-break"></div>')
+            html_parts.append(render_html(template, generation_date=generation_date, **section))
+        html_content = '\n'.join(html_parts)
+    else:
+        html_content = render_html(template, generation_date=generation_date, **template_data)
+    return html_content, key
+
+
+def render_pdf_weasyprint(html_content: str, css_string: str) -> bytes:
+    """Rendu WeasyPrint via le service du process (police + CSS compilées une fois)"""
+    return get_pdf_renderer().render(html_content, css_string)
+
+
+def render_pdf_puppeteer(html_content: str, params: Dict[str, Any]) -> bytes:
+    """Rendu via tools/puppeteer_print.js (Node doit être dans le PATH ou NODE_BIN)"""
+    html_fd, html_path = tempfile.mkstemp(suffix='.html')
+    with os.fdopen(html_fd, 'w', encoding='utf-8') as f:
+        f.write(html_content)
+    pdf_fd, pdf_path = tempfile.mkstemp(suffix='.pdf')
+    os.close(pdf_fd)
+    try:
+        node_cmd = os.getenv('NODE_BIN', 'node')
+        script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tools', 'puppeteer_print.js')
+        landscape = str(params.get('landscape', 'true')).lower() in ['true', '1', 'yes']
+        cmd = [node_cmd, script_path, '--file', html_path, '--out', pdf_path,
+               '--landscape', 'true' if landscape else 'false',
+               '--format', str(params.get('format', 'A4')),
+               '--margin', str(params.get('margin', '14mm')),
+               '--wait-until', str(params.get('wait_until', 'networkidle0'))]
+        if params.get('scale'):
+            cmd.extend(['--scale', str(params['scale'])])
+        if params.get('timeout_ms'):
+            cmd.extend(['--timeout', str(params['timeout_ms'])])
+        completed = subprocess.run(cmd, capture_output=True)
+        if completed.returncode != 0:
+            logger.error(f"Puppeteer error: {completed.stderr.decode('utf-8', errors='ignore')}")
+            raise RuntimeError('Puppeteer PDF generation failed')
+        with open(pdf_path, 'rb') as fpdf:
+            return fpdf.read()
+    finally:
+        for path in (html_path, pdf_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def render_report_pdf(report_type: str, html_content: str, params: Dict[str, Any]) -> bytes:
+    if report_type == 'bank_full' and str(params.get('engine', 'weasyprint')).lower() == 'puppeteer':
+        try:
+            return render_pdf_puppeteer(html_content, params)
+        except Exception as e:
+            logger.error(f"Puppeteer failed, falling back to WeasyPrint: {e}")
+    try:
+        return render_pdf_weasyprint(html_content, REPORT_CSS[report_type])
+    except MemoryError:
+        raise ReportError("Erreur mémoire. Le rapport est trop volumineux. Essayez de filtrer les données.")
+    except ImportError:
+        raise ReportError("WeasyPrint non installé. Installez avec: pip install weasyprint")
+
+
+def download_path(key: str, filename: str) -> str:
+    return f"/api/reports/files/{key}.pdf?name={quote(filename)}"
+
+
+def report_result(report_type: str, key: str, filename: str, store, cached: bool, size: Optional[int] = None) -> Dict[str, Any]:
+    return {
+        'ok': True,
+        'report': report_type,
+        'key': key,
+        'cached': cached,
+        'size': size,
+        'filename': filename,
+        'download_url': store.url(key, filename) or download_path(key, filename),
+    }
+
+
+def generate_report(report_type: str, params: Optional[Dict[str, Any]] = None, items: Optional[List[Any]] = None,
+                    cache=None, renderer: Optional[Callable[[str, str, Dict[str, Any]], bytes]] = None,
+                    progress: Optional[Callable[[str, int], None]] = None,
+                    version: Optional[int] = None, force: bool = False) -> Dict[str, Any]:
+    """Produit (ou retrouve) le PDF d'un rapport et renvoie sa clé et son lien de téléchargement.
+
+    `version`: version de l'inventaire lue par l'appelant; si un rendu existe déjà pour
+    (type, paramètres, version), il est renvoyé sans relire les items (sauf `force`).
+    """
+    progress = progress or (lambda step, pct: None)
+    params = report_params(report_type, params)
+    cache = cache or get_report_cache()
+    store = cache.store
+    renderer = renderer or render_report_pdf
+    filename = report_filename(report_type, params)
+
+    if version is None:
+        version = cache.inventory_version()
+    key = None if force else cache.lookup(report_type, params, version)
+    if key:
+        logger.info(f"♻️ Rapport {report_type} en cache (version {version}) → {key[:12]}")
+        result = report_result(report_type, key, filename, store, cached=True)
+        if not store_is_shared():
+            attach_pdf_payload(result, store, params, version)
+        return result
+
+    progress('fetch_items', 10)
+    if items is None:
+        from chat_engine import AdvancedDataManager  # lazy import (clients Supabase/OpenAI)
+        items = AdvancedDataManager.fetch_all_items()
+
+    progress('render_html', 30)
+    html_content, key = build_report_html(report_type, items, params)
+
+    cached = store.exists(key) and not force
+    size = None
+    start = time.time()
+    if not cached:
+        progress('render_pdf', 50)
+        pdf = renderer(report_type, html_content, params)
+        progress('store', 90)
+        store.put(key, pdf)
+        size = len(pdf)
+        cache.record(key, size)
+        logger.info(f"✅ Rapport {report_type} généré ({size} octets, {time.time() - start:.1f}s) → {key[:12]}")
+    else:
+        cache.touch(key)
+        logger.info(f"♻️ Rapport {report_type} déjà rendu → {key[:12]}")
+    cache.remember(report_type, params, version, key)
+    result = report_result(report_type, key, filename, store, cached=cached, size=size)
+    if not store_is_shared():
+        # Pas de store commun avec le web: le PDF voyage dans le résultat Celery
+        attach_pdf_payload(result, store, params, version)
+    return result
+
+
+def attach_pdf_payload(result: Dict[str, Any], store, params: Dict[str, Any], version: int) -> Dict[str, Any]:
+    """Ajoute le PDF (base64) et de quoi l'indexer au résultat de la tâche (côté worker)"""
+    pdf = store.get(result['key'])
+    if pdf is not None:
+        result.update({'pdf_b64': base64.b64encode(pdf).decode('ascii'), 'params': params, 'version': version,
+                       'size': len(pdf)})
+    return result
+
+
+def ingest_pdf_payload(result: Dict[str, Any], cache=None) -> Dict[str, Any]:
+    """Enregistre dans le store du web le PDF reçu via le résultat Celery et renvoie le résultat
+    sans les octets (idempotent: le même résultat peut être relu à chaque sondage)"""
+    payload = result.get('pdf_b64')
+    if not payload:
+        return result
+    cache = cache or get_report_cache()
+    store = cache.store
+    result = {k: v for k, v in result.items() if k != 'pdf_b64'}
+    key = result['key']
+    if not store.exists(key):
+        pdf = base64.b64decode(payload)
+        store.put(key, pdf)
+        cache.record(key, len(pdf))
+    if result.get('version') is not None:
+        cache.remember(result['report'], result.get('params') or {}, result['version'], key)
+    result['download_url'] = store.url(key, result['filename']) or download_path(key, result['filename'])
+    return result
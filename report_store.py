@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Stockage des rapports PDF générés par la file Celery `pdf`.
+
+Les fichiers sont adressés par le hash des données d'entrée (`<clé>.pdf`): deux demandes
+identiques réutilisent le même rendu. Deux backends:
+- disque local (`REPORT_STORE_DIR`, défaut `./generated_reports`)
+- stockage objet compatible S3 (`REPORT_STORE=s3`, `REPORT_S3_BUCKET`, `REPORT_S3_ENDPOINT_URL`),
+  servi au navigateur via URL pré-signée; une configuration S3 incomplète lève une erreur
+
+Quand le worker `pdf` tourne dans un service séparé sans stockage commun (Render: un disque par
+service, `REPORT_STORE` non défini), `store_is_shared()` est faux: le worker renvoie alors le PDF
+dans le résultat Celery et le web l'enregistre dans son propre store (`report_pdf.ingest_pdf_payload`).
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+from urllib.parse import quote
+
+from werkzeug.utils import secure_filename
+
+try:
+    import boto3  # type: ignore
+except Exception:  # pragma: no cover
+    boto3 = None
+
+logger = logging.getLogger(__name__)
+
+_KEY_RE = re.compile(r"^[0-9a-f]{16,64}$")
+
+
+def report_key(report_type: str, params: Dict[str, Any], data: Any) -> str:
+    """Clé de contenu: sha256 de (type, paramètres, données) en JSON canonique"""
+    payload = json.dumps(
+        {'type': report_type, 'params': params or {}, 'data': data},
+        sort_keys=True,
+        default=str,
+        ensure_ascii=False,
+        separators=(',', ':'),
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def is_valid_key(key: str) -> bool:
+    return bool(key and _KEY_RE.match(key))
+
+
+def content_disposition(filename: Optional[str], default: str = 'rapport.pdf') -> str:
+    """En-tête `attachment` sûr: nom ASCII (secure_filename) + nom UTF-8 encodé (RFC 6266/5987).
+
+    Les noms de rapport viennent des catégories ('Private Equity / Venture Capital', 'Actions
+    cotées'): barres obliques et guillemets sont remplacés, les accents conservés dans filename*.
+    """
+    name = re.sub(r'[\\/"\x00-\x1f]+', '_', (filename or '').strip()) or default
+    ascii_name = secure_filename(name) or default
+    return f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(name, safe='')}"
+
+
+class LocalReportStore:
+    """Rapports PDF sur disque local (écriture atomique via fichier temporaire + rename)"""
+
+    backend = 'local'
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        if not is_valid_key(key):
+            raise ValueError(f"Clé de rapport invalide: {key!r}")
+        return os.path.join(self.root, f"{key}.pdf")
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self.path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, data: bytes) -> None:
+        target = self.path(key)
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, target)
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def url(self, key: str, filename: Optional[str] = None) -> Optional[str]:
+        # Servi par l'app web (/api/reports/files/<clé>.pdf)
+        return None
+
+
+class S3ReportStore:
+    """Rapports PDF dans un bucket compatible S3 (AWS, R2, MinIO...)"""
+
+    backend = 's3'
+
+    def __init__(self, bucket: str, prefix: str = 'reports/', endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, url_ttl: int = 3600, client=None):
+        if client is None:
+            if boto3 is None:
+                raise RuntimeError("boto3 requis pour REPORT_STORE=s3 (pip install boto3)")
+            client = boto3.client('s3', endpoint_url=endpoint_url or None, region_name=region or None)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.url_ttl = url_ttl
+
+    def _object(self, key: str) -> str:
+        if not is_valid_key(key):
+            raise ValueError(f"Clé de rapport invalide: {key!r}")
+        return f"{self.prefix}{key}.pdf"
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object(key))
+            return True
+        except Exception:
+            return False
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            obj = self.client.get_object(Bucket=self.bucket, Key=self._object(key))
+            return obj['Body'].read()
+        except Exception:
+            return None
+
+    def put(self, key: str, data: bytes) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=self._object(key), Body=data, ContentType='application/pdf')
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._object(key))
+
+    def url(self, key: str, filename: Optional[str] = None) -> Optional[str]:
+        params = {'Bucket': self.bucket, 'Key': self._object(key)}
+        if filename:
+            params['ResponseContentDisposition'] = content_disposition(filename)
+        try:
+            return self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=self.url_ttl)
+        except Exception as e:
+            logger.warning(f"URL pré-signée impossible pour {key}: {e}")
+            return None
+
+
+def store_is_shared() -> bool:
+    """Vrai si le web et les workers `pdf` lisent le même store (S3, ou disque local hors Render /
+    volume commun déclaré par REPORT_STORE_SHARED_DISK=1)"""
+    if os.getenv('REPORT_STORE', 'local').lower() == 's3':
+        return True
+    return not os.getenv('RENDER') or os.getenv('REPORT_STORE_SHARED_DISK', '0') == '1'
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_report_store():
+    """Store du process selon REPORT_STORE (local par défaut)"""
+    global _store
+    if _store is not None:
+        return _store
+    with _store_lock:
+        if _store is None:
+            backend = os.getenv('REPORT_STORE', 'local').lower()
+            if backend == 's3':
+                if not os.getenv('REPORT_S3_BUCKET'):
+                    raise RuntimeError("REPORT_STORE=s3 mais REPORT_S3_BUCKET n'est pas défini")
+                _store = S3ReportStore(
+                    bucket=os.getenv('REPORT_S3_BUCKET'),
+                    prefix=os.getenv('REPORT_S3_PREFIX', 'reports/'),
+                    endpoint_url=os.getenv('REPORT_S3_ENDPOINT_URL'),
+                    region=os.getenv('REPORT_S3_REGION'),
+                    url_ttl=int(os.getenv('REPORT_S3_URL_TTL', '3600')),
+                )
+            elif backend == 'local':
+                _store = LocalReportStore(os.getenv('REPORT_STORE_DIR', os.path.join(os.getcwd(), 'generated_reports')))
+                if not store_is_shared():
+                    logger.warning("⚠️ Stockage des rapports non partagé entre web et worker pdf: les PDF "
+                                   "transitent par le backend de résultats Celery (REPORT_STORE=s3 recommandé)")
+            else:
+                raise RuntimeError(f"REPORT_STORE inconnu: {backend!r} (local ou s3)")
+            logger.info(f"📁 Stockage des rapports PDF: {_store.backend}")
+    return _store
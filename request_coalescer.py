@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Regroupement de requêtes concurrentes par clé ("single-flight").
+
+Les appels simultanés pour une même clé partagent un seul appel à la fonction; des clés
+différentes s'exécutent en parallèle. La table ne contient que les appels en cours (elle se
+vide d'elle-même), et les temps d'attente des appelants regroupés sont mesurés.
+"""
+
+import time
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class RequestCoalescer:
+    """Un seul appel en cours par clé; les appelants concurrents attendent son résultat"""
+
+    def __init__(self, name: str = 'coalescer', max_inflight: int = 1024):
+        self.name = name
+        self.max_inflight = max(1, max_inflight)
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._capacity = threading.BoundedSemaphore(self.max_inflight)
+        self._stats = {'calls': 0, 'coalesced': 0, 'errors': 0, 'peak_inflight': 0,
+                       'waits': 0, 'wait_total_s': 0.0, 'wait_max_s': 0.0}
+
+    def _record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self._stats['waits'] += 1
+            self._stats['wait_total_s'] += seconds
+            self._stats['wait_max_s'] = max(self._stats['wait_max_s'], seconds)
+
+    def run(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """
+        Exécute `fn` pour `key`, ou attend l'appel déjà en cours pour cette clé.
+
+        Les exceptions de `fn` sont propagées à tous les appelants regroupés.
+        """
+        with self._lock:
+            flight = self._inflight.get(key)
+            owner = flight is None
+            if owner:
+                flight = Future()
+                self._inflight[key] = flight
+                self._stats['peak_inflight'] = max(self._stats['peak_inflight'], len(self._inflight))
+            else:
+                self._stats['coalesced'] += 1
+
+        if not owner:
+            start = time.monotonic()
+            try:
+                return flight.result(timeout)
+            finally:
+                self._record_wait(time.monotonic() - start)
+
+        try:
+            # Borne le nombre d'appels simultanés (clés distinctes) en cours
+            start = time.monotonic()
+            self._capacity.acquire()
+            waited = time.monotonic() - start
+            if waited > 0.001:
+                self._record_wait(waited)
+            try:
+                value = fn()
+            finally:
+                self._capacity.release()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self._stats['calls'] += 1
+                self._stats['errors'] += 1
+            flight.set_exception(e)
+            raise
+        with self._lock:
+            self._inflight.pop(key, None)
+            self._stats['calls'] += 1
+        flight.set_result(value)
+        return value
+
+    def inflight(self) -> int:
+        with self._lock:
+            return len(self._inflight)
+
+    def stats(self) -> Dict[str, Any]:
+        """Appels, regroupements et temps d'attente (secondes)"""
+        with self._lock:
+            waits = self._stats['waits']
+            return {
+                **self._stats,
+                'wait_total_s': round(self._stats['wait_total_s'], 4),
+                'wait_max_s': round(self._stats['wait_max_s'], 4),
+                'wait_avg_s': round(self._stats['wait_total_s'] / waits, 4) if waits else None,
+                'inflight': len(self._inflight),
+                'max_inflight': self.max_inflight,
+            }
@@ -12,6 +12,11 @@ from datetime import timedelta
 from datetime import timezone
 import math
 
+from http_session_pool import HttpSessionPool
+from crawl_scheduler import CrawlScheduler
+from fetch_cache import get_fetch_cache
+from html_extract import extract_page, parse_datetime_str
+
 # Configuration du logging
 logging.basicConfig(level=logging.DEBUG)  # Changed to DEBUG
 logger = logging.getLogger(__name__)
@@ -104,6 +109,12 @@ class ScrapingBeeScraper:
         self.base_url = "https://app.scrapingbee.com/api/v1"
         self.tasks = {}
         self._initialized = False
+        # Session HTTP partagée: keep-alive vers app.scrapingbee.com au lieu d'un handshake par page
+        self._http = HttpSessionPool('scrapingbee')
+        # Pages et flux déjà récupérés (SQLite): un rapport relancé ne repaie pas les mêmes articles
+        self._fetch_cache = get_fetch_cache()
+        # Latence et crédits par source des dernières collectes (voir crawl_stats)
+        self.last_crawl_stats: Dict[str, Dict] = {}
         
         if not self.api_key:
             logger.warning("⚠️ SCRAPINGBEE_API_KEY non configuré")
@@ -331,32 +342,11 @@ class ScrapingBeeScraper:
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119 Safari/537.36'
             }
             
-            async with aiohttp.ClientSession(headers=headers) as session:
+            async with self._http.session(headers=headers) as session:
                 for f in feeds:
                     try:
-                        # Essai direct avec timeout court
-                        text = None
-                        try:
-                            async with session.get(f, timeout=10) as resp:
-                                if resp.status == 200:
-                                    text = await resp.text()
-                                    logger.info(f"📰 RSS direct réussi: {f} ({len(text)} chars)")
-                        except Exception as e:
-                            logger.debug(f"📰 RSS direct échoué {f}: {e}")
-                        
-                        # Fallback via ScrapingBee proxy (sans JS) si clé API disponible
-                        if not text and self.api_key and self.api_key != 'test_key_for_testing':
-                            try:
-                                async with session.get(self.base_url, params={
-                                    'api_key': self.api_key,
-                                    'url': f,
-                                    'render_js': 'false'
-                                }, timeout=15) as r2:
-                                    if r2.status == 200:
-                                        text = await r2.text()
-                                        logger.info(f"📰 RSS via ScrapingBee: {f}")
-                            except Exception as e:
-                                logger.debug(f"📰 RSS ScrapingBee échoué {f}: {e}")
+                        # Essai direct avec timeout court (revalidation ETag), puis ScrapingBee
+                        text = await self._fetch_feed(session, f, timeout=10)
                         
                         if not text:
                             logger.warning(f"⚠️ Impossible de récupérer RSS: {f}")
@@ -575,12 +565,17 @@ class ScrapingBeeScraper:
         logger.info(f"📰 RSS+state: collected={len(rss_items)} | allow_crawl={allow_crawl}")
         if allow_crawl:
             logger.info(f"📰 Domain crawl activé (RSS insuffisant: {len(rss_items)} < {per_site * 2})")
-            if len([i for i in rss_items if i.metadata.get('source') == 'marketwatch']) < per_site:
-                mw_links = await _gather_domain('www.marketwatch.com', marketwatch_starts, _is_mw_article, per_site * 2)
-            if len([i for i in rss_items if i.metadata.get('source') == 'cnn']) < per_site:
-                cnn_links = await _gather_domain('www.cnn.com', cnn_starts, _is_cnn_article, per_site * 2)
-            if len([i for i in rss_items if i.metadata.get('source') == 'investing']) < per_site:
-                inv_links = await _gather_domain('www.investing.com', investing_starts, _is_investing_article, per_site * 2)
+            async def _gather_if_short(source_name: str, domain: str, starts: List[str], predicate) -> List[str]:
+                if len([i for i in rss_items if i.metadata.get('source') == source_name]) >= per_site:
+                    return []
+                return await _gather_domain(domain, starts, predicate, per_site * 2)
+
+            # Les trois domaines sont explorés en parallèle
+            mw_links, cnn_links, inv_links = await asyncio.gather(
+                _gather_if_short('marketwatch', 'www.marketwatch.com', marketwatch_starts, _is_mw_article),
+                _gather_if_short('cnn', 'www.cnn.com', cnn_starts, _is_cnn_article),
+                _gather_if_short('investing', 'www.investing.com', investing_starts, _is_investing_article),
+            )
         else:
             logger.info("📰 Deep scrape: RSS-only mode (domain crawl disabled)")
 
@@ -640,96 +635,66 @@ class ScrapingBeeScraper:
                     logger.warning(f"⚠️ Erreur scraping direct {site}: {e}")
                     continue
 
-        async def _scrape_links(links: List[str], source_name: str):
-            for url in links[:per_site]:
+        by_url: Dict[str, ScrapedData] = {it.url: it for it in items}
+
+        def _accept_page(url: str, source_name: str, details: Dict) -> bool:
+            text = details.get('text') or ''
+            if not text:
+                return False
+            existing = by_url.get(url)
+            if existing is not None:
+                # Article déjà retenu (résumé RSS): remplacer par le texte complet s'il est plus riche
+                if len(text[:8000]) <= len(existing.content or ''):
+                    return False
+                existing.content = text[:8000]
+                return True
+            published_at = details.get('published_at')
+            # Normalize to aware UTC
+            if published_at and published_at.tzinfo is None:
                 try:
-                    details = await self._scrape_page_with_metadata(url)
-                    if not details or not details.get('text'):
-                        continue
-                    published_at = details.get('published_at')
-                    # Normalize to aware UTC
-                    if published_at and published_at.tzinfo is None:
-                        try:
-                            published_at = published_at.replace(tzinfo=timezone.utc)
-                        except Exception:
-                            pass
-                    if not _is_recent_dt(published_at):
-                        continue
-                    text = details.get('text') or ''
-                    # Filtrer grossièrement sur la requête si précisée
-                    if topic_query and isinstance(topic_query, str):
-                        q = topic_query.lower().strip()
-                        if q and (q not in (text.lower() or '')):
-                            # garder quand même si c'est du market summary générique
-                            pass
-                    if not any(existing.url == url for existing in items):
-                        items.append(
-                            ScrapedData(
-                        url=url,
-                        title=url[:120],
-                        content=text[:8000],
-                        timestamp=published_at or _now_utc(),
-                                metadata={
-                                    'source': source_name,
-                                    'scraped_at': datetime.now().isoformat()
-                                }
-                            )
-                        )
+                    published_at = published_at.replace(tzinfo=timezone.utc)
                 except Exception:
-                    continue
-
-        # Enrichir d'abord à partir des liens RSS (texte complet)
-        await _scrape_links(rss_mw_links, 'marketwatch')
-        await _scrape_links(rss_cnn_links, 'cnn')
-        await _scrape_links(rss_inv_links, 'investing')
-
-        if mw_links:
-            await _scrape_links(mw_links, 'marketwatch')
-        if cnn_links:
-            await _scrape_links(cnn_links, 'cnn')
-        if inv_links:
-            await _scrape_links(inv_links, 'investing')
+                    pass
+            if not _is_recent_dt(published_at):
+                return False
+            item = ScrapedData(
+                url=url,
+                title=url[:120],
+                content=text[:8000],
+                timestamp=published_at or _now_utc(),
+                metadata={
+                    'source': source_name,
+                    'scraped_at': datetime.now().isoformat()
+                }
+            )
+            items.append(item)
+            by_url[url] = item
+            return True
 
         # Assurer un minimum de caractères
         def _total_chars(data: List[ScrapedData]) -> int:
             return sum(len((d.content or '')) for d in data)
 
-        total_chars = _total_chars(items)
-        if total_chars < min_chars:
-            # Essayer d'élargir le nombre de liens (jusqu'à 2x per_site)
-            extra_items: List[ScrapedData] = []
-            async def _scrape_more(links: List[str], source_name: str):
-                for url in links[per_site:per_site*2]:
-                    try:
-                        details = await self._scrape_page_with_metadata(url)
-                        if not details or not details.get('text'):
-                            continue
-                        published_at = details.get('published_at')
-                        if not _is_recent_dt(published_at):
-                            continue
-                        text = details.get('text') or ''
-                        extra_items.append(ScrapedData(
-                            url=url,
-                            title=url[:120],
-                            content=text[:8000],
-                            timestamp=published_at or datetime.now(),
-                            metadata={'source': source_name, 'scraped_at': datetime.now().isoformat()}
-                        ))
-                        if _total_chars(items + extra_items) >= min_chars:
-                            break
-                    except Exception:
-                        continue
-
-            # Essayer d'abord plus d'articles depuis les liens RSS
-            await _scrape_more(rss_mw_links, 'marketwatch')
-            if _total_chars(items + extra_items) < min_chars:
-                await _scrape_more(rss_cnn_links, 'cnn')
-            # Si autorisé, compléter via un crawl léger
-            if allow_crawl and _total_chars(items + extra_items) < min_chars:
-                await _scrape_more(mw_links, 'marketwatch')
-            if allow_crawl and _total_chars(items + extra_items) < min_chars:
-                await _scrape_more(cnn_links, 'cnn')
-            items.extend(extra_items)
+        # Enrichir d'abord à partir des liens RSS (texte complet), puis des liens crawlés;
+        # toutes les sources en parallèle, arrêt dès que min_chars est atteint
+        crawler = self._new_crawler()
+        stop = lambda: _total_chars(items) >= min_chars
+        await crawler.crawl([
+            ('marketwatch', rss_mw_links[:per_site]),
+            ('cnn', rss_cnn_links[:per_site]),
+            ('investing', rss_inv_links[:per_site]),
+            ('marketwatch', mw_links[:per_site]),
+            ('cnn', cnn_links[:per_site]),
+            ('investing', inv_links[:per_site]),
+        ], _accept_page, stop_when=stop)
+
+        if not stop():
+            # Essayer d'élargir le nombre de liens (jusqu'à 2x per_site): RSS d'abord, crawl léger si autorisé
+            more = [('marketwatch', rss_mw_links[per_site:per_site*2]), ('cnn', rss_cnn_links[per_site:per_site*2])]
+            if allow_crawl:
+                more += [('marketwatch', mw_links[per_site:per_site*2]), ('cnn', cnn_links[per_site:per_site*2])]
+            await crawler.crawl(more, _accept_page, stop_when=stop)
+        self._record_crawl('deep', crawler)
 
         # Trier par fraîcheur, limiter au besoin
         items = [it for it in items if it and it.content]
@@ -832,29 +797,11 @@ class ScrapingBeeScraper:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119 Safari/537.36'
             }
-            async with aiohttp.ClientSession(headers=headers) as session:
+            async with self._http.session(headers=headers) as session:
                 for f in feeds:
                     try:
-                        text = None
-                        try:
-                            async with session.get(f, timeout=12) as resp:
-                                if resp.status == 200:
-                                    text = await resp.text()
-                        except Exception:
-                            text = None
-                        if not text and self.api_key and self.api_key != 'test_key_for_testing':
-                            try:
-                                async with session.get(self.base_url, params={
-                                    'api_key': self.api_key,
-                                    'url': f,
-                                    'render_js': 'false',
-                                    'premium_proxy': 'true',
-                                    'country_code': 'ch'
-                                }, timeout=15) as r2:
-                                    if r2.status == 200:
-                                        text = await r2.text()
-                            except Exception:
-                                pass
+                        text = await self._fetch_feed(session, f, timeout=12,
+                                                      proxy_params={'premium_proxy': 'true', 'country_code': 'ch'})
                         if not text:
                             continue
                         try:
@@ -939,48 +886,43 @@ class ScrapingBeeScraper:
         except Exception:
             immo_links = []
 
-        async def _scrape_links(links: List[str], source_name: str):
-            for url in links[:per_site*2]:
+        def _accept_page(url: str, source_name: str, details: Dict) -> bool:
+            if not details.get('text'):
+                return False
+            published_at = details.get('published_at')
+            # Normalize to aware UTC
+            if published_at and getattr(published_at, 'tzinfo', None) is None:
                 try:
-                    details = await self._scrape_page_with_metadata(url)
-                    if not details or not details.get('text'):
-                        continue
-                    published_at = details.get('published_at')
-                    # Normalize to aware UTC
-                    if published_at and getattr(published_at, 'tzinfo', None) is None:
-                        try:
-                            published_at = published_at.replace(tzinfo=timezone.utc)
-                        except Exception:
-                            pass
-                    if not _is_recent_dt(published_at):
-                        continue
-                    text = details.get('text') or ''
-                    items.append(ScrapedData(
-                        url=url,
-                        title=url[:120],
-                        content=text[:8000],
-                        timestamp=published_at or _now_utc(),
-                        metadata={'source': source_name, 'scraped_at': datetime.now().isoformat()}
-                    ))
+                    published_at = published_at.replace(tzinfo=timezone.utc)
                 except Exception:
-                    continue
-
-        if 'rts_links' in locals() and rts_links:
-            await _scrape_links(rts_links, 'rts')
-        if 'immo_links' in locals() and immo_links:
-            await _scrape_links(immo_links, 'immobilienbusiness')
+                    pass
+            if not _is_recent_dt(published_at):
+                return False
+            text = details.get('text') or ''
+            items.append(ScrapedData(
+                url=url,
+                title=url[:120],
+                content=text[:8000],
+                timestamp=published_at or _now_utc(),
+                metadata={'source': source_name, 'scraped_at': datetime.now().isoformat()}
+            ))
+            return True
 
         # Assurer un minimum de caractères
         def _total_chars(data: List[ScrapedData]) -> int:
             return sum(len((d.content or '')) for d in data)
 
-        total_chars = _total_chars(items)
-        if total_chars < min_chars:
+        # RTS et Immobilien Business en parallèle, arrêt dès que min_chars est atteint
+        crawler = self._new_crawler()
+        stop = lambda: _total_chars(items) >= min_chars
+        await crawler.crawl([('rts', rts_links[:per_site*2]), ('immobilienbusiness', immo_links[:per_site*2])],
+                            _accept_page, stop_when=stop)
+        if not stop():
             # Étendre si nécessaire
-            if 'rts_links' in locals() and rts_links:
-                await _scrape_links(rts_links[per_site*2:per_site*3], 'rts')
-            if 'immo_links' in locals() and immo_links:
-                await _scrape_links(immo_links[per_site:per_site*2], 'immobilienbusiness')
+            await crawler.crawl([('rts', rts_links[per_site*2:per_site*3]),
+                                 ('immobilienbusiness', immo_links[per_site*2:per_site*3])],
+                                _accept_page, stop_when=stop)
+        self._record_crawl('swiss', crawler)
 
         # Trier et retourner (assurer timestamps comparables UTC-aware)
         items = [it for it in items if it and it.content]
@@ -1038,30 +980,12 @@ class ScrapingBeeScraper:
                     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119 Safari/537.36'
                 }
                 items = []
-                async with aiohttp.ClientSession(headers=headers) as session:
+                async with self._http.session(headers=headers) as session:
                     for q in queries:
                         try:
                             feed_url = f"https://news.google.com/rss/search?q={quote_plus(q)}&hl={hl}&gl={gl}&ceid={ceid}"
-                            # Essai direct
-                            text = None
-                            try:
-                                async with session.get(feed_url, timeout=10) as resp:
-                                    if resp.status == 200:
-                                        text = await resp.text()
-                            except Exception:
-                                pass
-                            # Fallback via ScrapingBee (sans JS)
-                            if not text and self.api_key and self.api_key != 'test_key_for_testing':
-                                try:
-                                    async with session.get(self.base_url, params={
-                                        'api_key': self.api_key,
-                                        'url': feed_url,
-                                        'render_js': 'false'
-                                    }, timeout=15) as r2:
-                                        if r2.status == 200:
-                                            text = await r2.text()
-                                except Exception:
-                                    pass
+                            # Essai direct (revalidation ETag), fallback via ScrapingBee (sans JS)
+                            text = await self._fetch_feed(session, feed_url, timeout=10)
                             if not text:
                                 continue
                             try:
@@ -1103,7 +1027,7 @@ class ScrapingBeeScraper:
                         # Résoudre la redirection vers l'éditeur final
                         target_url = it['url']
                         try:
-                            async with aiohttp.ClientSession() as session:
+                            async with self._http.session() as session:
                                 async with session.get(target_url, allow_redirects=True, timeout=15) as resp:
                                     target_url = str(resp.url)
                         except Exception:
@@ -1137,32 +1061,10 @@ class ScrapingBeeScraper:
                     headers = {
                         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119 Safari/537.36'
                     }
-                    async with aiohttp.ClientSession(headers=headers) as session:
+                    async with self._http.session(headers=headers) as session:
                         for f in feeds:
-                            text = None
-                            try:
-                                async with session.get(f, timeout=15) as resp:
-                                    if resp.status == 200:
-                                        text = await resp.text()
-                                    else:
-                                        logger.warning(f"⚠️ RSS fetch failed ({resp.status}): {f}")
-                            except Exception as e:
-                                logger.warning(f"⚠️ RSS fetch error: {f} ({e})")
-
-                            # ScrapingBee fallback
-                            if not text and self.api_key and self.api_key != 'test_key_for_testing':
-                                try:
-                                    async with session.get(self.base_url, params={
-                                        'api_key': self.api_key,
-                                        'url': f,
-                                        'render_js': 'false'
-                                    }, timeout=20) as r2:
-                                        if r2.status == 200:
-                                            text = await r2.text()
-                                        else:
-                                            logger.warning(f"⚠️ RSS SBee failed ({r2.status}): {f}")
-                                except Exception as e:
-                                    logger.warning(f"⚠️ RSS SBee error: {f} ({e})")
+                            # Direct (revalidation ETag), puis ScrapingBee fallback
+                            text = await self._fetch_feed(session, f, timeout=15, proxy_timeout=20)
 
                             if not text:
                                 logger.warning(f"⚠️ RSS ignored (no content): {f}")
@@ -1370,30 +1272,30 @@ class ScrapingBeeScraper:
                 except Exception:
                     immo_links = []
 
-                async def _scrape_ch_links(links: List[str], source_name: str, cap: int) -> int:
-                    added_local = 0
-                    for url in links[:cap]:
-                        try:
-                            details = await self._scrape_page_with_metadata(url)
-                            if not details or not details.get('text'):
-                                continue
-                            published_at = details.get('published_at')
-                            if not _is_recent_dt(published_at):
-                                continue
-                            scraped.append(ScrapedData(
-                                url=url,
-                                title=url[:120],
-                                content=(details.get('text') or '')[:8000],
-                                timestamp=published_at or _now_utc(),
-                                metadata={'source': source_name, 'scraped_at': datetime.now().isoformat()}
-                            ))
-                            added_local += 1
-                        except Exception:
-                            continue
-                    return added_local
-
-                added_rts = await _scrape_ch_links(rts_links, 'rts', cap=max(3, per_site // 2)) if rts_links else 0
-                added_immo = await _scrape_ch_links(immo_links, 'immobilienbusiness', cap=max(3, per_site // 2)) if immo_links else 0
+                def _accept_ch_page(url: str, source_name: str, details: Dict) -> bool:
+                    if not details.get('text'):
+                        return False
+                    published_at = details.get('published_at')
+                    if not _is_recent_dt(published_at):
+                        return False
+                    scraped.append(ScrapedData(
+                        url=url,
+                        title=url[:120],
+                        content=(details.get('text') or '')[:8000],
+                        timestamp=published_at or _now_utc(),
+                        metadata={'source': source_name, 'scraped_at': datetime.now().isoformat()}
+                    ))
+                    return True
+
+                # RTS et Immobilien Business en parallèle (liens déjà présents dans `scraped` ignorés)
+                crawler = self._new_crawler()
+                for item in scraped:
+                    crawler.mark_seen(item.url)
+                cap = max(3, per_site // 2)
+                added = await crawler.crawl([('rts', rts_links[:cap]), ('immobilienbusiness', immo_links[:cap])],
+                                            _accept_ch_page)
+                added_rts, added_immo = added['rts'], added['immobilienbusiness']
+                self._record_crawl('global_ch', crawler)
                 logger.info(f"🇨🇭 Deep-crawl CH: RTS ajoutés {added_rts}, Immobilien {added_immo}")
             except Exception:
                 pass
@@ -1403,7 +1305,8 @@ class ScrapingBeeScraper:
 
             # Étape 2: Snapshot de marché quasi temps réel
             from stock_api_manager import stock_api_manager
-            market_snapshot = stock_api_manager.get_market_snapshot()
+            from market_board import report_max_age
+            market_snapshot = stock_api_manager.get_market_snapshot(max_age=report_max_age())
 
             # Étape 3: Appel LLM avec tokens étendus (45k) et reasoning 'high'
             result = await self.process_with_llm_custom(
@@ -1421,14 +1324,20 @@ class ScrapingBeeScraper:
     async def execute_bonvin_collection_news(self, prompt: str) -> Dict:
         try:
             from stock_api_manager import stock_api_manager
+            from market_board import report_max_age
 
             per_site = int(os.getenv('COLLECTION_NEWS_PER_SITE', '24'))
             max_age_hours = int(os.getenv('COLLECTION_NEWS_MAX_AGE_HOURS', '48'))
             min_chars_target = int(os.getenv('COLLECTION_NEWS_MIN_CHARS', '80000'))
 
+            # Un seul ordonnanceur pour toute la collecte: une URL déjà récupérée n'est jamais refacturée
+            crawler = self._new_crawler()
+
             # Étape 1: collecte Google News en amont pour garantir la diversité immédiate
             async def _boost_google_news(locales: List[Dict[str, str]], queries: List[str], cap: int = 30) -> List[ScrapedData]:
                 results: List[ScrapedData] = []
+                batches = []
+                links_meta: Dict[str, Dict[str, str]] = {}
                 for locale_cfg in locales:
                     hl = locale_cfg.get('hl', 'fr')
                     gl = locale_cfg.get('gl', 'CH')
@@ -1440,26 +1349,30 @@ class ScrapingBeeScraper:
                         logger.warning(f"⚠️ Google News ({locale_cfg}) échoué: {e}")
                         items = []
                     for it in items:
-                        try:
-                            details = await self._scrape_page_with_metadata(it['url'])
-                            if not details or not details.get('text'):
-                                continue
-                            timestamp = details.get('published_at') or datetime.now()
-                            metadata = {'source': f"google_news_{hl}"}
-                            if it.get('source'):
-                                metadata['original_source'] = it['source']
-                            if it.get('published_at'):
-                                metadata['published_at_raw'] = it['published_at']
-                            results.append(ScrapedData(
-                                url=it['url'],
-                                title=(it.get('title') or '')[:160],
-                                content=(details.get('text') or '')[:20000],
-                                timestamp=timestamp,
-                                metadata=metadata
-                            ))
-                        except Exception as e:
-                            logger.debug(f"⚠️ Google News enrichissement échoué ({it.get('url')}): {e}")
-                            continue
+                        links_meta.setdefault(it['url'], it)
+                    batches.append((f"google_news_{hl}", [it['url'] for it in items]))
+
+                def _accept_google_news(url: str, source_name: str, details: Dict) -> bool:
+                    if not details.get('text'):
+                        return False
+                    it = links_meta.get(url, {})
+                    timestamp = details.get('published_at') or datetime.now()
+                    metadata = {'source': source_name}
+                    if it.get('source'):
+                        metadata['original_source'] = it['source']
+                    if it.get('published_at'):
+                        metadata['published_at_raw'] = it['published_at']
+                    results.append(ScrapedData(
+                        url=url,
+                        title=(it.get('title') or '')[:160],
+                        content=(details.get('text') or '')[:20000],
+                        timestamp=timestamp,
+                        metadata=metadata
+                    ))
+                    return True
+
+                # Les articles de toutes les locales sont récupérés en parallèle
+                await crawler.crawl(batches, _accept_google_news)
                 logger.info(f"📰 Google News total agrégé: {len(results)} articles")
                 if not results:
                     logger.warning(f"⚠️ Google News vide (locales={locales})")
@@ -1522,20 +1435,20 @@ class ScrapingBeeScraper:
                     'https://www.ft.com/regulation'
                 ]
                 collected: List[ScrapedData] = []
-                for url in direct_sites:
-                    try:
-                        details = await self._scrape_page_with_metadata(url)
-                        if not details or not details.get('text'):
-                            continue
-                        collected.append(ScrapedData(
-                            url=url,
-                            title=url[:120],
-                            content=(details.get('text') or '')[:8000],
-                            timestamp=details.get('published_at') or datetime.now(),
-                            metadata={'source': 'direct_focus'}
-                        ))
-                    except Exception as e:
-                        logger.debug(f"⚠️ Direct focus échoué ({url}): {e}")
+
+                def _accept_direct(url: str, source_name: str, details: Dict) -> bool:
+                    if not details.get('text'):
+                        return False
+                    collected.append(ScrapedData(
+                        url=url,
+                        title=url[:120],
+                        content=(details.get('text') or '')[:8000],
+                        timestamp=details.get('published_at') or datetime.now(),
+                        metadata={'source': source_name}
+                    ))
+                    return True
+
+                await crawler.crawl([('direct_focus', direct_sites)], _accept_direct)
                 logger.info(f"🗞️ Direct focus: {len(collected)} articles")
                 return collected
 
@@ -1678,22 +1591,18 @@ class ScrapingBeeScraper:
                     'https://www.rts.ch/info/economie/'
                 ]
 
-                async def _fetch_direct_page(url: str) -> Optional[ScrapedData]:
-                    try:
-                        details = await self._scrape_page_with_metadata(url)
-                        if not details or not details.get('text'):
-                            return None
-                        timestamp = details.get('published_at') or datetime.now()
-                        return ScrapedData(
-                            url=url,
-                            title=url[:120],
-                            content=(details.get('text') or '')[:20000],
-                            timestamp=timestamp,
-                            metadata={'source': 'fallback_direct'}
-                        )
-                    except Exception as e:
-                        logger.debug(f"⚠️ Fallback direct échoué ({url}): {e}")
-                        return None
+                def _accept_fallback(url: str, source_name: str, details: Dict) -> bool:
+                    if not details.get('text'):
+                        return False
+                    scraped_blocks.append(ScrapedData(
+                        url=url,
+                        title=url[:120],
+                        content=(details.get('text') or '')[:20000],
+                        timestamp=details.get('published_at') or datetime.now(),
+                        metadata={'source': source_name}
+                    ))
+                    logger.info(f"📰 Fallback direct {url[:60]}... → chars ~{_count_chars(scraped_blocks)}")
+                    return True
 
                 # 1) Google News extra (cap plus large)
                 try:
@@ -1705,15 +1614,10 @@ class ScrapingBeeScraper:
                 except Exception as e:
                     logger.warning(f"⚠️ Fallback Google News échoué: {e}")
 
-                # 2) Direct pages
-                for url in fallback_direct_sources:
-                    if total_chars_collected >= min_chars_target:
-                        break
-                    direct_entry = await _fetch_direct_page(url)
-                    if direct_entry:
-                        scraped_blocks.append(direct_entry)
-                        total_chars_collected = _count_chars(scraped_blocks)
-                        logger.info(f"📰 Fallback direct {url[:60]}... → chars ~{total_chars_collected}")
+                # 2) Direct pages (en parallèle, arrêt dès que l'objectif de caractères est atteint)
+                await crawler.crawl([('fallback_direct', fallback_direct_sources)], _accept_fallback,
+                                    stop_when=lambda: _count_chars(scraped_blocks) >= min_chars_target)
+                total_chars_collected = _count_chars(scraped_blocks)
 
                 if total_chars_collected < min_chars_target:
                     logger.warning(f"⚠️ Bonvin fallback direct n'atteint toujours pas {min_chars_target} chars (actuel ~{total_chars_collected})")
@@ -1721,6 +1625,7 @@ class ScrapingBeeScraper:
             total_chars_collected = _count_chars(scraped_blocks)
             if total_chars_collected < min_chars_target:
                 logger.warning(f"⚠️ Bonvin Collection News: caractères collectés {total_chars_collected} < {min_chars_target} malgré les reforçes")
+            self._record_crawl('bonvin', crawler)
 
             # Déduplication stricte
             seen_urls: Dict[str, ScrapedData] = {}
@@ -1750,7 +1655,7 @@ class ScrapingBeeScraper:
 
             scraped.sort(key=lambda x: x.timestamp or datetime.min, reverse=True)
 
-            market_snapshot = stock_api_manager.get_market_snapshot()
+            market_snapshot = stock_api_manager.get_market_snapshot(max_age=report_max_age())
             try:
                 market_snapshot['swiss'] = stock_api_manager.get_swiss_snapshot()
             except Exception:
@@ -1782,28 +1687,10 @@ class ScrapingBeeScraper:
 
         seen_urls = set()
 
-        async with aiohttp.ClientSession(headers=headers) as session:
+        async with self._http.session(headers=headers) as session:
             for q in queries:
                 feed_url = f"https://news.google.com/rss/search?q={quote_plus(q)}&hl={hl}&gl={gl}&ceid={ceid}"
-                text = None
-                try:
-                    async with session.get(feed_url, timeout=10) as resp:
-                        if resp.status == 200:
-                            text = await resp.text()
-                except Exception as e:
-                    logger.debug(f"⚠️ Google News direct échoué ({feed_url}): {e}")
-
-                if not text and self.api_key and self.api_key != 'test_key_for_testing':
-                    try:
-                        async with session.get(self.base_url, params={
-                            'api_key': self.api_key,
-                            'url': feed_url,
-                            'render_js': 'false'
-                        }, timeout=15) as proxy_resp:
-                            if proxy_resp.status == 200:
-                                text = await proxy_resp.text()
-                    except Exception as e:
-                        logger.debug(f"⚠️ Google News via ScrapingBee échoué ({feed_url}): {e}")
+                text = await self._fetch_feed(session, feed_url, timeout=10)
 
                 if not text:
                     continue
@@ -2056,7 +1943,7 @@ class ScrapingBeeScraper:
                 'country_code': 'us'
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with self._http.session() as session:
                 async with session.get(self.base_url, params=params) as response:
                     if response.status == 200:
                         # ScrapingBee retourne du HTML, pas du JSON
@@ -2082,6 +1969,15 @@ class ScrapingBeeScraper:
         Optimisations:
         - Pour HTML nécessitant consent/hydratation, active JS + premium proxy US + blocage des ressources + petit scénario si besoin
         """
+        cached = self._fetch_cache.get(url, 'article')
+        if cached is not None:
+            return {
+                'text': cached['text'],
+                'published_at': cached['published_at'],
+                'published_at_raw': cached['published_at_raw'],
+                'credits': 0,
+                'cached': True
+            }
         try:
             # Heuristique: certaines pages exigent JS (consent/hydratation)
             u = (url or '').lower()
@@ -2107,7 +2003,7 @@ class ScrapingBeeScraper:
                         params['custom_google'] = 'true'
             except Exception:
                 pass
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout_secs)) as session:
+            async with self._http.session(timeout=aiohttp.ClientTimeout(total=timeout_secs)) as session:
                 async with session.get(self.base_url, params=params) as response:
                     if response.status != 200:
                         # Log détaillé pour diagnostiquer les 4xx/5xx
@@ -2122,144 +2018,78 @@ class ScrapingBeeScraper:
                             logger.error(f"Réponse de ScrapingBee: {response_text}")
                         return None
                     html_content = await response.text()
-                    cleaned_content = self._extract_text_from_html(html_content)
-                    # Extraire published_at depuis HTML ou headers
-                    published_at, raw = self._extract_published_time(html_content, dict(response.headers))
+                    # Une seule analyse: texte principal + published_at (HTML ou headers) + titre/liens
+                    page = extract_page(html_content, base_url=url, headers=dict(response.headers))
+                    self._fetch_cache.put(url, page.text[:8000], 'article', published_at=page.published_at,
+                                          published_at_raw=page.published_at_raw, headers=dict(response.headers))
                     return {
-                        'text': cleaned_content[:8000],
-                        'published_at': published_at,
-                        'published_at_raw': raw
+                        'text': page.text[:8000],
+                        'published_at': page.published_at,
+                        'published_at_raw': page.published_at_raw,
+                        'title': page.title,
+                        'links': page.links,
+                        # Crédits ScrapingBee facturés pour cette page (en-tête Spb-Cost)
+                        'credits': response.headers.get('Spb-Cost')
                     }
         except Exception as e:
             logger.error(f"❌ Erreur scraping page (with metadata) {url}: {e}")
             return None
     
     def _extract_text_from_html(self, html_content: str) -> str:
-        """Extrait le texte du HTML"""
+        """Extrait le texte principal du HTML (html_extract, boilerplate retiré)"""
         if not html_content:
             return ""
-        
-        # Supprimer les balises script et style
-        html_content = re.sub(r'<script[^>]*>.*?</script>', '', html_content, flags=re.DOTALL)
-        html_content = re.sub(r'<style[^>]*>.*?</style>', '', html_content, flags=re.DOTALL)
-        
-        # Extraire le texte des balises
-        text = re.sub(r'<[^>]+>', ' ', html_content)
-        
-        # Nettoyer le texte
-        text = re.sub(r'\s+', ' ', text)
-        text = re.sub(r'[^\w\s\.\,\!\?\-\:\;\(\)\-\$\%]', '', text)
-        
-        return text.strip()[:15000]
+        return extract_page(html_content).text
 
     def _parse_datetime_str(self, s: str) -> Optional[datetime]:
         """Parse datetime string with better RSS support"""
-        try:
-            if not s or not isinstance(s, str):
-                return None
-                
-            st = s.strip()
-            if not st:
-                return None
-                
-            # RSS format: "Thu, 28 Aug 2025 15:52:00 GMT"
-            if ',' in st and len(st.split()) >= 6:
-                try:
-                    from email.utils import parsedate_to_datetime
-                    return parsedate_to_datetime(st)
-                except Exception:
-                    pass
-            
-            # ISO 8601 simple
-            st = st.replace('Z', '+00:00')
-            try:
-                return datetime.fromisoformat(st)
-            except Exception:
-                pass
-                
-            # RFC 2822 (headers)
-            try:
-                from email.utils import parsedate_to_datetime
-                return parsedate_to_datetime(st)
-            except Exception:
-                pass
-                
-            # Fallback: try common RSS patterns
-            import re
-            patterns = [
-                r'(\d{1,2})\s+(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+(\d{4})',
-                r'(\d{4})-(\d{1,2})-(\d{1,2})',
-                r'(\d{1,2})/(\d{1,2})/(\d{4})'
-            ]
-            
-            for pattern in patterns:
-                match = re.search(pattern, st, re.IGNORECASE)
-                if match:
-                    try:
-                        if len(match.groups()) == 3:
-                            if pattern == patterns[0]:  # "28 Aug 2025"
-                                month_map = {
-                                    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
-                                    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
-                                }
-                                day, month_str, year = match.groups()
-                                month = month_map.get(month_str.lower(), 1)
-                                return datetime(int(year), month, int(day))
-                            elif pattern == patterns[1]:  # "2025-08-28"
-                                year, month, day = match.groups()
-                                return datetime(int(year), int(month), int(day))
-                            elif pattern == patterns[2]:  # "08/28/2025"
-                                month, day, year = match.groups()
-                                return datetime(int(year), int(month), int(day))
-                    except Exception:
-                        continue
-                        
-        except Exception:
-            pass
-        return None
+        return parse_datetime_str(s)
 
     def _extract_published_time(self, html_content: str, headers: Optional[Dict] = None) -> (Optional[datetime], Optional[str]):
         """Extrait la date de publication depuis le HTML ou les en-têtes HTTP."""
-        raw = None
-        try:
-            from bs4 import BeautifulSoup  # type: ignore
-            soup = BeautifulSoup(html_content or '', 'lxml')
-            # Meta tags courants
-            candidates = []
-            for selector, attr in [
-                (('meta', {'property': 'article:published_time'}), 'content'),
-                (('meta', {'name': 'article:published_time'}), 'content'),
-                (('meta', {'property': 'og:published_time'}), 'content'),
-                (('meta', {'property': 'og:updated_time'}), 'content'),
-                (('meta', {'itemprop': 'datePublished'}), 'content'),
-                (('meta', {'name': 'date'}), 'content'),
-                (('time', {'datetime': True}), 'datetime'),
-            ]:
-                try:
-                    tag = soup.find(*selector)
-                    if tag and tag.get(attr):
-                        candidates.append(tag.get(attr))
-                except Exception:
-                    continue
-            for c in candidates:
-                dt = self._parse_datetime_str(c)
-                if dt:
-                    return dt, c
-        except Exception:
-            pass
-        try:
-            # Headers HTTP
-            if headers:
-                for key in ['last-modified', 'date']:
-                    hv = headers.get(key) or headers.get(key.title())
-                    if hv:
-                        dt = self._parse_datetime_str(hv)
-                        if dt:
-                            return dt, hv
-        except Exception:
-            pass
-        return None, raw
+        page = extract_page(html_content, headers=headers)
+        return page.published_at, page.published_at_raw
     
+    async def _fetch_feed(self, session, feed_url: str, timeout: float = 10, proxy_params: Optional[Dict] = None,
+                          proxy_timeout: float = 15) -> Optional[str]:
+        """Récupère un flux RSS: cache (TTL 'rss'), GET conditionnel (ETag / If-Modified-Since), repli ScrapingBee.
+
+        Si le flux est injoignable, la dernière version connue est servie.
+        """
+        cached = self._fetch_cache.get(feed_url, 'rss')
+        if cached is not None:
+            return cached['text']
+        entry = self._fetch_cache.lookup(feed_url)
+        try:
+            async with session.get(feed_url, timeout=timeout, headers=self._fetch_cache.conditional_headers(entry)) as resp:
+                if resp.status == 304 and entry is not None:
+                    self._fetch_cache.touch(feed_url)
+                    logger.debug(f"📰 RSS inchangé (304): {feed_url}")
+                    return entry['text']
+                if resp.status == 200:
+                    text = await resp.text()
+                    self._fetch_cache.put(feed_url, text, 'rss', headers=dict(resp.headers))
+                    logger.info(f"📰 RSS direct réussi: {feed_url} ({len(text)} chars)")
+                    return text
+                logger.warning(f"⚠️ RSS fetch failed ({resp.status}): {feed_url}")
+        except Exception as e:
+            logger.debug(f"📰 RSS direct échoué {feed_url}: {e}")
+
+        # Fallback via ScrapingBee proxy (sans JS) si clé API disponible
+        if self.api_key and self.api_key != 'test_key_for_testing':
+            try:
+                params = {'api_key': self.api_key, 'url': feed_url, 'render_js': 'false', **(proxy_params or {})}
+                async with session.get(self.base_url, params=params, timeout=proxy_timeout) as resp:
+                    if resp.status == 200:
+                        text = await resp.text()
+                        self._fetch_cache.put(feed_url, text, 'rss')
+                        logger.info(f"📰 RSS via ScrapingBee: {feed_url}")
+                        return text
+                    logger.warning(f"⚠️ RSS SBee failed ({resp.status}): {feed_url}")
+            except Exception as e:
+                logger.debug(f"📰 RSS ScrapingBee échoué {feed_url}: {e}")
+        return entry['text'] if entry is not None else None
+
     async def _scrape_with_params(self, url: str, params: Dict) -> Optional[str]:
         """Scrape une page avec des paramètres ScrapingBee spécifiques."""
         try:
@@ -2270,11 +2100,18 @@ class ScrapingBeeScraper:
             }
             final_params = {**base_params, **params}
 
+            # Pages servant à découvrir des liens: réutilisables pendant le TTL 'page'
+            cached = self._fetch_cache.get(url, 'page')
+            if cached is not None:
+                return cached['text']
+
             timeout_secs = int(os.getenv('SCRAPINGBEE_HTTP_TIMEOUT', '30'))
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout_secs)) as session:
+            async with self._http.session(timeout=aiohttp.ClientTimeout(total=timeout_secs)) as session:
                 async with session.get(self.base_url, params=final_params) as response:
                     if response.status == 200:
-                        return await response.text()
+                        html = await response.text()
+                        self._fetch_cache.put(url, html, 'page', headers=dict(response.headers))
+                        return html
                     else:
                         response_text = await response.text()
                         logger.error(f"❌ Erreur ScrapingBee avec params: {response.status}")
@@ -2912,7 +2749,8 @@ Contenu: {data.content[:8000]}
             
             # Étape 2: Récupérer les données factuelles de marché
             from stock_api_manager import stock_api_manager
-            market_snapshot = stock_api_manager.get_market_snapshot()
+            from market_board import report_max_age
+            market_snapshot = stock_api_manager.get_market_snapshot(max_age=report_max_age())
 
             # Étape 3: Traitement LLM avec les données scrapées ET les données factuelles
             llm_result = await self.process_with_llm(task.prompt, scraped_data, market_snapshot)
@@ -2940,15 +2778,43 @@ Contenu: {data.content[:8000]}
         return self.tasks.get(task_id)
     
     async def initialize(self):
-        """Initialisation asynchrone"""
+        """Initialisation asynchrone (ouvre aussi la session HTTP partagée de la boucle courante)"""
         if not self._initialized:
             self.initialize_sync()
+        await self._http.get_session()
     
     def cleanup(self):
         """Nettoyage des ressources"""
         self.tasks.clear()
         self._initialized = False
-        logger.info("🧹 ScrapingBee Scraper nettoyé")
+        stats = self._http.stats()
+        self._http.close_nowait()
+        logger.info(f"🧹 ScrapingBee Scraper nettoyé (HTTP: {stats['requests']} requêtes, "
+                    f"{stats['connections_reused']} connexions réutilisées / {stats['connections_created']} ouvertes)")
+    
+    def http_stats(self) -> Dict:
+        """Statistiques de la session HTTP partagée (réutilisation des connexions, cache DNS)"""
+        return self._http.stats()
+
+    def _new_crawler(self) -> CrawlScheduler:
+        """Ordonnanceur de crawl pour une collecte (concurrence bornée, dédup des URLs)"""
+        return CrawlScheduler(self._scrape_page_with_metadata)
+
+    def _record_crawl(self, name: str, crawler: CrawlScheduler) -> None:
+        """Conserve et journalise latence et crédits par source de la dernière collecte `name`"""
+        stats = crawler.stats()
+        self.last_crawl_stats[name] = stats
+        summary = ', '.join(f"{src}: {s['accepted']}/{s['fetched']} pages ({s['cached']} en cache), {s['avg_latency_s']}s moy., {s['credits']} crédits"
+                            for src, s in stats.items())
+        logger.info(f"🕸️ Crawl {name}: {summary or 'aucune page'}")
+
+    def crawl_stats(self) -> Dict:
+        """Statistiques par source des dernières collectes (deep, swiss, global_ch, bonvin)"""
+        return dict(self.last_crawl_stats)
+
+    def fetch_cache_stats(self) -> Dict:
+        """Statistiques du cache persistant des pages et flux RSS"""
+        return self._fetch_cache.stats()
 
 # Fonction utilitaire pour obtenir le scraper
 def get_scrapingbee_scraper():
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Niveau de cache partagé (L2) sur Redis pour les familles de `SmartCache`.
+
+- L1: `ttl_cache.TTLCache` en mémoire dans chaque process
+- L2: Redis, partagé entre workers gunicorn, Celery et background worker
+- Invalidation: chaque écriture supprime la clé L2 et publie un message pub/sub
+  pour que tous les process abandonnent leur copie L1; un compteur de génération par
+  famille empêche un chargement commencé avant l'invalidation de réécrire l'ancienne valeur
+
+La liste d'objets est sérialisée de façon compacte: métadonnées JSON compressées
+(zlib) suivies de la matrice des embeddings en float32 brut.
+"""
+
+import os
+import ssl
+import json
+import zlib
+import uuid
+import time
+import struct
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import redis  # type: ignore
+except Exception:  # pragma: no cover
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+_ITEMS_MAGIC = b'IV1\x00'
+Codec = Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]
+
+
+def pack_items(rows: List[Dict[str, Any]]) -> bytes:
+    """Sérialise des lignes `items`; les embeddings sont stockés en float32 et non en JSON"""
+    meta = []
+    vectors = []
+    dim = 0
+    for row in rows:
+        row = dict(row)
+        embedding = row.pop('embedding', None)
+        if embedding is not None and len(embedding) > 0 and (not dim or len(embedding) == dim):
+            dim = len(embedding)
+            row['_embedding_index'] = len(vectors)
+            vectors.append(embedding)
+        meta.append(row)
+    header = zlib.compress(json.dumps({'dim': dim, 'items': meta}, default=str).encode('utf-8'))
+    matrix = np.asarray(vectors, dtype='<f4').tobytes() if vectors else b''
+    return _ITEMS_MAGIC + struct.pack('<I', len(header)) + header + matrix
+
+
+def unpack_items(payload: bytes) -> List[Dict[str, Any]]:
+    """Inverse de `pack_items`"""
+    if payload[:4] != _ITEMS_MAGIC:
+        raise ValueError("Format de cache items inconnu")
+    header_len = struct.unpack('<I', payload[4:8])[0]
+    header = json.loads(zlib.decompress(payload[8:8 + header_len]).decode('utf-8'))
+    dim = header['dim']
+    matrix = np.frombuffer(payload[8 + header_len:], dtype='<f4').reshape(-1, dim) if dim else None
+    rows = header['items']
+    for row in rows:
+        index = row.pop('_embedding_index', None)
+        row['embedding'] = matrix[index].tolist() if index is not None and matrix is not None else None
+    return rows
+
+
+def _json_encode(value: Any) -> bytes:
+    return zlib.compress(json.dumps(value, default=str).encode('utf-8'))
+
+
+def _json_decode(payload: bytes) -> Any:
+    return json.loads(zlib.decompress(payload).decode('utf-8'))
+
+
+JSON_CODEC: Codec = (_json_encode, _json_decode)
+
+
+class RedisCacheTier:
+    """Stockage L2 Redis + canal d'invalidation pub/sub"""
+
+    def __init__(self, redis_url: Optional[str] = None, prefix: str = 'inventorysbo:cache',
+                 channel: Optional[str] = None, client=None):
+        if client is None:
+            ssl_required = redis_url.startswith("rediss://") or os.getenv("REDIS_USE_SSL", "0") == "1"
+            client = redis.from_url(
+                redis_url,
+                ssl_cert_reqs=ssl.CERT_NONE if ssl_required else None,
+                socket_timeout=2,
+                socket_connect_timeout=2,
+            )
+        self.client = client
+        self.prefix = prefix
+        self.channel = channel or f"{prefix}:invalidate"
+        self.origin = uuid.uuid4().hex
+        self._listeners: Dict[str, List[Callable[[Optional[str]], None]]] = {}
+        self._listeners_lock = threading.Lock()
+        self._subscriber: Optional[threading.Thread] = None
+        self._stats = {'l2_hits': 0, 'l2_misses': 0, 'l2_errors': 0, 'l2_stale_writes': 0,
+                       'invalidations_sent': 0, 'invalidations_received': 0}
+
+    def _key(self, family: str, key: Hashable) -> str:
+        return f"{self.prefix}:{family}:{key}"
+
+    def _generation_key(self, family: str) -> str:
+        # Hors de `{prefix}:{family}:*` pour survivre à l'invalidation de la famille
+        return f"{self.prefix}:generation:{family}"
+
+    def generation(self, family: str) -> Optional[int]:
+        """Compteur d'invalidations de `family` (None si Redis est injoignable)"""
+        try:
+            value = self.client.get(self._generation_key(family))
+        except Exception as e:
+            self._stats['l2_errors'] += 1
+            logger.debug(f"Cache L2 indisponible ({family}): {e}")
+            return None
+        return int(value) if value is not None else 0
+
+    def get(self, family: str, key: Hashable) -> Optional[bytes]:
+        try:
+            value = self.client.get(self._key(family, key))
+        except Exception as e:
+            self._stats['l2_errors'] += 1
+            logger.debug(f"Cache L2 indisponible ({family}): {e}")
+            return None
+        self._stats['l2_hits' if value is not None else 'l2_misses'] += 1
+        return value
+
+    def set(self, family: str, key: Hashable, payload: bytes, ttl: float) -> None:
+        try:
+            self.client.setex(self._key(family, key), max(1, int(ttl)), payload)
+        except Exception as e:
+            self._stats['l2_errors'] += 1
+            logger.debug(f"Écriture cache L2 impossible ({family}): {e}")
+
+    def set_if_generation(self, family: str, key: Hashable, payload: bytes, ttl: float, generation: Optional[int]) -> bool:
+        """Écrit seulement si `family` n'a pas été invalidée depuis `generation` (lue avant le chargement).
+
+        La génération est relue après l'écriture: une invalidation intercalée entre le contrôle et
+        l'écriture est ainsi rattrapée (l'invalidation incrémente avant de supprimer les clés).
+        """
+        if generation is None or self.generation(family) != generation:
+            self._stats['l2_stale_writes'] += 1
+            return False
+        self.set(family, key, payload, ttl)
+        if self.generation(family) != generation:
+            try:
+                self.client.delete(self._key(family, key))
+            except Exception as e:
+                self._stats['l2_errors'] += 1
+                logger.debug(f"Suppression cache L2 impossible ({family}): {e}")
+            self._stats['l2_stale_writes'] += 1
+            return False
+        return True
+
+    def invalidate(self, family: str, key: Optional[Hashable] = None) -> None:
+        """Supprime la/les clé(s) L2 et notifie les autres process"""
+        try:
+            # Génération d'abord: un chargement en cours n'écrira pas sa valeur périmée
+            self.client.incr(self._generation_key(family))
+            if key is None:
+                keys = list(self.client.scan_iter(match=f"{self.prefix}:{family}:*", count=100))
+                if keys:
+                    self.client.delete(*keys)
+            else:
+                self.client.delete(self._key(family, key))
+            message = {'family': family, 'key': None if key is None else str(key), 'origin': self.origin}
+            self.client.publish(self.channel, json.dumps(message))
+            self._stats['invalidations_sent'] += 1
+        except Exception as e:
+            self._stats['l2_errors'] += 1
+            logger.warning(f"⚠️ Invalidation cache L2 impossible ({family}): {e}")
+
+    def on_invalidate(self, family: str, callback: Callable[[Optional[str]], None]) -> None:
+        """Enregistre un callback appelé quand un autre process invalide `family`"""
+        with self._listeners_lock:
+            self._listeners.setdefault(family, []).append(callback)
+        self._ensure_subscriber()
+
+    def _ensure_subscriber(self) -> None:
+        if self._subscriber and self._subscriber.is_alive():
+            return
+        self._subscriber = threading.Thread(target=self._listen, name='cache-invalidation', daemon=True)
+        self._subscriber.start()
+
+    def _listen(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                backoff = 1.0
+                # get_message(timeout) plutôt que listen(): compatible avec le socket_timeout du client
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message:
+                        self._dispatch(message.get('data'))
+            except Exception as e:
+                logger.debug(f"Abonnement invalidation cache interrompu: {e}")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    def _dispatch(self, data: Any) -> None:
+        try:
+            message = json.loads(data)
+        except Exception:
+            return
+        if message.get('origin') == self.origin:
+            return
+        self._stats['invalidations_received'] += 1
+        with self._listeners_lock:
+            callbacks = list(self._listeners.get(message.get('family'), []))
+        for callback in callbacks:
+            try:
+                callback(message.get('key'))
+            except Exception as e:
+                logger.warning(f"⚠️ Callback d'invalidation en erreur: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self._stats)
+
+    def wrap(self, family: str, l1, codec: Codec) -> 'TwoLevelCache':
+        return TwoLevelCache(family, l1, self, codec)
+
+
+class TwoLevelCache:
+    """Famille de cache L1 (mémoire) + L2 (Redis), même interface que `TTLCache`"""
+
+    def __init__(self, family: str, l1, l2: RedisCacheTier, codec: Codec):
+        self.family = family
+        self.l1 = l1
+        self.l2 = l2
+        self.encode, self.decode = codec
+        l2.on_invalidate(family, self._on_remote_invalidate)
+
+    def _on_remote_invalidate(self, key: Optional[str]) -> None:
+        self.l1.invalidate(key)
+
+    def _read_l2(self, key: Hashable) -> Any:
+        payload = self.l2.get(self.family, key)
+        if payload is None:
+            return None
+        try:
+            return self.decode(payload)
+        except Exception as e:
+            logger.warning(f"⚠️ Entrée L2 illisible ({self.family}): {e}")
+            return None
+
+    def _write_l2(self, key: Hashable, value: Any, ttl: Optional[float], generation: Optional[int] = None,
+                  guarded: bool = False) -> None:
+        try:
+            payload = self.encode(value)
+        except Exception as e:
+            logger.warning(f"⚠️ Sérialisation L2 impossible ({self.family}): {e}")
+            return
+        ttl = self.l1.ttl if ttl is None else ttl
+        if guarded:
+            self.l2.set_if_generation(self.family, key, payload, ttl, generation)
+        else:
+            self.l2.set(self.family, key, payload, ttl)
+
+    def get(self, key: Hashable = 'default') -> Any:
+        value = self.l1.get(key)
+        if value is None:
+            value = self._read_l2(key)
+            if value is not None:
+                self.l1.set(key, value)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self.l1.set(key, value, ttl)
+        self._write_l2(key, value, ttl)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        def _load():
+            value = self._read_l2(key)
+            if value is None:
+                # Comme la génération de TTLCache pour L1: une invalidation pendant loader()
+                # (update_item/delete_item) empêche de republier l'ancienne valeur aux autres workers
+                generation = self.l2.generation(self.family)
+                value = loader()
+                if value is not None:
+                    self._write_l2(key, value, ttl, generation, guarded=True)
+            return value
+        return self.l1.get_or_load(key, _load, ttl)
+
+    def contains(self, key: Hashable = 'default') -> bool:
+        return self.l1.contains(key)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        self.l1.invalidate(key)
+        self.l2.invalidate(self.family, key)
+
+    @property
+    def ttl(self) -> float:
+        return self.l1.ttl
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.l1.stats(), **self.l2.stats()}
+
+
+_default_tier: Optional[RedisCacheTier] = None
+_default_tier_lock = threading.Lock()
+
+
+def get_redis_cache_tier() -> Optional[RedisCacheTier]:
+    """Retourne le niveau L2 partagé du process, ou None si Redis n'est pas configuré"""
+    global _default_tier
+    if os.getenv("SHARED_CACHE_ENABLED", "1") != "1":
+        return None
+    redis_url = os.getenv("REDIS_URL")
+    if not (redis and redis_url):
+        return None
+    with _default_tier_lock:
+        if _default_tier is None:
+            try:
+                _default_tier = RedisCacheTier(redis_url)
+                logger.info("✅ Cache partagé Redis (L2) activé")
+            except Exception as e:
+                logger.warning(f"⚠️ Cache partagé Redis indisponible: {e}")
+                return None
+        return _default_tier
+
+
+def invalidate_shared(*families: str) -> None:
+    """Invalide des familles dans tous les process (utilisable hors de app.py)"""
+    tier = get_redis_cache_tier()
+    if tier is None:
+        return
+    for family in families:
+        tier.invalidate(family)
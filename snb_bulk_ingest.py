@@ -0,0 +1,251 @@
+"""
+Ingestion groupée des historiques SNB (CPI, KOF, NEER, OIS) depuis un fichier XLS/CSV.
+
+- normalisation vectorisée du DataFrame: dates (ISO), nombres, valeurs manquantes,
+  clés d'idempotence; une ligne invalide est rejetée avec son numéro et la raison
+- clé d'idempotence inchangée par rapport à l'import ligne à ligne: `bulk-<type>-<date brute>`
+  (`str()` de la cellule: '2024-01-31 00:00:00' pour un Excel, '2024-01-31' pour un CSV), pour
+  qu'un historique déjà importé soit mis à jour et non dupliqué
+- upsert Supabase par lots (`batch_size` lignes par appel) au lieu d'un appel par ligne;
+  si un lot est refusé, ses lignes sont renvoyées une à une pour isoler les fautives
+- CSV lu en flux (`pandas.read_csv(chunksize=...)`): un gros fichier n'est jamais chargé en entier
+"""
+
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, IO, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_CSV_CHUNK_ROWS = 5000
+MAX_REPORTED_ERRORS = 200
+OIS_TENORS = (3, 6, 9, 12, 18, 24)
+
+
+@dataclass(frozen=True)
+class BulkSpec:
+    """Description d'un type de données importable"""
+    table: str
+    required: Tuple[str, ...]
+    optional: Tuple[str, ...] = ()
+    on_conflict: str = 'idempotency_key'
+    latest_only: bool = False  # NEER: seule la dernière observation est conservée (snb_config)
+
+
+BULK_SPECS: Dict[str, BulkSpec] = {
+    'cpi': BulkSpec('snb_cpi_data', required=('date', 'yoy_pct'), optional=('mm_pct',)),
+    'kof': BulkSpec('snb_kof_data', required=('date', 'barometer')),
+    'neer': BulkSpec('snb_config', required=('date', 'neer_change_3m_pct'), optional=('neer_value',),
+                     on_conflict='key', latest_only=True),
+    'ois': BulkSpec('snb_ois_data', required=('date',) + tuple(f"ois_{t}m" for t in OIS_TENORS), on_conflict='as_of'),
+}
+
+
+@dataclass
+class BulkReport:
+    """Résultat d'un import: lignes écrites, rejetées (avec raison) et appels effectués"""
+    data_type: str
+    rows: int = 0
+    inserted: int = 0
+    rejected: int = 0
+    duplicates: int = 0
+    batches: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+
+    def reject(self, line: int, message: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': int(line), 'error': message})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'data_type': self.data_type,
+            'rows': self.rows,
+            'inserted': self.inserted,
+            'rejected': self.rejected,
+            'duplicates': self.duplicates,
+            'batches': self.batches,
+            'errors': self.errors,
+            'errors_truncated': self.rejected > len(self.errors),
+        }
+
+
+def _text_column(df: pd.DataFrame, name: str, default: str) -> pd.Series:
+    if name not in df.columns:
+        return pd.Series(default, index=df.index, dtype=object)
+    col = df[name].astype(object).where(df[name].notna(), default)
+    return col.map(lambda v: str(v).strip() or default)
+
+
+def normalize_frame(data_type: str, df: pd.DataFrame, report: BulkReport,
+                    first_line: int = 2) -> List[Tuple[int, Dict[str, Any]]]:
+    """
+    Valide et convertit un bloc du fichier en lignes prêtes pour l'upsert.
+
+    `first_line`: numéro (dans le fichier, en-tête = 1) de la première ligne du bloc.
+    Retourne [(numéro de ligne, enregistrement)], les lignes invalides étant consignées dans `report`.
+    """
+    spec = BULK_SPECS[data_type]
+    df = df.rename(columns=lambda c: str(c).strip().lower())
+    lines = np.arange(first_line, first_line + len(df))
+    report.rows += len(df)
+
+    missing = [c for c in spec.required if c not in df.columns]
+    if missing:
+        for line in lines:
+            report.reject(line, f"Missing column(s): {', '.join(missing)}")
+        return []
+
+    dates = pd.to_datetime(df['date'], errors='coerce')
+    numeric = {c: pd.to_numeric(df[c], errors='coerce') for c in spec.required + spec.optional
+               if c != 'date' and c in df.columns}
+
+    # Raison du rejet, calculée colonne par colonne (première erreur rencontrée)
+    reason = pd.Series('', index=df.index, dtype=object)
+    reason = reason.mask(dates.isna(), 'Invalid or missing date')
+    for c in spec.required:
+        if c == 'date':
+            continue
+        bad = numeric[c].isna() | ~np.isfinite(numeric[c].fillna(0))
+        reason = reason.mask((reason == '') & bad, f"Invalid or missing value for {c}")
+    for c in spec.optional:
+        if c in numeric:
+            bad = df[c].notna() & numeric[c].isna()
+            reason = reason.mask((reason == '') & bad, f"Invalid value for {c}")
+
+    valid = (reason == '').to_numpy()
+    for line, message in zip(lines[~valid], reason[~valid]):
+        report.reject(line, message)
+    if not valid.any():
+        return []
+
+    as_of = dates.dt.strftime('%Y-%m-%d')
+    # str() cellule par cellule (Timestamp Excel → 'AAAA-MM-JJ 00:00:00'), comme l'ancien iterrows
+    date_raw = df['date'].map(str)
+    frame = pd.DataFrame({'line': lines, 'as_of': as_of, 'date_raw': date_raw}, index=df.index)[valid]
+    for c, values in numeric.items():
+        frame[c] = values[valid].astype(object).where(values[valid].notna(), None)
+    frame['provider'] = _text_column(df, 'provider', 'Bulk upload')[valid]
+    frame['source_url'] = _text_column(df, 'source_url', 'Bulk upload')[valid]
+
+    # Même date plusieurs fois dans le fichier: la dernière ligne l'emporte
+    before = len(frame)
+    frame = frame.drop_duplicates(subset='as_of', keep='last')
+    report.duplicates += before - len(frame)
+
+    return [(int(r['line']), _record(data_type, r)) for r in frame.to_dict('records')]
+
+
+def _record(data_type: str, r: Dict[str, Any]) -> Dict[str, Any]:
+    key = f"bulk-{data_type}-{r['date_raw']}"
+    if data_type == 'cpi':
+        return {"provider": r['provider'], "as_of": r['as_of'], "yoy_pct": r['yoy_pct'], "mm_pct": r.get('mm_pct'),
+                "source_url": r['source_url'], "idempotency_key": key}
+    if data_type == 'kof':
+        return {"provider": r['provider'], "as_of": r['as_of'], "barometer": r['barometer'],
+                "source_url": r['source_url'], "idempotency_key": key}
+    if data_type == 'ois':
+        points = [{"tenor_months": t, "rate_pct": r[f"ois_{t}m"]} for t in OIS_TENORS]
+        return {"as_of": r['as_of'], "points": json.dumps(points), "source_url": r['source_url'], "idempotency_key": key}
+    # neer
+    return {"as_of": r['as_of'], "neer_value": r.get('neer_value') if r.get('neer_value') is not None else 100.0,
+            "neer_change_3m_pct": r['neer_change_3m_pct'], "source_url": "Bulk upload", "idempotency_key": key}
+
+
+class BulkIngestor:
+    """Écrit les lignes normalisées dans Supabase par lots"""
+
+    def __init__(self, supabase, data_type: str, batch_size: int = DEFAULT_BATCH_SIZE):
+        if data_type not in BULK_SPECS:
+            raise ValueError(f"Unknown data type: {data_type}")
+        self.supabase = supabase
+        self.data_type = data_type
+        self.spec = BULK_SPECS[data_type]
+        self.batch_size = max(1, int(batch_size))
+        self.report = BulkReport(data_type)
+        self._pending: List[Tuple[int, Dict[str, Any]]] = []
+        self._latest: Optional[Tuple[int, Dict[str, Any]]] = None
+
+    def add_frame(self, df: pd.DataFrame, first_line: int = 2) -> None:
+        rows = normalize_frame(self.data_type, df, self.report, first_line)
+        if self.spec.latest_only:
+            for line, record in rows:
+                if self._latest is None or record['as_of'] >= self._latest[1]['as_of']:
+                    self._latest = (line, record)
+            return
+        self._pending.extend(rows)
+        while len(self._pending) >= self.batch_size:
+            self._write(self._pending[:self.batch_size])
+            self._pending = self._pending[self.batch_size:]
+
+    def finish(self) -> BulkReport:
+        if self.spec.latest_only:
+            if self._latest is not None:
+                line, record = self._latest
+                try:
+                    self._upsert([{"key": "neer_latest", "value": json.dumps(record)}])
+                    # Comme l'import historique: toutes les lignes valides sont comptées comme lues
+                    self.report.inserted = self.report.rows - self.report.rejected - self.report.duplicates
+                except Exception as e:
+                    self.report.reject(line, str(e))
+        else:
+            if self._pending:
+                self._write(self._pending)
+            self._pending = []
+        return self.report
+
+    def _write(self, rows: List[Tuple[int, Dict[str, Any]]]) -> None:
+        # Dates en double d'un bloc CSV à l'autre: une seule ligne par clé dans un même upsert
+        unique: Dict[Any, Tuple[int, Dict[str, Any]]] = {}
+        for line, record in rows:
+            conflict_value = record.get(self.spec.on_conflict, record.get('as_of'))
+            if conflict_value in unique:
+                self.report.duplicates += 1
+            unique[conflict_value] = (line, record)
+        batch = list(unique.values())
+        try:
+            self._upsert([r for _, r in batch])
+            self.report.inserted += len(batch)
+        except Exception as e:
+            logger.warning(f"⚠️ Lot SNB {self.data_type} refusé ({len(batch)} lignes), reprise ligne à ligne: {e}")
+            for line, record in batch:
+                try:
+                    self._upsert([record])
+                    self.report.inserted += 1
+                except Exception as row_error:
+                    self.report.reject(line, str(row_error))
+
+    def _upsert(self, records: List[Dict[str, Any]]) -> None:
+        self.report.batches += 1
+        self.supabase.table(self.spec.table).upsert(records, on_conflict=self.spec.on_conflict).execute()
+
+
+def ingest_frames(supabase, data_type: str, frames: Iterable[pd.DataFrame],
+                  batch_size: int = DEFAULT_BATCH_SIZE) -> BulkReport:
+    """Importe une suite de blocs (DataFrame) consécutifs du même fichier"""
+    ingestor = BulkIngestor(supabase, data_type, batch_size=batch_size)
+    line = 2
+    for frame in frames:
+        ingestor.add_frame(frame, first_line=line)
+        line += len(frame)
+    return ingestor.finish()
+
+
+def ingest_upload(supabase, data_type: str, filename: str, stream: IO[bytes],
+                  batch_size: int = DEFAULT_BATCH_SIZE, csv_chunk_rows: int = DEFAULT_CSV_CHUNK_ROWS) -> BulkReport:
+    """Importe un fichier téléversé: CSV lu en flux par blocs, Excel lu en une fois"""
+    if filename.lower().endswith('.csv'):
+        frames = pd.read_csv(stream, chunksize=max(1, int(csv_chunk_rows)))
+    else:  # xlsx, xls
+        frames = [pd.read_excel(stream)]
+    report = ingest_frames(supabase, data_type, frames, batch_size=batch_size)
+    logger.info(
+        f"📥 Import SNB {data_type}: {report.inserted}/{report.rows} lignes en {report.batches} appels, "
+        f"{report.rejected} rejetées, {report.duplicates} doublons"
+    )
+    return report
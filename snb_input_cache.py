@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Cache des inputs du modèle BNS et mémoïsation des runs.
+
+- instantané des inputs (CPI, KOF, prévisions BNS, OIS, taux directeur, NEER) gardé en mémoire
+  avec la version à laquelle il a été lu; `snb_inputs_version` est un compteur incrémenté par les
+  endpoints `/ingest/*`, l'import groupé et `snb_collect_task` (Redis INCR si configuré, partagé
+  entre web et workers Celery; sinon compteur du process, borné par `max_age`)
+- chargements concurrents regroupés (un seul aller-retour Supabase par version)
+- runs mémoïsés sur l'empreinte des inputs effectifs (après overrides): une requête identique
+  renvoie la ligne `snb_model_runs` déjà enregistrée, sans recalcul ni nouvel insert
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, is_dataclass
+from typing import Any, Callable, Dict, Optional
+
+from request_coalescer import RequestCoalescer
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'inventorysbo:snb_inputs_version'
+RUN_PREFIX = 'inventorysbo:snb_model_run:'
+
+
+def _jsonable(value: Any) -> Any:
+    if is_dataclass(value):
+        return asdict(value)
+    return str(value)
+
+
+def model_fingerprint(inputs: Dict[str, Any], model_version: str = '') -> str:
+    """Empreinte stable des inputs effectifs d'un run (OISPoint sérialisés champ par champ)"""
+    payload = json.dumps({'inputs': inputs, 'model_version': model_version},
+                         sort_keys=True, default=_jsonable, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class SNBInputCache:
+    """Instantané versionné des inputs du modèle + runs mémoïsés par empreinte"""
+
+    def __init__(self, redis_client=None, max_age: float = 300.0, max_runs: int = 256,
+                 run_ttl: int = 30 * 24 * 3600):
+        self.redis = redis_client
+        self.max_age = float(max_age)
+        self.max_runs = max(1, int(max_runs))
+        self.run_ttl = int(run_ttl)
+        self._lock = threading.Lock()
+        self._local_version = 0
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._runs: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._loads = RequestCoalescer(name='snb_inputs', max_inflight=4)
+        self._stats = {'hits': 0, 'misses': 0, 'loads': 0, 'load_s_total': 0.0,
+                       'invalidations': 0, 'run_hits': 0, 'run_misses': 0}
+
+    # --- Version des inputs ------------------------------------------------------
+
+    def version(self) -> int:
+        if self.redis is not None:
+            try:
+                return int(self.redis.get(VERSION_KEY) or 0)
+            except Exception as e:
+                logger.debug(f"Version inputs SNB Redis illisible: {e}")
+        return self._local_version
+
+    def invalidate(self, reason: str = '') -> int:
+        """Incrémente la version: le prochain accès relit Supabase"""
+        version = None
+        if self.redis is not None:
+            try:
+                version = int(self.redis.incr(VERSION_KEY))
+            except Exception as e:
+                logger.debug(f"Incrément Redis impossible, repli local: {e}")
+        with self._lock:
+            self._stats['invalidations'] += 1
+            self._local_version += 1
+            self._snapshot = None
+            if version is None:
+                version = self._local_version
+        logger.debug(f"Version inputs SNB → {version} ({reason})")
+        return version
+
+    # --- Instantané des inputs ---------------------------------------------------
+
+    def snapshot(self, loader: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """
+        Inputs courants: {"version", "fingerprint", "loaded_at", "inputs"}.
+
+        `loader()` n'est appelé que si la version a changé ou si l'instantané a plus de `max_age`
+        secondes; il retourne None quand les données sont incomplètes (rien n'est alors gardé).
+        """
+        version = self.version()
+        with self._lock:
+            snap = self._snapshot
+            if snap is not None and snap['version'] == version and time.time() - snap['loaded_at'] < self.max_age:
+                self._stats['hits'] += 1
+                return snap
+            self._stats['misses'] += 1
+
+        def load():
+            start = time.monotonic()
+            inputs = loader()
+            elapsed = time.monotonic() - start
+            with self._lock:
+                self._stats['loads'] += 1
+                self._stats['load_s_total'] += elapsed
+            if inputs is None:
+                return None
+            fresh = {
+                'version': version,
+                'fingerprint': model_fingerprint(inputs),
+                'loaded_at': time.time(),
+                'inputs': inputs,
+            }
+            with self._lock:
+                # Une invalidation pendant la lecture l'emporte: ne pas réinstaller un instantané périmé
+                if self._snapshot is None or self._snapshot['version'] <= version:
+                    self._snapshot = fresh
+            return fresh
+
+        return self._loads.run(version, load)
+
+    # --- Runs mémoïsés -----------------------------------------------------------
+
+    def lookup_run(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Ligne `snb_model_runs` déjà calculée pour ces inputs, sinon None"""
+        run = None
+        if self.redis is not None:
+            try:
+                raw = self.redis.get(RUN_PREFIX + fingerprint)
+                run = json.loads(raw) if raw else None
+            except Exception:
+                run = None
+        with self._lock:
+            if run is None:
+                run = self._runs.get(fingerprint)
+                if run is not None:
+                    self._runs.move_to_end(fingerprint)
+            self._stats['run_hits' if run is not None else 'run_misses'] += 1
+        return run
+
+    def remember_run(self, fingerprint: str, run: Dict[str, Any]) -> None:
+        if self.redis is not None:
+            try:
+                self.redis.set(RUN_PREFIX + fingerprint, json.dumps(run, default=str), ex=self.run_ttl)
+            except Exception:
+                pass
+        with self._lock:
+            self._runs[fingerprint] = run
+            self._runs.move_to_end(fingerprint)
+            while len(self._runs) > self.max_runs:
+                self._runs.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            snap = self._snapshot
+            return {
+                **self._stats,
+                'load_s_total': round(self._stats['load_s_total'], 4),
+                'hit_rate': round(self._stats['hits'] / lookups, 3) if lookups else None,
+                'snapshot_version': snap['version'] if snap else None,
+                'snapshot_age_s': round(time.time() - snap['loaded_at'], 1) if snap else None,
+                'runs_memoized': len(self._runs),
+                'shared_version': self.redis is not None,
+            }
+
+
+_cache: Optional[SNBInputCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_snb_input_cache() -> SNBInputCache:
+    """Cache du process (version et runs partagés via Redis si configuré)"""
+    global _cache
+    if _cache is not None:
+        return _cache
+    with _cache_lock:
+        if _cache is None:
+            redis_client = None
+            try:
+                from shared_cache import get_redis_cache_tier
+                tier = get_redis_cache_tier()
+                redis_client = tier.client if tier is not None else None
+            except Exception:
+                redis_client = None
+            _cache = SNBInputCache(
+                redis_client=redis_client,
+                max_age=float(os.getenv('SNB_INPUT_CACHE_TTL', '300')),
+            )
+    return _cache
+
+
+def invalidate_snb_inputs(reason: str = '') -> Optional[int]:
+    """À appeler après toute écriture sur les données SNB (best-effort, ne lève jamais)"""
+    try:
+        return get_snb_input_cache().invalidate(reason)
+    except Exception as e:
+        logger.warning(f"⚠️ Inputs SNB non invalidés ({reason}): {e}")
+        return None
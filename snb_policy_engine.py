@@ -7,6 +7,7 @@ Architecture:
 - Règle de Taylor augmentée (avec NEER)
 - Fusion Kalman (règle + marché)
 - Probabilités décision (cut/hold/hike)
+- Grille de scénarios vectorisée (surfaces de probabilités, fan charts)
 """
 
 import numpy as np
@@ -21,6 +22,12 @@ LOWER_BOUND = 0.0       # Effective lower bound
 DEFAULT_KAPPA = 0.25    # Vitesse convergence Kalman
 DEFAULT_Q = 0.003       # Variance processus
 DEFAULT_R = 0.006       # Variance observation
+MODEL_VERSION = "bns-model-2025.09"
+MAX_GRID_SCENARIOS = 250_000
+MAX_GRID_MONTHS = 120                            # horizon maximal d'une grille (10 ans)
+MAX_GRID_CELLS = MAX_GRID_SCENARIOS * 24         # scénarios × mois: taille des matrices (S, months)
+GRID_AXES = ("cpi_yoy_pct", "kof_barometer", "neer_change_3m_pct", "policy_rate_now_pct")
+DEFAULT_FAN_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
 
 # === MODÈLES DE DONNÉES ===
 @dataclass
@@ -185,30 +192,63 @@ def kalman_fuse(
     Returns:
         Tuple (fused_path, variance_path)
     """
-    n = len(rule_path)
-    x = rule_path[0]  # État initial = règle mois 1
-    P = 0.05          # Variance initiale
+    fused, var = kalman_fuse_batch(np.asarray(rule_path, dtype=float)[None, :], market_path, kappa, q, r)
+    return fused[0], var
+
+
+def kalman_gains(n: int, q: float = DEFAULT_Q, r: float = DEFAULT_R, P0: float = 0.05) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Gains de Kalman et variances a posteriori sur n mois
     
-    fused = np.zeros(n)
-    var = np.zeros(n)
+    La variance ne dépend pas des observations: elle est identique pour tous les scénarios
+    et n'est calculée qu'une fois.
     
+    Returns:
+        Tuple (gains, variance_path)
+    """
+    gains = np.empty(n)
+    var = np.empty(n)
+    P = P0
     for t in range(n):
-        # Prédiction
-        if t > 0:
-            x_pred = x + kappa * (rule_path[t - 1] - x)
-        else:
-            x_pred = x
         P_pred = P + q
-        
-        # Mise à jour (observation = marché)
-        z = market_path[t]
         K = P_pred / (P_pred + r)  # Gain de Kalman
-        x = x_pred + K * (z - x_pred)
         P = (1 - K) * P_pred
-        
-        fused[t] = x
+        gains[t] = K
         var[t] = P
+    return gains, var
+
+
+def kalman_fuse_batch(
+    rule_paths: np.ndarray,
+    market_paths: np.ndarray,
+    kappa: float = DEFAULT_KAPPA,
+    q: float = DEFAULT_Q,
+    r: float = DEFAULT_R
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fusion Kalman de S scénarios à la fois (récursion vectorisée sur l'axe des scénarios)
+    
+    Args:
+        rule_paths: Chemins règle de Taylor, shape (S, n)
+        market_paths: Chemin(s) marché, shape (n,) ou (S, n)
+        kappa, q, r: voir kalman_fuse
+    
+    Returns:
+        Tuple (fused_paths (S, n), variance_path (n,))
+    """
+    rule = np.atleast_2d(np.asarray(rule_paths, dtype=float))
+    market = np.broadcast_to(np.asarray(market_paths, dtype=float), rule.shape)
+    n_scenarios, n = rule.shape
+    gains, var = kalman_gains(n, q, r)
     
+    x = rule[:, 0].copy()  # État initial = règle mois 1
+    fused = np.empty((n_scenarios, n))
+    for t in range(n):
+        # Prédiction
+        x_pred = x + kappa * (rule[:, t - 1] - x) if t > 0 else x
+        # Mise à jour (observation = marché)
+        x = x_pred + gains[t] * (market[:, t] - x_pred)
+        fused[:, t] = x
     return fused, var
 
 
@@ -249,6 +289,187 @@ def decision_probs(i_now: float, i_star_next: float) -> DecisionProbs:
         return DecisionProbs(cut=0.0, hold=1.0, hike=0.0)
 
 
+def taylor_augmented_batch(
+    pi_exp: np.ndarray,
+    ygap: np.ndarray,
+    d_neer: np.ndarray,
+    beta_pi: float = 1.5,
+    beta_y: float = 0.5,
+    beta_fx: float = 0.05,
+    alpha: float = 0.0
+) -> np.ndarray:
+    """Règle de Taylor augmentée sur des tableaux d'inputs (même formule que taylor_augmented)"""
+    i_star = (alpha + beta_pi * (np.asarray(pi_exp, dtype=float) - TARGET_INFLATION)
+              + beta_y * np.asarray(ygap, dtype=float) + beta_fx * np.asarray(d_neer, dtype=float))
+    return np.maximum(LOWER_BOUND, i_star)
+
+
+def rule_paths_batch(policy_rate_now: np.ndarray, i_star: np.ndarray, months: int = 24) -> np.ndarray:
+    """Chemins règle (S, months): transition sigmoïde de i_now vers i* pour chaque scénario"""
+    t = np.arange(months)
+    trans = 1.0 / (1.0 + np.exp(-(t - 6) / 2.5))  # Transition progressive sur 6-9 mois
+    i_now = np.asarray(policy_rate_now, dtype=float)[:, None]
+    return i_now + (np.asarray(i_star, dtype=float)[:, None] - i_now) * trans[None, :]
+
+
+def decision_probs_batch(i_now: np.ndarray, i_star_next: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Probabilités (cut, hold, hike) sur des tableaux (même formule que decision_probs)"""
+    diff = np.asarray(i_star_next, dtype=float) - np.asarray(i_now, dtype=float)
+    scale = 0.05
+    with np.errstate(over='ignore'):
+        p_hike = 1 / (1 + np.exp(-(diff - 0.125) / scale))
+        p_cut = 1 / (1 + np.exp(-(-diff - 0.125) / scale))
+    p_hold = np.maximum(0.0, 1 - (p_hike + p_cut))
+    total = p_hike + p_cut + p_hold
+    return p_cut / total, p_hold / total, p_hike / total
+
+
+def scenario_axis(spec: Any, base: float) -> np.ndarray:
+    """
+    Valeurs d'un axe de la grille
+    
+    Formats acceptés:
+        None                                → [base]
+        0.4 / [0.2, 0.4, 0.6]               → valeurs explicites
+        {"start": 0, "stop": 1, "step": 0.1} → plage (bornes incluses)
+        {"min": 95, "max": 105, "n": 21}    → n points équidistants
+        {"shifts": [-0.2, 0, 0.2]}          → base + écarts ("et si le CPI sort 0.2 plus haut")
+    """
+    if spec is None:
+        values = [base]
+    elif isinstance(spec, (int, float)):
+        values = [spec]
+    elif isinstance(spec, (list, tuple)):
+        values = spec
+    elif isinstance(spec, dict) and "shifts" in spec:
+        values = [base + float(s) for s in spec["shifts"]]
+    elif isinstance(spec, dict) and {"start", "stop", "step"} <= set(spec):
+        step = float(spec["step"])
+        if step <= 0:
+            raise ValueError("step must be > 0")
+        values = np.arange(float(spec["start"]), float(spec["stop"]) + step / 2, step)
+    elif isinstance(spec, dict) and {"min", "max", "n"} <= set(spec):
+        values = np.linspace(float(spec["min"]), float(spec["max"]), int(spec["n"]))
+    else:
+        raise ValueError(f"Invalid axis specification: {spec!r}")
+    axis = np.round(np.asarray(values, dtype=float), 10)
+    if axis.size == 0 or not np.all(np.isfinite(axis)):
+        raise ValueError(f"Empty or non-finite axis: {spec!r}")
+    return axis
+
+
+def run_scenario_grid(
+    base: Dict[str, float],
+    snb_forecast: Dict[str, float],
+    ois_points: List[OISPoint],
+    axes: Optional[Dict[str, Any]] = None,
+    months: int = 24,
+    surface: Optional[Tuple[str, str]] = None,
+    quantiles: Tuple[float, ...] = DEFAULT_FAN_QUANTILES,
+    as_of_date: Optional[date] = None
+) -> Dict[str, Any]:
+    """
+    Évalue toutes les combinaisons des axes CPI/KOF/NEER/taux directeur en un seul passage vectorisé
+    
+    Args:
+        base: Inputs de référence {"cpi_yoy_pct", "kof_barometer", "neer_change_3m_pct", "policy_rate_now_pct"}
+        snb_forecast: Prévisions BNS {"2025": 0.2, ...}
+        ois_points: Points de la courbe OIS (chemin marché commun à tous les scénarios)
+        axes: {nom d'axe: spécification} (voir scenario_axis); axe absent = valeur de base
+        months: Horizon de projection (1 à MAX_GRID_MONTHS; scénarios × mois ≤ MAX_GRID_CELLS)
+        surface: Couple d'axes de la surface de probabilités (défaut: deux premiers axes variables)
+        quantiles: Quantiles du fan chart (sur l'axe des scénarios)
+    
+    Returns:
+        Dict JSON: axes, surfaces de probabilités (moyenne sur les autres axes), fan chart du chemin fusionné
+    """
+    if as_of_date is None:
+        as_of_date = date.today()
+    if not 1 <= months <= MAX_GRID_MONTHS:
+        raise ValueError(f"months must be between 1 and {MAX_GRID_MONTHS}: {months}")
+    axes = axes or {}
+    unknown = set(axes) - set(GRID_AXES)
+    if unknown:
+        raise ValueError(f"Unknown axis: {', '.join(sorted(unknown))}")
+    values = {name: scenario_axis(axes.get(name), float(base.get(name, 0.0))) for name in GRID_AXES}
+    shape = tuple(len(values[name]) for name in GRID_AXES)
+    n_scenarios = int(np.prod(shape))
+    if n_scenarios > MAX_GRID_SCENARIOS:
+        raise ValueError(f"Too many scenarios: {n_scenarios} > {MAX_GRID_SCENARIOS}")
+    if n_scenarios * months > MAX_GRID_CELLS:
+        raise ValueError(f"Grid too large: {n_scenarios} scenarios x {months} months > {MAX_GRID_CELLS}")
+    
+    grid = np.meshgrid(*(values[name] for name in GRID_AXES), indexing="ij")
+    cpi, kof, neer, i_now = (g.ravel() for g in grid)
+    
+    # 1-3. Nowcast (pi_12m), output gap et règle de Taylor pour tous les scénarios
+    years = sorted([int(y) for y in snb_forecast.keys()])[-2:] if snb_forecast else []
+    mid = np.mean([snb_forecast[str(y)] for y in years]) if years else TARGET_INFLATION
+    pi_12m = 0.3 * cpi + 0.7 * mid
+    ygap = 0.5 * (kof - 100.0)
+    i_star = taylor_augmented_batch(pi_12m, ygap, neer)
+    
+    # 4. Chemins règle, marché commun, fusion Kalman
+    rule = rule_paths_batch(i_now, i_star, months)
+    market = interp_monthly(ois_points, months=months)
+    fused, var = kalman_fuse_batch(rule, market)
+    
+    # 5. Probabilités de décision
+    p_cut, p_hold, p_hike = decision_probs_batch(i_now, i_star)
+    
+    # Surface: moyenne sur les axes hors surface (pondération uniforme de la grille)
+    varying = [name for name in GRID_AXES if len(values[name]) > 1]
+    if surface is None:
+        surface = tuple((varying + [n for n in GRID_AXES if n not in varying])[:2])
+    if len(surface) != 2 or surface[0] == surface[1] or not set(surface) <= set(GRID_AXES):
+        raise ValueError(f"Invalid surface axes: {surface!r}")
+    ix, iy = GRID_AXES.index(surface[0]), GRID_AXES.index(surface[1])
+    other = tuple(i for i in range(len(GRID_AXES)) if i not in (ix, iy))
+    
+    def _surface(arr: np.ndarray) -> List[List[float]]:
+        cube = arr.reshape(shape).mean(axis=other)
+        # Après la moyenne, les axes restants sont dans l'ordre de GRID_AXES
+        if ix > iy:
+            cube = cube.T
+        return np.round(cube, 6).tolist()
+    
+    qs = np.asarray(quantiles, dtype=float)
+    fused_q = np.quantile(fused, qs, axis=0)
+    rule_q = np.quantile(rule, qs, axis=0)
+    labels = [f"p{int(round(q * 100)):02d}" for q in qs]
+    
+    return {
+        "as_of": as_of_date.isoformat(),
+        "version": MODEL_VERSION,
+        "months": months,
+        "scenarios": n_scenarios,
+        "axes": {name: values[name].tolist() for name in GRID_AXES},
+        "base": {name: float(base.get(name, 0.0)) for name in GRID_AXES},
+        "i_star_next_pct": {
+            "min": float(i_star.min()), "mean": float(i_star.mean()), "max": float(i_star.max())
+        },
+        "probs": {"cut": float(p_cut.mean()), "hold": float(p_hold.mean()), "hike": float(p_hike.mean())},
+        "probability_surface": {
+            "x": surface[0],
+            "y": surface[1],
+            "x_values": values[surface[0]].tolist(),
+            "y_values": values[surface[1]].tolist(),
+            "cut": _surface(p_cut),
+            "hold": _surface(p_hold),
+            "hike": _surface(p_hike),
+            "i_star": _surface(i_star),
+        },
+        "fan_chart": {
+            "month_ahead": list(range(1, months + 1)),
+            "quantiles": qs.tolist(),
+            "fused": {label: np.round(fused_q[k], 6).tolist() for k, label in enumerate(labels)},
+            "rule": {label: np.round(rule_q[k], 6).tolist() for k, label in enumerate(labels)},
+            "market": np.round(market, 6).tolist(),
+            "kalman_var": np.round(var, 6).tolist(),
+        },
+    }
+
+
 # === FONCTION PRINCIPALE ===
 
 def run_model(
@@ -348,7 +569,7 @@ def run_model(
             }
             for p in path
         ],
-        version="bns-model-2025.09"
+        version=MODEL_VERSION
     )
 
 
@@ -7,18 +7,27 @@ Endpoints:
 - POST /api/snb/ingest/snb-forecast
 - POST /api/snb/ingest/ois
 - POST /api/snb/model/run
+- POST /api/snb/model/grid
 - GET  /api/snb/model/latest
+- GET  /api/snb/model/cache/stats
 - POST /api/snb/explain
 """
 
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date
 from typing import Dict, Any, Optional
 from flask import Blueprint, request, jsonify
+from snb_bulk_ingest import BULK_SPECS, ingest_upload
+from snb_input_cache import get_snb_input_cache, invalidate_snb_inputs, model_fingerprint
 from snb_policy_engine import (
     run_model,
+    run_scenario_grid,
+    GRID_AXES,
+    DEFAULT_FAN_QUANTILES,
     model_output_to_dict,
+    MODEL_VERSION,
     parse_ois_points_from_db,
     OISPoint
 )
@@ -68,6 +77,116 @@ def validate_idempotency_key(table_name: str, idempotency_key: str) -> bool:
         return False
 
 
+def load_model_inputs(supabase) -> Optional[Dict[str, Any]]:
+    """
+    Dernières données du modèle (CPI, KOF, prévisions BNS, OIS, taux directeur, NEER)
+    
+    Les cinq requêtes (dont les deux clés snb_config en une seule) partent en parallèle.
+    Préférer get_model_inputs(), qui garde l'instantané en mémoire jusqu'à la prochaine ingestion.
+    
+    Returns:
+        Dict des inputs de base, ou None s'il manque CPI/KOF/SNB/OIS
+    """
+    # Récupérer les dernières données PAR ORDRE D'INSERTION (created_at)
+    # Garantit qu'on utilise les données les plus récemment saisies
+    queries = {
+        "cpi": lambda: supabase.table("snb_cpi_data").select("*").order("created_at", desc=True).limit(1).execute(),
+        "kof": lambda: supabase.table("snb_kof_data").select("*").order("created_at", desc=True).limit(1).execute(),
+        "snb": lambda: supabase.table("snb_forecasts").select("*").order("created_at", desc=True).limit(1).execute(),
+        "ois": lambda: supabase.table("snb_ois_data").select("*").order("created_at", desc=True).limit(1).execute(),
+        "config": lambda: supabase.table("snb_config").select("key,value").in_("key", ["policy_rate_now_pct", "neer_latest"]).execute(),
+    }
+    with ThreadPoolExecutor(max_workers=len(queries)) as pool:
+        futures = {name: pool.submit(query) for name, query in queries.items()}
+        rows = {name: future.result().data for name, future in futures.items()}
+    
+    if not (rows["cpi"] and rows["kof"] and rows["snb"] and rows["ois"]):
+        return None
+    config = {row["key"]: row["value"] for row in rows["config"] or []}
+    
+    # Parse les données
+    cpi = rows["cpi"][0]
+    kof = rows["kof"][0]
+    snb = rows["snb"][0]
+    ois = rows["ois"][0]
+    
+    # Parse forecast (JSON ou dict)
+    snb_forecast = snb["forecast"]
+    if isinstance(snb_forecast, str):
+        snb_forecast = json.loads(snb_forecast)
+    
+    # Policy rate actuel (depuis config) - normalisation
+    policy_rate_now = 0.0
+    if "policy_rate_now_pct" in config:
+        policy_value = config["policy_rate_now_pct"]
+        if isinstance(policy_value, (int, float)):
+            policy_rate_now = float(policy_value)
+        elif isinstance(policy_value, str):
+            try:
+                parsed = json.loads(policy_value)
+                if isinstance(parsed, (int, float)):
+                    policy_rate_now = float(parsed)
+                elif isinstance(parsed, dict):
+                    policy_rate_now = float(parsed.get('value', 0.0))
+            except:
+                policy_rate_now = float(policy_value) if policy_value else 0.0
+        elif isinstance(policy_value, dict):
+            policy_rate_now = float(policy_value.get('value', policy_value))
+    
+    # NEER (depuis config) - normalisation
+    neer_from_db = 0.0
+    if "neer_latest" in config:
+        neer_value = config["neer_latest"]
+        if isinstance(neer_value, str):
+            try:
+                neer_value = json.loads(neer_value)
+            except:
+                neer_from_db = 0.0
+        if isinstance(neer_value, dict):
+            neer_from_db = float(neer_value.get("neer_change_3m_pct", 0.0))
+        elif isinstance(neer_value, (int, float)):
+            neer_from_db = float(neer_value)
+    
+    return {
+        "as_of": ois["as_of"],
+        "cpi_yoy_pct": cpi["yoy_pct"],
+        "kof_barometer": kof["barometer"],
+        "policy_rate_now_pct": policy_rate_now,
+        "neer_change_3m_pct": neer_from_db,
+        "snb_forecast": snb_forecast,
+        "ois_points": parse_ois_points_from_db(ois),
+    }
+
+
+
+def get_model_inputs(supabase) -> Optional[Dict[str, Any]]:
+    """
+    Instantané en cache des inputs (voir snb_input_cache): relu seulement après une ingestion
+    ou une collecte (version incrémentée), ou au-delà de SNB_INPUT_CACHE_TTL secondes
+    
+    Returns:
+        {"version", "fingerprint", "loaded_at", "inputs"}, ou None s'il manque CPI/KOF/SNB/OIS
+    """
+    return get_snb_input_cache().snapshot(lambda: load_model_inputs(supabase))
+
+
+def run_row_to_output(run: Dict[str, Any]) -> Dict[str, Any]:
+    """Ligne snb_model_runs → dict du modèle (champs JSONB éventuellement sérialisés en texte)"""
+    def _json(value):
+        return json.loads(value) if isinstance(value, str) else value
+    
+    return {
+        "as_of": run["as_of"],
+        "inputs": _json(run["inputs"]),
+        "nowcast": _json(run["nowcast"]),
+        "output_gap_pct": run["output_gap_pct"],
+        "i_star_next_pct": run["i_star_next_pct"],
+        "probs": _json(run["probs"]),
+        "path": _json(run["path"]),
+        "version": run["version"]
+    }
+
+
 # === ENDPOINTS INGESTION ===
 
 @snb_bp.route('/ingest/cpi', methods=['POST'])
@@ -109,6 +228,7 @@ def ingest_cpi():
             "idempotency_key": data["idempotency_key"]
         }, on_conflict="idempotency_key").execute()
         
+        invalidate_snb_inputs("ingest cpi")
         return jsonify({"success": True, "id": result.data[0]["id"]}), 200
     
     except Exception as e:
@@ -150,6 +270,7 @@ def ingest_kof():
             "idempotency_key": data["idempotency_key"]
         }, on_conflict="idempotency_key").execute()
         
+        invalidate_snb_inputs("ingest kof")
         return jsonify({"success": True, "id": result.data[0]["id"]}), 200
     
     except Exception as e:
@@ -191,6 +312,7 @@ def ingest_snb_forecast():
             "idempotency_key": data["idempotency_key"]
         }, on_conflict="idempotency_key").execute()
         
+        invalidate_snb_inputs("ingest snb-forecast")
         return jsonify({"success": True, "id": result.data[0]["id"]}), 200
     
     except Exception as e:
@@ -238,6 +360,7 @@ def ingest_ois():
             "idempotency_key": data["idempotency_key"]
         }, on_conflict="as_of").execute()
         
+        invalidate_snb_inputs("ingest ois")
         return jsonify({"success": True, "id": result.data[0]["id"]}), 200
     
     except Exception as e:
@@ -283,6 +406,7 @@ def ingest_neer():
             })
         }).execute()
         
+        invalidate_snb_inputs("ingest neer")
         return jsonify({"success": True, "message": "NEER updated"}), 200
     
     except Exception as e:
@@ -310,88 +434,46 @@ def model_run():
         if not supabase:
             return jsonify({"success": False, "error": "Supabase not available"}), 500
         
-        # Récupérer les dernières données PAR ORDRE D'INSERTION (created_at)
-        # Garantit qu'on utilise les données les plus récemment saisies
-        cpi_data = supabase.table("snb_cpi_data").select("*").order("created_at", desc=True).limit(1).execute()
-        kof_data = supabase.table("snb_kof_data").select("*").order("created_at", desc=True).limit(1).execute()
-        snb_data = supabase.table("snb_forecasts").select("*").order("created_at", desc=True).limit(1).execute()
-        ois_data = supabase.table("snb_ois_data").select("*").order("created_at", desc=True).limit(1).execute()
-        
-        if not (cpi_data.data and kof_data.data and snb_data.data and ois_data.data):
+        snapshot = get_model_inputs(supabase)
+        if snapshot is None:
             return jsonify({"success": False, "error": "Insufficient data (missing CPI/KOF/SNB/OIS)"}), 400
-        
-        # Parse les données
-        cpi = cpi_data.data[0]
-        kof = kof_data.data[0]
-        snb = snb_data.data[0]
-        ois = ois_data.data[0]
-        
-        # Parse forecast (JSON ou dict)
-        snb_forecast = snb["forecast"]
-        if isinstance(snb_forecast, str):
-            snb_forecast = json.loads(snb_forecast)
-        
-        # Parse OIS points
-        ois_points = parse_ois_points_from_db(ois)
+        inputs = snapshot["inputs"]
         
         # Overrides depuis request
         data = request.get_json() or {}
         overrides = data.get("overrides", {})
         
-        cpi_yoy = overrides.get("cpi_yoy_pct", cpi["yoy_pct"])
-        kof_bar = overrides.get("kof_barometer", kof["barometer"])
-        neer = overrides.get("neer_change_3m_pct", 0.0)
-        
-        # Policy rate actuel (depuis config ou override) - normalisation
-        policy_config = supabase.table("snb_config").select("value").eq("key", "policy_rate_now_pct").execute()
-        policy_rate_now = 0.0
-        if policy_config.data:
-            policy_value = policy_config.data[0]["value"]
-            if isinstance(policy_value, (int, float)):
-                policy_rate_now = float(policy_value)
-            elif isinstance(policy_value, str):
-                try:
-                    parsed = json.loads(policy_value)
-                    if isinstance(parsed, (int, float)):
-                        policy_rate_now = float(parsed)
-                    elif isinstance(parsed, dict):
-                        policy_rate_now = float(parsed.get('value', 0.0))
-                except:
-                    policy_rate_now = float(policy_value) if policy_value else 0.0
-            elif isinstance(policy_value, dict):
-                policy_rate_now = float(policy_value.get('value', policy_value))
-        policy_rate_now = overrides.get("policy_rate_now_pct", policy_rate_now)
-        
-        # NEER (depuis config ou override) - normalisation
-        neer_config = supabase.table("snb_config").select("value").eq("key", "neer_latest").execute()
-        neer_from_db = 0.0
-        if neer_config.data:
-            neer_value = neer_config.data[0]["value"]
-            if isinstance(neer_value, str):
-                try:
-                    neer_value = json.loads(neer_value)
-                except:
-                    neer_from_db = 0.0
-            if isinstance(neer_value, dict):
-                neer_from_db = float(neer_value.get("neer_change_3m_pct", 0.0))
-            elif isinstance(neer_value, (int, float)):
-                neer_from_db = float(neer_value)
-        neer = overrides.get("neer_change_3m_pct", neer_from_db)
+        effective = {
+            "cpi_yoy_pct": float(overrides.get("cpi_yoy_pct", inputs["cpi_yoy_pct"])),
+            "kof_barometer": float(overrides.get("kof_barometer", inputs["kof_barometer"])),
+            "policy_rate_now_pct": float(overrides.get("policy_rate_now_pct", inputs["policy_rate_now_pct"])),
+            "neer_change_3m_pct": float(overrides.get("neer_change_3m_pct", inputs["neer_change_3m_pct"])),
+            "snb_forecast": inputs["snb_forecast"],
+            "ois_points": inputs["ois_points"],
+            "as_of": inputs["as_of"],
+        }
+        
+        # Mêmes inputs effectifs → run déjà enregistré (ni recalcul ni nouvel insert)
+        cache = get_snb_input_cache()
+        fingerprint = model_fingerprint(effective, MODEL_VERSION)
+        memo = cache.lookup_run(fingerprint)
+        if memo is not None:
+            return jsonify({"success": True, "result": memo["result"], "run_id": memo.get("run_id"), "cached": True}), 200
         
         # Run modèle
         result = run_model(
-            cpi_yoy=float(cpi_yoy),
-            kof=float(kof_bar),
-            snb_forecast=snb_forecast,
-            ois_points=ois_points,
-            policy_rate_now=float(policy_rate_now),
-            neer_change_3m=float(neer),
-            as_of_date=date.fromisoformat(ois["as_of"])
+            cpi_yoy=effective["cpi_yoy_pct"],
+            kof=effective["kof_barometer"],
+            snb_forecast=effective["snb_forecast"],
+            ois_points=effective["ois_points"],
+            policy_rate_now=effective["policy_rate_now_pct"],
+            neer_change_3m=effective["neer_change_3m_pct"],
+            as_of_date=date.fromisoformat(effective["as_of"])
         )
         
         # Sauvegarder dans snb_model_runs
         output_dict = model_output_to_dict(result)
-        supabase.table("snb_model_runs").insert({
+        inserted = supabase.table("snb_model_runs").insert({
             "as_of": output_dict["as_of"],
             "inputs": json.dumps(output_dict["inputs"]),
             "nowcast": json.dumps(output_dict["nowcast"]),
@@ -402,7 +484,62 @@ def model_run():
             "version": output_dict["version"]
         }).execute()
         
-        return jsonify({"success": True, "result": output_dict}), 200
+        run_id = inserted.data[0].get("id") if getattr(inserted, "data", None) else None
+        cache.remember_run(fingerprint, {"run_id": run_id, "result": output_dict})
+        
+        return jsonify({"success": True, "result": output_dict, "run_id": run_id, "cached": False}), 200
+    
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@snb_bp.route('/model/grid', methods=['POST'])
+def model_grid():
+    """
+    POST /api/snb/model/grid
+    
+    Grille de scénarios évaluée en un seul appel (voir snb_policy_engine.run_scenario_grid)
+    
+    Body: {
+        "axes": {
+            "cpi_yoy_pct": {"shifts": [-0.2, 0, 0.2]},        // écarts à la dernière valeur
+            "kof_barometer": {"min": 95, "max": 105, "n": 21},
+            "neer_change_3m_pct": [-2, 0, 2],
+            "policy_rate_now_pct": 0.0
+        },
+        "surface": ["cpi_yoy_pct", "kof_barometer"],          // optionnel
+        "quantiles": [0.05, 0.5, 0.95],                        // optionnel
+        "months": 24                                           // optionnel
+    }
+    """
+    try:
+        supabase = get_supabase_client()
+        if not supabase:
+            return jsonify({"success": False, "error": "Supabase not available"}), 500
+        
+        snapshot = get_model_inputs(supabase)
+        if snapshot is None:
+            return jsonify({"success": False, "error": "Insufficient data (missing CPI/KOF/SNB/OIS)"}), 400
+        inputs = snapshot["inputs"]
+        
+        data = request.get_json() or {}
+        try:
+            result = run_scenario_grid(
+                base={name: float(inputs[name]) for name in GRID_AXES},
+                snb_forecast=inputs["snb_forecast"],
+                ois_points=inputs["ois_points"],
+                axes=data.get("axes") or {},
+                months=int(data.get("months", 24)),
+                surface=tuple(data["surface"]) if data.get("surface") else None,
+                quantiles=tuple(data.get("quantiles") or DEFAULT_FAN_QUANTILES),
+                as_of_date=date.fromisoformat(inputs["as_of"])
+            )
+        except (TypeError, ValueError) as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        
+        return jsonify({"success": True, "result": result}), 200
     
     except Exception as e:
         import traceback
@@ -410,6 +547,19 @@ def model_run():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@snb_bp.route('/model/cache/stats', methods=['GET'])
+def model_cache_stats():
+    """
+    GET /api/snb/model/cache/stats
+    
+    Statistiques du cache des inputs (version, âge de l'instantané, hits) et des runs mémoïsés
+    """
+    try:
+        return jsonify({"success": True, "stats": get_snb_input_cache().stats()}), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
 @snb_bp.route('/model/latest', methods=['GET'])
 def model_latest():
     """
@@ -427,19 +577,8 @@ def model_latest():
         if not result.data:
             return jsonify({"success": False, "error": "No model run found"}), 404
         
-        run = result.data[0]
-        
         # Parse JSONB fields
-        output = {
-            "as_of": run["as_of"],
-            "inputs": json.loads(run["inputs"]) if isinstance(run["inputs"], str) else run["inputs"],
-            "nowcast": json.loads(run["nowcast"]) if isinstance(run["nowcast"], str) else run["nowcast"],
-            "output_gap_pct": run["output_gap_pct"],
-            "i_star_next_pct": run["i_star_next_pct"],
-            "probs": json.loads(run["probs"]) if isinstance(run["probs"], str) else run["probs"],
-            "path": json.loads(run["path"]) if isinstance(run["path"], str) else run["path"],
-            "version": run["version"]
-        }
+        output = run_row_to_output(result.data[0])
         
         return jsonify({"success": True, "result": output}), 200
     
@@ -654,6 +793,8 @@ def manual_ingest_all():
                 "value": policy_rate  # Stocker directement le float, pas json.dumps()
             }).execute()
         
+        invalidate_snb_inputs("manual ingest-all")
+        
         # 7. UTILISER DIRECTEMENT LES DONNÉES DU FORMULAIRE (pas de Supabase)
         # Cela évite tout problème de récupération/tri/cache
         try:
@@ -756,7 +897,8 @@ def bulk_upload(data_type):
     """
     POST /api/snb/bulk/upload-cpi (ou kof, neer, ois)
     
-    Upload bulk de données historiques via XLS/CSV
+    Upload bulk de données historiques via XLS/CSV (voir snb_bulk_ingest).
+    Réponse: lignes importées/rejetées et, par ligne rejetée, {"row": n° de ligne du fichier, "error": raison}
     """
     try:
         if 'file' not in request.files:
@@ -766,80 +908,32 @@ def bulk_upload(data_type):
         if file.filename == '':
             return jsonify({"success": False, "error": "Empty filename"}), 400
         
-        # Parse Excel/CSV
-        import pandas as pd
-        import io
-        
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(file.read()))
-        else:  # xlsx, xls
-            df = pd.read_excel(io.BytesIO(file.read()))
+        if data_type not in BULK_SPECS:
+            return jsonify({"success": False, "error": f"Unknown data type: {data_type}"}), 400
         
         supabase = get_supabase_client()
         if not supabase:
             return jsonify({"success": False, "error": "Supabase not available"}), 500
         
-        inserted = 0
+        # Validation vectorisée, upsert par lots; CSV lu en flux sans charger tout le fichier
+        report = ingest_upload(
+            supabase,
+            data_type,
+            file.filename,
+            file.stream,
+            batch_size=int(os.getenv("SNB_BULK_BATCH_SIZE", "500")),
+            csv_chunk_rows=int(os.getenv("SNB_BULK_CSV_CHUNK_ROWS", "5000"))
+        ).to_dict()
         
-        # Ingestion selon le type
-        if data_type == 'cpi':
-            for _, row in df.iterrows():
-                supabase.table("snb_cpi_data").upsert({
-                    "provider": row.get('provider', 'Bulk upload'),
-                    "as_of": str(row['date']),
-                    "yoy_pct": float(row['yoy_pct']),
-                    "mm_pct": float(row['mm_pct']) if pd.notna(row.get('mm_pct')) else None,
-                    "source_url": row.get('source_url', 'Bulk upload'),
-                    "idempotency_key": f"bulk-cpi-{row['date']}"
-                }, on_conflict="idempotency_key").execute()
-                inserted += 1
+        if report["inserted"]:
+            invalidate_snb_inputs(f"bulk upload {data_type}")
         
-        elif data_type == 'kof':
-            for _, row in df.iterrows():
-                supabase.table("snb_kof_data").upsert({
-                    "provider": row.get('provider', 'Bulk upload'),
-                    "as_of": str(row['date']),
-                    "barometer": float(row['barometer']),
-                    "source_url": row.get('source_url', 'Bulk upload'),
-                    "idempotency_key": f"bulk-kof-{row['date']}"
-                }, on_conflict="idempotency_key").execute()
-                inserted += 1
-        
-        elif data_type == 'neer':
-            # Pour NEER, on stocke juste la dernière valeur dans config
-            last_row = df.iloc[-1]
-            supabase.table("snb_config").upsert({
-                "key": "neer_latest",
-                "value": json.dumps({
-                    "as_of": str(last_row['date']),
-                    "neer_value": float(last_row.get('neer_value', 100.0)),
-                    "neer_change_3m_pct": float(last_row['neer_change_3m_pct']),
-                    "source_url": "Bulk upload",
-                    "idempotency_key": f"bulk-neer-{last_row['date']}"
-                })
-            }).execute()
-            inserted = len(df)
-        
-        elif data_type == 'ois':
-            for _, row in df.iterrows():
-                # Chaque ligne = 1 observation avec 6 points
-                points = [
-                    {"tenor_months": 3, "rate_pct": float(row['ois_3m'])},
-                    {"tenor_months": 6, "rate_pct": float(row['ois_6m'])},
-                    {"tenor_months": 9, "rate_pct": float(row['ois_9m'])},
-                    {"tenor_months": 12, "rate_pct": float(row['ois_12m'])},
-                    {"tenor_months": 18, "rate_pct": float(row['ois_18m'])},
-                    {"tenor_months": 24, "rate_pct": float(row['ois_24m'])}
-                ]
-                supabase.table("snb_ois_data").upsert({
-                    "as_of": str(row['date']),
-                    "points": json.dumps(points),
-                    "source_url": row.get('source_url', 'Bulk upload'),
-                    "idempotency_key": f"bulk-ois-{row['date']}"
-                }, on_conflict="as_of").execute()
-                inserted += 1
-        
-        return jsonify({"success": True, "inserted": inserted, "message": f"{inserted} lignes importées"}), 200
+        status = 200 if report["inserted"] or not report["rejected"] else 400
+        return jsonify({
+            "success": status == 200,
+            **report,
+            "message": f"{report['inserted']} lignes importées, {report['rejected']} rejetées"
+        }), status
     
     except Exception as e:
         import traceback
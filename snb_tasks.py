@@ -39,6 +39,10 @@ def snb_collect_task(self, mode: str = 'monthly'):
         try:
             stdout, stderr = process.communicate(timeout=180)
             
+            # Le scraper a pu écrire de nouvelles données (même en cas d'échec partiel)
+            from snb_input_cache import invalidate_snb_inputs
+            invalidate_snb_inputs(f"snb_collect_task {mode}")
+            
             self.update_state(state='PROGRESS', meta={'step': 'completed', 'pct': 100})
             
             if process.returncode == 0:
@@ -58,6 +62,8 @@ def snb_collect_task(self, mode: str = 'monthly'):
                 
         except subprocess.TimeoutExpired:
             process.kill()
+            from snb_input_cache import invalidate_snb_inputs
+            invalidate_snb_inputs(f"snb_collect_task {mode} timeout")
             self.update_state(state='FAILURE', meta={'error': 'Timeout'})
             return {
                 "success": False,
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Index BM25 persistant pour la partie "sparse" de la recherche hybride.
+
+- Les documents (objets de la collection) sont tokenisés une seule fois; seuls les
+  objets nouveaux ou modifiés (`updated_at`) sont re-tokenisés lors d'une synchronisation.
+- Les fréquences de termes sont stockées en CSR; les poids BM25 sont précalculés en CSC,
+  de sorte qu'une requête se réduit à un produit creux sur les colonnes des termes de la requête.
+- `to_bytes()` / `from_bytes()` permettent de partager un snapshot entre workers.
+"""
+
+import io
+import re
+import json
+import threading
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+_TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")
+
+
+def item_document(item: Any) -> str:
+    """Texte indexé pour un objet: nom, catégorie, description et champs boursiers"""
+    parts = [item.name or "", item.category or "", item.description or ""]
+    if item.category == 'Actions':
+        parts.extend([
+            item.stock_symbol or "",
+            item.stock_exchange or "",
+        ])
+    return " \n".join([str(p) for p in parts if p])
+
+
+class BM25Index:
+    """Index BM25 (unigrammes + bigrammes) synchronisé incrémentalement avec la liste d'objets"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, ngram_range: Tuple[int, int] = (1, 2)):
+        self.k1 = k1
+        self.b = b
+        self.ngram_range = ngram_range
+        self._lock = threading.Lock()
+        self._source: Optional[Sequence[Any]] = None
+        self._vocab: Dict[str, int] = {}
+        # clé -> (version, ids de termes, fréquences)
+        self._docs: Dict[Hashable, Tuple[Any, np.ndarray, np.ndarray]] = {}
+        # (clés, poids BM25 en CSC) remplacés ensemble
+        self._state: Tuple[List[Hashable], sparse.csc_matrix] = ([], sparse.csc_matrix((0, 0), dtype=np.float32))
+        self.stats = {'builds': 0, 'docs_reused': 0, 'docs_tokenized': 0, 'searches': 0}
+
+    def __len__(self) -> int:
+        return len(self._state[0])
+
+    def _tokenize(self, text: str) -> List[str]:
+        tokens = _TOKEN_RE.findall(text.lower())
+        terms: List[str] = []
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            terms.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return terms
+
+    def _encode(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Tokenise un document et retourne (ids de termes, fréquences), en enrichissant le vocabulaire"""
+        counts: Dict[int, int] = {}
+        for term in self._tokenize(text):
+            term_id = self._vocab.get(term)
+            if term_id is None:
+                term_id = len(self._vocab)
+                self._vocab[term] = term_id
+            counts[term_id] = counts.get(term_id, 0) + 1
+        ids = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+        freqs = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        return ids, freqs
+
+    def sync(self, items: Sequence[Any]) -> None:
+        """Aligne l'index sur `items`; ne re-tokenise que les objets nouveaux ou modifiés"""
+        if items is self._source:
+            return
+        with self._lock:
+            if items is self._source:
+                return
+            docs: Dict[Hashable, Tuple[Any, np.ndarray, np.ndarray]] = {}
+            reused = 0
+            for item in items:
+                key = item.id if getattr(item, 'id', None) is not None else id(item)
+                if key in docs:
+                    continue
+                version = getattr(item, 'updated_at', None)
+                previous = self._docs.get(key)
+                if previous is not None and previous[0] == version:
+                    docs[key] = previous
+                    reused += 1
+                else:
+                    docs[key] = (version, *self._encode(item_document(item)))
+            self._docs = docs
+            self._rebuild()
+            self._source = items
+            self.stats['docs_reused'] += reused
+            self.stats['docs_tokenized'] += len(docs) - reused
+
+    def _rebuild(self) -> None:
+        """Recalcule la matrice de poids BM25 à partir des fréquences (sans re-tokeniser)"""
+        keys = list(self._docs.keys())
+        n_docs, n_terms = len(keys), len(self._vocab)
+        lengths = np.array([len(self._docs[k][1]) for k in keys], dtype=np.int64)
+        indptr = np.concatenate(([0], np.cumsum(lengths))) if n_docs else np.zeros(1, dtype=np.int64)
+        indices = np.concatenate([self._docs[k][1] for k in keys]) if n_docs else np.zeros(0, dtype=np.int32)
+        tf = np.concatenate([self._docs[k][2] for k in keys]) if n_docs else np.zeros(0, dtype=np.float32)
+
+        rows = np.repeat(np.arange(n_docs), lengths)
+        doc_len = np.bincount(rows, weights=tf, minlength=n_docs)
+        avgdl = float(doc_len.mean()) if n_docs and doc_len.mean() > 0 else 1.0
+        df = np.bincount(indices, minlength=n_terms)
+        idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        norm = self.k1 * (1.0 - self.b + self.b * doc_len / avgdl)
+        weights = idf[indices] * tf * (self.k1 + 1.0) / (tf + norm[rows]) if len(tf) else tf
+        matrix = sparse.csr_matrix((weights.astype(np.float32), indices, indptr), shape=(n_docs, n_terms)).tocsc()
+
+        self._state = (keys, matrix)
+        self.stats['builds'] += 1
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[Hashable, float]]:
+        """Retourne les `top_k` (clé, score BM25) de score strictement positif, triés"""
+        keys, matrix = self._state
+        if not keys:
+            return []
+        query_counts: Dict[int, float] = {}
+        for term in self._tokenize(query or ""):
+            term_id = self._vocab.get(term)
+            if term_id is not None and term_id < matrix.shape[1]:
+                query_counts[term_id] = query_counts.get(term_id, 0.0) + 1.0
+        if not query_counts:
+            return []
+        cols = np.fromiter(query_counts.keys(), dtype=np.int32, count=len(query_counts))
+        weights = np.fromiter(query_counts.values(), dtype=np.float32, count=len(query_counts))
+        scores = np.asarray(matrix[:, cols] @ weights).ravel()
+        candidates = np.flatnonzero(scores > 0)
+        if not len(candidates):
+            return []
+        k = min(max(1, int(top_k)), len(candidates))
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        self.stats['searches'] += 1
+        return [(keys[i], float(scores[i])) for i in top]
+
+    def to_bytes(self) -> bytes:
+        """Snapshot sérialisé (vocabulaire, versions et fréquences CSR) partageable entre workers"""
+        with self._lock:
+            keys = list(self._docs.keys())
+            lengths = np.array([len(self._docs[k][1]) for k in keys], dtype=np.int64)
+            meta = {
+                'k1': self.k1, 'b': self.b, 'ngram_range': list(self.ngram_range),
+                'vocab': sorted(self._vocab, key=self._vocab.get),
+                'keys': keys,
+                'versions': [self._docs[k][0] for k in keys],
+            }
+            buffer = io.BytesIO()
+            np.savez_compressed(
+                buffer,
+                meta=np.frombuffer(json.dumps(meta, default=str).encode('utf-8'), dtype=np.uint8),
+                indptr=np.concatenate(([0], np.cumsum(lengths))),
+                indices=np.concatenate([self._docs[k][1] for k in keys]) if keys else np.zeros(0, dtype=np.int32),
+                data=np.concatenate([self._docs[k][2] for k in keys]) if keys else np.zeros(0, dtype=np.float32),
+            )
+            return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> 'BM25Index':
+        """Restaure un index depuis `to_bytes()` (la matrice BM25 est recalculée, sans tokenisation)"""
+        arrays = np.load(io.BytesIO(payload))
+        meta = json.loads(arrays['meta'].tobytes().decode('utf-8'))
+        index = cls(k1=meta['k1'], b=meta['b'], ngram_range=tuple(meta['ngram_range']))
+        index._vocab = {term: i for i, term in enumerate(meta['vocab'])}
+        indptr, indices, data = arrays['indptr'], arrays['indices'], arrays['data']
+        for i, (key, version) in enumerate(zip(meta['keys'], meta['versions'])):
+            index._docs[key] = (version, indices[indptr[i]:indptr[i + 1]], data[indptr[i]:indptr[i + 1]])
+        index._rebuild()
+        return index
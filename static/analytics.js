@@ -462,30 +462,12 @@ async function generatePDF() {
         button.disabled = true;
         
         // Appeler l'API de génération PDF
-        const response = await fetch('/api/portfolio/pdf');
-        
-        if (response.ok) {
-            // Télécharger le PDF
-            const blob = await response.blob();
-            const url = window.URL.createObjectURL(blob);
-            const a = document.createElement('a');
-            a.href = url;
-            a.download = `bonvin_portfolio_${new Date().toISOString().slice(0, 10)}.pdf`;
-            document.body.appendChild(a);
-            a.click();
-            window.URL.revokeObjectURL(url);
-            document.body.removeChild(a);
-            
-            console.log('✅ PDF généré et téléchargé avec succès');
-        } else {
-            const error = await response.json();
-            console.error('❌ Erreur génération PDF:', error);
-            alert('Erreur lors de la génération du PDF: ' + (error.error || 'Erreur inconnue'));
-        }
+        await downloadReport('/api/portfolio/pdf', `bonvin_portfolio_${new Date().toISOString().slice(0, 10)}.pdf`);
+        console.log('✅ PDF généré et téléchargé avec succès');
         
     } catch (error) {
-        console.error('❌ Erreur:', error);
-        alert('Erreur lors de la génération du PDF');
+        console.error('❌ Erreur génération PDF:', error);
+        alert('Erreur lors de la génération du PDF: ' + error.message);
     } finally {
         // Restaurer le bouton
         const button = event.target;
@@ -0,0 +1,69 @@
+/**
+ * Rapports PDF - téléchargement via la file Celery `pdf`
+ * L'endpoint renvoie 202 + task_id; on suit /api/tasks/<id> puis on télécharge result.download_url
+ * (200 + download_url si le rapport est déjà rendu pour la version courante de l'inventaire)
+ */
+
+(function () {
+    const POLL_MS = 1500;
+    const TIMEOUT_MS = 5 * 60 * 1000;
+
+    function sleep(ms) {
+        return new Promise(resolve => setTimeout(resolve, ms));
+    }
+
+    function triggerDownload(href, filename) {
+        const a = document.createElement('a');
+        a.href = href;
+        if (filename) a.download = filename;
+        document.body.appendChild(a);
+        a.click();
+        document.body.removeChild(a);
+    }
+
+    async function waitForTask(pollUrl) {
+        const deadline = Date.now() + TIMEOUT_MS;
+        while (Date.now() < deadline) {
+            const response = await fetch(pollUrl);
+            const body = await response.json();
+            if (body.state === 'SUCCESS') {
+                const result = body.result || {};
+                if (!result.ok) throw new Error(result.error || 'Erreur inconnue');
+                return result;
+            }
+            if (body.state === 'FAILURE' || body.state === 'REVOKED') {
+                throw new Error('La génération du rapport a échoué');
+            }
+            await sleep(POLL_MS);
+        }
+        throw new Error('Délai dépassé pour la génération du rapport');
+    }
+
+    async function downloadReport(url, fallbackName) {
+        const response = await fetch(url);
+        if (response.status === 202) {
+            const job = await response.json();
+            const result = await waitForTask(job.poll_url || `/api/tasks/${job.task_id}`);
+            triggerDownload(result.download_url, result.filename || fallbackName);
+            return result;
+        }
+        if (!response.ok) {
+            let error = {};
+            try { error = await response.json(); } catch (_) {}
+            throw new Error(error.error || 'Erreur inconnue');
+        }
+        if ((response.headers.get('Content-Type') || '').includes('application/json')) {
+            const result = await response.json();
+            triggerDownload(result.download_url, result.filename || fallbackName);
+            return result;
+        }
+        // Réponse PDF directe
+        const blob = await response.blob();
+        const objectUrl = window.URL.createObjectURL(blob);
+        triggerDownload(objectUrl, fallbackName);
+        window.URL.revokeObjectURL(objectUrl);
+        return { cached: false };
+    }
+
+    window.downloadReport = downloadReport;
+})();
@@ -255,30 +255,16 @@ async function generateAssetClassReport(assetClassName) {
         console.log(`📄 Génération du rapport pour: ${assetClassName}`);
         showNotification(`Génération du rapport ${assetClassName}...`, false);
         
-        const response = await fetch(`/api/reports/asset-class/${encodeURIComponent(assetClassName)}`);
-        
-        if (response.ok) {
-            const blob = await response.blob();
-            const url = window.URL.createObjectURL(blob);
-            const a = document.createElement('a');
-            a.href = url;
-            a.download = `bonvin_${assetClassName.replace(/\s+/g, '_').toLowerCase()}_${new Date().toISOString().slice(0, 10)}.pdf`;
-            document.body.appendChild(a);
-            a.click();
-            window.URL.revokeObjectURL(url);
-            document.body.removeChild(a);
-            
-            console.log('✅ Rapport généré avec succès');
-            showNotification(`Rapport ${assetClassName} généré !`, false);
-        } else {
-            const error = await response.json();
-            console.error('❌ Erreur génération rapport:', error);
-            showNotification('Erreur lors de la génération du rapport: ' + (error.error || 'Erreur inconnue'), true);
-        }
+        await downloadReport(
+            `/api/reports/asset-class/${encodeURIComponent(assetClassName)}`,
+            `bonvin_${assetClassName.replace(/\s+/g, '_').toLowerCase()}_${new Date().toISOString().slice(0, 10)}.pdf`
+        );
+        console.log('✅ Rapport généré avec succès');
+        showNotification(`Rapport ${assetClassName} généré !`, false);
         
     } catch (error) {
-        console.error('❌ Erreur:', error);
-        showNotification('Erreur lors de la génération du rapport', true);
+        console.error('❌ Erreur génération rapport:', error);
+        showNotification('Erreur lors de la génération du rapport: ' + error.message, true);
     }
 }
 
@@ -288,30 +274,13 @@ async function generateAllReports() {
         console.log('📄 Génération de tous les rapports...');
         showNotification('Génération de tous les rapports en cours...', false);
         
-        const response = await fetch('/api/reports/all-asset-classes');
-        
-        if (response.ok) {
-            const blob = await response.blob();
-            const url = window.URL.createObjectURL(blob);
-            const a = document.createElement('a');
-            a.href = url;
-            a.download = `bonvin_all_asset_classes_${new Date().toISOString().slice(0, 10)}.pdf`;
-            document.body.appendChild(a);
-            a.click();
-            window.URL.revokeObjectURL(url);
-            document.body.removeChild(a);
-            
-            console.log('✅ Tous les rapports générés avec succès');
-            showNotification('Tous les rapports générés !', false);
-        } else {
-            const error = await response.json();
-            console.error('❌ Erreur génération rapports:', error);
-            showNotification('Erreur lors de la génération des rapports: ' + (error.error || 'Erreur inconnue'), true);
-        }
+        await downloadReport('/api/reports/all-asset-classes', `bonvin_all_asset_classes_${new Date().toISOString().slice(0, 10)}.pdf`);
+        console.log('✅ Tous les rapports générés avec succès');
+        showNotification('Tous les rapports générés !', false);
         
     } catch (error) {
-        console.error('❌ Erreur:', error);
-        showNotification('Erreur lors de la génération des rapports', true);
+        console.error('❌ Erreur génération rapports:', error);
+        showNotification('Erreur lors de la génération des rapports: ' + error.message, true);
     }
 }
 
@@ -8,28 +8,29 @@ import os
 import time
 import logging
 import requests
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from datetime import datetime
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from rate_limiter import get_rate_limiter, limiter_stats
 
 logger = logging.getLogger(__name__)
 
-def rate_limit(calls_per_minute=5):
-    """Décorateur pour limiter les appels API"""
-    min_interval = 60.0 / calls_per_minute
-    last_called = [0.0]
-    
+def rate_limit(calls_per_minute=5, key: Optional[str] = None, burst: Optional[int] = None):
+    """Décorateur pour limiter les appels API (voir rate_limiter.TokenBucket).
+
+    Les fonctions décorées avec la même `key` (fournisseur) partagent le même budget,
+    commun à tous les threads et, si Redis est configuré, à tous les workers gunicorn/Celery.
+    Sans `key`, le budget est propre à la fonction décorée.
+    """
     def decorator(func):
+        limiter_key = key or f"{func.__module__}.{func.__qualname__}"
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            elapsed = time.time() - last_called[0]
-            left_to_wait = min_interval - elapsed
-            if left_to_wait > 0:
-                logger.info(f"⏳ Rate limiting: attente {left_to_wait:.2f}s (max {calls_per_minute} req/min)")
-                time.sleep(left_to_wait)
-            ret = func(*args, **kwargs)
-            last_called[0] = time.time()
-            return ret
+            get_rate_limiter(limiter_key, calls_per_minute, burst).acquire()
+            return func(*args, **kwargs)
         return wrapper
     return decorator
 
@@ -46,7 +47,7 @@ class AlphaVantageAPI:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
     
-    @rate_limit(calls_per_minute=5)
+    @rate_limit(calls_per_minute=5, key='alpha_vantage')
     def get_stock_price(self, symbol: str) -> Optional[Dict[str, Any]]:
         """Récupère le prix d'une action via Alpha Vantage"""
         try:
@@ -166,7 +167,7 @@ class EODHDAPI:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
     
-    @rate_limit(calls_per_minute=10)
+    @rate_limit(calls_per_minute=10, key='eodhd', burst=2)
     def get_stock_price(self, symbol: str) -> Optional[Dict[str, Any]]:
         """Récupère le prix d'une action via EODHD"""
         try:
@@ -222,7 +223,7 @@ class FinnhubAPI:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
     
-    @rate_limit(calls_per_minute=60)
+    @rate_limit(calls_per_minute=60, key='finnhub', burst=5)
     def get_stock_price(self, symbol: str) -> Optional[Dict[str, Any]]:
         """Récupère le prix d'une action via Finnhub"""
         try:
@@ -272,7 +273,7 @@ class YFinanceAPI:
         # yfinance est importé dynamiquement dans l'appel pour éviter les erreurs d'import au démarrage
         pass
 
-    @rate_limit(calls_per_minute=90)
+    @rate_limit(calls_per_minute=90, key='yahoo', burst=5)
     def get_stock_price(self, symbol: str) -> Optional[Dict[str, Any]]:
         """Récupère le prix via yfinance, avec retries et fallback history."""
         try:
@@ -378,6 +379,93 @@ class YFinanceAPI:
                 else:
                     return None
 
+    @rate_limit(calls_per_minute=90, key='yahoo', burst=5)
+    def get_bulk_quotes(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Récupère prix, variation, volume et plus hauts/bas 52 semaines en un seul `yf.download` multi-tickers.
+
+        Retourne uniquement les symboles pour lesquels un cours valide a été obtenu.
+        Devise et PER ne sont pas fournis par le téléchargement (voir `get_quote_metadata`).
+        """
+        if not symbols:
+            return {}
+        try:
+            import yfinance as yf  # type: ignore
+            import pandas as pd  # type: ignore
+        except Exception as e:
+            logger.warning(f"⚠️ yfinance non disponible: {e}")
+            return {}
+
+        try:
+            logger.info(f"🔄 yfinance download multi-tickers ({len(symbols)} symboles)")
+            data = yf.download(
+                tickers=symbols, period='1y', interval='1d', group_by='ticker',
+                auto_adjust=False, threads=True, progress=False, timeout=30
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ yfinance download multi-tickers échoué: {e}")
+            return {}
+        if data is None or data.empty:
+            return {}
+
+        quotes: Dict[str, Dict[str, Any]] = {}
+        for symbol in symbols:
+            try:
+                if isinstance(data.columns, pd.MultiIndex):
+                    if symbol not in data.columns.get_level_values(0):
+                        continue
+                    frame = data[symbol]
+                elif len(symbols) == 1:
+                    frame = data
+                else:
+                    continue
+                frame = frame.dropna(subset=['Close'])
+                if frame.empty:
+                    continue
+                price = float(frame['Close'].iloc[-1])
+                if price <= 0:
+                    continue
+                change = None
+                change_percent = None
+                if len(frame) >= 2:
+                    prev_close = float(frame['Close'].iloc[-2])
+                    if prev_close:
+                        change = price - prev_close
+                        change_percent = (change / prev_close) * 100.0
+                volume = frame['Volume'].iloc[-1] if 'Volume' in frame else None
+                high = frame['High'].max() if 'High' in frame else None
+                low = frame['Low'].min() if 'Low' in frame else None
+                quotes[symbol] = {
+                    'price': price,
+                    'currency': None,
+                    'change': change,
+                    'change_percent': change_percent,
+                    'volume': int(volume) if volume is not None and not pd.isna(volume) else None,
+                    'fifty_two_week_high': float(high) if high is not None and not pd.isna(high) else None,
+                    'fifty_two_week_low': float(low) if low is not None and not pd.isna(low) else None,
+                    'pe_ratio': None,
+                    'timestamp': datetime.now().isoformat(),
+                    'source': 'yfinance'
+                }
+            except Exception as e:
+                logger.warning(f"⚠️ yfinance download: données inexploitables pour {symbol}: {e}")
+        logger.info(f"✅ yfinance download multi-tickers: {len(quotes)}/{len(symbols)} symboles")
+        return quotes
+
+    @rate_limit(calls_per_minute=90, key='yahoo', burst=5)
+    def get_quote_metadata(self, symbol: str) -> Dict[str, Any]:
+        """Récupère la devise et le PER d'un symbole (complément de `get_bulk_quotes`)."""
+        try:
+            import yfinance as yf  # type: ignore
+            info = yf.Ticker(symbol).info or {}
+        except Exception as e:
+            logger.warning(f"⚠️ yfinance métadonnées indisponibles pour {symbol}: {e}")
+            return {}
+        pe_ratio = info.get('trailingPE') or info.get('trailingPe') or info.get('forwardPE')
+        return {
+            'currency': info.get('currency'),
+            'pe_ratio': float(pe_ratio) if pe_ratio is not None else None
+        }
+
 class StockAPIManager:
     """Gestionnaire principal des APIs boursières"""
     
@@ -390,6 +478,8 @@ class StockAPIManager:
         self.cache = {}
         # Toujours à jour: désactiver le cache par défaut
         self.cache_duration = 0
+        # Nombre de requêtes yfinance simultanées pour les mises à jour groupées
+        self.batch_max_workers = max(1, int(os.environ.get('STOCK_BATCH_WORKERS', '4')))
     
     def get_stock_price(self, symbol: str, force_refresh=False) -> Optional[Dict[str, Any]]:
         """
@@ -414,6 +504,57 @@ class StockAPIManager:
         logger.error(f"❌ yfinance indisponible pour {symbol}")
         return None
     
+    def get_stock_prices_batch(self, symbols: List[str], max_workers: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Récupère les prix de plusieurs actions en parallèle (yfinance).
+
+        1. Un seul `yf.download` multi-tickers fournit cours, variation, volume et 52 semaines.
+        2. Un pool borné complète devise/PER, et retombe sur `get_stock_price` pour les symboles
+           absents du téléchargement.
+        Tous les appels passent par le budget `rate_limit` partagé de Yahoo.
+
+        Retourne: {'results': {symbol: data}, 'errors': {symbol: message}}
+        """
+        unique_symbols = list(dict.fromkeys(s for s in symbols if s))
+        results: Dict[str, Dict[str, Any]] = {}
+        errors: Dict[str, str] = {}
+        if not unique_symbols:
+            return {'results': results, 'errors': errors}
+
+        start_time = time.time()
+        bulk = self.yfinance.get_bulk_quotes(unique_symbols)
+
+        def _fetch(symbol: str) -> Optional[Dict[str, Any]]:
+            quote = bulk.get(symbol)
+            if quote is None:
+                return self.get_stock_price(symbol, force_refresh=True)
+            quote.update({k: v for k, v in self.yfinance.get_quote_metadata(symbol).items() if v is not None})
+            quote['currency'] = quote.get('currency') or 'USD'
+            return self._adjust_currency_for_swiss_stocks(symbol, quote)
+
+        workers = min(len(unique_symbols), max_workers or self.batch_max_workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_fetch, symbol): symbol for symbol in unique_symbols}
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    data = future.result()
+                    if data and data.get('price') is not None and float(data['price']) > 0:
+                        results[symbol] = data
+                        if self.cache_duration > 0:
+                            self._cache_result(symbol, data)
+                    else:
+                        errors[symbol] = 'Données non disponibles'
+                except Exception as e:
+                    logger.error(f"❌ Erreur batch pour {symbol}: {e}")
+                    errors[symbol] = str(e)
+
+        logger.info(
+            f"✅ Batch prix: {len(results)} ok, {len(errors)} échecs "
+            f"en {time.time() - start_time:.1f}s ({workers} workers, {len(bulk)} via download)"
+        )
+        return {'results': results, 'errors': errors}
+    
     def _cache_result(self, symbol: str, data: Dict[str, Any]):
         """Met en cache le résultat"""
         self.cache[symbol] = {
@@ -449,6 +590,7 @@ class StockAPIManager:
                 'key_configured': bool(self.finnhub.api_key and self.finnhub.api_key != 'demo'),
                 'rate_limit': '60 req/min'
             },
+            'rate_limiters': limiter_stats(),
             'cache': self.get_cache_status()
         }
 
@@ -462,362 +604,17 @@ class StockAPIManager:
             logger.info(f"🇨🇭 Devise ajustée pour {symbol}: CHF")
         return result
 
-    def get_market_snapshot(self) -> Dict[str, Any]:
-        """Récupère un aperçu des principaux indicateurs de marché (version stricte yfinance).
+    def get_market_snapshot(self, max_age: Optional[float] = None) -> Dict[str, Any]:
+        """Récupère un aperçu des principaux indicateurs de marché (voir market_board).
 
-        Exigences:
-        - Utiliser yfinance uniquement
-        - Attendre 11 secondes AVANT chaque requête
-        - Inclure: NVDA, MSFT, AMD, AAPL, Or (Gold), Bitcoin, S&P 500, Nasdaq, Dow Jones, VIX
-        - Ne pas inventer: si indisponible, retourner {"error": "Data not available"}
+        - Réponse immédiate depuis le dernier aperçu valide (Redis ou mémoire), rafraîchi en
+          arrière-plan par un download yfinance multi-tickers + appels FRED parallèles
+        - `max_age` (secondes): rafraîchit d'abord si l'aperçu est plus ancien
+        - Ne pas inventer: un symbole jamais obtenu reste {"error": "Data not available"};
+          `freshness` donne la date d'obtention de chaque valeur
         """
-        logger.info("📊 Récupération de l'aperçu du marché (mode strict yfinance)...")
-
-        snapshot: Dict[str, Any] = {
-            "stocks": {},
-            "indices": {},
-            "volatility": {},
-            "commodities": {},
-            "crypto": {},
-            "forex": {},
-            "bonds": {},
-            "macros": {}
-        }
-
-        # Liste ordonnée des requêtes à effectuer (avec affichage)
-        # Inclut USA, Europe (y compris Suisse), Asie (y compris Japon) et quelques sociétés phares européennes
-        ordered_symbols = [
-            # Actions USA (repères tech)
-            ("stocks", "NVDA", "NVDA"),
-            ("stocks", "MSFT", "MSFT"),
-            ("stocks", "AMD", "AMD"),
-            ("stocks", "AAPL", "AAPL"),
-            # Actions Europe/Suisse (sociétés phares)
-            ("stocks", "Nestlé (CH)", "NESN.SW"),
-            ("stocks", "Novartis (CH)", "NOVN.SW"),
-            ("stocks", "Roche (CH)", "ROG.SW"),
-            ("stocks", "IREN (CH)", "IREN.SW"),
-            ("stocks", "LVMH (FR)", "MC.PA"),
-            ("stocks", "ASML (NL)", "ASML.AS"),
-            # Indices USA
-            ("indices", "S&P 500", "^GSPC"),
-            ("indices", "NASDAQ", "^IXIC"),
-            ("indices", "Dow Jones", "^DJI"),
-            ("indices", "Russell 2000", "^RUT"),
-            # Indices Europe
-            ("indices", "Euro Stoxx 50", "^STOXX50E"),
-            ("indices", "DAX", "^GDAXI"),
-            ("indices", "CAC 40", "^FCHI"),
-            ("indices", "FTSE 100", "^FTSE"),
-            ("indices", "SMI", "^SSMI"),
-            # Indices Asie
-            ("indices", "Nikkei 225", "^N225"),
-            ("indices", "Hang Seng", "^HSI"),
-            ("indices", "Shanghai Composite", "^SSEC"),
-            # Volatilité
-            ("volatility", "VIX", "^VIX"),
-            # Matières premières
-            ("commodities", "WTI", "CL=F"),
-            ("commodities", "Brent", "BZ=F"),
-            ("commodities", "Natural Gas", "NG=F"),
-            ("commodities", "Or (Gold)", "GC=F"),
-            # Crypto
-            ("crypto", "Bitcoin", "BTC-USD"),
-            ("crypto", "Ethereum", "ETH-USD"),
-            # Devises / Indice dollar
-            ("forex", "DXY", "DX=F"),
-            # Obligations US
-            ("bonds", "US2Y", "^UST2Y"),
-            ("bonds", "US5Y", "^FVX"),
-            ("bonds", "US10Y", "^TNX"),
-        ]
-
-        # Utiliser exclusivement yfinance
-        start_time = time.time()
-        max_execution_time = 420  # 7 minutes max
-        
-        for category, display_name, symbol in ordered_symbols:
-            # Vérifier le timeout global
-            if time.time() - start_time > max_execution_time:
-                logger.warning(f"⚠️ Timeout global atteint ({max_execution_time}s), arrêt de la récupération")
-                break
-            # Obligations: utiliser FRED en priorité
-            if category == 'bonds' and display_name in ('US10Y','US5Y','US2Y'):
-                series_map = {'US2Y': 'DGS2', 'US5Y': 'DGS5', 'US10Y': 'DGS10'}
-                series_id = series_map.get(display_name)
-                fred_res = self.fred.get_latest_yield(series_id) if series_id else None
-                if fred_res:
-                    snapshot[category][display_name] = fred_res
-                else:
-                    # Si FRED échoue pour les bonds, mettre N/A au lieu d'essayer yfinance
-                    logger.warning(f"⚠️ FRED indisponible pour {display_name}, mise à N/A")
-                    snapshot[category][display_name] = {
-                        'yield': 'N/A',
-                        'change_bps': 'N/A',
-                        'source': 'FRED (indisponible)'
-                    }
-                continue  # Ne pas essayer yfinance pour les bonds
-            
-            # Pour tous les autres actifs, utiliser yfinance
-            try:
-                logger.info(f"⏳ Attente 11s avant la requête yfinance pour {symbol} ({display_name})...")
-                time.sleep(11)
-                logger.info(f"🔄 Récupération yfinance pour {symbol} ({display_name})...")
-                data = self.yfinance.get_stock_price(symbol)
-                if data and data.get('price') is not None:
-                    if category == 'forex' and display_name == 'DXY':
-                        snapshot[category][display_name] = {
-                            "value": data.get('price'),
-                            "change": data.get('change'),
-                            "change_percent": data.get('change_percent'),
-                            "source": data.get('source')
-                        }
-                    else:
-                        snapshot[category][display_name] = {"price": data.get('price'), "change": data.get('change'), "change_percent": data.get('change_percent'), "source": data.get('source')}
-                else:
-                    snapshot[category][display_name] = {"error": "Data not available"}
-            except Exception as e:
-                logger.warning(f"⚠️ Erreur pour {symbol} ({display_name}): {e}")
-                snapshot[category][display_name] = {"error": f"Error: {str(e)}"}
-                continue  # Continuer avec le prochain symbole
-
-        # Calculs dérivés (analytics)
-        analytics: Dict[str, Any] = {}
-
-        # Gold/Silver ratio
-        try:
-            gold = snapshot.get('commodities', {}).get('Or (Gold)', {}).get('price')
-            # Ajouter Silver si absent
-            if 'Silver' not in snapshot.get('commodities', {}):
-                try:
-                    logger.info("⏳ Attente 11s avant la requête yfinance pour SI=F (Silver)...")
-                    time.sleep(11)
-                    logger.info("🔄 Récupération Silver (SI=F) via yfinance...")
-                    silver_data = self.yfinance.get_stock_price('SI=F')
-                    snapshot['commodities']['Silver'] = {
-                        'price': silver_data.get('price') if silver_data else None,
-                        'change': silver_data.get('change') if silver_data else None,
-                        'change_percent': silver_data.get('change_percent') if silver_data else None,
-                        'source': (silver_data or {}).get('source') if silver_data else None
-                    }
-                except Exception as e:
-                    logger.warning(f"⚠️ Erreur récupération Silver: {e}")
-                    snapshot['commodities']['Silver'] = {
-                        'price': None,
-                        'change': None,
-                        'change_percent': None,
-                        'source': 'Error'
-                    }
-            silver = snapshot.get('commodities', {}).get('Silver', {}).get('price')
-            if gold and silver and silver != 0:
-                analytics['gold_silver_ratio'] = round(float(gold) / float(silver), 2)
-        except Exception as e:
-            logger.warning(f"⚠️ Impossible de calculer le ratio Or/Argent: {e}")
-
-        # Courbe 2-10Y
-        try:
-            ten_y = snapshot.get('bonds', {}).get('US 10Y', {}).get('yield')
-            two_y = snapshot.get('bonds', {}).get('US 2Y', {}).get('yield')
-            if isinstance(ten_y, (int, float)) and isinstance(two_y, (int, float)):
-                analytics['spread_2_10_bps'] = round((float(ten_y) - float(two_y)) * 100.0, 1)
-        except Exception as e:
-            logger.warning(f"⚠️ Impossible de calculer le spread 2-10Y: {e}")
-
-        # RSI(14) sur S&P 500 (^GSPC)
-        try:
-            rsi = self._get_yfinance_rsi('^GSPC', period=14)
-            if rsi is not None:
-                analytics['rsi_spx_14'] = round(rsi, 1)
-        except Exception as e:
-            logger.warning(f"⚠️ RSI SPX indisponible: {e}")
-
-        # Crypto Fear & Greed (Alternative.me)
-        try:
-            analytics['btc_fear_greed'] = self._get_crypto_fng()
-        except Exception as e:
-            logger.warning(f"⚠️ Fear&Greed indisponible: {e}")
-
-        # BTC Dominance (CoinGecko)
-        try:
-            analytics['btc_dominance_pct'] = self._get_btc_dominance_pct()
-        except Exception as e:
-            logger.warning(f"⚠️ BTC dominance indisponible: {e}")
-
-        # VIX régime
-        try:
-            vix = snapshot.get('volatility', {}).get('VIX', {}).get('price')
-            if isinstance(vix, (int, float)):
-                regime = 'Crisis (>30)'
-                if vix < 15: regime = 'Low (<15)'
-                elif vix < 20: regime = 'Normal (15-20)'
-                elif vix < 30: regime = 'Elevated (20-30)'
-                analytics['vix_regime'] = regime
-        except Exception:
-            pass
-
-        # Market phase (US)
-        try:
-            now_utc = datetime.utcnow()
-            wd = now_utc.weekday()
-            hour = now_utc.hour
-            minute = now_utc.minute
-            # Approximation: Marchés US ouverts ~ 13:30-20:00 UTC (selon DST)
-            trading = (hour > 13 or (hour == 13 and minute >= 30)) and (hour < 20)
-            weekend = wd >= 5
-            phase = 'Weekend' if weekend else ('Trading' if trading else ('Pre-market' if hour < 13 else 'After-hours'))
-            analytics['market_phase'] = phase
-        except Exception:
-            pass
-
-        snapshot['analytics'] = analytics
-        
-        # Ajout: Indicateurs macro FRED (groupés par thèmes)
-        try:
-            fred_blocks = {
-                'rates_yields': {
-                    # US
-                    'DFF': "Fed Funds Rate",
-                    'DGS2': "2Y Treasury",
-                    'DGS10': "10Y Treasury",
-                    'DGS30': "30Y Treasury",
-                    'T10Y2Y': "Yield Curve 10Y-2Y",
-                    'BAMLH0A0HYM2': "High Yield Spread",
-                    # Europe
-                    'IRLTLT01EZM156N': "ECB 10Y",
-                    'IR3TIB01DEM156N': "3M Euribor",
-                    # Suisse
-                    'IRLTLT01CHM156N': "Swiss 10Y",
-                    'IRSTCI01CHM156N': "SARON",
-                },
-                'inflation': {
-                    'CPIAUCSL': "US CPI",
-                    'CPILFESL': "US Core CPI",
-                    'PCEPI': "US PCE",
-                    'DPCCRV1Q225SBEA': "US Core PCE",
-                    'CP0000EZ19M086NEST': "Eurozone HICP",
-                    'CPALTT01CHM659N': "Swiss CPI",
-                },
-                'employment': {
-                    'UNRATE': "US Unemployment",
-                    'PAYEMS': "US NFP",
-                    'CIVPART': "US Participation Rate",
-                    'EMVOVERALLEMV': "US Job Openings",
-                    'LRHUTTTTEZM156S': "Eurozone Unemployment",
-                },
-                'activity': {
-                    'GDP': "US GDP",
-                    'GDPC1': "US Real GDP",
-                    'MANEMP': "ISM Manufacturing",
-                    'NMFBAI': "ISM Services",
-                    'RSAFS': "US Retail Sales",
-                    'INDPRO': "US Industrial Production",
-                    'NAPM': "US PMI Composite",
-                },
-                'liquidity_stress': {
-                    'WALCL': "Fed Balance Sheet",
-                    'RRPONTSYD': "Reverse Repo",
-                    'SOFR': "SOFR Rate",
-                    'TEDRATE': "TED Spread",
-                    'DCOILWTICO': "WTI Oil",
-                    'DEXUSEU': "EUR/USD",
-                }
-            }
-            # Formatage/Unités par série FRED
-            def _fred_series_format(series_id: str) -> Dict[str, Any]:
-                """Retourne unit, change_unit, scale d'affichage (pour value), et decimals.
-                - unit: suffixe d'unité pour la valeur (ex: '%', 'index', 'bln USD', 'USD/bbl', 'ratio', 'K jobs')
-                - change_unit: unité de variation (ex: 'bp', 'pp', 'pts', 'USD')
-                - scale: facteur à appliquer à la valeur brute pour l'affichage
-                - decimals: nombre de décimales recommandé
-                """
-                percent_series = {
-                    'DFF','DGS2','DGS10','DGS30','T10Y2Y','BAMLH0A0HYM2',
-                    'IRLTLT01EZM156N','IR3TIB01DEM156N','IRLTLT01CHM156N','IRSTCI01CHM156N',
-                    'UNRATE','CIVPART','SOFR','TEDRATE'
-                }
-                index_series = {
-                    'CPIAUCSL','CPILFESL','PCEPI','DPCCRV1Q225SBEA','CP0000EZ19M086NEST','CPALTT01CHM659N',
-                    'INDPRO','NAPM','NMFBAI'
-                }
-                usd_per_barrel = {'DCOILWTICO'}
-                ratio_series = {'DEXUSEU'}
-                bln_usd_series = {'GDP','GDPC1'}  # déjà en milliards
-                mln_to_bln_series = {'WALCL','RRPONTSYD','RSAFS'}  # millions -> milliards
-                k_jobs_series = {'PAYEMS'}  # milliers de personnes
-
-                if series_id in percent_series:
-                    # Valeur en %, variation en points de pourcentage (pp); pour DGS*, change est en bp
-                    if series_id in {'DGS2','DGS10','DGS30'}:
-                        return {'unit': '%', 'change_unit': 'bp', 'scale': 1.0, 'decimals': 2}
-                    return {'unit': '%', 'change_unit': 'pp', 'scale': 1.0, 'decimals': 2}
-                if series_id in index_series:
-                    return {'unit': 'index', 'change_unit': 'pts', 'scale': 1.0, 'decimals': 1}
-                if series_id in usd_per_barrel:
-                    return {'unit': 'USD/bbl', 'change_unit': 'USD', 'scale': 1.0, 'decimals': 2}
-                if series_id in ratio_series:
-                    return {'unit': 'ratio', 'change_unit': None, 'scale': 1.0, 'decimals': 4}
-                if series_id in bln_usd_series:
-                    return {'unit': 'bln USD', 'change_unit': 'bln USD', 'scale': 1.0, 'decimals': 1}
-                if series_id in mln_to_bln_series:
-                    return {'unit': 'bln USD', 'change_unit': 'bln USD', 'scale': 1e-3, 'decimals': 1}
-                if series_id in k_jobs_series:
-                    return {'unit': 'K jobs', 'change_unit': 'K', 'scale': 1.0, 'decimals': 0}
-                # Défaut
-                return {'unit': None, 'change_unit': None, 'scale': 1.0, 'decimals': 2}
-
-            macros: Dict[str, Any] = {}
-            for block, series in fred_blocks.items():
-                macros[block] = {}
-                for sid, label in series.items():
-                    # Yields: privilégier get_latest_yield pour tranches reconnues
-                    val = None
-                    if sid in ('DGS2','DGS10','DGS30'):
-                        val = self.fred.get_latest_yield(sid)
-                        if val is not None and 'yield' in val:
-                            fmt = _fred_series_format(sid)
-                            macros[block][label] = {
-                                "value": val['yield'],
-                                "change": val.get('change_bps'),
-                                "unit": fmt.get('unit'),
-                                "change_unit": fmt.get('change_unit'),
-                                "scale": fmt.get('scale'),
-                                "decimals": fmt.get('decimals'),
-                                "source": val.get('source')
-                            }
-                            try:
-                                logger.debug(f"FRED {block}/{label} ({sid}) -> yield={val['yield']}, change_bps={val.get('change_bps')}")
-                            except Exception:
-                                pass
-                            continue
-                    # Autres séries: valeur simple
-                    v = self.fred.get_latest_value(sid)
-                    if v is not None:
-                        fmt = _fred_series_format(sid)
-                        macros[block][label] = {
-                            "value": v.get('value'),
-                            "change": v.get('change'),
-                            "unit": fmt.get('unit'),
-                            "change_unit": fmt.get('change_unit'),
-                            "scale": fmt.get('scale'),
-                            "decimals": fmt.get('decimals'),
-                            "source": v.get('source')
-                        }
-                        try:
-                            logger.debug(f"FRED {block}/{label} ({sid}) -> value={v.get('value')}, change={v.get('change')}")
-                        except Exception:
-                            pass
-                    else:
-                        try:
-                            logger.debug(f"FRED {block}/{label} ({sid}) -> aucune donnée")
-                        except Exception:
-                            pass
-            snapshot['macros'] = macros
-        except Exception as e:
-            logger.warning(f"⚠️ Indicateurs FRED non disponibles: {e}")
-        
-        execution_time = time.time() - start_time
-        logger.info(f"✅ Aperçu du marché (strict) récupéré en {execution_time:.1f}s")
-        return snapshot
+        from market_board import get_market_board
+        return get_market_board(self).snapshot(max_age=max_age)
 
     def get_swiss_snapshot(self) -> Dict[str, Any]:
         """Récupère un snapshot concentré sur la Suisse (yfinance uniquement).
@@ -1045,13 +842,16 @@ class StockAPIManager:
             logger.warning(f"⚠️ BTC dominance indisponible: {e}")
             return None
 
+# Limite documentée de l'API FRED: 120 requêtes/minute par clé (budget commun aux deux méthodes)
+FRED_CALLS_PER_MINUTE = int(os.environ.get('FRED_CALLS_PER_MINUTE', '120'))
+
 class FredAPI:
     """FRED (Federal Reserve) simple client pour rendements US."""
     def __init__(self):
         self.api_key = os.environ.get('FRED_API_KEY')
         self.base = 'https://api.stlouisfed.org/fred/series/observations'
 
-    @rate_limit(calls_per_minute=12)
+    @rate_limit(calls_per_minute=FRED_CALLS_PER_MINUTE, key='fred', burst=10)
     def get_latest_yield(self, series_id: str) -> Optional[Dict[str, Any]]:
         if not self.api_key:
             return None
@@ -1082,7 +882,7 @@ class FredAPI:
         except Exception:
             return None
 
-    @rate_limit(calls_per_minute=12)
+    @rate_limit(calls_per_minute=FRED_CALLS_PER_MINUTE, key='fred', burst=10)
     def get_latest_value(self, series_id: str) -> Optional[Dict[str, Any]]:
         """Retourne la dernière valeur numérique d'une série FRED (valeur et variation d'une obs)."""
         if not self.api_key:
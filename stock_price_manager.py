@@ -1,11 +1,10 @@
 #!/usr/bin/env python3
 """
 Gestionnaire de prix d'actions avec Yahoo Finance API - Version sans limitation
-Stockage local des prix historiques et gestion intelligente du cache
+Stockage local des prix historiques (SQLite en ajout seul, price_history_store) et gestion intelligente du cache
 """
 
 import os
-import json
 import time
 import logging
 import threading
@@ -15,6 +14,9 @@ from dataclasses import dataclass, asdict
 import yfinance as yf
 import pandas as pd
 from yahoo_finance_api import YahooFinanceAPI
+from price_history_store import PriceHistoryStore
+from request_coalescer import RequestCoalescer
+from rate_limiter import get_rate_limiter
 
 # Import du fallback yahooquery
 try:
@@ -51,6 +53,7 @@ class StockPriceManager:
         self.data_dir = data_dir
         self.cache_file = os.path.join(data_dir, "price_cache.json")
         self.history_file = os.path.join(data_dir, "price_history.json")
+        self.history_db = os.path.join(data_dir, "price_history.db")
         
         # Créer le répertoire de données s'il n'existe pas
         os.makedirs(data_dir, exist_ok=True)
@@ -58,9 +61,13 @@ class StockPriceManager:
         # Cache duration - 24 heures de cache
         self.cache_duration = 86400  # 24 heures
         
-        # Verrou pour éviter les conflits en webapp
+        # Historique: un point par jour au-delà de 7 jours
+        self.history_downsample_days = 7
+        
+        # Verrou court pour les opérations sur tout le cache (clear_cache)
         self._lock = threading.Lock()
-        self._request_locks = {}  # Verrous par symbole
+        # Un seul appel réseau en cours par symbole; symboles différents en parallèle
+        self._requests = RequestCoalescer(name='stock_prices')
         
         # Initialiser l'authentification Yahoo Finance
         try:
@@ -81,55 +88,37 @@ class StockPriceManager:
         else:
             logger.warning("⚠️ yahooquery non disponible pour le fallback")
         
-        # Charger les données existantes
+        # Charger les données existantes (anciens fichiers JSON importés une seule fois)
+        self.history_store = PriceHistoryStore(self.history_db)
+        self.history_store.import_json(self.cache_file, self.history_file)
         self._load_cache()
-        self._load_history()
-    
-    def _get_symbol_lock(self, symbol: str) -> threading.Lock:
-        """Obtient ou crée un verrou pour un symbole spécifique"""
-        if symbol not in self._request_locks:
-            self._request_locks[symbol] = threading.Lock()
-        return self._request_locks[symbol]
     
     def _load_cache(self):
-        """Charge le cache des prix"""
+        """Charge le dernier cours connu de chaque symbole"""
         try:
-            if os.path.exists(self.cache_file):
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    self.price_cache = json.load(f)
-                logger.info(f"Cache chargé: {len(self.price_cache)} entrées")
-            else:
-                self.price_cache = {}
+            self.price_cache = self.history_store.load_quotes()
+            logger.info(f"Cache chargé: {len(self.price_cache)} entrées")
         except Exception as e:
             logger.error(f"Erreur chargement cache: {e}")
             self.price_cache = {}
     
-    def _save_cache(self):
-        """Sauvegarde le cache des prix"""
-        try:
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.price_cache, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"Erreur sauvegarde cache: {e}")
-    
-    def _load_history(self):
-        """Charge l'historique des prix"""
-        try:
-            if os.path.exists(self.history_file):
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    self.price_history = json.load(f)
-                logger.info(f"Historique chargé: {len(self.price_history)} symboles")
-            else:
-                self.price_history = {}
-        except Exception as e:
-            logger.error(f"Erreur chargement historique: {e}")
-            self.price_history = {}
-    
-    def _save_history(self):
-        """Sauvegarde l'historique des prix"""
+    def _record_price(self, formatted_symbol: str, price_data: StockPriceData):
+        """Met à jour le cours en cache et ajoute un point à l'historique (une ligne chacun)"""
+        now = time.time()
+        self.price_cache[formatted_symbol] = {
+            'data': price_data.to_dict(),
+            'timestamp': now
+        }
         try:
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.price_history, f, indent=2, ensure_ascii=False)
+            self.history_store.put_quote(formatted_symbol, self.price_cache[formatted_symbol]['data'], now)
+            self.history_store.append(
+                formatted_symbol,
+                price=price_data.price,
+                change=price_data.change,
+                change_percent=price_data.change_percent,
+                volume=price_data.volume,
+                ts=now
+            )
         except Exception as e:
             logger.error(f"Erreur sauvegarde historique: {e}")
     
@@ -157,6 +146,7 @@ class StockPriceManager:
     def _get_fundamental_metrics(self, symbol: str) -> Dict[str, Any]:
         """Récupère les métriques fondamentales via yfinance"""
         try:
+            get_rate_limiter('yahoo').acquire()
             ticker = yf.Ticker(symbol)
             info = ticker.info
             
@@ -189,11 +179,12 @@ class StockPriceManager:
         """Récupère le prix d'une action avec gestion optimisée et verrouillage"""
         formatted_symbol = self._format_symbol(symbol, exchange)
         
-        # Utiliser un verrou par symbole pour éviter les conflits
-        symbol_lock = self._get_symbol_lock(formatted_symbol)
-        
-        with symbol_lock:
-            return self._get_stock_price_internal(formatted_symbol, force_refresh)
+        # Les demandes simultanées pour un même symbole partagent une seule récupération
+        # (une demande forcée ne se contente pas d'une lecture de cache en cours)
+        return self._requests.run(
+            (formatted_symbol, force_refresh),
+            lambda: self._get_stock_price_internal(formatted_symbol, force_refresh)
+        )
     
     def _get_stock_price_internal(self, formatted_symbol: str, force_refresh: bool = False) -> Optional[StockPriceData]:
         """Méthode interne pour récupérer le prix d'une action"""
@@ -235,31 +226,8 @@ class StockPriceManager:
                         timestamp=yahoo_data.get('timestamp', datetime.now().isoformat())
                     )
                     
-                    # Sauvegarder dans le cache
-                    self.price_cache[formatted_symbol] = {
-                        'data': price_data.to_dict(),
-                        'timestamp': time.time()
-                    }
-                    self._save_cache()
-                    
-                    # Sauvegarder dans l'historique
-                    if formatted_symbol not in self.price_history:
-                        self.price_history[formatted_symbol] = []
-                    
-                    self.price_history[formatted_symbol].append({
-                        'date': datetime.now().strftime('%Y-%m-%d'),
-                        'time': datetime.now().strftime('%H:%M'),
-                        'price': float(yahoo_data['price']),
-                        'change': float(yahoo_data.get('change', 0)),
-                        'change_percent': float(yahoo_data.get('change_percent', 0)),
-                        'volume': int(yahoo_data.get('volume', 0))
-                    })
-                    
-                    # Garder seulement les 30 derniers jours
-                    if len(self.price_history[formatted_symbol]) > 30:
-                        self.price_history[formatted_symbol] = self.price_history[formatted_symbol][-30:]
-                    
-                    self._save_history()
+                    # Sauvegarder dans le cache et l'historique
+                    self._record_price(formatted_symbol, price_data)
                     
                     logger.info(f"✅ Données mises à jour pour {formatted_symbol}: {yahoo_data['price']} {yahoo_data['currency']}")
                     return price_data
@@ -288,31 +256,8 @@ class StockPriceManager:
                         timestamp=yahooquery_data.get('timestamp', datetime.now().isoformat())
                     )
                     
-                    # Sauvegarder dans le cache
-                    self.price_cache[formatted_symbol] = {
-                        'data': price_data.to_dict(),
-                        'timestamp': time.time()
-                    }
-                    self._save_cache()
-                    
-                    # Sauvegarder dans l'historique
-                    if formatted_symbol not in self.price_history:
-                        self.price_history[formatted_symbol] = []
-                    
-                    self.price_history[formatted_symbol].append({
-                        'date': datetime.now().strftime('%Y-%m-%d'),
-                        'time': datetime.now().strftime('%H:%M'),
-                        'price': float(yahooquery_data['price']),
-                        'change': float(yahooquery_data.get('change', 0)),
-                        'change_percent': float(yahooquery_data.get('change_percent', 0)),
-                        'volume': int(yahooquery_data.get('volume', 0))
-                    })
-                    
-                    # Garder seulement les 30 derniers jours
-                    if len(self.price_history[formatted_symbol]) > 30:
-                        self.price_history[formatted_symbol] = self.price_history[formatted_symbol][-30:]
-                    
-                    self._save_history()
+                    # Sauvegarder dans le cache et l'historique
+                    self._record_price(formatted_symbol, price_data)
                     
                     logger.info(f"✅ Données mises à jour via yahooquery pour {formatted_symbol}: {yahooquery_data['price']} {yahooquery_data['currency']}")
                     return price_data
@@ -386,31 +331,8 @@ class StockPriceManager:
                 timestamp=datetime.now().isoformat()
             )
             
-            # Sauvegarder dans le cache
-            self.price_cache[formatted_symbol] = {
-                'data': price_data.to_dict(),
-                'timestamp': time.time()
-            }
-            self._save_cache()
-            
-            # Sauvegarder dans l'historique
-            if formatted_symbol not in self.price_history:
-                self.price_history[formatted_symbol] = []
-            
-            self.price_history[formatted_symbol].append({
-                'date': datetime.now().strftime('%Y-%m-%d'),
-                'time': datetime.now().strftime('%H:%M'),
-                'price': float(current_price),
-                'change': float(change),
-                'change_percent': float(change_percent),
-                'volume': volume
-            })
-            
-            # Garder seulement les 30 derniers jours
-            if len(self.price_history[formatted_symbol]) > 30:
-                self.price_history[formatted_symbol] = self.price_history[formatted_symbol][-30:]
-            
-            self._save_history()
+            # Sauvegarder dans le cache et l'historique
+            self._record_price(formatted_symbol, price_data)
             
             logger.info(f"✅ Données mises à jour pour {formatted_symbol}: {current_price} {info.get('currency', 'USD')}")
             return price_data
@@ -419,29 +341,30 @@ class StockPriceManager:
             logger.error(f"Erreur récupération prix pour {formatted_symbol}: {e}")
             return None
     
-    def get_price_history(self, symbol: str, days: int = 30) -> List[Dict[str, Any]]:
-        """Récupère l'historique des prix"""
+    def get_price_history(self, symbol: str, days: int = 30, interval: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Récupère l'historique des prix des `days` derniers jours (tout si days <= 0);
+        `interval` (secondes, ex. 86400) ne garde que le dernier point par intervalle"""
         formatted_symbol = self._format_symbol(symbol)
-        
-        if formatted_symbol in self.price_history:
-            history = self.price_history[formatted_symbol]
-            return history[-days:] if days > 0 else history
-        
-        return []
+        try:
+            return self.history_store.history(formatted_symbol, days=days, interval=interval)
+        except Exception as e:
+            logger.error(f"Erreur lecture historique pour {formatted_symbol}: {e}")
+            return []
     
     def get_cache_status(self) -> Dict[str, Any]:
         """Retourne le statut du cache"""
         return {
             'cache_size': len(self.price_cache),
-            'history_size': len(self.price_history),
-            'cache_duration': self.cache_duration
+            'history_size': self.history_store.symbol_count(),
+            'cache_duration': self.cache_duration,
+            'requests': self._requests.stats()
         }
     
     def clear_cache(self):
         """Vide le cache"""
         with self._lock:
             self.price_cache.clear()
-            self._save_cache()
+            self.history_store.clear_quotes()
             logger.info("Cache des prix vidé")
     
     def update_all_stocks(self, symbols: List[str]) -> Dict[str, Any]:
@@ -454,27 +377,34 @@ class StockPriceManager:
             'cache_used': 0
         }
         
-        with self._lock:
-            for symbol in symbols:
-                try:
-                    # Récupérer le prix
-                    price_data = self.get_stock_price(symbol, force_refresh=True)
-                    
-                    if price_data:
-                        results['success'].append({
-                            'symbol': symbol,
-                            'price': price_data.price,
-                            'currency': price_data.currency,
-                            'change_percent': price_data.change_percent,
-                            'volume': price_data.volume
-                        })
-                        results['requests_used'] += 1
-                    else:
-                        results['failed'].append(symbol)
-                        
-                except Exception as e:
-                    logger.error(f"Erreur mise à jour {symbol}: {e}")
+        # Pas de verrou global: chaque symbole passe par le regroupement par symbole,
+        # une lecture ou un clear_cache concurrent n'attend pas la fin de la boucle
+        for symbol in symbols:
+            try:
+                # Récupérer le prix
+                price_data = self.get_stock_price(symbol, force_refresh=True)
+                
+                if price_data:
+                    results['success'].append({
+                        'symbol': symbol,
+                        'price': price_data.price,
+                        'currency': price_data.currency,
+                        'change_percent': price_data.change_percent,
+                        'volume': price_data.volume
+                    })
+                    results['requests_used'] += 1
+                else:
                     results['failed'].append(symbol)
+                    
+            except Exception as e:
+                logger.error(f"Erreur mise à jour {symbol}: {e}")
+                results['failed'].append(symbol)
+        
+        # Compacter l'historique ancien (les points récents restent à la minute)
+        try:
+            self.history_store.downsample(older_than_days=self.history_downsample_days)
+        except Exception as e:
+            logger.error(f"Erreur compaction historique: {e}")
         
         return results
     
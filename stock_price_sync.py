@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Écriture groupée des prix d'actions rafraîchis dans la table Supabase `items`.
+
+Utilisé par /api/stock-price/update-all (app.py) et par le job de rafraîchissement
+du background worker: une seule requête upsert (ou quelques chunks) au lieu d'un
+`update().eq('id', ...)` par position, en ignorant les lignes dont le prix, la
+variation et le volume n'ont pas bougé.
+"""
+
+import os
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PRICE_UPSERT_CHUNK_SIZE = int(os.getenv('PRICE_UPSERT_CHUNK_SIZE', '200'))
+
+# Colonnes NOT NULL renvoyées avec chaque ligne: l'upsert PostgREST construit un INSERT
+# complet avant de résoudre le conflit sur `id`.
+_REQUIRED_COLUMNS = ('id', 'name', 'category')
+
+
+def _to_number(value: Any) -> Optional[float]:
+    """Convertit en float, None si vide ou non numérique"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _has_moved(old: Any, new: Any, tolerance: float) -> bool:
+    """Indique si une valeur a changé au-delà de la tolérance (précision des colonnes DECIMAL)"""
+    old_num = _to_number(old)
+    new_num = _to_number(new)
+    if new_num is None:
+        return False
+    if old_num is None:
+        return True
+    return abs(old_num - new_num) > tolerance
+
+
+def price_has_moved(row: Dict[str, Any], data: Dict[str, Any]) -> bool:
+    """Vrai si le prix, la variation ou le volume diffère de la valeur stockée"""
+    return (
+        _has_moved(row.get('current_price'), data.get('price'), 0.005)
+        or _has_moved(row.get('stock_change'), data.get('change'), 0.005)
+        or _has_moved(row.get('stock_volume'), data.get('volume'), 0.5)
+    )
+
+
+def build_price_update(row: Dict[str, Any], data: Dict[str, Any], timestamp: Optional[str] = None) -> Dict[str, Any]:
+    """Construit la ligne à upserter pour une position à partir des données de cotation"""
+    price = _to_number(data.get('price'))
+    quantity = _to_number(row.get('stock_quantity')) or 1
+    volume = _to_number(data.get('volume'))
+    update = {column: row.get(column) for column in _REQUIRED_COLUMNS}
+    update.update({
+        'current_price': price,
+        'current_value': price * quantity if price is not None else None,
+        'last_price_update': timestamp or datetime.now().isoformat(),
+        'stock_volume': int(volume) if volume is not None else None,
+        'stock_pe_ratio': _to_number(data.get('pe_ratio')),
+        'stock_52_week_high': _to_number(data.get('fifty_two_week_high')),
+        'stock_52_week_low': _to_number(data.get('fifty_two_week_low')),
+        'stock_change': _to_number(data.get('change')),
+        'stock_change_percent': _to_number(data.get('change_percent')),
+        'stock_average_volume': int(volume) if volume is not None else None,
+        'stock_currency': data.get('currency') or row.get('stock_currency') or 'USD'
+    })
+    return update
+
+
+def bulk_upsert_stock_prices(supabase_client, rows: List[Dict[str, Any]], prices: Dict[str, Dict[str, Any]],
+                             chunk_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Upserte en bloc les prix rafraîchis.
+
+    Args:
+        supabase_client: client Supabase
+        rows: lignes `items` actuelles (au minimum id, name, category, stock_symbol,
+              stock_quantity, current_price, stock_change, stock_volume)
+        prices: données de cotation par symbole (format StockAPIManager)
+        chunk_size: nombre de lignes par requête upsert
+
+    Returns:
+        {'updated': [ids], 'unchanged': [ids], 'failed': [ids], 'requests': n}
+    """
+    chunk_size = chunk_size or PRICE_UPSERT_CHUNK_SIZE
+    timestamp = datetime.now().isoformat()
+    payload: List[Dict[str, Any]] = []
+    unchanged: List[Any] = []
+    for row in rows:
+        data = prices.get(row.get('stock_symbol'))
+        if not data or _to_number(data.get('price')) is None:
+            continue
+        if not price_has_moved(row, data):
+            unchanged.append(row.get('id'))
+            continue
+        payload.append(build_price_update(row, data, timestamp))
+
+    result: Dict[str, Any] = {'updated': [], 'unchanged': unchanged, 'failed': [], 'requests': 0}
+    for start in range(0, len(payload), chunk_size):
+        chunk = payload[start:start + chunk_size]
+        ids = [r['id'] for r in chunk]
+        try:
+            supabase_client.table('items').upsert(chunk, on_conflict='id').execute()
+            result['updated'].extend(ids)
+        except Exception as e:
+            logger.error(f"❌ Échec upsert groupé des prix ({len(chunk)} lignes): {e}")
+            result['failed'].extend(ids)
+        result['requests'] += 1
+
+    logger.info(
+        f"💾 Upsert prix: {len(result['updated'])} mises à jour, {len(unchanged)} inchangées, "
+        f"{len(result['failed'])} échecs en {result['requests']} requête(s)"
+    )
+    return result
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Canal d'événements des tâches Celery (avancement + résultat final) via Redis pub/sub.
+
+- Côté worker: `ProgressTask` (classe de base des tâches) publie chaque `update_state`
+  et le résultat final sur `<prefix>:<task_id>`
+- Côté web: un seul abonné par process (`TaskEventHub`, psubscribe sur `<prefix>:*`)
+  distribue les messages aux flux SSE ouverts pour ce task_id
+- `stream_task_events()` produit les trames SSE (open/state/result/error, keepalive);
+  l'état du backend Celery n'est relu qu'à l'ouverture puis au rythme du heartbeat,
+  en filet de sécurité (message manqué, tâche révoquée)
+"""
+
+import os
+import ssl
+import json
+import time
+import queue
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from celery import Task
+
+try:
+    import redis  # type: ignore
+except Exception:  # pragma: no cover
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+TASK_EVENTS_PREFIX = os.getenv("TASK_EVENTS_PREFIX", "inventorysbo:task")
+TERMINAL_STATES = ("SUCCESS", "FAILURE", "REVOKED")
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _redis_url() -> Optional[str]:
+    url = os.getenv("CELERY_RESULT_BACKEND") or os.getenv("REDIS_URL")
+    if url and os.getenv("REDIS_USE_SSL", "0") == "1" and url.startswith("redis://"):
+        url = "rediss://" + url[len("redis://"):]
+    return url if url and url.startswith(("redis://", "rediss://")) else None
+
+
+def _get_client():
+    """Client Redis partagé du process (None si Redis n'est pas configuré)"""
+    global _client
+    if _client is not None or redis is None:
+        return _client
+    url = _redis_url()
+    if not url:
+        return None
+    with _client_lock:
+        if _client is None:
+            _client = redis.from_url(
+                url,
+                ssl_cert_reqs=ssl.CERT_NONE if url.startswith("rediss://") else None,
+                socket_timeout=2,
+                socket_connect_timeout=2,
+            )
+    return _client
+
+
+def channel_for(task_id: str) -> str:
+    return f"{TASK_EVENTS_PREFIX}:{task_id}"
+
+
+def publish_task_event(task_id: Optional[str], event: Dict[str, Any], client=None) -> None:
+    """Publie un événement {'state', 'info', ['result'|'traceback']} (best-effort)"""
+    if not task_id:
+        return
+    client = client or _get_client()
+    if client is None:
+        return
+    try:
+        client.publish(channel_for(task_id), json.dumps(event, default=str))
+    except Exception as e:
+        logger.debug(f"Publication événement tâche {task_id} impossible: {e}")
+
+
+class ProgressTask(Task):
+    """Tâche Celery qui publie son avancement et son résultat sur le canal de la tâche"""
+
+    def update_state(self, task_id=None, state=None, meta=None, **kwargs):
+        super().update_state(task_id=task_id, state=state, meta=meta, **kwargs)
+        publish_task_event(task_id or self.request.id, {'state': state, 'info': meta if isinstance(meta, dict) else {}})
+
+    def after_return(self, status, retval, task_id, args, kwargs, einfo):
+        # Appelé après l'écriture du résultat dans le backend
+        if status == 'SUCCESS':
+            publish_task_event(task_id, {'state': status, 'info': {}, 'result': retval})
+        else:
+            publish_task_event(task_id, {
+                'state': status,
+                'info': {},
+                'traceback': getattr(einfo, 'traceback', None)
+            })
+        super().after_return(status, retval, task_id, args, kwargs, einfo)
+
+
+class TaskEventHub:
+    """Abonné pub/sub unique du process, multiplexé vers les files des flux SSE"""
+
+    def __init__(self, client, prefix: str = TASK_EVENTS_PREFIX):
+        self.client = client
+        self.prefix = prefix
+        self._queues: Dict[str, List[queue.Queue]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {'subscribers': 0, 'messages': 0, 'delivered': 0, 'reconnects': 0}
+
+    def subscribe(self, task_id: str) -> queue.Queue:
+        q: queue.Queue = queue.Queue()
+        with self._lock:
+            self._queues.setdefault(task_id, []).append(q)
+            self.stats['subscribers'] += 1
+        self._ensure_listener()
+        return q
+
+    def unsubscribe(self, task_id: str, q: queue.Queue) -> None:
+        with self._lock:
+            queues = self._queues.get(task_id, [])
+            if q in queues:
+                queues.remove(q)
+                self.stats['subscribers'] -= 1
+            if not queues:
+                self._queues.pop(task_id, None)
+
+    def _ensure_listener(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._listen, name='task-events', daemon=True)
+            self._thread.start()
+
+    def _listen(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(f"{self.prefix}:*")
+                backoff = 1.0
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message:
+                        self._dispatch(message)
+            except Exception as e:
+                logger.debug(f"Abonnement événements tâches interrompu: {e}")
+                self.stats['reconnects'] += 1
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    def _dispatch(self, message: Dict[str, Any]) -> None:
+        channel = message.get('channel')
+        if isinstance(channel, bytes):
+            channel = channel.decode('utf-8', 'replace')
+        task_id = str(channel or '')[len(self.prefix) + 1:]
+        try:
+            event = json.loads(message.get('data'))
+        except Exception:
+            return
+        self.stats['messages'] += 1
+        with self._lock:
+            queues = list(self._queues.get(task_id, []))
+        for q in queues:
+            q.put(event)
+        self.stats['delivered'] += len(queues)
+
+
+_hub: Optional[TaskEventHub] = None
+_hub_lock = threading.Lock()
+
+
+def get_task_event_hub() -> Optional[TaskEventHub]:
+    """Hub du process, ou None si Redis n'est pas disponible (repli sur le polling)"""
+    global _hub
+    if _hub is not None:
+        return _hub
+    if os.getenv("TASK_EVENTS_ENABLED", "1") != "1":
+        return None
+    client = _get_client()
+    if client is None:
+        return None
+    with _hub_lock:
+        if _hub is None:
+            _hub = TaskEventHub(client)
+    return _hub
+
+
+def backend_snapshot(task_id: str, celery_app) -> Dict[str, Any]:
+    """État courant de la tâche lu dans le backend de résultats"""
+    from celery.result import AsyncResult
+    ar = AsyncResult(task_id, app=celery_app)
+    state = ar.state
+    event: Dict[str, Any] = {'state': state, 'info': ar.info if isinstance(ar.info, dict) else {}}
+    if state == 'SUCCESS':
+        event['result'] = ar.result
+    elif state in ('FAILURE', 'REVOKED'):
+        event['traceback'] = getattr(ar, 'traceback', None)
+    return event
+
+
+def _sse(event: str, payload: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+def _event_frames(task_id: str, snapshot: Callable[[], Dict[str, Any]], hub: Optional[TaskEventHub],
+                  announce: bool = True) -> Iterator[str]:
+    hb_every = int(os.getenv("STREAM_HEARTBEAT_S", "10"))
+    # Sans canal push: relecture du backend comme avant; avec canal: filet de sécurité au rythme du heartbeat
+    poll_every = float(os.getenv("TASK_EVENTS_POLL_S", str(hb_every))) if hub else 0.4
+    if announce:
+        # Inform client the stream is open and set retry interval
+        yield "event: open\ndata: {}\n\n"
+        yield f"retry: {int(os.getenv('STREAM_RETRY_MS', '3000'))}\n\n"
+
+    # S'abonner avant de lire le backend: aucun événement ne tombe entre les deux
+    events = hub.subscribe(task_id) if hub else None
+    seen_states = set()
+    try:
+        event: Optional[Dict[str, Any]] = snapshot()
+        last_hb = last_poll = time.monotonic()
+        while True:
+            if event:
+                state = event.get('state')
+                info = event.get('info') if isinstance(event.get('info'), dict) else {}
+                if state not in seen_states and state not in ("PENDING",):
+                    yield _sse('state', {'state': state, 'info': info})
+                    seen_states.add(state)
+                if state in TERMINAL_STATES:
+                    if state == "SUCCESS":
+                        if 'result' not in event:
+                            event = snapshot()
+                        yield _sse('result', {'result': event.get('result')})
+                    else:
+                        yield _sse('error', {'state': state, 'info': info, 'traceback': event.get('traceback')})
+                    return
+            event = None
+
+            now = time.monotonic()
+            wait = max(0.0, min(last_hb + hb_every, last_poll + poll_every) - now)
+            if events is not None:
+                try:
+                    event = events.get(timeout=wait)
+                except queue.Empty:
+                    pass
+            else:
+                time.sleep(wait)
+
+            now = time.monotonic()
+            if now - last_hb >= hb_every:
+                # Heartbeat to keep intermediaries from closing idle connections
+                yield ":keepalive\n\n"
+                last_hb = now
+            if event is None and now - last_poll >= poll_every:
+                event = snapshot()
+                last_poll = now
+    finally:
+        if events is not None:
+            hub.unsubscribe(task_id, events)
+
+
+def stream_task_events(task_id: str, celery_app, announce: bool = True) -> Iterator[str]:
+    """Flux SSE (open/state/result/error) d'une tâche Celery, alimenté par le canal push"""
+    return _event_frames(task_id, lambda: backend_snapshot(task_id, celery_app), get_task_event_hub(), announce)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test des tâches chat Celery exécutées en process (chat_engine, sans rappel HTTP à l'app web)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def _items():
+    from chat_engine import CollectionItem
+    return [
+        CollectionItem(id=1, name='Ferrari 812', category='Voitures', status='Available', current_value=350000),
+        CollectionItem(id=2, name='Porsche 911', category='Voitures', status='Sold', current_value=150000),
+        CollectionItem(id=3, name='Sunseeker 76', category='Bateaux', status='Available', current_value=2500000),
+        CollectionItem(id=4, name='Nestlé', category='Actions', status='Available', current_price=100.0, stock_quantity=50),
+    ]
+
+def test_basic_answers_use_cached_items():
+    """Les réponses déterministes lisent les items via AdvancedDataManager, sans requests.get"""
+    print("🔍 Test _compute_basic_answer_or_none...")
+
+    import tasks
+    import chat_engine
+
+    calls = []
+    original = chat_engine.AdvancedDataManager.fetch_all_items
+    chat_engine.AdvancedDataManager.fetch_all_items = staticmethod(lambda: calls.append(1) or _items())
+    original_get = tasks.requests.get
+    tasks.requests.get = lambda *a, **k: (_ for _ in ()).throw(AssertionError("appel HTTP inattendu"))
+    try:
+        count = tasks._compute_basic_answer_or_none("Combien de voitures au total ?")
+        net = tasks._compute_basic_answer_or_none("Quelle est ma valeur nette ?")
+        flagship = tasks._compute_basic_answer_or_none("Quel est mon vaisseau amiral ?")
+    finally:
+        chat_engine.AdvancedDataManager.fetch_all_items = original
+        tasks.requests.get = original_get
+    print(f"   📊 {count} | {net} | {flagship}")
+    assert count == "Tu as 2 voitures au total, dont 1 vendues et 1 disponibles."
+    assert "2,855,000 CHF" in net
+    assert "Sunseeker 76" in flagship
+    assert len(calls) == 3
+    return True
+
+def test_chat_task_runs_engine_in_process():
+    """chat_task délègue au moteur en process quand aucune réponse rapide n'existe"""
+    print("\n🔍 Test chat_task → generate_chat_reply...")
+
+    import tasks
+    import chat_engine
+
+    seen = {}
+
+    def fake_reply(message, session_id=None, history=None):
+        seen.update(message=message, session_id=session_id, history=history)
+        return "Réponse du moteur"
+
+    original = chat_engine.generate_chat_reply
+    original_post = tasks.requests.post
+    chat_engine.generate_chat_reply = fake_reply
+    progress = []
+    tasks.chat_task.update_state = lambda state=None, meta=None, **k: progress.append(meta["step"])
+    tasks.requests.post = lambda *a, **k: (_ for _ in ()).throw(AssertionError("appel HTTP inattendu"))
+    os.environ.pop("AGENT_CHAT_URL", None)
+    try:
+        out = tasks.chat_task.run({"message": "Parle-moi de ma Ferrari", "session_id": "s1", "history": [{"role": "user", "content": "salut"}]})
+    finally:
+        del tasks.chat_task.update_state
+        chat_engine.generate_chat_reply = original
+        tasks.requests.post = original_post
+    print(f"   📊 {out['answer']} / {progress}")
+    assert out["ok"] and out["answer"] == "Réponse du moteur"
+    assert seen["session_id"] == "s1" and seen["history"][0]["content"] == "salut"
+    assert progress[-1] == "format_output"
+    return True
+
+if __name__ == "__main__":
+    print("🚀 Test des tâches chat en process")
+    print("=" * 50)
+    ok_basic = test_basic_answers_use_cached_items()
+    ok_engine = test_chat_task_runs_engine_in_process()
+    print(f"\nRéponses rapides: {'✅' if ok_basic else '❌'} | Moteur en process: {'✅' if ok_engine else '❌'}")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test de l'ordonnanceur de crawl des scrapers (crawl_scheduler.CrawlScheduler)
+"""
+
+import sys
+import os
+import asyncio
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _FakeFetcher:
+    """_scrape_page_with_metadata simulé: 50 ms par page, 1000 caractères, 5 crédits"""
+
+    def __init__(self, failing=()):
+        self.calls = []
+        self.active = {}
+        self.peak = {'global': 0}
+        self.failing = set(failing)
+
+    async def __call__(self, url):
+        from crawl_scheduler import _domain
+        domain = _domain(url)
+        self.calls.append(url)
+        self.active[domain] = self.active.get(domain, 0) + 1
+        total = sum(self.active.values())
+        self.peak['global'] = max(self.peak['global'], total)
+        self.peak[domain] = max(self.peak.get(domain, 0), self.active[domain])
+        await asyncio.sleep(0.05)
+        self.active[domain] -= 1
+        if url in self.failing:
+            return None
+        return {'text': 'x' * 1000, 'published_at': None, 'credits': '5'}
+
+
+def test_bounded_fan_out_and_dedup():
+    """3 sources × 8 liens: bornes globale/par domaine respectées, doublons jamais récupérés"""
+    print("🔍 Test concurrence bornée et déduplication...")
+
+    from crawl_scheduler import CrawlScheduler, normalize_url
+
+    assert normalize_url('https://WWW.CNN.com/world/a/?utm_source=rss#top') == 'https://www.cnn.com/world/a'
+    fetcher = _FakeFetcher(failing={'https://www.cnn.com/world/3'})
+    crawler = CrawlScheduler(fetcher, max_concurrency=6, per_domain=2)
+    crawler.mark_seen('https://www.rts.ch/info/0')
+    kept = []
+
+    def handle(url, source, details):
+        kept.append((source, url))
+        return True
+
+    batches = [
+        ('marketwatch', [f"https://www.marketwatch.com/story/{i}" for i in range(8)]),
+        ('cnn', [f"https://www.cnn.com/world/{i}" for i in range(8)] + ['https://www.cnn.com/world/1/?utm_medium=x']),
+        ('rts', [f"https://www.rts.ch/info/{i}" for i in range(8)]),
+    ]
+    start = time.perf_counter()
+    added = asyncio.run(crawler.crawl(batches, handle))
+    elapsed = time.perf_counter() - start
+    stats = crawler.stats()
+    print(f"   📊 {len(fetcher.calls)} pages en {elapsed * 1000:.0f} ms, pics {fetcher.peak}")
+    print(f"   📊 {stats['cnn']}")
+
+    assert len(fetcher.calls) == 23 and len(set(fetcher.calls)) == 23
+    assert fetcher.peak['global'] == 6 and all(fetcher.peak[d] == 2 for d in ('marketwatch.com', 'cnn.com', 'rts.ch'))
+    assert 0.2 <= elapsed < 0.4  # 4 vagues de 50 ms au lieu de 23 pages à la suite (~1.15 s)
+    assert added == {'marketwatch': 8, 'cnn': 7, 'rts': 7}
+    assert stats['cnn']['failed'] == 1 and stats['cnn']['duplicates'] == 1 and stats['rts']['duplicates'] == 1
+    assert stats['cnn']['credits'] == 35 and stats['cnn']['avg_latency_s'] >= 0.05
+    return True
+
+
+def test_early_stop_at_min_chars():
+    """Objectif de caractères atteint: plus aucune page lancée; un 2e lot ne refait pas les URLs vues"""
+    print("\n🔍 Test arrêt anticipé...")
+
+    from crawl_scheduler import CrawlScheduler
+
+    fetcher = _FakeFetcher()
+    crawler = CrawlScheduler(fetcher, max_concurrency=2, per_domain=2)
+    chars = []
+
+    def handle(url, source, details):
+        chars.append(len(details['text']))
+        return True
+
+    stop = lambda: sum(chars) >= 3000
+    links = [f"https://www.marketwatch.com/story/{i}" for i in range(20)]
+
+    async def scenario():
+        await crawler.crawl([('marketwatch', links[:12]), ('cnn', ['https://www.cnn.com/world/1'])], handle, stop_when=stop)
+        first_calls = len(fetcher.calls)
+        added = await crawler.crawl([('marketwatch', links[:14])], handle)
+        return first_calls, added
+
+    first_calls, added = asyncio.run(scenario())
+    stats = crawler.stats()
+    print(f"   📊 {first_calls} pages récupérées, {stats['marketwatch']['skipped']} évitées")
+    assert first_calls <= 4 and stats['marketwatch']['skipped'] + stats['cnn']['skipped'] == 13 - first_calls
+    # Les deux sources ont démarré (lots entrelacés)
+    assert 'https://www.cnn.com/world/1' in fetcher.calls
+
+    # 2e lot: seules les URLs jamais vues sont récupérées (les pages évitées restent réservées)
+    assert added == {'marketwatch': 2} and len(fetcher.calls) == first_calls + 2
+    return True
+
+
+if __name__ == "__main__":
+    print("🚀 Test de l'ordonnanceur de crawl")
+    print("=" * 50)
+    ok_fanout = test_bounded_fan_out_and_dedup()
+    ok_stop = test_early_stop_at_min_chars()
+    print(f"\nConcurrence/dédup: {'✅' if ok_fanout else '❌'} | Arrêt anticipé: {'✅' if ok_stop else '❌'}")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test du cache d'embeddings de requêtes (embedding_cache.QueryEmbeddingCache)
+"""
+
+import sys
+import os
+import tempfile
+import threading
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+class _FakeEmbeddings:
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def create(self, model, input):
+        with self._lock:
+            self.calls.append(list(input))
+        data = [SimpleNamespace(index=i, embedding=[float(len(text)), float(i)]) for i, text in enumerate(input)]
+        return SimpleNamespace(data=list(reversed(data)))
+
+def _client():
+    return SimpleNamespace(embeddings=_FakeEmbeddings())
+
+def test_normalization_and_l2():
+    """Formulations triviales partagées, relecture SQLite après redémarrage"""
+    print("🔍 Test normalisation + cache SQLite...")
+
+    from embedding_cache import QueryEmbeddingCache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'cache.db')
+        client = _client()
+        cache = QueryEmbeddingCache(client, db_path=db_path, batch_window=0)
+        first = cache.get("Combien de voitures ?", "text-embedding-3-small")
+        second = cache.get("combien de  voitures", "text-embedding-3-small")
+        assert first == second
+        assert len(client.embeddings.calls) == 1
+
+        restarted = QueryEmbeddingCache(_client(), db_path=db_path, batch_window=0)
+        assert restarted.get("COMBIEN de voitures", "text-embedding-3-small") == first
+        print(f"   📊 {restarted.stats}")
+        assert restarted.stats['l2_hits'] == 1
+        assert restarted.stats['api_calls'] == 0
+    return True
+
+def test_concurrent_misses_batched():
+    """Les requêtes concurrentes manquantes partagent un seul appel API"""
+    print("\n🔍 Test regroupement des requêtes concurrentes...")
+
+    from embedding_cache import QueryEmbeddingCache
+
+    client = _client()
+    cache = QueryEmbeddingCache(client, batch_window=0.2)
+    queries = [f"question {i % 6}" for i in range(12)]
+    results = [None] * len(queries)
+
+    def worker(i):
+        results[i] = cache.get(queries[i], "text-embedding-3-small")
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(queries))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    print(f"   📊 appels: {client.embeddings.calls}")
+    assert len(client.embeddings.calls) == 1
+    assert sorted(client.embeddings.calls[0]) == sorted({q for q in queries})
+    assert all(r is not None for r in results)
+    assert results[0] == results[6]
+    return True
+
+if __name__ == "__main__":
+    print("🚀 Test du cache d'embeddings")
+    print("=" * 50)
+    ok_l2 = test_normalization_and_l2()
+    ok_batch = test_concurrent_misses_batched()
+    print(f"\nNormalisation/L2: {'✅' if ok_l2 else '❌'} | Regroupement: {'✅' if ok_batch else '❌'}")
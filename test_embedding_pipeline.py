@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test du pipeline de génération groupée des embeddings (embedding_pipeline)
+"""
+
+import sys
+import os
+import json
+import tempfile
+import threading
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+class _FakeQuery:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+        self.after = 0
+        self.limit_n = None
+        self.payload = None
+
+    def select(self, columns):
+        return self
+
+    def gt(self, column, value):
+        self.after = value
+        return self
+
+    def order(self, column, desc=False):
+        return self
+
+    def limit(self, n):
+        self.limit_n = n
+        return self
+
+    def upsert(self, rows, on_conflict=None):
+        self.payload = rows
+        return self
+
+    def execute(self):
+        if self.payload is not None:
+            with self.db.lock:
+                self.db.upserts.append(self.payload)
+                for row in self.payload:
+                    self.db.rows[row['id']].update(row)
+            return SimpleNamespace(data=self.payload)
+        rows = [dict(r) for i, r in sorted(self.db.rows.items()) if i > self.after][:self.limit_n]
+        return SimpleNamespace(data=rows)
+
+class _FakeSupabase:
+    def __init__(self, rows):
+        self.rows = {r['id']: dict(r) for r in rows}
+        self.upserts = []
+        self.lock = threading.Lock()
+
+    def table(self, name):
+        assert name == 'items'
+        return _FakeQuery(self, name)
+
+class _FakeEmbeddings:
+    def __init__(self):
+        self.inputs = []
+
+    def create(self, model, input):
+        self.inputs.append(list(input))
+        return SimpleNamespace(data=[SimpleNamespace(index=i, embedding=[float(len(t))]) for i, t in enumerate(input)])
+
+def _items(n):
+    return [{'id': i, 'name': f'Objet {i}', 'category': 'Montres', 'status': 'Available'} for i in range(1, n + 1)]
+
+def test_backfill_batches_and_skips_unchanged():
+    """Lots multi-input, écriture groupée, lignes inchangées ignorées au second passage"""
+    print("🔍 Test EmbeddingBackfill.run...")
+
+    from embedding_pipeline import EmbeddingBackfill
+
+    db = _FakeSupabase(_items(25))
+    client = SimpleNamespace(embeddings=_FakeEmbeddings())
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline = EmbeddingBackfill(db, client, batch_size=10, max_workers=3, page_size=20,
+                                     tokens_per_minute=1e9, checkpoint_path=os.path.join(tmp, 'cp.json'))
+        first = pipeline.run('items')
+        print(f"   📊 1er passage: {first}")
+        assert first['embedded'] == 25
+        assert first['api_calls'] == 3
+        assert first['write_requests'] == 3
+        assert all(row.get('embedding_hash') for row in db.rows.values())
+
+        db.rows[7]['name'] = 'Objet renommé'
+        second = pipeline.run('items')
+        print(f"   📊 2e passage: {second}")
+        assert second['skipped'] == 24
+        assert second['embedded'] == 1
+        assert client.embeddings.inputs[-1][0].startswith('Nom: Objet renommé')
+        assert not os.path.exists(os.path.join(tmp, 'cp.json'))
+    return True
+
+def test_resume_from_checkpoint():
+    """La reprise repart après le dernier id enregistré"""
+    print("\n🔍 Test point de reprise...")
+
+    from embedding_pipeline import EmbeddingBackfill, DEFAULT_MODEL
+
+    db = _FakeSupabase(_items(12))
+    client = SimpleNamespace(embeddings=_FakeEmbeddings())
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpoint = os.path.join(tmp, 'cp.json')
+        with open(checkpoint, 'w') as f:
+            json.dump({'items': {'last_id': 8, 'model': DEFAULT_MODEL, 'force': False}}, f)
+        pipeline = EmbeddingBackfill(db, client, batch_size=10, tokens_per_minute=1e9, checkpoint_path=checkpoint)
+        stats = pipeline.run('items')
+        print(f"   📊 {stats}")
+        assert stats['resumed_from'] == 8
+        assert stats['embedded'] == 4
+    return True
+
+if __name__ == "__main__":
+    print("🚀 Test du pipeline d'embeddings")
+    print("=" * 50)
+    ok_run = test_backfill_batches_and_skips_unchanged()
+    ok_resume = test_resume_from_checkpoint()
+    print(f"\nBackfill: {'✅' if ok_run else '❌'} | Reprise: {'✅' if ok_resume else '❌'}")
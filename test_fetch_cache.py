@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test du cache persistant des pages scrapées (fetch_cache.FetchCache) et de la revalidation RSS
+"""
+
+import sys
+import os
+import time
+import asyncio
+import tempfile
+from datetime import datetime, timezone
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiohttp import web
+
+RSS = "<rss><channel><item><title>BNS</title><link>https://www.snb.ch/a</link></item></channel></rss>"
+ARTICLE = ("<html><head><meta property='article:published_time' content='2025-09-30T08:00:00Z'></head>"
+           "<body><article><p>" + "La BNS maintient son taux directeur. " * 40 + "</p></article></body></html>")
+
+
+def test_store_ttl_and_normalization():
+    """Entrée relue via une URL équivalente; TTL propre à chaque source; validateurs HTTP conservés"""
+    print("🔍 Test stockage, TTL par source et clé normalisée...")
+
+    from fetch_cache import FetchCache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = FetchCache(os.path.join(tmp, 'fetch.db'), ttls={'rss': 0.05})
+        published = datetime(2025, 9, 30, 8, 0, tzinfo=timezone.utc)
+        cache.put('https://www.CNN.com/world/a/?utm_source=rss', 'texte complet', 'article',
+                  published_at=published, published_at_raw='2025-09-30T08:00:00Z',
+                  headers={'ETag': '"v1"', 'Last-Modified': 'Tue, 30 Sep 2025 08:00:00 GMT', 'Set-Cookie': 'x'})
+
+        hit = cache.get('https://www.cnn.com/world/a#comments')
+        assert hit['text'] == 'texte complet' and hit['published_at'] == published
+        assert hit['headers'] == {'etag': '"v1"', 'last-modified': 'Tue, 30 Sep 2025 08:00:00 GMT'}
+        assert FetchCache.conditional_headers(hit) == {'If-None-Match': '"v1"',
+                                                      'If-Modified-Since': 'Tue, 30 Sep 2025 08:00:00 GMT'}
+        assert cache.get('https://www.cnn.com/world/a', 'article', max_age=0) is None
+
+        cache.put('https://news.google.com/rss/search?q=bns', RSS, 'rss')
+        assert cache.get('https://news.google.com/rss/search?q=bns', 'rss') is not None
+        time.sleep(0.06)
+        assert cache.get('https://news.google.com/rss/search?q=bns', 'rss') is None
+        assert cache.lookup('https://news.google.com/rss/search?q=bns')['text'] == RSS
+        cache.touch('https://news.google.com/rss/search?q=bns')
+        assert cache.get('https://news.google.com/rss/search?q=bns', 'rss') is not None
+
+        # Persistance: une nouvelle instance (autre process) relit la même base
+        reopened = FetchCache(os.path.join(tmp, 'fetch.db'))
+        assert reopened.get('https://www.cnn.com/world/a')['text'] == 'texte complet'
+        stats = cache.stats()
+        print(f"   📊 {stats}")
+        assert stats['hits'] == 3 and stats['stale'] == 2 and stats['revalidated'] == 1 and stats['entries'] == 2
+
+        disabled = FetchCache(os.path.join(tmp, 'off.db'), enabled=False)
+        disabled.put('https://x.ch/a', 'texte')
+        assert disabled.get('https://x.ch/a') is None and not os.path.exists(os.path.join(tmp, 'off.db'))
+    return True
+
+
+def test_prune_respects_env_ttl_overrides():
+    """FETCH_CACHE_TTL_ARTICLE au-delà des défauts: le nettoyage périodique ne supprime pas l'entrée"""
+    print("\n🔍 Test nettoyage et surcharge de TTL...")
+
+    from fetch_cache import FetchCache, DEFAULT_TTLS
+
+    saved = os.environ.get('FETCH_CACHE_TTL_ARTICLE')
+    os.environ['FETCH_CACHE_TTL_ARTICLE'] = str(30 * 24 * 3600)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = FetchCache(os.path.join(tmp, 'fetch.db'), ttls={s: 0.01 for s in DEFAULT_TTLS})
+            cache.put('https://www.rts.ch/info/1', 'ancien article', 'article')
+            time.sleep(0.05)
+            cache._writes = 499  # la prochaine écriture déclenche le nettoyage
+            cache.put('https://www.rts.ch/info/2', 'nouvel article', 'article')
+            assert cache.get('https://www.rts.ch/info/1', 'article')['text'] == 'ancien article'
+    finally:
+        if saved is None:
+            os.environ.pop('FETCH_CACHE_TTL_ARTICLE', None)
+        else:
+            os.environ['FETCH_CACHE_TTL_ARTICLE'] = saved
+    return True
+
+
+def test_scraper_warm_cache_and_rss_revalidation():
+    """2e rapport: articles servis sans appel ScrapingBee; flux RSS revalidé par ETag (304)"""
+    print("\n🔍 Test scraper: cache chaud et revalidation RSS...")
+
+    from fetch_cache import FetchCache
+    from scrapingbee_scraper import ScrapingBeeScraper
+
+    calls = {'api': 0, 'rss': 0, 'not_modified': 0}
+
+    async def api(request):
+        calls['api'] += 1
+        return web.Response(text=ARTICLE, content_type='text/html', headers={'Spb-Cost': '25'})
+
+    async def rss(request):
+        calls['rss'] += 1
+        if request.headers.get('If-None-Match') == '"feed-v1"':
+            calls['not_modified'] += 1
+            return web.Response(status=304)
+        return web.Response(text=RSS, content_type='application/rss+xml', headers={'ETag': '"feed-v1"'})
+
+    async def scenario(tmp):
+        app = web.Application()
+        app.router.add_get('/api/v1', api)
+        app.router.add_get('/rss', rss)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        scraper = ScrapingBeeScraper()
+        scraper.api_key = 'test_key_for_testing'
+        scraper.base_url = f"http://127.0.0.1:{port}/api/v1"
+        scraper._fetch_cache = FetchCache(os.path.join(tmp, 'fetch.db'), ttls={'rss': 0})
+        feed_url = f"http://127.0.0.1:{port}/rss"
+        try:
+            first = await scraper._scrape_page_with_metadata('https://www.rts.ch/info/economie/123')
+            second = await scraper._scrape_page_with_metadata('https://www.rts.ch/info/economie/123?utm_medium=x')
+            async with scraper._http.session() as session:
+                feeds = [await scraper._fetch_feed(session, feed_url) for _ in range(3)]
+        finally:
+            await scraper._http.close()
+            await runner.cleanup()
+        return scraper, first, second, feeds
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scraper, first, second, feeds = asyncio.run(scenario(tmp))
+        stats = scraper.fetch_cache_stats()
+        print(f"   📊 appels {calls}, cache {stats}")
+        assert first['credits'] == '25' and not first.get('cached') and len(first['text']) > 1000
+        assert second['cached'] and second['credits'] == 0 and second['text'] == first['text']
+        assert second['published_at'] == first['published_at'] and first['published_at'] is not None
+        assert calls['api'] == 1
+        assert feeds == [RSS, RSS, RSS] and calls['rss'] == 3 and calls['not_modified'] == 2
+        assert stats['revalidated'] == 2
+    return True
+
+
+if __name__ == "__main__":
+    print("🚀 Test du cache des pages scrapées")
+    print("=" * 50)
+    ok_store = test_store_ttl_and_normalization()
+    ok_prune = test_prune_respects_env_ttl_overrides()
+    ok_scraper = test_scraper_warm_cache_and_rss_revalidation()
+    print(f"\nStockage/TTL: {'✅' if ok_store else '❌'} | Nettoyage: {'✅' if ok_prune else '❌'} | Cache chaud/ETag: {'✅' if ok_scraper else '❌'}")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test du streaming Responses API (gpt5_compat.stream_responses_text)
+"""
+
+import sys
+import os
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+class _FakeStream:
+    def __init__(self, events):
+        self.events = events
+
+    def __enter__(self):
+        return iter(self.events)
+
+    def __exit__(self, *exc):
+        return False
+
+class _FakeResponses:
+    def __init__(self, events):
+        self.events = events
+        self.request = None
+
+    def stream(self, **req):
+        self.request = req
+        return _FakeStream(self.events)
+
+def test_stream_yields_deltas():
+    """Les deltas sont relayés un par un; le system devient instructions"""
+    print("🔍 Test stream_responses_text...")
+
+    from gpt5_compat import stream_responses_text
+
+    events = [
+        SimpleNamespace(type="response.created"),
+        SimpleNamespace(type="response.output_text.delta", delta="Bon"),
+        SimpleNamespace(type="response.output_text.delta", delta="jour"),
+        SimpleNamespace(type="response.completed"),
+    ]
+    responses = _FakeResponses(events)
+    client = SimpleNamespace(responses=responses)
+    deltas = list(stream_responses_text(
+        client=client,
+        model="gpt-5",
+        messages=[{"role": "system", "content": "Assistant"}, {"role": "user", "content": "Salut"}],
+        max_output_tokens=100,
+    ))
+    print(f"   📊 {deltas} / {list(responses.request.keys())}")
+    assert deltas == ["Bon", "jour"]
+    assert responses.request["instructions"] == "Assistant"
+    assert responses.request["input"][0]["content"][0] == {"type": "input_text", "text": "Salut"}
+    return True
+
+def test_stream_error_event_raises():
+    """Un événement d'erreur interrompt le flux par une exception"""
+    print("\n🔍 Test événement d'erreur...")
+
+    from gpt5_compat import stream_responses_text
+
+    client = SimpleNamespace(responses=_FakeResponses([SimpleNamespace(type="error", error="rate_limit")]))
+    try:
+        list(stream_responses_text(client=client, model="gpt-5", messages=[{"role": "user", "content": "x"}]))
+    except RuntimeError as e:
+        assert "rate_limit" in str(e)
+        return True
+    raise AssertionError("exception attendue")
+
+if __name__ == "__main__":
+    print("🚀 Test du streaming gpt5_compat")
+    print("=" * 50)
+    ok_stream = test_stream_yields_deltas()
+    ok_error = test_stream_error_event_raises()
+    print(f"\nDeltas: {'✅' if ok_stream else '❌'} | Erreur: {'✅' if ok_error else '❌'}")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test de l'extraction HTML en une passe (html_extract.extract_page)
+"""
+
+import sys
+import os
+from datetime import datetime, timezone
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+PAGE = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    '<html><head><title>BNS: taux inchangé</title>'
+    '<meta property="og:updated_time" content="2025-10-01T09:00:00Z">'
+    '<script type="application/ld+json">{"@type": "NewsArticle", "datePublished": "2025-09-30T08:00:00Z"}</script>'
+    '<script>var tracking = "ne doit pas apparaître";</script><style>p{color:red}</style></head><body>'
+    '<header><nav><a href="/">Accueil</a><a href="/economie">Économie</a></nav></header>'
+    '<div id="cookie-consent">Nous utilisons des cookies <button>Accepter</button></div>'
+    '<div class="content-sidebar-layout"><article><header><h1>La BNS maintient son taux</h1></header>'
+    + ''.join(f"<p>Paragraphe {i}: l'inflation reste contenue à 0,{i} % selon la Banque nationale suisse.</p>"
+              for i in range(6))
+    + '<a href="https://www.snb.ch/fr/communique?utm_source=rts">Communiqué</a><a href="#top">Haut</a></article>'
+    '<aside class="related">Articles liés</aside></div>'
+    '<div class="share-buttons">Partager sur X</div><footer>© RTS</footer></body></html>'
+)
+
+
+def test_single_pass_extraction():
+    """Texte principal sans boilerplate, titre, date (priorité meta > JSON-LD) et liens absolus"""
+    print("🔍 Test extraction en une passe...")
+
+    from html_extract import extract_page
+
+    page = extract_page(PAGE, base_url='https://www.rts.ch/info/economie/123')
+    print(f"   📊 méthode {page.method}, {len(page.text)} caractères, date {page.published_at_raw}")
+    assert page.method == 'article' and page.title == 'BNS: taux inchangé'
+    assert page.text.startswith('La BNS maintient son taux Paragraphe 0:')
+    assert "l'inflation reste contenue à 0,5 %" in page.text  # apostrophes, accents et % conservés
+    for noise in ('tracking', 'cookies', 'Accueil', 'Articles liés', 'Partager', '© RTS', 'color:red'):
+        assert noise not in page.text, noise
+    assert page.published_at == datetime(2025, 10, 1, 9, 0, tzinfo=timezone.utc)
+    assert page.links == ['https://www.rts.ch/', 'https://www.rts.ch/economie',
+                          'https://www.snb.ch/fr/communique?utm_source=rts']
+
+    # Sans meta: JSON-LD, puis <time>, puis en-têtes HTTP
+    jsonld_only = PAGE.replace('og:updated_time', 'og:locale')
+    assert extract_page(jsonld_only).published_at_raw == '2025-09-30T08:00:00Z'
+    undated = '<html><body><p>Texte court</p><time datetime="pas une date">hier</time></body></html>'
+    page = extract_page(undated, headers={'Last-Modified': 'Tue, 30 Sep 2025 08:00:00 GMT'})
+    assert page.published_at_raw == 'Tue, 30 Sep 2025 08:00:00 GMT' and page.text == 'Texte court hier'
+    assert page.method == 'body'
+
+    # Page sans <article>/<main>: bloc le plus dense; entrées vides ou invalides
+    dense = ('<html><body><div class="menu"><ul>' + '<li><a href="/x">Lien</a></li>' * 30 + '</ul></div>'
+             '<div id="story">' + '<p>Le marché immobilier suisse reste soutenu par des taux bas.</p>' * 8
+             + '</div></body></html>')
+    page = extract_page(dense)
+    assert page.method == 'density' and 'Lien' not in page.text
+    assert extract_page('').text == '' and extract_page(None).method == 'empty'
+    assert len(extract_page(PAGE, max_chars=50).text) == 50
+    return True
+
+
+def test_scraper_wrappers_and_benchmark_corpus():
+    """Les méthodes du scraper délèguent à html_extract; corpus du benchmark extrait correctement"""
+    print("\n🔍 Test intégration scraper et micro-benchmark...")
+
+    from html_extract import extract_page
+    from scrapingbee_scraper import ScrapingBeeScraper
+    from tools.bench_html_extract import run, synthetic_corpus
+
+    scraper = ScrapingBeeScraper()
+    text = scraper._extract_text_from_html(PAGE)
+    assert text.startswith('La BNS maintient son taux') and 'cookies' not in text
+    published, raw = scraper._extract_published_time(PAGE, {'Date': 'Wed, 01 Oct 2025 10:00:00 GMT'})
+    assert raw == '2025-10-01T09:00:00Z' and published.year == 2025
+    assert scraper._parse_datetime_str('Thu, 28 Aug 2025 15:52:00 GMT').day == 28
+
+    # Temps affichés à titre indicatif seulement (comparaison chiffrée: tools/bench_html_extract.py)
+    result = run(synthetic_corpus(10), repeat=1)
+    print(f"   📊 {result}")
+    assert result['dated'] == 10 and result['methods'] == {'article': 10}
+    assert 0 < result['single_pass_chars'] < result['legacy_chars']
+    name, html = synthetic_corpus(1)[0]
+    text = extract_page(html).text
+    assert text.startswith('Article 0 Paragraphe 0:') and 'Rubrique' not in text and 'cookies' not in text
+    return True
+
+
+if __name__ == "__main__":
+    print("🚀 Test de l'extraction HTML en une passe")
+    print("=" * 50)
+    ok_extract = test_single_pass_extraction()
+    ok_scraper = test_scraper_wrappers_and_benchmark_corpus()
+    print(f"\nExtraction: {'✅' if ok_extract else '❌'} | Scraper/benchmark: {'✅' if ok_scraper else '❌'}")
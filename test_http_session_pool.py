@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test de la session aiohttp partagée des scrapers (http_session_pool.HttpSessionPool)
+"""
+
+import sys
+import os
+import asyncio
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiohttp import web
+
+
+async def _start_server():
+    """Faux ScrapingBee local: renvoie les en-têtes reçus, 50 ms de latence"""
+    state = {'active': 0, 'peak': 0}
+
+    async def handle(request):
+        state['active'] += 1
+        state['peak'] = max(state['peak'], state['active'])
+        await asyncio.sleep(0.05)
+        state['active'] -= 1
+        return web.json_response({'ua': request.headers.get('User-Agent'), 'url': request.query.get('url')})
+
+    app = web.Application()
+    app.router.add_get('/api/v1', handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/api/v1", state
+
+
+def test_connections_reused():
+    """20 pages scrapées à la suite → 1 connexion ouverte, 19 réutilisées; en-têtes appliqués"""
+    print("🔍 Test keep-alive et statistiques...")
+
+    from http_session_pool import HttpSessionPool
+
+    async def scenario():
+        runner, base_url, _ = await _start_server()
+        pool = HttpSessionPool('test', limit=8, limit_per_host=4)
+        try:
+            for i in range(20):
+                async with pool.session(headers={'User-Agent': 'inventorysbo-test'}) as session:
+                    async with session.get(base_url, params={'url': f"https://example.com/{i}"}) as resp:
+                        body = await resp.json()
+                        assert body == {'ua': 'inventorysbo-test', 'url': f"https://example.com/{i}"}
+            stats = pool.stats()
+            await pool.close()
+            stats['open_after_close'] = pool.stats()['open_sessions']
+        finally:
+            await runner.cleanup()
+        return stats
+
+    stats = asyncio.run(scenario())
+    print(f"   📊 {stats}")
+    assert stats['requests'] == 20 and stats['sessions_created'] == 1
+    assert stats['connections_created'] == 1 and stats['connections_reused'] == 19
+    assert stats['reuse_rate'] == 0.95 and stats['open_sessions'] == 1 and stats['open_after_close'] == 0
+    return True
+
+
+def test_per_host_limit_and_new_loop():
+    """limit_per_host borne les requêtes simultanées; un nouvel asyncio.run obtient sa propre session"""
+    print("\n🔍 Test limites de connexions et changement de boucle...")
+
+    from http_session_pool import HttpSessionPool
+
+    pool = HttpSessionPool('test', limit=16, limit_per_host=3)
+
+    async def burst():
+        runner, base_url, state = await _start_server()
+        try:
+            session = await pool.get_session()
+            start = time.perf_counter()
+
+            async def fetch(i):
+                async with session.get(base_url, params={'url': str(i)}) as resp:
+                    return resp.status
+
+            statuses = await asyncio.gather(*(fetch(i) for i in range(12)))
+            return statuses, time.perf_counter() - start, state['peak'], id(session)
+        finally:
+            await runner.cleanup()
+
+    statuses, elapsed, peak, first_session = asyncio.run(burst())
+    print(f"   📊 12 requêtes en {elapsed * 1000:.0f} ms, pic simultané {peak}")
+    assert statuses == [200] * 12 and peak == 3 and elapsed >= 0.19
+
+    # Boucle précédente fermée: sa session est oubliée, une nouvelle est créée pour cette boucle
+    _, _, _, second_session = asyncio.run(burst())
+    stats = pool.stats()
+    assert second_session != first_session and stats['sessions_created'] == 2 and stats['open_sessions'] == 1
+    pool.close_nowait()
+    assert pool.stats()['open_sessions'] == 0
+    return True
+
+
+if __name__ == "__main__":
+    print("🚀 Test de la session HTTP partagée")
+    print("=" * 50)
+    ok_reuse = test_connections_reused()
+    ok_limits = test_per_host_limit_and_new_loop()
+    print(f"\nKeep-alive: {'✅' if ok_reuse else '❌'} | Limites/boucles: {'✅' if ok_limits else '❌'}")
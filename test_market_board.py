@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Test du tableau de marché (market_board.MarketBoard): rafraîchissement groupé, dernier aperçu valide
+"""
+
+import sys
+import os
+import json
+import time
+import threading
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return False
+        self.data[key] = value
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+class _FakeManager:
+    """yfinance / FRED simulés: 50 ms par appel, symboles ou séries en échec configurables"""
+
+    def __init__(self):
+        self.failing = set()
+        self.calls = {'download': 0, 'fred': 0}
+        self.lock = threading.Lock()
+        self.price = 100.0
+        self.yfinance = SimpleNamespace(get_bulk_quotes=self._bulk)
+        self.fred = SimpleNamespace(get_latest_yield=self._yield, get_latest_value=self._value)
+
+    def _bulk(self, symbols):
+        time.sleep(0.05)
+        with self.lock:
+            self.calls['download'] += 1
+        return {s: {'price': self.price, 'change': 1.0, 'change_percent': 1.0, 'source': 'yfinance'}
+                for s in symbols if s not in self.failing}
+
+    def _fred(self, sid, payload):
+        time.sleep(0.05)
+        with self.lock:
+            self.calls['fred'] += 1
+        return None if sid in self.failing else payload
+
+    def _yield(self, sid):
+        return self._fred(sid, {'yield': 4.0 if sid == 'DGS10' else 3.5, 'change_bps': 1.0, 'source': 'FRED'})
+
+    def _value(self, sid):
+        return self._fred(sid, {'value': 2.5, 'change': 0.1, 'source': 'FRED'})
+
+    def _get_yfinance_rsi(self, symbol, period=14):
+        return 55.55
+
+    def _get_crypto_fng(self):
+        return 60
+
+    def _get_btc_dominance_pct(self):
+        return 52.1
+
+
+def test_refresh_in_one_pass():
+    """Un download multi-tickers + séries FRED en parallèle; lecture suivante en quelques ms"""
+    print("🔍 Test rafraîchissement groupé...")
+
+    from market_board import MarketBoard, FRED_BLOCKS, BOND_SERIES
+
+    manager = _FakeManager()
+    board = MarketBoard(manager, refresh_interval=300, workers=16)
+    start = time.perf_counter()
+    snap = board.snapshot()
+    cold = time.perf_counter() - start
+    series = set(BOND_SERIES.values()) | {sid for block in FRED_BLOCKS.values() for sid in block}
+    print(f"   📊 1er aperçu en {cold * 1000:.0f} ms ({len(series)} séries FRED), appels {manager.calls}")
+    assert manager.calls == {'download': 1, 'fred': len(series)} and cold < 0.5
+
+    assert snap['stocks']['NVDA']['price'] == 100.0 and snap['forex']['DXY']['value'] == 100.0
+    assert snap['bonds']['US10Y']['yield'] == 4.0 and snap['macros']['liquidity_stress']['EUR/USD']['value'] == 2.5
+    assert snap['analytics']['spread_2_10_bps'] == 50.0 and snap['analytics']['gold_silver_ratio'] == 1.0
+    assert snap['analytics']['rsi_spx_14'] == 55.5 and snap['analytics']['market_phase']
+    assert snap['freshness']['stocks']['NVDA'] == snap['as_of']
+
+    start = time.perf_counter()
+    for _ in range(100):
+        board.snapshot()
+    warm = (time.perf_counter() - start) / 100
+    print(f"   📊 lecture en {warm * 1000:.2f} ms")
+    assert manager.calls['download'] == 1 and warm < 0.01
+    return True
+
+
+def test_last_good_values_and_max_age():
+    """Champ en échec: dernière valeur connue et sa date; max_age force un rafraîchissement"""
+    print("\n🔍 Test dernier aperçu valide et borne de fraîcheur...")
+
+    from market_board import MarketBoard
+
+    manager = _FakeManager()
+    redis = _FakeRedis()
+    board = MarketBoard(manager, redis_client=redis, refresh_interval=300, workers=16)
+    first = board.snapshot()
+    time.sleep(0.02)
+
+    manager.failing = {'NVDA', 'DGS10'}
+    manager.price = 101.0
+    assert board.snapshot(max_age=60)['stocks']['MSFT']['price'] == 100.0  # assez frais: pas d'appel
+    second = board.snapshot(max_age=0.01)
+    assert manager.calls['download'] == 2
+    assert second['stocks']['MSFT']['price'] == 101.0 and second['stocks']['NVDA']['price'] == 100.0
+    assert second['freshness']['stocks']['NVDA'] == first['as_of'] != second['as_of']
+    assert second['bonds']['US10Y']['yield'] == 4.0 and second['freshness']['bonds']['US10Y'] == first['as_of']
+
+    # Un autre process lit l'aperçu partagé (Redis) sans rien rafraîchir
+    other = MarketBoard(_FakeManager(), redis_client=redis, refresh_interval=300)
+    assert other.snapshot()['stocks']['MSFT']['price'] == 101.0 and other._stats['refreshes'] == 0
+
+    # Aperçu trop vieux: réponse immédiate, rafraîchissement en arrière-plan
+    board.refresh_interval = 0
+    manager.price = 102.0
+    stale = board.snapshot()
+    assert stale['stocks']['MSFT']['price'] == 101.0
+    for _ in range(50):
+        if board._stats['background_refreshes'] and not board._background.locked():
+            break
+        time.sleep(0.02)
+    board.refresh_interval = 300
+    assert board.snapshot()['stocks']['MSFT']['price'] == 102.0
+    print(f"   📊 {board.stats()}")
+    return True
+
+
+def test_stale_board_blocks_report():
+    """Aperçu périmé (Redis): un rapport attend le rafraîchissement au lieu de servir des cours anciens"""
+    print("\n🔍 Test aperçu périmé avant un rapport...")
+
+    from market_board import MarketBoard, BOARD_KEY, report_max_age
+
+    manager = _FakeManager()
+    redis = _FakeRedis()
+    MarketBoard(manager, redis_client=redis, refresh_interval=300, workers=16).refresh()
+    old = json.loads(redis.data[BOARD_KEY])
+    old['refreshed_at'] -= 3 * 86400  # aperçu laissé par un worker arrêté depuis 3 jours
+    redis.data[BOARD_KEY] = json.dumps(old)
+
+    manager.price = 101.0
+    board = MarketBoard(manager, redis_client=redis, refresh_interval=300, workers=16)
+    os.environ['MARKET_BOARD_REPORT_MAX_AGE_S'] = '900'
+    try:
+        assert report_max_age() == 900.0
+        snap = board.snapshot(max_age=report_max_age())
+    finally:
+        os.environ.pop('MARKET_BOARD_REPORT_MAX_AGE_S', None)
+    print(f"   📊 âge {snap['age_s']} s, {board.stats()}")
+    assert snap['stocks']['MSFT']['price'] == 101.0 and snap['age_s'] < 60
+    assert board._stats['forced_refreshes'] == 1 and board._stats['background_refreshes'] == 0
+    assert manager.calls['download'] == 2
+    return True
+
+
+if __name__ == "__main__":
+    print("🚀 Test du tableau de marché")
+    print("=" * 50)
+    ok_refresh = test_refresh_in_one_pass()
+    ok_fallback = test_last_good_values_and_max_age()
+    ok_stale = test_stale_board_blocks_report()
+    print(f"\nRafraîchissement groupé: {'✅' if ok_refresh else '❌'} | Dernier aperçu valide: {'✅' if ok_fallback else '❌'}"
+          f" | Aperçu périmé: {'✅' if ok_stale else '❌'}")
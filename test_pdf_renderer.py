@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test du service de rendu PDF (pdf_renderer): police et CSS compilées une fois par process
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+COMPILED = []
+FONT_CONFIGS = []
+
+
+class _Css:
+    def __init__(self, string, font_config=None):
+        COMPILED.append(string)
+        self.string = string
+        self.font_config = font_config
+
+
+class _Document:
+    def __init__(self, html, stylesheets, options):
+        self.html, self.stylesheets, self.options = html, stylesheets, options
+
+    def write_pdf(self, **options):
+        css = ''.join(sheet.string for sheet in self.stylesheets)
+        return f"%PDF {self.html}|{css}|{sorted(options)}".encode('utf-8')
+
+
+class _Html:
+    def __init__(self, string):
+        self.string = string
+
+    def render(self, stylesheets=None, font_config=None, **options):
+        assert font_config is FONT_CONFIGS[0]
+        assert all(sheet.font_config is font_config for sheet in stylesheets or [])
+        return _Document(self.string, stylesheets or [], options)
+
+
+def _font_config():
+    FONT_CONFIGS.append(object())
+    return FONT_CONFIGS[-1]
+
+
+def test_stylesheets_and_fonts_compiled_once():
+    """Trois rendus avec la même CSS → une seule compilation et une seule FontConfiguration"""
+    print("🔍 Test PdfRenderer.render...")
+
+    from pdf_renderer import PdfRenderer
+
+    COMPILED.clear()
+    FONT_CONFIGS.clear()
+    renderer = PdfRenderer(html_cls=_Html, css_cls=_Css, font_config_factory=_font_config, max_stylesheets=2)
+    timings = {}
+    pdf = renderer.render('<p>a</p>', 'p { color: black }', timings=timings, optimize_images=True)
+    renderer.render('<p>b</p>', 'p { color: black }')
+    renderer.render('<p>c</p>', 'p { color: black }')
+    assert pdf.startswith(b'%PDF <p>a</p>|p { color: black }') and b'optimize_images' in pdf
+    assert set(timings) == {'parse', 'layout', 'write'}
+    assert COMPILED == ['p { color: black }'] and len(FONT_CONFIGS) == 1
+
+    # LRU borné: la CSS la moins récemment utilisée est abandonnée
+    renderer.render('<p>d</p>', 'h1 { margin: 0 }')
+    renderer.render('<p>e</p>', 'td { padding: 0 }')
+    stats = renderer.stats()
+    print(f"   📊 {stats}")
+    assert stats['renders'] == 5 and stats['css_compiled'] == 3 and stats['css_reused'] == 2
+    assert stats['stylesheets'] == 2 and stats['phase_avg_s']['layout'] is not None
+    return True
+
+
+def test_warm_compiles_report_css():
+    """Le pré-chauffage compile toutes les CSS à l'avance: le premier rendu les réutilise"""
+    print("\n🔍 Test PdfRenderer.warm...")
+
+    from pdf_renderer import PdfRenderer
+    from report_pdf import REPORT_CSS
+
+    COMPILED.clear()
+    FONT_CONFIGS.clear()
+    renderer = PdfRenderer(html_cls=_Html, css_cls=_Css, font_config_factory=_font_config)
+    renderer.warm(REPORT_CSS.values())
+    compiled = len(COMPILED)
+    renderer.render('<p>x</p>', REPORT_CSS['bank_full'])
+    stats = renderer.stats()
+    print(f"   📊 {compiled} CSS pré-compilées, {stats}")
+    assert compiled == len(set(REPORT_CSS.values())) and len(COMPILED) == compiled
+    assert stats['warmed'] and stats['font_configs'] == 1
+    return True
+
+
+if __name__ == "__main__":
+    print("🚀 Test du service de rendu PDF")
+    print("=" * 50)
+    ok_render = test_stylesheets_and_fonts_compiled_once()
+    ok_warm = test_warm_compiles_report_css()
+    print(f"\nRéutilisation CSS/polices: {'✅' if ok_render else '❌'} | Pré-chauffage: {'✅' if ok_warm else '❌'}")
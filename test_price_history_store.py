@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test de l'historique des cours en ajout seul (price_history_store.PriceHistoryStore)
+"""
+
+import sys
+import os
+import json
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+DAY = 86400
+NOW = 1_760_000_000  # ancré sur un multiple de 60 s pour des minutes stables
+
+
+def test_dedup_and_range_query():
+    """Un point par minute, fenêtre de lecture bornée, sous-échantillonnage et compaction"""
+    print("🔍 Test PriceHistoryStore...")
+
+    from price_history_store import PriceHistoryStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = PriceHistoryStore(os.path.join(tmp, 'history.db'))
+        store.append('AAPL', 210.0, ts=NOW - 40 * DAY)
+        for hour in range(6):
+            store.append('AAPL', 200.0 + hour, ts=NOW - 10 * DAY + hour * 3600)
+        store.append('AAPL', 220.0, volume=10, ts=NOW - 5)
+        store.append('AAPL', 221.0, volume=12, ts=NOW - 1)  # même minute: remplace le point
+        store.append('MSFT', 500.0, ts=NOW)
+
+        recent = store.history('AAPL', days=1, now=NOW)
+        print(f"   📊 1 jour: {recent}")
+        assert [p['price'] for p in recent] == [221.0] and recent[0]['volume'] == 12
+
+        month = store.history('AAPL', days=30, now=NOW)
+        assert len(month) == 7 and month[0]['price'] == 200.0
+        daily = store.history('AAPL', days=30, interval=DAY, now=NOW)
+        assert [p['price'] for p in daily][-1] == 221.0 and len(daily) <= 3
+        assert len(store.history('AAPL', days=0)) == 8
+
+        removed = store.downsample(older_than_days=7, interval=DAY, now=NOW)
+        print(f"   📊 compaction: {removed} points supprimés")
+        assert len(store.history('AAPL', days=0)) == 8 - removed and removed >= 4
+        assert store.history('AAPL', days=30, now=NOW)[-1]['price'] == 221.0
+        assert store.symbol_count() == 2
+    return True
+
+
+def test_imports_legacy_json_once():
+    """Les anciens price_cache.json / price_history.json sont repris une fois, doublons fusionnés"""
+    print("\n🔍 Test import JSON...")
+
+    from price_history_store import PriceHistoryStore
+
+    here = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stock_data')
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ('price_cache.json', 'price_history.json'):
+            shutil.copy(os.path.join(here, name), tmp)
+        with open(os.path.join(tmp, 'price_history.json'), encoding='utf-8') as f:
+            legacy = json.load(f)
+        unique = {(p['date'], p['time']) for p in legacy['AAPL']}
+
+        store = PriceHistoryStore(os.path.join(tmp, 'history.db'))
+        imported = store.import_json(os.path.join(tmp, 'price_cache.json'), os.path.join(tmp, 'price_history.json'))
+        again = store.import_json(os.path.join(tmp, 'price_cache.json'), os.path.join(tmp, 'price_history.json'))
+        print(f"   📊 {imported}, AAPL: {len(legacy['AAPL'])} points JSON → {len(unique)} uniques")
+        assert imported['points'] > 0 and again == {'quotes': 0, 'points': 0}
+        assert len(store.history('AAPL', days=0)) == len(unique)
+        assert set(store.load_quotes()) == set(json.load(open(os.path.join(tmp, 'price_cache.json'), encoding='utf-8')))
+    return True
+
+
+if __name__ == "__main__":
+    print("🚀 Test de l'historique des cours")
+    print("=" * 50)
+    ok_store = test_dedup_and_range_query()
+    ok_import = test_imports_legacy_json_once()
+    print(f"\nPlages + dédoublonnage: {'✅' if ok_store else '❌'} | Import JSON: {'✅' if ok_import else '❌'}")
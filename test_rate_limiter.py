@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test du limiteur de débit par fournisseur (rate_limiter.TokenBucket): rafale, file équitable, budget partagé
+"""
+
+import sys
+import os
+import time
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _FakeRedis:
+    """Redis simulé: le script GCRA est rejoué en Python sur un stockage commun (un verrou = atomicité)"""
+
+    def __init__(self, fail=False):
+        self.data = {}
+        self.lock = threading.Lock()
+        self.fail = fail
+        self.calls = 0
+
+    def register_script(self, script):
+        assert "redis.call('TIME')" in script
+
+        def run(keys, args):
+            if self.fail:
+                raise ConnectionError("redis down")
+            interval, tolerance, max_wait = (float(a) for a in args)
+            with self.lock:
+                self.calls += 1
+                now = time.time()
+                tat = max(float(self.data.get(keys[0], 0)), now)
+                wait = max(0.0, tat - tolerance - now)
+                if max_wait >= 0 and wait > max_wait:
+                    return [0, str(wait)]
+                self.data[keys[0]] = str(tat + interval)
+                return [1, str(wait)]
+        return run
+
+
+def test_burst_then_steady_rate():
+    """Rafale de `burst` appels immédiats puis un appel par intervalle; max_wait refuse sans réserver"""
+    print("🔍 Test rafale et débit...")
+
+    from rate_limiter import TokenBucket
+
+    bucket = TokenBucket('test', calls_per_minute=1200, burst=3)  # intervalle 50 ms
+    start = time.perf_counter()
+    waits = [bucket.acquire() for _ in range(5)]
+    elapsed = time.perf_counter() - start
+    print(f"   📊 5 appels en {elapsed * 1000:.0f} ms, attentes {[round(w, 3) for w in waits]}")
+    assert waits[:3] == [0.0, 0.0, 0.0] and all(w > 0 for w in waits[3:])
+    assert 0.08 <= elapsed < 0.2
+
+    assert bucket.acquire(max_wait=0) is None
+    stats = bucket.stats()
+    assert stats['acquired'] == 5 and stats['waited'] == 2 and stats['rejected'] == 1
+    assert stats['backend'] == 'local'
+    time.sleep(0.16)
+    assert bucket.acquire(max_wait=0) == 0.0  # jetons rechargés
+    return True
+
+
+def test_threads_served_in_order():
+    """8 threads concurrents: jamais plus que le budget, créneaux espacés et attribués une seule fois"""
+    print("\n🔍 Test threads concurrents...")
+
+    from rate_limiter import TokenBucket
+
+    bucket = TokenBucket('test', calls_per_minute=1200, burst=1)
+    stamps = []
+    lock = threading.Lock()
+
+    def worker():
+        bucket.acquire()
+        with lock:
+            stamps.append(time.perf_counter())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stamps.sort()
+    gaps = [b - a for a, b in zip(stamps, stamps[1:])]
+    print(f"   📊 écart min {min(gaps) * 1000:.0f} ms, total {(stamps[-1] - stamps[0]) * 1000:.0f} ms")
+    assert min(gaps) >= 0.04 and stamps[-1] - stamps[0] >= 0.33
+    assert bucket.stats()['max_wait_s'] >= 0.33
+    return True
+
+
+def test_shared_budget_and_decorator():
+    """Deux process (deux limiteurs) sur le même Redis partagent le budget; repli local si Redis tombe"""
+    print("\n🔍 Test budget partagé via Redis et décorateur rate_limit...")
+
+    import rate_limiter
+    from rate_limiter import TokenBucket
+
+    redis = _FakeRedis()
+    worker_a = TokenBucket('yahoo', calls_per_minute=1200, burst=2, redis_client=redis)
+    worker_b = TokenBucket('yahoo', calls_per_minute=1200, burst=2, redis_client=redis)
+    waits = [worker_a.acquire(), worker_b.acquire(), worker_a.acquire(), worker_b.acquire()]
+    assert waits[:2] == [0.0, 0.0] and waits[2] > 0 and waits[3] > 0
+    assert worker_b.stats()['backend'] == 'redis' and redis.calls == 4
+
+    redis.fail = True
+    assert worker_a.acquire() is not None and worker_a.stats()['redis_errors'] == 1
+
+    from stock_api_manager import rate_limit
+    rate_limiter._limiters.pop('test_decorated', None)
+    rate_limiter.get_rate_limiter('test_decorated', 1200, 2)  # création (import Redis) hors chronométrage
+    calls = []
+
+    @rate_limit(calls_per_minute=1200, key='test_decorated', burst=2)
+    def fetch(i):
+        calls.append(i)
+        return i
+
+    start = time.perf_counter()
+    assert [fetch(i) for i in range(4)] == [0, 1, 2, 3]
+    elapsed = time.perf_counter() - start
+    stats = rate_limiter.limiter_stats()['test_decorated']
+    print(f"   📊 {stats}")
+    assert 0.08 <= elapsed < 0.2 and stats['acquired'] == 4 and stats['burst'] == 2
+    return True
+
+
+if __name__ == "__main__":
+    print("🚀 Test du limiteur de débit")
+    print("=" * 50)
+    ok_burst = test_burst_then_steady_rate()
+    ok_threads = test_threads_served_in_order()
+    ok_shared = test_shared_budget_and_decorator()
+    print(f"\nRafale: {'✅' if ok_burst else '❌'} | Threads: {'✅' if ok_threads else '❌'} | Partagé: {'✅' if ok_shared else '❌'}")
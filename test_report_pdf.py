@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Test du pipeline de rapports PDF (report_pdf + report_store + report_cache)
+"""
+
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+class _FakeRedis:
+    """Client Redis minimal en mémoire (ZSET/HASH de l'index LRU partagé)"""
+
+    def __init__(self):
+        self.kv, self.zsets, self.hashes = {}, {}, {}
+
+    def get(self, key):
+        return self.kv.get(key)
+
+    def set(self, key, value, ex=None):
+        self.kv[key] = value
+
+    def incr(self, key):
+        self.kv[key] = int(self.kv.get(key) or 0) + 1
+        return self.kv[key]
+
+    def pipeline(self):
+        redis = self
+
+        class _Pipe:
+            def __init__(self):
+                self.ops = []
+
+            def __getattr__(self, name):
+                return lambda *a, **k: self.ops.append((name, a, k))
+
+            def execute(self):
+                return [getattr(redis, name)(*a, **k) for name, a, k in self.ops]
+        return _Pipe()
+
+    def zadd(self, key, mapping, xx=False, ch=False):
+        zset = self.zsets.setdefault(key, {})
+        changed = 0
+        for member, score in mapping.items():
+            if xx and member not in zset:
+                continue
+            changed += 1
+            zset[member] = score
+        return changed
+
+    def zrange(self, key, start, end):
+        return [m for m, _ in sorted(self.zsets.get(key, {}).items(), key=lambda kv: kv[1])]
+
+    def zrem(self, key, member):
+        self.zsets.get(key, {}).pop(member, None)
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = str(value).encode()
+
+    def hincrby(self, key, field, amount):
+        h = self.hashes.setdefault(key, {})
+        h[field] = str(int(h.get(field, 0)) + amount).encode()
+
+    def hgetall(self, key):
+        return {k.encode(): v for k, v in self.hashes.get(key, {}).items()}
+
+    def hvals(self, key):
+        return list(self.hashes.get(key, {}).values())
+
+    def hdel(self, key, field):
+        self.hashes.get(key, {}).pop(field, None)
+
+def _items():
+    from chat_engine import CollectionItem
+    return [
+        CollectionItem(id=1, name='Ferrari 812', category='Voitures', status='Available', current_value=350000),
+        CollectionItem(id=2, name='Sunseeker 76', category='Bateaux', status='Available', current_value=2500000),
+        CollectionItem(id=3, name='Nestlé', category='Actions', status='Available', current_price=100.0,
+                       stock_quantity=50, stock_symbol='NESN.SW', stock_currency='CHF'),
+        CollectionItem(id=4, name='Porsche 911', category='Voitures', status='Sold', current_value=150000),
+    ]
+
+def test_templates_render_without_flask():
+    """Chaque type de rapport produit son HTML hors contexte Flask"""
+    print("🔍 Test build_report_html...")
+
+    from report_pdf import REPORT_TYPES, build_report_html
+
+    for report_type in REPORT_TYPES:
+        params = {'asset_class_name': 'Actifs réels'} if report_type == 'asset_class' else {}
+        html, key = build_report_html(report_type, _items(), params)
+        print(f"   📊 {report_type}: {len(html)} car., clé {key[:12]}")
+        assert '<html' in html.lower() and len(key) == 64
+    html, _ = build_report_html('asset_class', _items(), {'asset_class_name': 'Actifs réels'})
+    assert 'Ferrari 812' in html and 'Porsche 911' not in html
+    return True
+
+def test_generate_report_is_content_addressed():
+    """Un rendu par contenu: même inventaire → clé et PDF réutilisés, changement → nouveau rendu"""
+    print("\n🔍 Test generate_report...")
+
+    from report_pdf import generate_report, ReportError
+    from report_store import LocalReportStore
+    from report_cache import ReportCache
+
+    renders = []
+
+    def renderer(report_type, html, params):
+        renders.append(report_type)
+        return b'%PDF-1.7 ' + html.encode('utf-8')[:100]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ReportCache(LocalReportStore(tmp), index_path=os.path.join(tmp, 'index.db'))
+        store = cache.store
+        first = generate_report('portfolio', {}, items=_items(), cache=cache, renderer=renderer, version=1)
+        second = generate_report('portfolio', {'ignored': 1}, items=_items(), cache=cache, renderer=renderer, version=2)
+        print(f"   📊 {first['download_url']} / cached={second['cached']}")
+        assert not first['cached'] and second['cached'] and first['key'] == second['key']
+        assert store.get(first['key']).startswith(b'%PDF')
+        assert first['download_url'].startswith(f"/api/reports/files/{first['key']}.pdf")
+
+        changed = _items()
+        changed[0].current_value = 360000
+        third = generate_report('portfolio', {}, items=changed, cache=cache, renderer=renderer, version=3)
+        assert third['key'] != first['key'] and not third['cached']
+        assert renders == ['portfolio', 'portfolio']
+
+        try:
+            generate_report('asset_class', {'asset_class_name': 'Inconnue'}, items=_items(), cache=cache, renderer=renderer)
+        except ReportError as e:
+            assert e.status == 404
+        else:
+            raise AssertionError("ReportError attendue")
+    return True
+
+def test_cache_by_inventory_version():
+    """Même version d'inventaire → PDF servi sans relire les items; version incrémentée → miss"""
+    print("\n🔍 Test ReportCache (version + LRU)...")
+
+    from report_pdf import generate_report
+    from report_store import LocalReportStore
+    from report_cache import ReportCache
+
+    renders = []
+
+    def renderer(report_type, html, params):
+        renders.append(report_type)
+        return b'%PDF-1.7 ' + html.encode('utf-8')[:100] + b' ' * 400
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ReportCache(LocalReportStore(tmp), index_path=os.path.join(tmp, 'index.db'), max_bytes=1200)
+        assert cache.inventory_version() == 0
+        first = generate_report('portfolio', {}, items=_items(), cache=cache, renderer=renderer)
+        # items=[] : un hit ne doit même pas les consulter (sinon le rapport serait vide et la clé différente)
+        hit = generate_report('portfolio', {}, items=[], cache=cache, renderer=renderer)
+        assert hit['cached'] and hit['key'] == first['key'] and renders == ['portfolio']
+
+        assert cache.bump_inventory_version('test') == 1
+        changed = _items()
+        changed[1].current_value = 2600000
+        after_bump = generate_report('portfolio', {}, items=changed, cache=cache, renderer=renderer)
+        assert after_bump['key'] != first['key'] and not after_bump['cached']
+
+        # Trois PDF d'environ 500 octets pour 1200 octets: le moins récemment utilisé est évincé
+        generate_report('all_asset_classes', {}, items=_items(), cache=cache, renderer=renderer)
+        stats = cache.stats()
+        print(f"   📊 {stats}")
+        assert stats['evictions'] == 1 and stats['bytes'] <= 1200
+        assert not cache.store.exists(first['key'])
+        assert cache.lookup('portfolio', {}, 0) is None
+        assert stats['hits'] == 1 and stats['inventory_version'] == 1
+    return True
+
+def test_store_configuration_fails_loudly():
+    """S3 demandé mais incomplet, ou backend inconnu: erreur explicite, pas de repli silencieux"""
+    print("\n🔍 Test configuration du stockage des rapports...")
+
+    import report_store
+
+    saved = {k: os.environ.get(k) for k in ('REPORT_STORE', 'REPORT_S3_BUCKET', 'RENDER', 'REPORT_STORE_DIR')}
+    cases = [
+        ({'REPORT_STORE': 's3'}, "REPORT_S3_BUCKET"),
+        ({'REPORT_STORE': 'disque'}, "REPORT_STORE inconnu"),
+    ]
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for env, message in cases:
+                for k in saved:
+                    os.environ.pop(k, None)
+                os.environ.update(env)
+                report_store._store = None
+                try:
+                    report_store.get_report_store()
+                except RuntimeError as e:
+                    print(f"   ⛔ {env}: {e}")
+                    assert message in str(e)
+                else:
+                    raise AssertionError(f"RuntimeError attendue pour {env}")
+
+            # Render sans bucket: store local utilisable, mais signalé comme non partagé
+            for k in saved:
+                os.environ.pop(k, None)
+            os.environ.update({'RENDER': 'true', 'REPORT_STORE_DIR': tmp})
+            report_store._store = None
+            assert report_store.get_report_store().backend == 'local' and not report_store.store_is_shared()
+    finally:
+        report_store._store = None
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+    return True
+
+def test_unshared_store_ships_pdf_through_result():
+    """Worker et web sur des disques distincts: le PDF passe par le résultat Celery puis est servi par le web"""
+    print("\n🔍 Test transfert du PDF sans store partagé...")
+
+    import json
+    from report_pdf import generate_report, ingest_pdf_payload
+    from report_store import LocalReportStore
+    from report_cache import ReportCache
+
+    def renderer(report_type, html, params):
+        return b'%PDF-1.7 ' + html.encode('utf-8')[:100]
+
+    saved = os.environ.get('RENDER')
+    os.environ['RENDER'] = 'true'
+    try:
+        with tempfile.TemporaryDirectory() as worker_dir, tempfile.TemporaryDirectory() as web_dir:
+            worker = ReportCache(LocalReportStore(worker_dir), index_path=os.path.join(worker_dir, 'index.db'))
+            web = ReportCache(LocalReportStore(web_dir), index_path=os.path.join(web_dir, 'index.db'))
+            params = {'asset_class_name': 'Actifs réels'}
+            result = generate_report('asset_class', params, items=_items(), cache=worker, renderer=renderer, version=4)
+            result = json.loads(json.dumps(result))  # sérialiseur JSON de Celery
+            assert result['pdf_b64'] and not web.store.exists(result['key'])
+
+            served = ingest_pdf_payload(result, web)
+            again = ingest_pdf_payload(result, web)  # sondage répété: idempotent
+            print(f"   📊 {served['download_url']} ({served['size']} octets)")
+            assert 'pdf_b64' not in served and again['download_url'] == served['download_url']
+            assert web.store.get(result['key']).startswith(b'%PDF')
+            assert served['download_url'].startswith(f"/api/reports/files/{result['key']}.pdf")
+            assert web.lookup('asset_class', params, 4) == result['key']
+            assert web.stats()['entries'] == 1
+    finally:
+        if saved is None:
+            os.environ.pop('RENDER', None)
+        else:
+            os.environ['RENDER'] = saved
+    return True
+
+def test_download_name_with_slash_and_accent():
+    """Catégories 'Private Equity / Venture Capital' et 'Actions cotées': en-tête de téléchargement valide"""
+    print("\n🔍 Test nom de fichier du téléchargement...")
+
+    from report_pdf import report_filename
+    from report_store import S3ReportStore, content_disposition
+
+    class _FakeS3:
+        def generate_presigned_url(self, op, Params, ExpiresIn):
+            self.params = Params
+            return 'https://bucket.example/presigned'
+
+    for category, ascii_part, utf8_part in [
+        ('Private Equity / Venture Capital', 'bonvin_private_equity___venture_capital_', 'bonvin_private_equity___venture_capital_'),
+        ('Actions cotées', 'bonvin_actions_cotees_', 'bonvin_actions_cot%C3%A9es_'),
+    ]:
+        filename = report_filename('asset_class', {'asset_class_name': category})
+        header = content_disposition(filename)
+        print(f"   📎 {header}")
+        assert header.startswith(f'attachment; filename="{ascii_part}') and header.endswith('.pdf')
+        assert f"filename*=UTF-8''{utf8_part}" in header
+        assert header.isascii() and '/' not in header
+
+        client = _FakeS3()
+        S3ReportStore('bucket', client=client).url('a' * 64, filename)
+        assert client.params['ResponseContentDisposition'] == header
+    assert content_disposition('') == 'attachment; filename="rapport.pdf"; filename*=UTF-8\'\'rapport.pdf'
+    return True
+
+def test_shared_lru_index_across_services():
+    """Store S3 commun: l'index LRU (Redis) voit les rendus du worker et les téléchargements du web"""
+    print("\n🔍 Test index LRU partagé web/worker...")
+
+    import time
+    from report_store import LocalReportStore
+    from report_cache import ReportCache
+
+    redis = _FakeRedis()
+    with tempfile.TemporaryDirectory() as shared, tempfile.TemporaryDirectory() as web_dir, \
+            tempfile.TemporaryDirectory() as worker_dir:
+        store = LocalReportStore(shared)  # tient lieu du bucket commun
+        worker = ReportCache(store, index_path=os.path.join(worker_dir, 'index.db'), max_bytes=1200,
+                             redis_client=redis, shared_index=True)
+        web = ReportCache(store, index_path=os.path.join(web_dir, 'index.db'), max_bytes=1200,
+                          redis_client=redis, shared_index=True)
+        keys = [c * 64 for c in 'abc']
+        for key in keys[:2]:
+            store.put(key, b'%PDF' + b' ' * 496)
+            worker.record(key, 500)
+            time.sleep(0.01)
+        web.touch(keys[0])  # téléchargement côté web: A devient le plus récent
+        store.put(keys[2], b'%PDF' + b' ' * 496)
+        worker.record(keys[2], 500)
+
+        stats = web.stats()
+        print(f"   📊 web: {stats['entries']} PDF, {stats['bytes']} octets, évictions worker {worker.stats()['evictions']}")
+        assert store.exists(keys[0]) and not store.exists(keys[1]) and store.exists(keys[2])
+        assert stats['entries'] == 2 and stats['bytes'] == 1000 and stats['shared_index']
+        assert redis.hashes['inventorysbo:report_index:hits'][keys[0]] == b'1'
+    return True
+
+if __name__ == "__main__":
+    print("🚀 Test des rapports PDF")
+    print("=" * 50)
+    ok_html = test_templates_render_without_flask()
+    ok_store = test_generate_report_is_content_addressed()
+    ok_cache = test_cache_by_inventory_version()
+    ok_config = test_store_configuration_fails_loudly()
+    ok_ship = test_unshared_store_ships_pdf_through_result()
+    ok_name = test_download_name_with_slash_and_accent()
+    ok_lru = test_shared_lru_index_across_services()
+    print(f"\nHTML: {'✅' if ok_html else '❌'} | Stockage par contenu: {'✅' if ok_store else '❌'} | Cache par version: {'✅' if ok_cache else '❌'} | Configuration: {'✅' if ok_config else '❌'} | Transfert: {'✅' if ok_ship else '❌'} | Nom de fichier: {'✅' if ok_name else '❌'} | Index partagé: {'✅' if ok_lru else '❌'}")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test du regroupement de requêtes par clé (request_coalescer.RequestCoalescer)
+"""
+
+import sys
+import os
+import time
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run_threads(target, count):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def test_same_key_shares_one_call():
+    """8 demandes simultanées du même symbole → 1 appel; symboles différents en parallèle"""
+    print("🔍 Test RequestCoalescer.run...")
+
+    from request_coalescer import RequestCoalescer
+
+    coalescer = RequestCoalescer(name='test')
+    calls = []
+    results = []
+
+    def fetch(symbol):
+        calls.append(symbol)
+        time.sleep(0.2)
+        return f"{symbol}:42"
+
+    _run_threads(lambda i: results.append(coalescer.run('AAPL', lambda: fetch('AAPL'))), 8)
+    assert calls == ['AAPL'] and results == ['AAPL:42'] * 8
+
+    calls.clear()
+    start = time.monotonic()
+    symbols = ['NESN.SW', 'MSFT', 'TSLA', 'GOOGL']
+    _run_threads(lambda i: coalescer.run(symbols[i], lambda: fetch(symbols[i])), 4)
+    elapsed = time.monotonic() - start
+    stats = coalescer.stats()
+    print(f"   📊 {elapsed:.2f}s pour 4 symboles, {stats}")
+    assert sorted(calls) == sorted(symbols) and elapsed < 0.6
+    assert stats['coalesced'] == 7 and stats['waits'] >= 7 and stats['wait_max_s'] > 0.1
+    assert stats['inflight'] == 0
+    return True
+
+
+def test_errors_reach_every_waiter():
+    """Une erreur est propagée à tous les appelants regroupés, la clé est libérée"""
+    print("\n🔍 Test propagation des erreurs...")
+
+    from request_coalescer import RequestCoalescer
+
+    coalescer = RequestCoalescer(name='test')
+    errors = []
+
+    def failing():
+        time.sleep(0.1)
+        raise RuntimeError("429 Too Many Requests")
+
+    def call(i):
+        try:
+            coalescer.run('AAPL', failing)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    _run_threads(call, 4)
+    assert len(errors) == 4 and coalescer.stats()['errors'] == 1
+    assert coalescer.run('AAPL', lambda: 'ok') == 'ok'
+    return True
+
+
+def test_bounded_concurrency():
+    """max_inflight borne les appels simultanés; l'attente est comptée"""
+    print("\n🔍 Test borne max_inflight...")
+
+    from request_coalescer import RequestCoalescer
+
+    coalescer = RequestCoalescer(name='test', max_inflight=2)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def fetch():
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.pop()
+        return True
+
+    _run_threads(lambda i: coalescer.run(f"S{i}", fetch), 6)
+    stats = coalescer.stats()
+    print(f"   📊 pic {max(peak)}, {stats}")
+    assert max(peak) <= 2 and stats['calls'] == 6 and stats['waits'] > 0
+    return True
+
+
+if __name__ == "__main__":
+    print("🚀 Test du regroupement de requêtes")
+    print("=" * 50)
+    ok_flight = test_same_key_shares_one_call()
+    ok_errors = test_errors_reach_every_waiter()
+    ok_bound = test_bounded_concurrency()
+    print(f"\nSingle-flight: {'✅' if ok_flight else '❌'} | Erreurs: {'✅' if ok_errors else '❌'} | Borne: {'✅' if ok_bound else '❌'}")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test du cache partagé L1/L2 (shared_cache)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+class _FakeRedis:
+    """Client Redis minimal en mémoire (get/setex/incr/delete/scan_iter/publish)"""
+
+    def __init__(self):
+        self.store = {}
+        self.published = []
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def setex(self, key, ttl, value):
+        self.store[key] = value
+
+    def incr(self, key):
+        self.store[key] = str(int(self.store.get(key) or 0) + 1).encode()
+        return int(self.store[key])
+
+    def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+
+    def scan_iter(self, match=None, count=None):
+        prefix = match.rstrip('*')
+        return [k for k in list(self.store) if k.startswith(prefix)]
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+def _make_tier():
+    from shared_cache import RedisCacheTier
+    tier = RedisCacheTier(prefix='test', client=_FakeRedis())
+    tier._ensure_subscriber = lambda: None  # pas de thread d'abonnement en test
+    return tier
+
+def test_pack_items_roundtrip():
+    """Les embeddings passent en float32 et reviennent en listes"""
+    print("🔍 Test pack_items/unpack_items...")
+
+    from shared_cache import pack_items, unpack_items
+
+    rows = [
+        {'id': 1, 'name': 'Ferrari', 'embedding': [0.1, 0.2, 0.3]},
+        {'id': 2, 'name': 'Montre', 'embedding': None},
+    ]
+    payload = pack_items(rows)
+    decoded = unpack_items(payload)
+
+    print(f"   📦 {len(payload)} octets")
+    assert decoded[0]['name'] == 'Ferrari'
+    assert [round(x, 5) for x in decoded[0]['embedding']] == [0.1, 0.2, 0.3]
+    assert decoded[1]['embedding'] is None
+    return True
+
+def test_two_level_cache_read_through_and_invalidation():
+    """Un second process lit depuis L2 sans recharger, puis l'invalidation est publiée"""
+    print("\n🔍 Test L1/L2...")
+
+    from ttl_cache import SmartCache
+    from shared_cache import JSON_CODEC
+
+    tier = _make_tier()
+    cache_a = SmartCache(l2=tier, codecs={'analytics': JSON_CODEC})
+    cache_b = SmartCache(l2=tier, codecs={'analytics': JSON_CODEC})
+
+    loads = []
+    loader = lambda: loads.append(1) or {'total': 42}
+    assert cache_a.get_or_load('analytics', loader) == {'total': 42}
+    assert cache_b.get_or_load('analytics', loader) == {'total': 42}
+    assert len(loads) == 1  # process B servi par L2
+
+    cache_a.invalidate('analytics')
+    assert list(tier.client.store) == ['test:generation:analytics']
+    assert len(tier.client.published) == 1
+
+    # Simuler la réception du message par un autre process
+    tier.origin = 'other'
+    tier._dispatch(tier.client.published[0][1])
+    assert not cache_b.contains('analytics')
+    return True
+
+def test_invalidation_during_load_skips_l2_write():
+    """update_item pendant la lecture Supabase: l'ancienne liste n'est pas republiée dans L2"""
+    print("\n🔍 Test invalidation pendant le chargement...")
+
+    from ttl_cache import SmartCache
+    from shared_cache import JSON_CODEC
+
+    tier = _make_tier()
+    cache_a = SmartCache(l2=tier, codecs={'items': JSON_CODEC})
+    cache_b = SmartCache(l2=tier, codecs={'items': JSON_CODEC})
+
+    def slow_loader():
+        # Un autre worker modifie un objet pendant que la liste est lue
+        cache_b.invalidate('items')
+        return [{'id': 1, 'price': 100}]
+
+    assert cache_a.get_or_load('items', slow_loader) == [{'id': 1, 'price': 100}]
+    assert 'test:items:default' not in tier.client.store
+    assert tier.stats()['l2_stale_writes'] == 1
+
+    # Sans invalidation concurrente, la valeur est bien partagée
+    cache_a.invalidate('items')
+    assert cache_b.get_or_load('items', lambda: [{'id': 1, 'price': 120}]) == [{'id': 1, 'price': 120}]
+    assert 'test:items:default' in tier.client.store
+    return True
+
+if __name__ == "__main__":
+    print("🚀 Test du cache partagé")
+    print("=" * 50)
+    ok_pack = test_pack_items_roundtrip()
+    ok_l2 = test_two_level_cache_read_through_and_invalidation()
+    ok_race = test_invalidation_during_load_skips_l2_write()
+    print(f"\nSérialisation: {'✅' if ok_pack else '❌'} | L1/L2: {'✅' if ok_l2 else '❌'} | Invalidation concurrente: {'✅' if ok_race else '❌'}")
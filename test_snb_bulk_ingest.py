@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test de l'ingestion groupée des historiques SNB (snb_bulk_ingest)
+"""
+
+import io
+import sys
+import os
+import json
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+class _FakeTable:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+        self.rows = None
+
+    def upsert(self, rows, on_conflict=None):
+        self.rows = rows if isinstance(rows, list) else [rows]
+        self.on_conflict = on_conflict
+        return self
+
+    def execute(self):
+        json.dumps(self.rows)  # les valeurs doivent être sérialisables (pas de NaN numpy)
+        self.db.calls.append((self.name, self.on_conflict, len(self.rows)))
+        if self.db.reject_as_of and any(r.get('as_of') == self.db.reject_as_of for r in self.rows):
+            raise RuntimeError("violates check constraint")
+        for row in self.rows:
+            self.db.tables.setdefault(self.name, {})[row.get(self.on_conflict)] = row
+        return SimpleNamespace(data=self.rows)
+
+class _FakeSupabase:
+    def __init__(self, reject_as_of=None):
+        self.calls = []
+        self.tables = {}
+        self.reject_as_of = reject_as_of
+
+    def table(self, name):
+        return _FakeTable(self, name)
+
+def _cpi_csv(months=240):
+    lines = ["date,yoy_pct,mm_pct,provider"]
+    for i in range(months):
+        year, month = 2005 + i // 12, i % 12 + 1
+        lines.append(f"{year}-{month:02d}-28,{0.5 + i / 1000:.3f},{'' if i % 7 else '0.1'},BFS")
+    return lines
+
+def test_cpi_history_in_batches():
+    """20 ans de CPI mensuel → quelques appels groupés, lignes invalides rapportées par numéro"""
+    print("🔍 Test import CPI groupé...")
+
+    from snb_bulk_ingest import ingest_upload
+
+    lines = _cpi_csv()
+    lines[10] = "pas-une-date,0.4,,BFS"
+    lines[20] = "2006-08-28,n/a,,BFS"
+    lines.append(lines[-1].replace(",BFS", ",SECO"))  # doublon de date: la dernière ligne l'emporte
+    supabase = _FakeSupabase()
+    csv_bytes = io.BytesIO("\n".join(lines).encode('utf-8'))
+    report = ingest_upload(supabase, 'cpi', 'cpi.csv', csv_bytes, batch_size=100, csv_chunk_rows=64).to_dict()
+    print(f"   📊 {report['inserted']}/{report['rows']} en {report['batches']} appels, erreurs {report['errors']}")
+
+    assert report['rows'] == 241 and report['rejected'] == 2 and report['duplicates'] == 1
+    assert report['inserted'] == 238 and report['batches'] == 3
+    assert [e['row'] for e in report['errors']] == [11, 21]
+    assert 'date' in report['errors'][0]['error'] and 'yoy_pct' in report['errors'][1]['error']
+    stored = supabase.tables['snb_cpi_data']
+    last = stored['bulk-cpi-2024-12-28']
+    assert last['provider'] == 'SECO' and last['as_of'] == '2024-12-28' and isinstance(last['yoy_pct'], float)
+    assert all(r['mm_pct'] is None or isinstance(r['mm_pct'], float) for r in stored.values())
+    return True
+
+def test_failed_batch_isolates_bad_rows():
+    """Un lot refusé est repris ligne à ligne: seules les lignes fautives sont rejetées"""
+    print("\n🔍 Test reprise ligne à ligne...")
+
+    import pandas as pd
+    from snb_bulk_ingest import ingest_frames
+
+    df = pd.DataFrame({
+        'date': ['2024-01-31', '2024-02-29', '2024-03-31'],
+        **{f"ois_{t}m": [0.5, 0.45, 0.4] for t in (3, 6, 9, 12, 18, 24)},
+    })
+    supabase = _FakeSupabase(reject_as_of='2024-02-29')
+    report = ingest_frames(supabase, 'ois', [df]).to_dict()
+    print(f"   📊 {report}")
+    assert report['inserted'] == 2 and report['rejected'] == 1 and report['errors'][0]['row'] == 3
+    point = json.loads(supabase.tables['snb_ois_data']['2024-03-31']['points'])
+    assert point[0] == {'tenor_months': 3, 'rate_pct': 0.4} and len(point) == 6
+
+    neer = pd.DataFrame({'date': ['2024-03-31', '2024-01-31'], 'neer_change_3m_pct': [1.2, 0.8]})
+    supabase = _FakeSupabase()
+    report = ingest_frames(supabase, 'neer', [neer]).to_dict()
+    value = json.loads(supabase.tables['snb_config']['neer_latest']['value'])
+    assert report['batches'] == 1 and value['as_of'] == '2024-03-31' and value['neer_value'] == 100.0
+    return True
+
+def test_idempotency_key_matches_previous_imports():
+    """Réimport d'un historique Excel déjà chargé: mêmes clés qu'avant (mise à jour, pas de doublons)"""
+    print("\n🔍 Test clés d'idempotence...")
+
+    import pandas as pd
+    from snb_bulk_ingest import ingest_frames
+
+    # read_excel produit des Timestamp: l'ancien import ligne à ligne utilisait str(row['date'])
+    excel = pd.DataFrame({'date': pd.to_datetime(['2024-01-31', '2024-02-29']), 'barometer': [101.2, 99.8]})
+    supabase = _FakeSupabase()
+    ingest_frames(supabase, 'kof', [excel])
+    stored = supabase.tables['snb_kof_data']
+    print(f"   🔑 {sorted(stored)}")
+    assert sorted(stored) == ['bulk-kof-2024-01-31 00:00:00', 'bulk-kof-2024-02-29 00:00:00']
+    assert stored['bulk-kof-2024-01-31 00:00:00']['as_of'] == '2024-01-31'
+    return True
+
+if __name__ == "__main__":
+    print("🚀 Test de l'ingestion groupée SNB")
+    print("=" * 50)
+    ok_batches = test_cpi_history_in_batches()
+    ok_retry = test_failed_batch_isolates_bad_rows()
+    ok_keys = test_idempotency_key_matches_previous_imports()
+    print(f"\nImport par lots: {'✅' if ok_batches else '❌'} | Reprise ligne à ligne: {'✅' if ok_retry else '❌'} | Clés: {'✅' if ok_keys else '❌'}")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Test du cache des inputs du modèle BNS (snb_input_cache) et de la mémoïsation des runs
+"""
+
+import sys
+import os
+import json
+import time
+import threading
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+ROWS = {
+    "snb_cpi_data": [{"id": 1, "as_of": "2025-08-31", "yoy_pct": 0.2}],
+    "snb_kof_data": [{"id": 1, "as_of": "2025-08-01", "barometer": 97.4}],
+    "snb_forecasts": [{"id": 1, "forecast": json.dumps({"2025": 0.2, "2026": 0.5, "2027": 0.7})}],
+    "snb_ois_data": [{"id": 1, "as_of": "2025-09-30", "points": json.dumps(
+        [{"tenor_months": t, "rate_pct": r} for t, r in ((3, 0.0), (6, 0.01), (12, 0.1), (24, 0.2))])}],
+    "snb_config": [{"key": "policy_rate_now_pct", "value": 0.0},
+                   {"key": "neer_latest", "value": json.dumps({"neer_change_3m_pct": -1.0})}],
+}
+
+
+class _FakeQuery:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+        self.rows = list(ROWS.get(name, []))
+        self.inserted = None
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def order(self, *args, **kwargs):
+        return self
+
+    def limit(self, n):
+        self.rows = self.rows[:n]
+        return self
+
+    def in_(self, column, values):
+        self.rows = [r for r in self.rows if r[column] in values]
+        return self
+
+    def insert(self, row):
+        self.inserted = dict(row, id=len(self.db.inserts) + 1)
+        return self
+
+    def execute(self):
+        time.sleep(0.02)  # latence réseau simulée
+        with self.db.lock:
+            if self.inserted is not None:
+                self.db.inserts.append(self.inserted)
+                return SimpleNamespace(data=[self.inserted])
+            self.db.reads.append(self.name)
+        return SimpleNamespace(data=self.rows)
+
+
+class _FakeSupabase:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reads = []
+        self.inserts = []
+
+    def table(self, name):
+        return _FakeQuery(self, name)
+
+
+def test_snapshot_versioning():
+    """Instantané servi depuis la mémoire jusqu'à l'invalidation; chargements concurrents regroupés"""
+    print("🔍 Test instantané versionné...")
+
+    from snb_input_cache import SNBInputCache
+
+    cache = SNBInputCache()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        time.sleep(0.1)
+        return {"cpi_yoy_pct": 0.2 + len(loads)}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.snapshot(loader))) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(loads) == 1 and len({r["fingerprint"] for r in results}) == 1
+
+    first = cache.snapshot(loader)
+    assert len(loads) == 1 and first["version"] == 0
+
+    assert cache.invalidate("ingest cpi") == 1
+    second = cache.snapshot(loader)
+    assert len(loads) == 2 and second["version"] == 1 and second["fingerprint"] != first["fingerprint"]
+
+    cache.max_age = 0  # instantané trop vieux → relu même sans invalidation
+    cache.snapshot(loader)
+    stats = cache.stats()
+    print(f"   📊 {stats}")
+    assert len(loads) == 3 and stats["invalidations"] == 1 and stats["hits"] >= 1
+    assert cache.snapshot(lambda: None) is None
+    return True
+
+
+def test_model_run_memoized():
+    """Deux /model/run identiques: 1 lecture des inputs, 1 calcul, 1 insert; l'ingestion invalide"""
+    print("\n🔍 Test mémoïsation de /api/snb/model/run...")
+
+    from flask import Flask
+    import snb_input_cache
+    import snb_routes
+
+    snb_input_cache._cache = snb_input_cache.SNBInputCache()
+    supabase = _FakeSupabase()
+    app = Flask(__name__)
+    app.config['SUPABASE_CLIENT'] = supabase
+    app.register_blueprint(snb_routes.snb_bp)
+    client = app.test_client()
+
+    start = time.perf_counter()
+    first = client.post('/api/snb/model/run', json={}).get_json()
+    elapsed = time.perf_counter() - start
+    print(f"   📊 1er run en {elapsed * 1000:.0f} ms, lectures {sorted(supabase.reads)}")
+    assert first["success"] and not first["cached"] and first["run_id"] == 1
+    assert len(supabase.reads) == 5 and supabase.reads.count("snb_config") == 1
+    assert elapsed < 0.09  # cinq requêtes de 20 ms en parallèle
+
+    second = client.post('/api/snb/model/run', json={"overrides": {}}).get_json()
+    assert second["cached"] and second["run_id"] == 1 and second["result"] == first["result"]
+    assert len(supabase.reads) == 5 and len(supabase.inserts) == 1
+
+    override = client.post('/api/snb/model/run', json={"overrides": {"cpi_yoy_pct": 1.4}}).get_json()
+    assert not override["cached"] and override["run_id"] == 2 and len(supabase.reads) == 5
+
+    snb_routes.invalidate_snb_inputs("test")
+    grid = client.post('/api/snb/model/grid', json={"axes": {"kof_barometer": [95, 100]}}).get_json()
+    assert grid["success"] and len(supabase.reads) == 10
+
+    # Inputs relus mais identiques → même empreinte, le run enregistré est réutilisé
+    third = client.post('/api/snb/model/run', json={}).get_json()
+    assert third["cached"] and third["run_id"] == 1 and len(supabase.inserts) == 2
+    stats = client.get('/api/snb/model/cache/stats').get_json()["stats"]
+    print(f"   📊 {stats}")
+    assert stats["run_hits"] == 2 and stats["loads"] == 2
+    return True
+
+
+if __name__ == "__main__":
+    print("🚀 Test du cache des inputs BNS")
+    print("=" * 50)
+    ok_snapshot = test_snapshot_versioning()
+    ok_memo = test_model_run_memoized()
+    print(f"\nInstantané: {'✅' if ok_snapshot else '❌'} | Runs mémoïsés: {'✅' if ok_memo else '❌'}")
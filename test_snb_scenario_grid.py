@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test de la grille de scénarios vectorisée du modèle BNS (snb_policy_engine.run_scenario_grid)
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+FORECAST = {"2025": 0.2, "2026": 0.5, "2027": 0.7}
+BASE = {"cpi_yoy_pct": 0.2, "kof_barometer": 97.4, "neer_change_3m_pct": -1.0, "policy_rate_now_pct": 0.0}
+
+
+def _ois():
+    from snb_policy_engine import OISPoint
+    return [OISPoint(3, 0.0), OISPoint(6, 0.01), OISPoint(12, 0.10), OISPoint(24, 0.20)]
+
+
+def test_grid_matches_scalar_model():
+    """Chaque scénario de la grille reproduit run_model (Taylor, chemins, Kalman, probabilités)"""
+    print("🔍 Test grille vs run_model...")
+
+    import numpy as np
+    from snb_policy_engine import run_model, run_scenario_grid, kalman_fuse, kalman_fuse_batch
+
+    for cpi in (0.2, 1.4):
+        grid = run_scenario_grid(dict(BASE, cpi_yoy_pct=cpi), FORECAST, _ois(), quantiles=(0.5,))
+        scalar = run_model(cpi, BASE["kof_barometer"], FORECAST, _ois(), BASE["policy_rate_now_pct"], BASE["neer_change_3m_pct"])
+        assert grid["scenarios"] == 1
+        assert abs(grid["i_star_next_pct"]["mean"] - scalar.i_star_next_pct) < 1e-12
+        for k in ("cut", "hold", "hike"):
+            assert abs(grid["probs"][k] - scalar.probs[k]) < 1e-12
+        fused = [p["fused"] for p in scalar.path]
+        assert np.allclose(grid["fan_chart"]["fused"]["p50"], fused, atol=1e-6)
+
+    rng = np.random.default_rng(7)
+    rules, market = rng.normal(size=(5, 24)), rng.normal(size=24)
+    batch, var = kalman_fuse_batch(rules, market)
+    for i in range(5):
+        single, single_var = kalman_fuse(rules[i], market)
+        assert np.array_equal(batch[i], single) and np.array_equal(var, single_var)
+    return True
+
+
+def test_surface_and_fan_chart():
+    """Écarts CPI × plage KOF × NEER: surface moyenne sur NEER, fan chart ordonné par quantile"""
+    print("\n🔍 Test surfaces de probabilités et fan chart...")
+
+    from snb_policy_engine import run_scenario_grid
+
+    axes = {
+        "cpi_yoy_pct": {"shifts": [-0.2, 0, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0]},
+        "kof_barometer": {"min": 90, "max": 110, "n": 41},
+        "neer_change_3m_pct": {"start": -3, "stop": 3, "step": 0.5},
+        "policy_rate_now_pct": [0.0, 0.25],
+    }
+    start = time.perf_counter()
+    result = run_scenario_grid(BASE, FORECAST, _ois(), axes=axes)
+    elapsed = time.perf_counter() - start
+    surface = result["probability_surface"]
+    print(f"   📊 {result['scenarios']} scénarios en {elapsed * 1000:.1f} ms, i* {result['i_star_next_pct']}")
+
+    assert result["scenarios"] == 8 * 41 * 13 * 2
+    assert result["axes"]["cpi_yoy_pct"][1] == BASE["cpi_yoy_pct"]
+    assert (surface["x"], surface["y"]) == ("cpi_yoy_pct", "kof_barometer")
+    assert len(surface["hike"]) == 8 and len(surface["hike"][0]) == 41
+    # Plus d'inflation → probabilité de hausse croissante
+    hikes = [row[20] for row in surface["hike"]]
+    assert hikes == sorted(hikes) and hikes[-1] > hikes[0]
+    cells = [surface[k][2][5] for k in ("cut", "hold", "hike")]
+    assert abs(sum(cells) - 1) < 1e-5
+
+    fan = result["fan_chart"]
+    assert len(fan["month_ahead"]) == 24 and set(fan["fused"]) == {"p05", "p25", "p50", "p75", "p95"}
+    assert all(lo <= hi for lo, hi in zip(fan["fused"]["p05"], fan["fused"]["p95"]))
+
+    flipped = run_scenario_grid(BASE, FORECAST, _ois(), axes=axes, surface=("kof_barometer", "cpi_yoy_pct"))
+    assert flipped["probability_surface"]["hike"][20] == hikes
+    return True
+
+
+def test_invalid_axes_rejected():
+    """Axe inconnu, plage vide, horizon invalide ou grille trop grande → ValueError (400 côté API)"""
+    print("\n🔍 Test validation des axes...")
+
+    from snb_policy_engine import run_scenario_grid
+
+    for axes in ({"gdp": [1, 2]}, {"kof_barometer": {"start": 1, "stop": 2, "step": 0}},
+                 {"kof_barometer": {"min": 0, "max": 1, "n": 1000}, "cpi_yoy_pct": {"min": 0, "max": 1, "n": 1000}}):
+        try:
+            run_scenario_grid(BASE, FORECAST, _ois(), axes=axes)
+        except ValueError as e:
+            print(f"   📊 {e}")
+        else:
+            raise AssertionError(f"ValueError attendue pour {axes}")
+
+    # Horizon nul/négatif (IndexError dans la fusion Kalman auparavant) ou démesuré
+    big = {"kof_barometer": {"min": 90, "max": 110, "n": 500}, "cpi_yoy_pct": {"min": 0, "max": 2, "n": 400}}
+    for months, axes, message in ((0, {}, "months"), (-3, {}, "months"), (121, {}, "months"),
+                                  (120, big, "Grid too large")):
+        try:
+            run_scenario_grid(BASE, FORECAST, _ois(), axes=axes, months=months)
+        except ValueError as e:
+            print(f"   📊 months={months}: {e}")
+            assert message in str(e)
+        else:
+            raise AssertionError(f"ValueError attendue pour months={months}")
+    assert run_scenario_grid(BASE, FORECAST, _ois(), months=1)["months"] == 1
+    return True
+
+
+if __name__ == "__main__":
+    print("🚀 Test de la grille de scénarios BNS")
+    print("=" * 50)
+    ok_scalar = test_grid_matches_scalar_model()
+    ok_surface = test_surface_and_fan_chart()
+    ok_invalid = test_invalid_axes_rejected()
+    print(f"\nÉquivalence: {'✅' if ok_scalar else '❌'} | Surfaces/fan chart: {'✅' if ok_surface else '❌'} | Validation: {'✅' if ok_invalid else '❌'}")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test de l'index BM25 (sparse_index.BM25Index)
+"""
+
+import sys
+import os
+from dataclasses import dataclass
+from typing import Optional
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+@dataclass
+class _Item:
+    id: int
+    name: str
+    category: str
+    description: Optional[str] = None
+    stock_symbol: Optional[str] = None
+    stock_exchange: Optional[str] = None
+    updated_at: str = '2025-01-01'
+
+def _items():
+    return [
+        _Item(1, 'Ferrari 812 Superfast', 'Voitures', 'V12 rouge, faible kilométrage'),
+        _Item(2, 'Porsche 911 GT3', 'Voitures', 'Boîte manuelle'),
+        _Item(3, 'Nestlé', 'Actions', None, 'NESN.SW', 'SIX'),
+        _Item(4, 'Rolex Daytona', 'Montres', 'Acier, cadran blanc'),
+    ]
+
+def test_bm25_ranking():
+    """Les documents contenant les termes de la requête sont classés en tête"""
+    print("🔍 Test BM25Index.search...")
+
+    from sparse_index import BM25Index
+
+    index = BM25Index()
+    index.sync(_items())
+    results = index.search("ferrari rouge", top_k=3)
+    print(f"   📊 {results}")
+    assert results[0][0] == 1
+    assert all(score > 0 for _, score in results)
+    assert index.search("nesn", top_k=3)[0][0] == 3
+    assert index.search("inconnu", top_k=3) == []
+    return True
+
+def test_incremental_sync_and_snapshot():
+    """Seuls les objets modifiés sont re-tokenisés; le snapshot restaure le même classement"""
+    print("\n🔍 Test synchronisation incrémentale + snapshot...")
+
+    from sparse_index import BM25Index
+
+    index = BM25Index()
+    index.sync(_items())
+    items = _items()[:3] + [_Item(4, 'Patek Philippe Nautilus', 'Montres', 'Or rose', updated_at='2025-02-01')]
+    index.sync(items)
+    print(f"   📊 {index.stats}")
+    assert index.stats['docs_tokenized'] == 5
+    assert index.stats['docs_reused'] == 3
+    assert index.search("rolex", top_k=3) == []
+    assert index.search("nautilus", top_k=3)[0][0] == 4
+
+    restored = BM25Index.from_bytes(index.to_bytes())
+    assert restored.search("porsche manuelle", top_k=3) == index.search("porsche manuelle", top_k=3)
+    restored.sync(items)
+    assert restored.stats['docs_tokenized'] == 0
+    return True
+
+if __name__ == "__main__":
+    print("🚀 Test de l'index BM25")
+    print("=" * 50)
+    ok_rank = test_bm25_ranking()
+    ok_sync = test_incremental_sync_and_snapshot()
+    print(f"\nClassement: {'✅' if ok_rank else '❌'} | Incrémental/snapshot: {'✅' if ok_sync else '❌'}")
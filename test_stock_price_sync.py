@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test de l'upsert groupé des prix d'actions (stock_price_sync)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+class _FakeTable:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def upsert(self, rows, on_conflict=None):
+        self.calls.append(rows)
+        return self
+
+    def execute(self):
+        return self
+
+class _FakeSupabase:
+    def __init__(self):
+        self.calls = []
+
+    def table(self, name):
+        assert name == 'items'
+        return _FakeTable(self.calls)
+
+def test_bulk_upsert_skips_unchanged_rows():
+    """Les lignes inchangées sont ignorées et les autres partent en chunks"""
+    print("🔍 Test bulk_upsert_stock_prices...")
+
+    from stock_price_sync import bulk_upsert_stock_prices
+
+    rows = [
+        {'id': 1, 'name': 'Apple', 'category': 'Actions', 'stock_symbol': 'AAPL', 'stock_quantity': 10,
+         'current_price': 190.0, 'stock_change': 1.5, 'stock_volume': 1000},
+        {'id': 2, 'name': 'Nestlé', 'category': 'Actions', 'stock_symbol': 'NESN.SW', 'stock_quantity': 5,
+         'current_price': 90.0, 'stock_change': 0.2, 'stock_volume': 500},
+        {'id': 3, 'name': 'IREN', 'category': 'Actions', 'stock_symbol': 'IREN.SW', 'stock_quantity': 2,
+         'current_price': 10.0, 'stock_change': 0.0, 'stock_volume': 50},
+    ]
+    prices = {
+        'AAPL': {'price': 190.001, 'change': 1.5, 'volume': 1000, 'currency': 'USD'},
+        'NESN.SW': {'price': 91.0, 'change': 1.2, 'volume': 800, 'currency': 'CHF'},
+        'IREN.SW': {'price': 11.0, 'change': 1.0, 'volume': 60, 'currency': 'CHF'},
+    }
+
+    client = _FakeSupabase()
+    result = bulk_upsert_stock_prices(client, rows, prices, chunk_size=1)
+
+    print(f"   📊 Résultat: {result}")
+    assert result['unchanged'] == [1]
+    assert sorted(result['updated']) == [2, 3]
+    assert result['requests'] == 2
+    assert client.calls[0][0]['name'] == 'Nestlé'
+    assert client.calls[0][0]['current_value'] == 91.0 * 5
+
+    return True
+
+if __name__ == "__main__":
+    print("🚀 Test de l'upsert groupé des prix")
+    print("=" * 50)
+    ok = test_bulk_upsert_skips_unchanged_rows()
+    print(f"\nRésultat: {'✅' if ok else '❌'}")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test de la récupération groupée des prix (StockAPIManager.get_stock_prices_batch)
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def test_stock_prices_batch():
+    """Test de la récupération concurrente de plusieurs symboles"""
+    print("🔍 Test get_stock_prices_batch...")
+
+    try:
+        from stock_api_manager import stock_api_manager
+
+        symbols = ["AAPL", "MSFT", "NESN.SW", "IREN.SW", "AAPL"]
+
+        start = time.time()
+        batch = stock_api_manager.get_stock_prices_batch(symbols)
+        duration = time.time() - start
+
+        print(f"⏱️ Durée: {duration:.1f}s")
+        for symbol, data in batch['results'].items():
+            print(f"   ✅ {symbol}: {data.get('price')} {data.get('currency')} ({data.get('change_percent')}%)")
+        for symbol, error in batch['errors'].items():
+            print(f"   ❌ {symbol}: {error}")
+
+        # Les doublons sont dédupliqués
+        assert len(batch['results']) + len(batch['errors']) == 4
+        # Les actions suisses sont en CHF
+        if 'NESN.SW' in batch['results']:
+            assert batch['results']['NESN.SW']['currency'] == 'CHF'
+
+        return True
+
+    except Exception as e:
+        print(f"❌ Erreur test: {e}")
+        return False
+
+def test_rate_limit_thread_safety():
+    """Test du budget partagé du décorateur rate_limit sous concurrence"""
+    print("\n🔍 Test rate_limit concurrent...")
+
+    try:
+        from concurrent.futures import ThreadPoolExecutor
+        from stock_api_manager import rate_limit
+
+        calls = []
+
+        @rate_limit(calls_per_minute=600, key='test_batch')
+        def tick():
+            calls.append(time.time())
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for _ in range(8):
+                executor.submit(tick)
+
+        calls.sort()
+        gaps = [b - a for a, b in zip(calls, calls[1:])]
+        print(f"   📊 Écart minimal entre appels: {min(gaps):.3f}s (attendu ≥ ~0.1s)")
+        assert min(gaps) >= 0.09
+
+        return True
+
+    except Exception as e:
+        print(f"❌ Erreur test: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("🚀 Test de la mise à jour groupée des prix")
+    print("=" * 50)
+
+    ok_batch = test_stock_prices_batch()
+    ok_rate = test_rate_limit_thread_safety()
+
+    print("\n" + "=" * 50)
+    print(f"Batch: {'✅' if ok_batch else '❌'} | Rate limit: {'✅' if ok_rate else '❌'}")
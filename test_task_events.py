@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test du canal d'événements des tâches Celery (task_events)
+"""
+
+import sys
+import os
+import json
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def _message(task_id, event):
+    return {'channel': f"inventorysbo:task:{task_id}".encode(), 'data': json.dumps(event)}
+
+def test_hub_dispatches_to_subscribers():
+    """Un message publié n'est remis qu'aux flux ouverts pour ce task_id"""
+    print("🔍 Test TaskEventHub._dispatch...")
+
+    from task_events import TaskEventHub
+
+    hub = TaskEventHub(client=None, prefix='inventorysbo:task')
+    hub._ensure_listener = lambda: None
+    q1 = hub.subscribe('t1')
+    q2 = hub.subscribe('t2')
+    hub._dispatch(_message('t1', {'state': 'PROGRESS', 'info': {'pct': 40}}))
+    assert q1.get_nowait()['info']['pct'] == 40
+    assert q2.empty()
+    hub.unsubscribe('t1', q1)
+    assert 't1' not in hub._queues
+    print(f"   📊 {hub.stats}")
+    return True
+
+def test_stream_uses_pushed_events():
+    """Le flux SSE suit les événements poussés sans relire le backend à chaque tour"""
+    print("\n🔍 Test _event_frames...")
+
+    from task_events import TaskEventHub, _event_frames
+
+    hub = TaskEventHub(client=None, prefix='inventorysbo:task')
+    hub._ensure_listener = lambda: None
+    reads = []
+
+    def snapshot():
+        reads.append(1)
+        return {'state': 'PENDING', 'info': {}}
+
+    def worker():
+        import time
+        time.sleep(0.05)
+        hub._dispatch(_message('abc', {'state': 'PROGRESS', 'info': {'step': 'llm_call', 'pct': 55}}))
+        hub._dispatch(_message('abc', {'state': 'SUCCESS', 'info': {}, 'result': {'ok': True, 'answer': '42'}}))
+
+    threading.Thread(target=worker).start()
+    frames = list(_event_frames('abc', snapshot, hub))
+    print(f"   📊 {frames}")
+    assert frames[0].startswith("event: open")
+    assert any('"step": "llm_call"' in f for f in frames)
+    assert frames[-1].startswith("event: result") and '"answer": "42"' in frames[-1]
+    assert len(reads) == 1
+    assert 'abc' not in hub._queues
+    return True
+
+if __name__ == "__main__":
+    print("🚀 Test du canal d'événements des tâches")
+    print("=" * 50)
+    ok_hub = test_hub_dispatches_to_subscribers()
+    ok_stream = test_stream_uses_pushed_events()
+    print(f"\nHub: {'✅' if ok_hub else '❌'} | Flux SSE: {'✅' if ok_stream else '❌'}")
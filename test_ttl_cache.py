@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test du cache mémoire TTL/LRU (ttl_cache)
+"""
+
+import sys
+import os
+import time
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def test_per_key_ttl_and_lru_eviction():
+    """Expiration par clé et éviction LRU"""
+    print("🔍 Test TTL par clé + LRU...")
+
+    from ttl_cache import TTLCache
+
+    cache = TTLCache(ttl=60, max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2, ttl=0.05)
+    time.sleep(0.06)
+    assert cache.get('a') == 1
+    assert cache.get('b') is None  # expirée seule, 'a' reste valide
+
+    cache.set('c', 3)
+    cache.get('a')          # 'a' devient la plus récente
+    cache.set('d', 4)       # évince 'c'
+    assert cache.get('c') is None
+    assert cache.get('a') == 1
+
+    stats = cache.stats()
+    print(f"   📊 {stats}")
+    assert stats['evictions'] == 1
+    assert stats['expirations'] == 1
+    return True
+
+def test_single_flight_loading():
+    """8 requêtes concurrentes sur une clé froide déclenchent un seul chargement"""
+    print("\n🔍 Test single-flight...")
+
+    from ttl_cache import SmartCache
+
+    cache = SmartCache()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.1)
+        return ['item']
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load('items', loader))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    print(f"   📊 chargements: {len(calls)}, résultats: {len(results)}")
+    assert len(calls) == 1
+    assert results == [['item']] * 8
+    assert cache.stats()['items']['coalesced'] == 7
+    return True
+
+if __name__ == "__main__":
+    print("🚀 Test du cache TTL/LRU")
+    print("=" * 50)
+    ok_ttl = test_per_key_ttl_and_lru_eviction()
+    ok_flight = test_single_flight_loading()
+    print(f"\nTTL/LRU: {'✅' if ok_ttl else '❌'} | Single-flight: {'✅' if ok_flight else '❌'}")
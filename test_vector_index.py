@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test de l'index vectoriel (vector_index.EmbeddingIndex)
+"""
+
+import sys
+import os
+from dataclasses import dataclass
+from typing import List, Optional
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+@dataclass
+class _Item:
+    id: int
+    embedding: Optional[List[float]]
+    updated_at: str = '2025-01-01'
+
+def test_search_matches_cosine_similarity():
+    """Le top-k correspond au classement cosinus exact"""
+    print("🔍 Test EmbeddingIndex.search...")
+
+    import numpy as np
+    from vector_index import EmbeddingIndex
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(200, 16))
+    items = [_Item(i, v.tolist()) for i, v in enumerate(vectors)] + [_Item(999, None)]
+    query = rng.normal(size=16)
+
+    index = EmbeddingIndex()
+    index.sync(items)
+    results = index.search(query.tolist(), top_k=5)
+
+    expected = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+    expected_ids = list(np.argsort(-expected)[:5])
+    print(f"   📊 {[k for k, _ in results]} vs {expected_ids}")
+    assert [k for k, _ in results] == expected_ids
+    assert abs(results[0][1] - expected[expected_ids[0]]) < 1e-5
+    assert len(index) == 200
+    return True
+
+def test_incremental_sync():
+    """Seuls les objets modifiés sont ré-encodés"""
+    print("\n🔍 Test synchronisation incrémentale...")
+
+    from vector_index import EmbeddingIndex
+
+    items = [_Item(1, [1.0, 0.0]), _Item(2, [0.0, 1.0])]
+    index = EmbeddingIndex()
+    index.sync(items)
+    index.sync(items)  # même liste: pas de reconstruction
+    assert index.stats['builds'] == 1
+
+    updated = [_Item(1, [1.0, 0.0]), _Item(2, [1.0, 1.0], updated_at='2025-02-01'), _Item(3, [0.0, 1.0])]
+    index.sync(updated)
+    print(f"   📊 {index.stats}")
+    assert index.stats['rows_reused'] == 1
+    assert index.stats['rows_encoded'] == 4
+    assert index.search([0.0, 1.0], top_k=1)[0][0] == 3
+    return True
+
+if __name__ == "__main__":
+    print("🚀 Test de l'index vectoriel")
+    print("=" * 50)
+    ok_search = test_search_matches_cosine_similarity()
+    ok_sync = test_incremental_sync()
+    print(f"\nRecherche: {'✅' if ok_search else '❌'} | Synchronisation: {'✅' if ok_sync else '❌'}")
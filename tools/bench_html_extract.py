@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de l'extraction HTML des scrapers.
+
+Compare, sur un corpus de pages sauvegardées (*.html), l'ancienne extraction
+(chaîne de `re.sub` sur le document + seconde analyse BeautifulSoup pour la date)
+à `html_extract.extract_page` (une seule analyse lxml).
+
+Usage:
+  python -m tools.bench_html_extract [dossier_de_pages] [--repeat N]
+
+Sans dossier (ni HTML_BENCH_DIR), un corpus synthétique de pages d'actualité
+(navigation, bandeau cookies, scripts, article) est généré.
+"""
+
+import os
+import re
+import sys
+import glob
+import time
+import argparse
+import statistics
+from typing import List, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_extract import extract_page, parse_datetime_str  # noqa: E402
+
+
+def legacy_extract(html_content: str):
+    """Ancienne extraction de ScrapingBeeScraper (texte regex + date BeautifulSoup)"""
+    from bs4 import BeautifulSoup
+
+    text = re.sub(r'<script[^>]*>.*?</script>', '', html_content, flags=re.DOTALL)
+    text = re.sub(r'<style[^>]*>.*?</style>', '', text, flags=re.DOTALL)
+    text = re.sub(r'<[^>]+>', ' ', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[^\w\s\.\,\!\?\-\:\;\(\)\-\$\%]', '', text).strip()[:15000]
+
+    soup = BeautifulSoup(html_content, 'lxml')
+    published = None
+    for selector, attr in [
+        (('meta', {'property': 'article:published_time'}), 'content'),
+        (('meta', {'name': 'article:published_time'}), 'content'),
+        (('meta', {'property': 'og:published_time'}), 'content'),
+        (('meta', {'property': 'og:updated_time'}), 'content'),
+        (('meta', {'itemprop': 'datePublished'}), 'content'),
+        (('meta', {'name': 'date'}), 'content'),
+        (('time', {'datetime': True}), 'datetime'),
+    ]:
+        tag = soup.find(*selector)
+        if tag and tag.get(attr):
+            published = parse_datetime_str(tag.get(attr))
+            if published:
+                break
+    return text, published
+
+
+def synthetic_corpus(count: int = 40) -> List[Tuple[str, str]]:
+    """Pages d'actualité typiques (~150-400 Ko): beaucoup de chrome autour d'un article"""
+    pages = []
+    for i in range(count):
+        nav = ''.join(f'<li><a href="/rubrique/{j}">Rubrique {j}</a></li>' for j in range(150))
+        scripts = ''.join(f'<script>window.__data{j} = {{"k": "{"x" * 2000}"}};</script>' for j in range(20))
+        related = ''.join(f'<div class="teaser"><a href="/article/{i}-{j}">Titre connexe {j}</a><p>Résumé court.</p></div>'
+                          for j in range(60))
+        body = ''.join(f"<p>Paragraphe {j}: la Banque nationale suisse a maintenu son taux directeur, "
+                       f"l'inflation restant contenue à {j % 3}.{j % 10} %.</p>" for j in range(30 + i % 20))
+        html = (
+            '<!DOCTYPE html><html lang="fr"><head><meta charset="utf-8">'
+            f'<title>Article {i}</title><meta property="article:published_time" content="2025-09-{1 + i % 28:02d}T08:00:00Z">'
+            f'<style>{"body{margin:0}" * 500}</style>{scripts}</head><body>'
+            f'<header><nav><ul>{nav}</ul></nav></header>'
+            '<div id="cookie-consent">Nous utilisons des cookies. <button>Accepter</button></div>'
+            f'<main><article><h1>Article {i}</h1>{body}</article>'
+            f'<aside class="related-articles">{related}</aside></main>'
+            f'<footer>{"<a href=/legal>Mentions</a>" * 50}</footer></body></html>'
+        )
+        pages.append((f'synthetic-{i}.html', html))
+    return pages
+
+
+def load_corpus(directory: str) -> List[Tuple[str, str]]:
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, '**', '*.htm*'), recursive=True)):
+        with open(path, 'rb') as f:
+            pages.append((os.path.basename(path), f.read().decode('utf-8', errors='replace')))
+    return pages
+
+
+def _time(func, pages, repeat: int) -> List[float]:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _, html in pages:
+            func(html)
+        runs.append(time.perf_counter() - start)
+    return runs
+
+
+def run(pages: List[Tuple[str, str]], repeat: int = 5) -> dict:
+    """Temps médians (s) pour le corpus complet, pages/s et volume de texte produit"""
+    legacy_runs = _time(legacy_extract, pages, repeat)
+    new_runs = _time(extract_page, pages, repeat)
+    legacy_chars = sum(len(legacy_extract(html)[0]) for _, html in pages)
+    new_results = [extract_page(html) for _, html in pages]
+    legacy_median, new_median = statistics.median(legacy_runs), statistics.median(new_runs)
+    return {
+        'pages': len(pages),
+        'corpus_mb': round(sum(len(html) for _, html in pages) / 1e6, 2),
+        'legacy_s': round(legacy_median, 4),
+        'single_pass_s': round(new_median, 4),
+        'speedup': round(legacy_median / new_median, 2) if new_median else None,
+        'single_pass_pages_per_s': round(len(pages) / new_median, 1) if new_median else None,
+        'legacy_chars': legacy_chars,
+        'single_pass_chars': sum(len(r.text) for r in new_results),
+        'dated': sum(1 for r in new_results if r.published_at),
+        'methods': {m: sum(1 for r in new_results if r.method == m) for m in sorted({r.method for r in new_results})},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'extraction HTML des scrapers")
+    parser.add_argument('directory', nargs='?', default=os.getenv('HTML_BENCH_DIR'))
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    pages = load_corpus(args.directory) if args.directory else synthetic_corpus()
+    if not pages:
+        print(f"Aucune page *.html dans {args.directory}")
+        return 1
+    result = run(pages, args.repeat)
+    print(f"Corpus: {result['pages']} pages, {result['corpus_mb']} Mo")
+    print(f"Ancienne extraction (regex + BeautifulSoup): {result['legacy_s'] * 1000:.0f} ms")
+    print(f"Extraction une passe (lxml):                {result['single_pass_s'] * 1000:.0f} ms "
+          f"(x{result['speedup']}, {result['single_pass_pages_per_s']} pages/s)")
+    print(f"Texte produit: {result['legacy_chars']} -> {result['single_pass_chars']} caractères, "
+          f"{result['dated']} pages datées, méthodes {result['methods']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
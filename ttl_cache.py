@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Cache mémoire thread-safe: LRU borné avec expiration par clé et chargement "single-flight".
+
+`SmartCache` regroupe plusieurs familles (items, analytics, ai_responses, embeddings),
+chacune étant un `TTLCache` avec sa propre durée de vie et sa taille maximale.
+Certaines familles peuvent être partagées entre process via un niveau L2 (voir shared_cache).
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """Cache LRU borné, expiration par clé, verrouillé, avec chargement single-flight"""
+
+    def __init__(self, ttl: float, max_entries: int = 1024, name: str = 'cache'):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()  # key -> (value, expires_at)
+        self._inflight: Dict[Hashable, Future] = {}
+        self._generation = 0
+        self._lock = threading.RLock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'loads': 0, 'coalesced': 0}
+
+    def _lookup(self, key: Hashable, now: float):
+        """Retourne (trouvé, valeur); doit être appelé sous verrou"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        value, expires_at = entry
+        if expires_at <= now:
+            del self._entries[key]
+            self._stats['expirations'] += 1
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _store(self, key: Hashable, value: Any, ttl: Optional[float]) -> None:
+        """Insère une entrée et évince les plus anciennes; doit être appelé sous verrou"""
+        self._entries[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def get(self, key: Hashable = 'default') -> Any:
+        """Retourne la valeur en cache ou None"""
+        with self._lock:
+            found, value = self._lookup(key, time.monotonic())
+            self._stats['hits' if found else 'misses'] += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Stocke une valeur avec une durée de vie propre (TTL de la famille par défaut)"""
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def contains(self, key: Hashable = 'default') -> bool:
+        """Indique si une entrée valide existe, sans toucher aux compteurs"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[1] > time.monotonic()
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """
+        Retourne la valeur en cache ou l'obtient via `loader`.
+
+        Les appels concurrents pour une même clé absente partagent un seul appel à `loader`.
+        Un résultat None n'est pas mis en cache. Les exceptions du loader sont propagées
+        à tous les appelants en attente.
+        """
+        with self._lock:
+            found, value = self._lookup(key, time.monotonic())
+            if found:
+                self._stats['hits'] += 1
+                return value
+            self._stats['misses'] += 1
+            flight = self._inflight.get(key)
+            owner = flight is None
+            if owner:
+                flight = Future()
+                self._inflight[key] = flight
+                generation = self._generation
+            else:
+                self._stats['coalesced'] += 1
+
+        if not owner:
+            return flight.result()
+
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.set_exception(e)
+            raise
+        with self._lock:
+            self._stats['loads'] += 1
+            # Ne pas réinsérer une valeur chargée avant une invalidation concurrente
+            if value is not None and generation == self._generation:
+                self._store(key, value, ttl)
+            self._inflight.pop(key, None)
+        flight.set_result(value)
+        return value
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Supprime une clé, ou toutes les entrées si key est None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._generation += 1
+            else:
+                self._entries.pop(key, None)
+                if key in self._inflight:
+                    self._generation += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs hits/misses/évictions et taille courante"""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else None
+            }
+
+
+class SmartCache:
+    """Cache intelligent multi-niveaux (une famille TTLCache par type de données)"""
+
+    DEFAULT_FAMILIES = {
+        'items': {'ttl': 60, 'max_entries': 1},
+        'analytics': {'ttl': 300, 'max_entries': 1},
+        'ai_responses': {'ttl': 900, 'max_entries': 512},
+        'embeddings': {'ttl': 3600, 'max_entries': 2048}
+    }
+
+    def __init__(self, families: Optional[Dict[str, Dict[str, Any]]] = None, l2=None,
+                 codecs: Optional[Dict[str, Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]]] = None):
+        """
+        Args:
+            families: configuration {nom: {'ttl': s, 'max_entries': n}}
+            l2: niveau partagé optionnel (`shared_cache.RedisCacheTier`)
+            codecs: {nom: (encode, decode)} des familles à partager via `l2`
+        """
+        self._caches = {
+            name: TTLCache(cfg['ttl'], cfg.get('max_entries', 1024), name=name)
+            for name, cfg in (families or self.DEFAULT_FAMILIES).items()
+        }
+        if l2 is not None:
+            for name, codec in (codecs or {}).items():
+                if name in self._caches:
+                    self._caches[name] = l2.wrap(name, self._caches[name], codec)
+
+    def get(self, cache_name: str, key: str = 'default'):
+        """Récupère du cache"""
+        cache = self._caches.get(cache_name)
+        return cache.get(key) if cache else None
+
+    def set(self, cache_name: str, data: Any, key: str = 'default', ttl: Optional[float] = None):
+        """Stocke dans le cache"""
+        cache = self._caches.get(cache_name)
+        if cache:
+            cache.set(key, data, ttl)
+
+    def get_or_load(self, cache_name: str, loader: Callable[[], Any], key: str = 'default', ttl: Optional[float] = None):
+        """Récupère du cache ou charge une seule fois pour tous les appelants concurrents"""
+        cache = self._caches.get(cache_name)
+        if not cache:
+            return loader()
+        return cache.get_or_load(key, loader, ttl)
+
+    def family(self, cache_name: str):
+        """Retourne le cache d'une famille (pour les composants qui gèrent leurs propres clés)"""
+        return self._caches.get(cache_name)
+
+    def contains(self, cache_name: str, key: str = 'default') -> bool:
+        """Indique si une entrée valide est en cache"""
+        cache = self._caches.get(cache_name)
+        return bool(cache and cache.contains(key))
+
+    def invalidate(self, cache_name: str = None):
+        """Invalide le cache"""
+        if cache_name:
+            if cache_name in self._caches:
+                self._caches[cache_name].invalidate()
+        else:
+            for cache in self._caches.values():
+                cache.invalidate()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Statistiques par famille"""
+        return {name: cache.stats() for name, cache in self._caches.items()}
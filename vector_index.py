@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Index vectoriel en mémoire pour la recherche sémantique des objets de la collection.
+
+Les embeddings sont stockés dans une matrice float32 normalisée (L2), de sorte que la
+similarité cosinus d'une requête contre toute la collection se réduit à un produit
+matrice-vecteur, suivi d'un `argpartition` pour le top-k.
+"""
+
+import threading
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class EmbeddingIndex:
+    """Matrice d'embeddings normalisés, synchronisée incrémentalement avec la liste d'objets"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._source: Optional[Sequence[Any]] = None
+        self._versions: Dict[Hashable, Any] = {}
+        self._rows: Dict[Hashable, int] = {}
+        # (clés, matrice) remplacés ensemble pour que les recherches concurrentes voient un état cohérent
+        self._state: Tuple[List[Hashable], np.ndarray] = ([], np.zeros((0, 0), dtype=np.float32))
+        self.stats = {'builds': 0, 'rows_reused': 0, 'rows_encoded': 0, 'searches': 0}
+
+    def __len__(self) -> int:
+        return len(self._state[0])
+
+    def sync(self, items: Sequence[Any]) -> None:
+        """
+        Aligne l'index sur `items` (objets avec id, updated_at, embedding).
+
+        Ne fait rien si c'est la même liste que lors du dernier appel (cache items inchangé).
+        Sinon, réutilise les lignes des objets dont `updated_at` n'a pas changé et
+        n'encode que les objets nouveaux ou modifiés.
+        """
+        if items is self._source:
+            return
+        with self._lock:
+            if items is self._source:
+                return
+            keys: List[Hashable] = []
+            versions: Dict[Hashable, Any] = {}
+            reused_rows: List[int] = []
+            reused_positions: List[int] = []
+            fresh_vectors: List[Any] = []
+            fresh_positions: List[int] = []
+            old_keys, old_matrix = self._state
+            dim: Optional[int] = None
+
+            for item in items:
+                embedding = getattr(item, 'embedding', None)
+                key = getattr(item, 'id', None)
+                if key is None:
+                    key = id(item)
+                if embedding is None or len(embedding) == 0 or key in versions:
+                    continue
+                if dim is None:
+                    dim = len(embedding)
+                if len(embedding) != dim:
+                    continue
+                version = getattr(item, 'updated_at', None)
+                position = len(keys)
+                keys.append(key)
+                versions[key] = version
+                row = self._rows.get(key)
+                if row is not None and self._versions.get(key) == version and old_matrix.shape[1] == dim:
+                    reused_rows.append(row)
+                    reused_positions.append(position)
+                else:
+                    fresh_vectors.append(embedding)
+                    fresh_positions.append(position)
+
+            matrix = np.empty((len(keys), dim or 0), dtype=np.float32)
+            if reused_rows:
+                matrix[reused_positions] = old_matrix[reused_rows]
+            if fresh_vectors:
+                matrix[fresh_positions] = _normalize_rows(np.asarray(fresh_vectors, dtype=np.float32))
+
+            self._state = (keys, matrix)
+            self._versions = versions
+            self._rows = {key: i for i, key in enumerate(keys)}
+            self._source = items
+            self.stats['builds'] += 1
+            self.stats['rows_reused'] += len(reused_rows)
+            self.stats['rows_encoded'] += len(fresh_vectors)
+
+    def search(self, query_embedding: Sequence[float], top_k: int = 10) -> List[Tuple[Hashable, float]]:
+        """Retourne les `top_k` (clé, similarité cosinus) les plus proches, triés"""
+        keys, matrix = self._state
+        if not keys or query_embedding is None or len(query_embedding) != matrix.shape[1]:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if norm == 0:
+            return []
+        scores = matrix @ (query / norm)
+        k = min(max(1, int(top_k)), len(keys))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        self.stats['searches'] += 1
+        return [(keys[i], float(scores[i])) for i in top]
@@ -12,6 +12,8 @@ from typing import Dict, List, Optional, Union, Any
 from datetime import datetime, timedelta
 import re
 
+from rate_limiter import get_rate_limiter
+
 logger = logging.getLogger(__name__)
 
 def get_yahoo_crumb():
@@ -62,8 +64,8 @@ class YahooFinanceAPI:
         self.session = None
         self.crumb = None
         self.base_url = "https://query1.finance.yahoo.com"
-        self.last_request_time = None
-        self.min_request_interval = 1.0
+        # Budget Yahoo commun avec yfinance (stock_api_manager), partagé entre workers via Redis
+        self.rate_limiter = get_rate_limiter('yahoo')
         self.max_retries = 3
         self.retry_delay = 2
         self.crumb_lifetime = timedelta(hours=1)
@@ -87,12 +89,7 @@ class YahooFinanceAPI:
     
     def _wait_between_requests(self):
         """Attend entre les requêtes pour éviter les rate limits"""
-        if self.last_request_time:
-            elapsed = time.time() - self.last_request_time
-            if elapsed < self.min_request_interval:
-                sleep_time = self.min_request_interval - elapsed + 0.1
-                time.sleep(sleep_time)
-        self.last_request_time = time.time()
+        self.rate_limiter.acquire()
     
     def _refresh_crumb(self):
         """Renouvelle le crumb et la session"""